@@ -0,0 +1,36 @@
+"""
+Add content hash to attachments
+
+Revision ID: 0005_attachment_sha256
+Revises: 0004_add_attachments
+Create Date: 2026-10-19
+
+New uploads are stored content-addressed (ab/cd/<sha256>) and deduplicated;
+rows sharing a path are the blob's references, hence the index on path.
+Existing files keep their location and a NULL hash: schema only, the hashes
+are filled in afterwards by ``python -m app.storage.hashes`` (or the
+``storage.hash_backfill`` job), which commits batch by batch instead of
+reading every file while this migration holds its lock on the table.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_attachment_sha256'
+down_revision: Union[str, None] = '0004_add_attachments'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('attachments', sa.Column('sha256', sa.String(length=64), nullable=True))
+    op.create_index('ix_attachments_sha256', 'attachments', ['sha256'], unique=False)
+    op.create_index('ix_attachments_path', 'attachments', ['path'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_attachments_path', table_name='attachments')
+    op.drop_index('ix_attachments_sha256', table_name='attachments')
+    op.drop_column('attachments', 'sha256')
@@ -0,0 +1,41 @@
+"""
+Add per-user storage usage counter
+
+Revision ID: 0006_storage_usage
+Revises: 0005_attachment_sha256
+Create Date: 2026-10-19
+
+One row per user with the bytes of their attachments, updated in the same
+transaction as attachment inserts/deletes so quota checks are a primary key
+lookup instead of SUM(size). Backfilled from the existing attachments.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_storage_usage'
+down_revision: Union[str, None] = '0005_attachment_sha256'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'storage_usage',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('bytes_used', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.execute(
+        "INSERT INTO storage_usage (user_id, bytes_used) "
+        "SELECT user_id, COALESCE(SUM(size), 0) FROM attachments GROUP BY user_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('storage_usage')
@@ -0,0 +1,34 @@
+"""
+Add deleted_at to cards and users
+
+Revision ID: 0009_deleted_at
+Revises: 0008_jobs
+Create Date: 2026-10-19
+
+Deleting a card or user now marks it and queues a job that removes its
+history in small batches; nullable columns without default are added
+without rewriting the tables. audit_logs.user_id gets an index so detaching
+a deleted user's entries does not scan the whole log.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0009_deleted_at'
+down_revision: Union[str, None] = '0008_jobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('cards', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('users', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_audit_logs_user_id', 'audit_logs', ['user_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_audit_logs_user_id', table_name='audit_logs')
+    op.drop_column('users', 'deleted_at')
+    op.drop_column('cards', 'deleted_at')
@@ -0,0 +1,28 @@
+"""
+Add sequence for user change events
+
+Revision ID: 0010_user_event_seq
+Revises: 0009_deleted_at
+Create Date: 2026-10-19
+
+Change events go out through NOTIFY and are not stored; the sequence only
+numbers them so SSE clients can resume with Last-Event-ID.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0010_user_event_seq'
+down_revision: Union[str, None] = '0009_deleted_at'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence('user_event_id_seq')))
+
+
+def downgrade() -> None:
+    op.execute(sa.schema.DropSequence(sa.Sequence('user_event_id_seq')))
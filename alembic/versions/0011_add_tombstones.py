@@ -0,0 +1,54 @@
+"""
+Add tombstones and updated_at indexes for delta sync
+
+Revision ID: 0011_tombstones
+Revises: 0010_user_event_seq
+Create Date: 2026-10-19
+
+Delta sync walks (user_id, updated_at, id) keysets. The index on the
+transactions table is built CONCURRENTLY so writes are not blocked while it
+builds on a large table.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0011_tombstones'
+down_revision: Union[str, None] = '0010_user_event_seq'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'tombstones',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=16), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_tombstones_user_created', 'tombstones', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_cards_user_updated', 'cards', ['user_id', 'updated_at', 'id'], unique=False)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_user_updated',
+            'transactions',
+            ['user_id', 'updated_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_transactions_user_updated', table_name='transactions', postgresql_concurrently=True)
+    op.drop_index('ix_cards_user_updated', table_name='cards')
+    op.drop_index('ix_tombstones_user_created', table_name='tombstones')
+    op.drop_table('tombstones')
@@ -0,0 +1,53 @@
+"""
+Add transactional outbox and relay offsets
+
+Revision ID: 0012_outbox
+Revises: 0011_tombstones
+Create Date: 2026-10-19
+
+Domain writes insert their events into outbox_events in the same
+transaction; the relay delivers them to the configured sinks in
+(txid, id) order and records how far each sink got in outbox_offsets.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '0012_outbox'
+down_revision: Union[str, None] = '0011_tombstones'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'outbox_events',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('txid', sa.BigInteger(), server_default=sa.text('pg_current_xact_id()::text::bigint'), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(length=64), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_outbox_events_position', 'outbox_events', ['txid', 'id'], unique=False)
+    op.create_table(
+        'outbox_offsets',
+        sa.Column('sink', sa.String(length=64), nullable=False),
+        sa.Column('txid', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('event_id', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('delivered', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('sink'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('outbox_offsets')
+    op.drop_index('ix_outbox_events_position', table_name='outbox_events')
+    op.drop_table('outbox_events')
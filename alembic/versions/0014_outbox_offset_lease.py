@@ -0,0 +1,31 @@
+"""
+Lease outbox offsets instead of locking them during delivery
+
+Revision ID: 0014_outbox_lease
+Revises: 0013_webhooks
+Create Date: 2026-10-19
+
+The relay used to keep a sink's offset row locked FOR UPDATE while the sink
+delivered, which kept a transaction (and its txid) open and held back the
+xmin watermark every sink reads up to. Relays now take a committed lease.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0014_outbox_lease'
+down_revision: Union[str, None] = '0013_webhooks'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('outbox_offsets', sa.Column('locked_by', sa.String(length=64), nullable=True))
+    op.add_column('outbox_offsets', sa.Column('lease_until', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('outbox_offsets', 'lease_until')
+    op.drop_column('outbox_offsets', 'locked_by')
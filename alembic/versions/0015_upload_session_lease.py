@@ -0,0 +1,32 @@
+"""
+Lease upload sessions instead of locking them while a chunk is received
+
+Revision ID: 0015_upload_session_lease
+Revises: 0014_outbox_lease
+Create Date: 2026-10-19
+
+PATCH kept the session row locked FOR UPDATE NOWAIT for as long as the
+client took to send the chunk, pinning a pooled connection idle in
+transaction. Requests now take a short committed lease, renewed while the
+chunk streams in.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0015_upload_session_lease'
+down_revision: Union[str, None] = '0014_outbox_lease'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('upload_sessions', sa.Column('locked_by', sa.String(length=32), nullable=True))
+    op.add_column('upload_sessions', sa.Column('lease_until', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('upload_sessions', 'lease_until')
+    op.drop_column('upload_sessions', 'locked_by')
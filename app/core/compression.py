@@ -0,0 +1,210 @@
+"""Response compression (zstd, brotli, gzip) as pure ASGI middleware.
+
+The encoding is negotiated from ``Accept-Encoding`` in server preference order;
+zstd and brotli are used only when their packages are installed. Bodies below
+``minimum_size`` go out untouched. Streaming responses are compressed chunk by
+chunk with a sync flush, so clients keep receiving data as it is produced.
+Chunks of ``offload_size`` bytes or more are compressed in a worker thread to
+keep the event loop free.
+
+Responses are skipped when they already carry ``Content-Encoding``, are
+partial (206), have a non-compressible media type, or are marked
+``Cache-Control: no-transform`` (attachment downloads use this: they are
+mostly already-compressed images/PDFs and may be served byte ranges).
+"""
+import zlib
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/problem+json",
+    "application/x-ndjson",
+    "application/xml",
+    "application/javascript",
+    "image/svg+xml",
+)
+
+
+class _Gzip:
+    def __init__(self) -> None:
+        self._c = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.compress(data) + self._c.flush()
+
+
+class _Zstd:
+    def __init__(self) -> None:
+        self._c = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.compress(data) + self._c.flush()
+
+
+class _Brotli:
+    def __init__(self) -> None:
+        self._c = brotli.Compressor(quality=4)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.process(data) + self._c.finish()
+
+
+CODECS = {"gzip": _Gzip}
+if zstandard is not None:
+    CODECS["zstd"] = _Zstd
+if brotli is not None:
+    CODECS["br"] = _Brotli
+
+
+def negotiate(accept_encoding: str, preferred: tuple[str, ...]) -> str | None:
+    """First encoding of ``preferred`` the client accepts (``q`` > 0) and we can produce."""
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    wildcard = accepted.get("*", 0.0)
+    for name in preferred:
+        if name in CODECS and accepted.get(name, wildcard) > 0:
+            return name
+    return None
+
+
+def _compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers or "content-range" in headers:
+        return False
+    if "no-transform" in headers.get("cache-control", "").lower():
+        return False
+    content_type = headers.get("content-type", "").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        offload_size: int = 256 * 1024,
+        encodings: tuple[str, ...] = ("zstd", "br", "gzip"),
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self.encodings = encodings
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponder(self, encoding, send).run(scope, receive)
+
+
+class _CompressedResponder:
+    """Per-request state: holds ``http.response.start`` until the first body
+    bytes tell whether the response is worth compressing."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send) -> None:
+        self.mw = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start: Message | None = None
+        self.buffer = bytearray()
+        self.compressor = None
+        self.passthrough = False
+
+    async def run(self, scope: Scope, receive: Receive) -> None:
+        await self.mw.app(scope, receive, self.send_wrapper)
+
+    async def _call(self, fn, data: bytes) -> bytes:
+        if len(data) >= self.mw.offload_size:
+            return await anyio.to_thread.run_sync(fn, data)
+        return fn(data)
+
+    async def send_wrapper(self, message: Message) -> None:
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if message["status"] in (204, 206, 304) or not _compressible(headers):
+                self.passthrough = True
+                await self.send(message)
+                return
+            self.start = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            self.buffer += body
+            if more_body and len(self.buffer) < self.mw.minimum_size:
+                return  # keep buffering until the size threshold tells us what to do
+            data = bytes(self.buffer)
+            self.buffer.clear()
+            if not more_body and len(data) < self.mw.minimum_size:
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": data})
+                return
+
+            self.compressor = CODECS[self.encoding]()
+            headers = MutableHeaders(scope=self.start)
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers and not headers["etag"].startswith("W/"):
+                # the representation changes, so a strong validator no longer applies
+                headers["ETag"] = "W/" + headers["etag"]
+            if more_body:
+                del headers["Content-Length"]
+                compressed = await self._call(self.compressor.compress, data)
+            else:
+                compressed = await self._call(self.compressor.finish, data)
+                headers["Content-Length"] = str(len(compressed))
+            await self.send(self.start)
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+            return
+
+        fn = self.compressor.compress if more_body else self.compressor.finish
+        compressed = await self._call(fn, body)
+        if compressed or not more_body:
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
@@ -17,14 +17,90 @@ class Settings(BaseSettings):
     reset_db_on_start: bool = Field(alias="RESET_DB_ON_START", default=False)
     secret_key: str = Field(alias="SECRET_KEY")
     access_token_expire_minutes: int = Field(alias="ACCESS_TOKEN_EXPIRE_MINUTES", default=30)
-    loki_url: str = Field(alias="LOKI_URL")
+    loki_url: str | None = Field(alias="LOKI_URL", default=None)
+    loki_batch_size: int = Field(alias="LOKI_BATCH_SIZE", default=500)
+    loki_flush_interval: float = Field(alias="LOKI_FLUSH_INTERVAL", default=2.0)
+    loki_max_buffer_mb: int = Field(alias="LOKI_MAX_BUFFER_MB", default=8)
+    loki_timeout: float = Field(alias="LOKI_TIMEOUT", default=5.0)
+    loki_max_retries: int = Field(alias="LOKI_MAX_RETRIES", default=5)
     log_level: str = Field(alias="LOG_LEVEL", default="INFO")
+    log_queue_size: int = Field(alias="LOG_QUEUE_SIZE", default=10000)
+    log_sample_rate: float = Field(alias="LOG_SAMPLE_RATE", default=1.0)
+    log_sampled_events: str | None = Field(alias="LOG_SAMPLED_EVENTS", default="request_start,request_completed,health")
     upload_dir: str = Field(alias="UPLOAD_DIR", default="uploads")
     upload_max_mb: int = Field(alias="UPLOAD_MAX_MB", default=5)
+    upload_max_files: int = Field(alias="UPLOAD_MAX_FILES", default=10)
+    upload_concurrency: int = Field(alias="UPLOAD_CONCURRENCY", default=4)
+    upload_session_ttl_hours: float = Field(alias="UPLOAD_SESSION_TTL_HOURS", default=24)
+    upload_session_lease_seconds: float = Field(alias="UPLOAD_SESSION_LEASE_SECONDS", default=60)
+    upload_quota_mb: int = Field(alias="UPLOAD_QUOTA_MB", default=1024)
     upload_allowed_content_types: str | None = Field(alias="UPLOAD_ALLOWED_CONTENT_TYPES", default=None)
     upload_blocked_content_types: str | None = Field(alias="UPLOAD_BLOCKED_CONTENT_TYPES", default=None)
     upload_allowed_exts: str | None = Field(alias="UPLOAD_ALLOWED_EXTS", default=None)
     upload_blocked_exts: str | None = Field(alias="UPLOAD_BLOCKED_EXTS", default=None)
+    jobs_worker_enabled: bool = Field(alias="JOBS_WORKER_ENABLED", default=True)
+    jobs_concurrency: int = Field(alias="JOBS_CONCURRENCY", default=4)
+    jobs_poll_seconds: float = Field(alias="JOBS_POLL_SECONDS", default=1.0)
+    jobs_heartbeat_seconds: float = Field(alias="JOBS_HEARTBEAT_SECONDS", default=10.0)
+    jobs_stale_seconds: float = Field(alias="JOBS_STALE_SECONDS", default=60.0)
+    jobs_retry_base_seconds: float = Field(alias="JOBS_RETRY_BASE_SECONDS", default=5.0)
+    jobs_retry_max_seconds: float = Field(alias="JOBS_RETRY_MAX_SECONDS", default=600.0)
+    delete_batch_size: int = Field(alias="DELETE_BATCH_SIZE", default=500)
+    delete_batch_pause_ms: int = Field(alias="DELETE_BATCH_PAUSE_MS", default=50)
+    events_heartbeat_seconds: float = Field(alias="EVENTS_HEARTBEAT_SECONDS", default=15.0)
+    events_queue_size: int = Field(alias="EVENTS_QUEUE_SIZE", default=100)
+    events_history_size: int = Field(alias="EVENTS_HISTORY_SIZE", default=1000)
+    events_retry_ms: int = Field(alias="EVENTS_RETRY_MS", default=3000)
+    sync_settle_seconds: float = Field(alias="SYNC_SETTLE_SECONDS", default=2.0)
+    sync_tombstone_retention_days: int = Field(alias="SYNC_TOMBSTONE_RETENTION_DAYS", default=90)
+    outbox_sinks: str | None = Field(alias="OUTBOX_SINKS", default="webhooks")
+    outbox_relay_enabled: bool = Field(alias="OUTBOX_RELAY_ENABLED", default=True)
+    outbox_batch_size: int = Field(alias="OUTBOX_BATCH_SIZE", default=500)
+    outbox_poll_seconds: float = Field(alias="OUTBOX_POLL_SECONDS", default=1.0)
+    outbox_purge_seconds: float = Field(alias="OUTBOX_PURGE_SECONDS", default=60.0)
+    outbox_retry_base_seconds: float = Field(alias="OUTBOX_RETRY_BASE_SECONDS", default=1.0)
+    outbox_retry_max_seconds: float = Field(alias="OUTBOX_RETRY_MAX_SECONDS", default=300.0)
+    outbox_lease_seconds: float = Field(alias="OUTBOX_LEASE_SECONDS", default=120.0)
+    outbox_file_dir: str = Field(alias="OUTBOX_FILE_DIR", default="outbox")
+    outbox_http_url: str | None = Field(alias="OUTBOX_HTTP_URL", default=None)
+    outbox_http_timeout: float = Field(alias="OUTBOX_HTTP_TIMEOUT", default=10.0)
+    outbox_notify_channel: str = Field(alias="OUTBOX_NOTIFY_CHANNEL", default="outbox_events")
+    webhooks_worker_enabled: bool = Field(alias="WEBHOOKS_WORKER_ENABLED", default=True)
+    webhooks_concurrency: int = Field(alias="WEBHOOKS_CONCURRENCY", default=4)
+    webhooks_batch_size: int = Field(alias="WEBHOOKS_BATCH_SIZE", default=50)
+    webhooks_timeout_seconds: float = Field(alias="WEBHOOKS_TIMEOUT_SECONDS", default=10.0)
+    webhooks_poll_seconds: float = Field(alias="WEBHOOKS_POLL_SECONDS", default=1.0)
+    webhooks_max_attempts: int = Field(alias="WEBHOOKS_MAX_ATTEMPTS", default=8)
+    webhooks_retry_base_seconds: float = Field(alias="WEBHOOKS_RETRY_BASE_SECONDS", default=5.0)
+    webhooks_retry_max_seconds: float = Field(alias="WEBHOOKS_RETRY_MAX_SECONDS", default=600.0)
+    webhooks_failure_threshold: int = Field(alias="WEBHOOKS_FAILURE_THRESHOLD", default=5)
+    webhooks_cooldown_seconds: float = Field(alias="WEBHOOKS_COOLDOWN_SECONDS", default=300.0)
+    webhooks_max_per_user: int = Field(alias="WEBHOOKS_MAX_PER_USER", default=10)
+    webhooks_allow_private_targets: bool = Field(alias="WEBHOOKS_ALLOW_PRIVATE_TARGETS", default=False)
+    download_offload: Literal["direct", "x-accel", "x-sendfile"] = Field(alias="DOWNLOAD_OFFLOAD", default="direct")
+    download_accel_prefix: str = Field(alias="DOWNLOAD_ACCEL_PREFIX", default="/protected-uploads/")
+    thumbnails_enabled: bool = Field(alias="THUMBNAILS_ENABLED", default=True)
+    thumbnail_max_px: int = Field(alias="THUMBNAIL_MAX_PX", default=320)
+    thumbnail_workers: int = Field(alias="THUMBNAIL_WORKERS", default=2)
+    storage_backend: Literal["local", "s3"] = Field(alias="STORAGE_BACKEND", default="local")
+    s3_bucket: str | None = Field(alias="S3_BUCKET", default=None)
+    s3_prefix: str = Field(alias="S3_PREFIX", default="")
+    s3_endpoint_url: str | None = Field(alias="S3_ENDPOINT_URL", default=None)
+    s3_region: str | None = Field(alias="S3_REGION", default=None)
+    s3_access_key_id: str | None = Field(alias="S3_ACCESS_KEY_ID", default=None)
+    s3_secret_access_key: str | None = Field(alias="S3_SECRET_ACCESS_KEY", default=None)
+    s3_max_pool_connections: int = Field(alias="S3_MAX_POOL_CONNECTIONS", default=20)
+    s3_multipart_threshold_mb: int = Field(alias="S3_MULTIPART_THRESHOLD_MB", default=8)
+    s3_part_size_mb: int = Field(alias="S3_PART_SIZE_MB", default=8)
+    query_budget_statements: int = Field(alias="QUERY_BUDGET_STATEMENTS", default=30)
+    query_budget_ms: int = Field(alias="QUERY_BUDGET_MS", default=500)
+    query_repeat_threshold: int = Field(alias="QUERY_REPEAT_THRESHOLD", default=5)
+    slow_query_ms: int = Field(alias="SLOW_QUERY_MS", default=200)
+    slow_query_explain: bool = Field(alias="SLOW_QUERY_EXPLAIN", default=False)
+    compression_enabled: bool = Field(alias="COMPRESSION_ENABLED", default=True)
+    compression_min_size: int = Field(alias="COMPRESSION_MIN_SIZE", default=1024)
+    compression_offload_size: int = Field(alias="COMPRESSION_OFFLOAD_SIZE", default=262144)
+    compression_encodings: str = Field(alias="COMPRESSION_ENCODINGS", default="zstd,br,gzip")
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
@@ -19,8 +19,37 @@ async def get_current_user(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales inválidas")
 
     user_id = payload["sub"]
-    result = await db.execute(select(User).where(User.id == int(user_id)))
+    # Cuentas en borrado (deleted_at) dejan de autenticar en cuanto se solicita
+    result = await db.execute(select(User).where(User.id == int(user_id), User.deleted_at.is_(None)))
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no encontrado")
     return user
+
+
+def sparse_fields(allowed: tuple[str, ...]):
+    """Build a dependency for ``?fields=a,b`` on list endpoints.
+
+    Names are checked against ``allowed`` and returned in allow-list order (so
+    the column lists stay cacheable); without the parameter every allowed field
+    is returned. Unknown names are rejected with 400.
+    """
+    allowed_set = frozenset(allowed)
+
+    def dependency(
+        fields: str | None = Query(None, description=f"Campos separados por coma: {', '.join(allowed)}"),
+    ) -> tuple[str, ...]:
+        if fields is None:
+            return allowed
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        if not requested:
+            return allowed
+        unknown = requested - allowed_set
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Campos no permitidos: {', '.join(sorted(unknown))}",
+            )
+        return tuple(name for name in allowed if name in requested)
+
+    return dependency
@@ -1,10 +1,19 @@
+import atexit
 import logging
+import queue
+import random
+import threading
+from contextvars import ContextVar
 from datetime import datetime, timezone
-from typing import Any, Dict
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Dict
 
 from pythonjsonlogger import jsonlogger
 
 from .config import get_settings
+from .loki import LokiHandler
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
 
 
 class UTCFormatter(jsonlogger.JsonFormatter):
@@ -20,15 +29,102 @@ class UTCFormatter(jsonlogger.JsonFormatter):
             log_record["details"] = {}
 
 
+class DroppingQueueHandler(QueueHandler):
+    """Non-blocking QueueHandler: when the bounded queue is full the record is
+    dropped and counted instead of stalling the caller (the event loop).
+
+    The number of dropped records is reported as a warning record once the
+    queue accepts records again.
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported = 0
+        self._drop_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve what cannot safely cross threads; JSON formatting happens in the listener.
+        # The queue handler is the only root handler, so the record can be updated in place.
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+                self._unreported += 1
+            return
+        if self._unreported:
+            self._report_dropped()
+
+    def _report_dropped(self) -> None:
+        with self._drop_lock:
+            count, self._unreported = self._unreported, 0
+        if not count:
+            return
+        record = logging.LogRecord(__name__, logging.WARNING, __file__, 0, "Log records dropped", None, None)
+        record.details = {"event": "log_dropped", "extra": {"dropped": count, "dropped_total": self.dropped}}
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self._unreported += count
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request id to the record while still in the request's context.
+
+    The JSON formatter emits it as a top-level ``request_id`` field.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = request_id_var.get()
+        if request_id is not None:
+            record.request_id = request_id
+        return True
+
+
+class SuccessSampler(logging.Filter):
+    """Keep only a fraction of high-volume success events (e.g. 2xx ``request_completed``, ``health``).
+
+    Warnings, errors and any record with ``status_code >= 400`` are always kept.
+    """
+
+    def __init__(self, events: set[str], rate: float) -> None:
+        super().__init__()
+        self.events = events
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1.0 or record.levelno > logging.INFO:
+            return True
+        details = getattr(record, "details", None)
+        if not isinstance(details, dict) or details.get("event") not in self.events:
+            return True
+        status_code = details.get("status_code")
+        if status_code is not None and status_code >= 400:
+            return True
+        return random.random() < self.rate
+
+
 settings = get_settings()
 _configured = False
+_listener: QueueListener | None = None
 
 # In case Uvicorn config runs after import, provide a helper to re-tune loggers
 # without re-creating handlers. This is safe to call multiple times.
 
 
 def configure_logging() -> logging.Logger:
-    global _configured
+    global _configured, _listener
     if _configured:
         # Re-ajustar niveles y propagación de loggers de librerías en cada llamada
         root_logger = logging.getLogger()
@@ -45,11 +141,23 @@ def configure_logging() -> logging.Logger:
 
     formatter = UTCFormatter("%(timestamp)s %(level)s %(message)s")
 
-    # Stream handler para consola
+    # Stream handler para consola; corre en el hilo del QueueListener, fuera del event loop
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(formatter)
     stream_handler.setLevel(getattr(logging, settings.log_level.upper(), logging.INFO))
-    root_logger.addHandler(stream_handler)
+
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=settings.log_queue_size))
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(SuccessSampler(_parse_events(settings.log_sampled_events), settings.log_sample_rate))
+    root_logger.addHandler(queue_handler)
+
+    handlers: list[logging.Handler] = [stream_handler]
+    if settings.loki_url:
+        handlers.append(_build_loki_handler(formatter))
+
+    _listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
 
     # Configurar loggers específicos de librerías
     _tune_library_loggers()
@@ -59,6 +167,58 @@ def configure_logging() -> logging.Logger:
     return root_logger
 
 
+def shutdown_logging() -> None:
+    """Flush queued records, stop the listener thread and close its handlers. Safe to call multiple times."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def _build_loki_handler(formatter: logging.Formatter) -> LokiHandler:
+    handler = LokiHandler(
+        settings.loki_url,
+        labels={"app": settings.app_name, "service": settings.service_name},
+        batch_size=settings.loki_batch_size,
+        flush_interval=settings.loki_flush_interval,
+        max_buffer_bytes=settings.loki_max_buffer_mb * 1024 * 1024,
+        timeout=settings.loki_timeout,
+        max_retries=settings.loki_max_retries,
+    )
+    handler.setFormatter(formatter)
+    handler.setLevel(getattr(logging, settings.log_level.upper(), logging.INFO))
+    return handler
+
+
+def _parse_events(value: str | None) -> set[str]:
+    return {v.strip() for v in value.split(",") if v.strip()} if value else set()
+
+
+def log_event(
+    logger: logging.Logger,
+    level: int,
+    message: str,
+    event: str,
+    extra: Callable[[], dict[str, Any]] | None = None,
+    **fields: Any,
+) -> None:
+    """Log a structured ``details`` record, building the payload only if ``level`` is enabled.
+
+    ``extra`` is a zero-argument callable returning the ``details.extra`` dict, so
+    comprehensions, ``isoformat()`` calls and nested dicts cost nothing when the
+    level is disabled (DEBUG in production). ``fields`` go at the top level of
+    ``details`` (e.g. ``status_code``, ``duration_ms``).
+    """
+    if not logger.isEnabledFor(level):
+        return
+    details: dict[str, Any] = {"event": event, **fields}
+    if extra is not None:
+        details["extra"] = extra()
+    logger.log(level, message, extra={"details": details}, stacklevel=2)
+
+
 def get_logger(module_name: str) -> logging.Logger:
     configure_logging()
     return logging.getLogger(module_name)
@@ -68,7 +228,7 @@ def _tune_library_loggers() -> None:
     """Ensure third-party loggers forward to our root handler.
 
     Uvicorn config can override logger handlers/propagation during startup.
-    We clear their handlers and enable propagation so our root stream handler
+    We clear their handlers and enable propagation so our root queue handler
     formats everything (including access logs) as JSON. Safe to call multiple times.
     """
     level = getattr(logging, settings.log_level.upper(), logging.INFO)
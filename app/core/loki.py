@@ -0,0 +1,158 @@
+"""Batched Loki push handler.
+
+Records are formatted by the handler (which runs in the logging QueueListener
+thread, never on the event loop), grouped by stream labels and pushed to
+Loki's ``/loki/api/v1/push`` endpoint from a dedicated background thread.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import sys
+import threading
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+
+class LokiHandler(logging.Handler):
+    """Buffer log lines per stream (app, service, level, module) and push them in gzip batches.
+
+    - A batch is flushed every ``flush_interval`` seconds, or earlier once
+      ``batch_size`` records are buffered.
+    - Buffered plus in-flight lines never exceed ``max_buffer_bytes``; records
+      arriving over budget are dropped and counted in ``dropped``.
+    - Failed pushes are retried with exponential backoff; a batch that still
+      fails is discarded and counted in ``failed_batches``.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        labels: dict[str, str],
+        batch_size: int = 500,
+        flush_interval: float = 2.0,
+        max_buffer_bytes: int = 8 * 1024 * 1024,
+        timeout: float = 5.0,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ) -> None:
+        super().__init__()
+        self.url = url
+        self.labels = labels
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer_bytes = max_buffer_bytes
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.dropped = 0
+        self.failed_batches = 0
+        self.pushed_batches = 0
+
+        self._streams: dict[tuple[str, str], list[list[str]]] = defaultdict(list)
+        self._buffered = 0
+        self._bytes = 0  # buffered + in-flight bytes, bounded by max_buffer_bytes
+        self._buffer_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="loki-push", daemon=True)
+        self._thread.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record)
+        except Exception:  # noqa: BLE001
+            self.handleError(record)
+            return
+        size = len(line)
+        key = (record.levelname.lower(), record.name)
+        with self._buffer_lock:
+            if self._bytes + size > self.max_buffer_bytes:
+                self.dropped += 1
+                return
+            self._streams[key].append([str(int(record.created * 1e9)), line])
+            self._buffered += 1
+            self._bytes += size
+            full = self._buffered >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self) -> None:
+        self._push_pending(retries=self.max_retries)
+
+    def close(self) -> None:
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout=self.timeout + 1)
+        # Final attempt without retries so process shutdown stays bounded
+        self._push_pending(retries=0)
+        super().close()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stopping.is_set():
+                break
+            self._push_pending(retries=self.max_retries)
+
+    def _take(self) -> tuple[dict[tuple[str, str], list[list[str]]], int]:
+        with self._buffer_lock:
+            streams, self._streams = self._streams, defaultdict(list)
+            size = sum(len(v[1]) for values in streams.values() for v in values)
+            self._buffered = 0
+        return streams, size
+
+    def _payload(self, streams: dict[tuple[str, str], list[list[str]]]) -> bytes:
+        body = {
+            "streams": [
+                {"stream": {**self.labels, "level": level, "module": module}, "values": values}
+                for (level, module), values in streams.items()
+            ]
+        }
+        return gzip.compress(json.dumps(body, separators=(",", ":")).encode("utf-8"))
+
+    def _push_pending(self, *, retries: int) -> None:
+        streams, size = self._take()
+        if not streams:
+            return
+        try:
+            if self._send(self._payload(streams), retries=retries):
+                self.pushed_batches += 1
+            else:
+                self.failed_batches += 1
+                # Logging from inside a log handler would recurse; report on stderr instead
+                sys.stderr.write(f"loki push failed, dropped {sum(len(v) for v in streams.values())} records\n")
+        finally:
+            with self._buffer_lock:
+                self._bytes -= size
+
+    def _send(self, payload: bytes, *, retries: int) -> bool:
+        request = urllib.request.Request(
+            self.url,
+            data=payload,
+            method="POST",
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+        )
+        for attempt in range(retries + 1):
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+                return True
+            except urllib.error.HTTPError as exc:
+                # Client errors other than rate limiting will not succeed on retry
+                if 400 <= exc.code < 500 and exc.code != 429:
+                    return False
+            except (urllib.error.URLError, OSError):
+                pass
+            if attempt < retries:
+                delay = min(self.backoff * (2**attempt), self.max_backoff)
+                if self._stopping.wait(delay):
+                    return False
+        return False
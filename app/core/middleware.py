@@ -0,0 +1,114 @@
+import re
+import time
+import uuid
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.logging_config import get_logger, request_id_var
+from app.db.instrumentation import report_query_budget, track_queries
+
+logger = get_logger(__name__)
+
+REQUEST_ID_HEADER = "x-request-id"
+# client ids end up in every log record and Loki stream: anything else gets a fresh one
+_REQUEST_ID_RE = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+
+class RequestLoggingMiddleware:
+    """Pure ASGI request timing and logging.
+
+    Unlike ``@app.middleware("http")`` (``BaseHTTPMiddleware``) this does not
+    wrap the response in an extra task and memory stream: messages are passed
+    straight through, so ``StreamingResponse``/``FileResponse`` keep streaming.
+    The status code is captured from ``http.response.start`` and the request id
+    is exposed to every log record emitted while the request is handled.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        headers = Headers(scope=scope)
+        request_id = headers.get(REQUEST_ID_HEADER)
+        if not request_id or not _REQUEST_ID_RE.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        method = scope["method"]
+        path = scope["path"]
+        client = scope.get("client")
+        status_code = 500
+
+        logger.info(
+            "HTTP request started",
+            extra={
+                "details": {
+                    "event": "request_start",
+                    "extra": {
+                        "method": method,
+                        "path": path,
+                        "user_agent": headers.get("user-agent"),
+                        "client_ip": client[0] if client else None,
+                    },
+                }
+            },
+        )
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, request_id)
+            await send(message)
+
+        try:
+            try:
+                with track_queries() as query_stats:
+                    await self.app(scope, receive, send_wrapper)
+            except Exception as exc:  # noqa: BLE001
+                logger.error(
+                    "Unhandled exception in request",
+                    extra={
+                        "details": {
+                            "event": "request_error",
+                            "status_code": 500,
+                            "duration_ms": int((time.perf_counter() - start_time) * 1000),
+                            "extra": {
+                                "method": method,
+                                "path": path,
+                                "error": str(exc),
+                                "error_type": type(exc).__name__,
+                            },
+                        }
+                    },
+                )
+                raise
+
+            duration_ms = int((time.perf_counter() - start_time) * 1000)
+            report_query_budget(query_stats, method=method, path=path)
+
+            # Nivel de log según el status code
+            log = logger.error if status_code >= 400 else logger.info
+            log(
+                "HTTP request completed",
+                extra={
+                    "details": {
+                        "event": "request_completed",
+                        "status_code": status_code,
+                        "duration_ms": duration_ms,
+                        "extra": {
+                            "method": method,
+                            "path": path,
+                            "db_statements": query_stats.count,
+                            "db_duration_ms": round(query_stats.duration_ms, 2),
+                        },
+                    }
+                },
+            )
+        finally:
+            request_id_var.reset(token)
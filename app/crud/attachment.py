@@ -1,6 +1,13 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.db.models import Attachment
+from datetime import datetime
+
+from sqlalchemy import delete, func, insert, or_, select
+from app.crud.outbox import OutboxCRUD, attachment_data
+from app.crud.rows import columns_for, fetch_dicts
+from app.crud.storage_usage import StorageUsageCRUD
+from app.crud.transaction import on_visible_card
+from app.db.models import Attachment, Transaction
+from app.db.models.outbox import ATTACHMENT_CREATED, ATTACHMENT_DELETED
 
 
 class AttachmentCRUD:
@@ -15,7 +22,14 @@ class AttachmentCRUD:
         size: int | None,
         transaction_id: int | None,
         transfer_id: int | None,
+        sha256: str | None = None,
+        quota: int | None = None,
     ) -> Attachment:
+        """Insert the row and charge its size to the user's storage usage in one transaction.
+
+        With ``quota`` (bytes) nothing is written and ``QuotaExceededError`` is
+        raised when the upload does not fit.
+        """
         att = Attachment(
             user_id=user_id,
             filename=filename,
@@ -24,12 +38,44 @@ class AttachmentCRUD:
             size=size,
             transaction_id=transaction_id,
             transfer_id=transfer_id,
+            sha256=sha256,
         )
         db.add(att)
+        await StorageUsageCRUD.add(db, user_id, size or 0, quota=quota)
+        await db.flush()  # the event carries the new id
+        await OutboxCRUD.record(db, user_id, ATTACHMENT_CREATED, [attachment_data(att)])
         await db.commit()
         await db.refresh(att)
         return att
 
+    @staticmethod
+    async def create_many(
+        db: AsyncSession, *, user_id: int, rows: list[dict], quota: int | None = None
+    ) -> list[int]:
+        """Insert several attachments with a single ``INSERT ... RETURNING`` and commit.
+
+        Their total size is charged to the user's usage in the same transaction
+        (``QuotaExceededError`` when it does not fit). Returns the new ids in
+        the order of ``rows``.
+        """
+        # sorted: two requests locking overlapping paths cannot deadlock
+        for path in sorted({row["path"] for row in rows}):
+            await AttachmentCRUD.lock_path(db, path)
+        res = await db.execute(
+            insert(Attachment).returning(Attachment.id, sort_by_parameter_order=True),
+            [{"user_id": user_id, **row} for row in rows],
+        )
+        ids = list(res.scalars())
+        await StorageUsageCRUD.add(db, user_id, sum(row["size"] or 0 for row in rows), quota=quota)
+        await OutboxCRUD.record(
+            db,
+            user_id,
+            ATTACHMENT_CREATED,
+            [attachment_data(Attachment(id=id, **row)) for id, row in zip(ids, rows)],  # transient, for the payload
+        )
+        await db.commit()
+        return ids
+
     @staticmethod
     async def list_by_transaction(db: AsyncSession, user_id: int, transaction_id: int) -> list[Attachment]:
         res = await db.execute(
@@ -42,6 +88,77 @@ class AttachmentCRUD:
         res = await db.execute(select(Attachment).where(Attachment.user_id == user_id, Attachment.transfer_id == transfer_id))
         return list(res.scalars().all())
 
+    @staticmethod
+    async def list_rows_by_transaction(
+        db: AsyncSession, user_id: int, transaction_id: int, fields: tuple[str, ...]
+    ) -> list[dict]:
+        stmt = select(*columns_for(Attachment, fields)).where(
+            Attachment.user_id == user_id, Attachment.transaction_id == transaction_id
+        )
+        return await fetch_dicts(db, stmt)
+
+    @staticmethod
+    async def list_rows_by_transfer(db: AsyncSession, user_id: int, transfer_id: int, fields: tuple[str, ...]) -> list[dict]:
+        stmt = select(*columns_for(Attachment, fields)).where(
+            Attachment.user_id == user_id, Attachment.transfer_id == transfer_id
+        )
+        return await fetch_dicts(db, stmt)
+
+    @staticmethod
+    async def list_rows_by_user(
+        db: AsyncSession, user_id: int, fields: tuple[str, ...], *, offset: int = 0, limit: int = 50
+    ) -> list[dict]:
+        stmt = (
+            select(*columns_for(Attachment, fields))
+            .where(Attachment.user_id == user_id)
+            .order_by(Attachment.id.desc())
+            .offset(offset)
+            .limit(limit)
+        )
+        return await fetch_dicts(db, stmt)
+
+    @staticmethod
+    async def list_export_rows(
+        db: AsyncSession,
+        user_id: int,
+        *,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        card_id: int | None = None,
+        transaction_id: int | None = None,
+        transfer_id: int | None = None,
+    ) -> list[dict]:
+        """Attachments joined with the transaction they document, oldest first.
+
+        A transfer's attachment is matched through its source (expense) transaction,
+        whose id is the ``transfer_id``; ``card_id`` matches either side of a transfer.
+        ``end`` is exclusive.
+        """
+        attachment_cols = columns_for(
+            Attachment, ("id", "filename", "content_type", "size", "sha256", "path", "transaction_id", "transfer_id")
+        )
+        transaction_cols = columns_for(Transaction, ("card_id", "created_at", "description", "income", "expenses"))
+        stmt = (
+            select(*attachment_cols, *transaction_cols)
+            .join(Transaction, Transaction.id == func.coalesce(Attachment.transaction_id, Attachment.transfer_id))
+            .where(Attachment.user_id == user_id, Transaction.user_id == user_id, on_visible_card(user_id))
+            .order_by(Transaction.created_at, Attachment.id)
+        )
+        if start is not None:
+            stmt = stmt.where(Transaction.created_at >= start)
+        if end is not None:
+            stmt = stmt.where(Transaction.created_at < end)
+        if transaction_id is not None:
+            stmt = stmt.where(Attachment.transaction_id == transaction_id)
+        if transfer_id is not None:
+            stmt = stmt.where(Attachment.transfer_id == transfer_id)
+        if card_id is not None:
+            transfers_with_card = select(Transaction.transfer_id).where(
+                Transaction.user_id == user_id, Transaction.card_id == card_id, Transaction.transfer_id.is_not(None)
+            )
+            stmt = stmt.where(or_(Transaction.card_id == card_id, Attachment.transfer_id.in_(transfers_with_card)))
+        return await fetch_dicts(db, stmt)
+
     @staticmethod
     async def get_by_id(db: AsyncSession, user_id: int, attachment_id: int) -> Attachment | None:
         res = await db.execute(select(Attachment).where(Attachment.id == attachment_id, Attachment.user_id == user_id))
@@ -51,3 +168,50 @@ class AttachmentCRUD:
     async def delete(db: AsyncSession, attachment: Attachment) -> None:
         await db.delete(attachment)
         await db.commit()
+
+    @staticmethod
+    async def lock_path(db: AsyncSession, path: str) -> None:
+        """Serialize reference changes on a stored blob until the current transaction ends."""
+        await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(path))))
+
+    @staticmethod
+    async def delete_reference(db: AsyncSession, attachment: Attachment) -> int:
+        """Delete ``attachment`` (without committing) and return how many rows still reference its blob.
+
+        The owner's storage usage is decreased in the same transaction.
+        """
+        await AttachmentCRUD.lock_path(db, attachment.path)
+        await db.delete(attachment)
+        await StorageUsageCRUD.add(db, attachment.user_id, -(attachment.size or 0))
+        await OutboxCRUD.record(db, attachment.user_id, ATTACHMENT_DELETED, [{"id": attachment.id}])
+        await db.flush()
+        res = await db.execute(select(func.count()).select_from(Attachment).where(Attachment.path == attachment.path))
+        return res.scalar_one()
+
+    @staticmethod
+    async def delete_references(db: AsyncSession, *conditions) -> list[str]:
+        """Delete every attachment matching ``conditions`` (without committing).
+
+        Storage usage is decreased per owner in the same transaction. Returns
+        the paths no row references any more; their advisory locks are held
+        until the caller commits, so the blobs can be unlinked safely before.
+        """
+        # paths are locked before the rows, in the same order as release_attachment and create_many
+        res = await db.execute(select(Attachment.path).where(*conditions).distinct())
+        paths = sorted(res.scalars())
+        for path in paths:
+            await AttachmentCRUD.lock_path(db, path)
+        res = await db.execute(
+            delete(Attachment)
+            .where(*conditions, Attachment.path.in_(paths))
+            .returning(Attachment.user_id, Attachment.size)
+            .execution_options(synchronize_session=False)
+        )
+        freed: dict[int, int] = {}
+        for user_id, size in res.all():
+            freed[user_id] = freed.get(user_id, 0) + (size or 0)
+        for user_id, size in freed.items():
+            await StorageUsageCRUD.add(db, user_id, -size)
+        res = await db.execute(select(Attachment.path).where(Attachment.path.in_(paths)).distinct())
+        still_used = set(res.scalars())
+        return [path for path in paths if path not in still_used]
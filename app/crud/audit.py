@@ -1,8 +1,11 @@
+import logging
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.crud.rows import columns_for, fetch_dicts
 from app.db.models import Audit
-from app.core.logging_config import get_logger
+from app.core.logging_config import get_logger, log_event
 
 logger = get_logger(__name__)
 
@@ -15,17 +18,30 @@ class AuditCRUD:
             stmt = stmt.where(Audit.user_id == user_id)
         result = await db.execute(stmt.order_by(Audit.created_at.desc()))
         audits = list(result.scalars().all())
-        logger.debug(
+        log_event(
+            logger,
+            logging.DEBUG,
             "Audit logs listed",
-            extra={
-                "details": {
-                    "event": "audit_list",
-                    "extra": {"user_id": user_id, "count": len(audits)},
-                }
-            },
+            "audit_list",
+            lambda: {"user_id": user_id, "count": len(audits)},
         )
         return audits
 
+    @staticmethod
+    async def list_log_rows(db: AsyncSession, fields: tuple[str, ...], user_id: int | None = None) -> list[dict]:
+        stmt = select(*columns_for(Audit, fields))
+        if user_id is not None:
+            stmt = stmt.where(Audit.user_id == user_id)
+        rows = await fetch_dicts(db, stmt.order_by(Audit.created_at.desc()))
+        log_event(
+            logger,
+            logging.DEBUG,
+            "Audit log rows listed",
+            "audit_list",
+            lambda: {"user_id": user_id, "count": len(rows)},
+        )
+        return rows
+
     @staticmethod
     async def create(
         db: AsyncSession,
@@ -37,15 +53,13 @@ class AuditCRUD:
     ) -> Audit:
         audit = Audit(user_id=user_id, action=action, resource=resource, details=details)
         db.add(audit)
+        # INSERT ... RETURNING already loads id and timestamps; no refresh round trip
         await db.commit()
-        await db.refresh(audit)
-        logger.info(
+        log_event(
+            logger,
+            logging.INFO,
             "Audit log created",
-            extra={
-                "details": {
-                    "event": "audit_create",
-                    "extra": {"audit_id": audit.id, "user_id": user_id, "action": action, "resource": resource},
-                }
-            },
+            "audit_create",
+            lambda: {"audit_id": audit.id, "user_id": user_id, "action": action, "resource": resource},
         )
         return audit
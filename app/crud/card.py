@@ -1,8 +1,17 @@
-from sqlalchemy import select
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import Card
-from app.core.logging_config import get_logger
+from app.crud.job import JobCRUD
+from app.crud.outbox import OutboxCRUD, card_data
+from app.crud.tombstone import TombstoneCRUD
+from app.crud.rows import columns_for, fetch_dicts
+from app.db.models import Card, Job
+from app.db.models.outbox import CARD_CREATED, CARD_DELETED, CARD_UPDATED
+from app.db.models.tombstone import CARD
+from app.core.logging_config import get_logger, log_event
 
 logger = get_logger(__name__)
 
@@ -10,44 +19,78 @@ logger = get_logger(__name__)
 class CardCRUD:
     @staticmethod
     async def get_by_id(db: AsyncSession, card_id: int, user_id: int) -> Card | None:
-        result = await db.execute(select(Card).where(Card.id == card_id, Card.user_id == user_id))
+        result = await db.execute(
+            select(Card).where(Card.id == card_id, Card.user_id == user_id, Card.deleted_at.is_(None))
+        )
         card = result.scalar_one_or_none()
-        logger.debug(
+        log_event(
+            logger,
+            logging.DEBUG,
             "Fetched card by id",
-            extra={
-                "details": {
-                    "event": "card_lookup_id",
-                    "extra": {"card_id": card_id, "user_id": user_id, "found": bool(card)},
-                }
-            },
+            "card_lookup_id",
+            lambda: {"card_id": card_id, "user_id": user_id, "found": bool(card)},
         )
         return card
 
     @staticmethod
     async def list_by_user(db: AsyncSession, user_id: int) -> list[Card]:
-        result = await db.execute(select(Card).where(Card.user_id == user_id))
+        result = await db.execute(select(Card).where(Card.user_id == user_id, Card.deleted_at.is_(None)))
         cards = list(result.scalars().all())
-        logger.debug(
+        log_event(
+            logger,
+            logging.DEBUG,
             "Listed cards for user",
-            extra={"details": {"event": "card_list", "extra": {"user_id": user_id, "count": len(cards)}}},
+            "card_list",
+            lambda: {"user_id": user_id, "count": len(cards)},
         )
         return cards
 
+    @staticmethod
+    async def list_rows_by_user(db: AsyncSession, user_id: int, fields: tuple[str, ...]) -> list[dict]:
+        rows = await fetch_dicts(
+            db, select(*columns_for(Card, fields)).where(Card.user_id == user_id, Card.deleted_at.is_(None))
+        )
+        log_event(
+            logger,
+            logging.DEBUG,
+            "Listed card rows for user",
+            "card_list",
+            lambda: {"user_id": user_id, "count": len(rows)},
+        )
+        return rows
+
+    @staticmethod
+    async def list_changed_rows(
+        db: AsyncSession,
+        user_id: int,
+        fields: tuple[str, ...],
+        after: tuple[datetime, int],
+        before: datetime,
+        limit: int,
+    ) -> list[dict]:
+        """Live cards updated after the ``(updated_at, id)`` keyset position and before ``before``."""
+        stmt = (
+            select(*columns_for(Card, fields))
+            .where(
+                Card.user_id == user_id,
+                Card.deleted_at.is_(None),
+                tuple_(Card.updated_at, Card.id) > tuple_(*after),
+                Card.updated_at < before,
+            )
+            .order_by(Card.updated_at, Card.id)
+            .limit(limit)
+        )
+        return await fetch_dicts(db, stmt)
+
     @staticmethod
     async def create(db: AsyncSession, user_id: int, **kwargs) -> Card:
         card = Card(user_id=user_id, **kwargs)
         db.add(card)
+        await db.flush()  # the event carries the new id
+        await OutboxCRUD.record(db, user_id, CARD_CREATED, [card_data(card)])
         await db.commit()
         await db.refresh(card)
-        logger.info(
-            "Card created",
-            extra={
-                "details": {
-                    "event": "card_create",
-                    "extra": {"card_id": card.id, "user_id": user_id},
-                }
-            },
-        )
+        log_event(logger, logging.INFO, "Card created", "card_create", lambda: {"card_id": card.id, "user_id": user_id})
         return card
 
     @staticmethod
@@ -55,24 +98,41 @@ class CardCRUD:
         for field, value in kwargs.items():
             if value is not None:
                 setattr(card, field, value)
+        await OutboxCRUD.record(db, card.user_id, CARD_UPDATED, [card_data(card)])
         await db.commit()
         await db.refresh(card)
-        logger.info(
+        log_event(
+            logger,
+            logging.INFO,
             "Card updated",
-            extra={
-                "details": {
-                    "event": "card_update",
-                    "extra": {"card_id": card.id, "updated_fields": [field for field, value in kwargs.items() if value is not None]},
-                }
+            "card_update",
+            lambda: {
+                "card_id": card.id,
+                "updated_fields": [field for field, value in kwargs.items() if value is not None],
             },
         )
         return card
 
     @staticmethod
-    async def delete(db: AsyncSession, card: Card) -> None:
-        await db.delete(card)
+    async def delete(db: AsyncSession, card: Card) -> Job:
+        """Hide the card now and queue the job that removes it with its history in batches.
+
+        A single ``ON DELETE CASCADE`` over years of transactions would hold
+        its locks for the whole statement; see ``app.services.deletion``.
+        """
+        card.deleted_at = datetime.now(timezone.utc)
+        job = await JobCRUD.enqueue(
+            db, type="cards.delete", payload={"card_id": card.id}, user_id=card.user_id, commit=False
+        )
+        # for delta sync: a card tombstone also means its transactions are gone
+        await TombstoneCRUD.record(db, card.user_id, CARD, [card.id])
+        await OutboxCRUD.record(db, card.user_id, CARD_DELETED, [{"id": card.id}])
         await db.commit()
-        logger.warning(
-            "Card deleted",
-            extra={"details": {"event": "card_delete", "extra": {"card_id": card.id, "user_id": card.user_id}}},
+        log_event(
+            logger,
+            logging.WARNING,
+            "Card deletion scheduled",
+            "card_delete",
+            lambda: {"card_id": card.id, "user_id": card.user_id, "job_id": job.id},
         )
+        return job
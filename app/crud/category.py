@@ -1,8 +1,10 @@
+import logging
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import Category
-from app.core.logging_config import get_logger
+from app.core.logging_config import get_logger, log_event
 
 logger = get_logger(__name__)
 
@@ -12,18 +14,24 @@ class CategoryCRUD:
     async def get_by_id(db: AsyncSession, category_id: int) -> Category | None:
         result = await db.execute(select(Category).where(Category.id == category_id))
         category = result.scalar_one_or_none()
-        logger.debug(
+        log_event(
+            logger,
+            logging.DEBUG,
             "Fetched category by id",
-            extra={"details": {"event": "category_lookup_id", "extra": {"id": category_id, "found": bool(category)}}},
+            "category_lookup_id",
+            lambda: {"id": category_id, "found": bool(category)},
         )
         return category
     @staticmethod
     async def get_by_name(db: AsyncSession, name: str) -> Category | None:
         result = await db.execute(select(Category).where(Category.name == name))
         category = result.scalar_one_or_none()
-        logger.debug(
+        log_event(
+            logger,
+            logging.DEBUG,
             "Fetched category by name",
-            extra={"details": {"event": "category_lookup", "extra": {"name": name, "found": bool(category)}}},
+            "category_lookup",
+            lambda: {"name": name, "found": bool(category)},
         )
         return category
 
@@ -31,10 +39,7 @@ class CategoryCRUD:
     async def list_all(db: AsyncSession) -> list[Category]:
         result = await db.execute(select(Category))
         categories = list(result.scalars().all())
-        logger.debug(
-            "Listed categories",
-            extra={"details": {"event": "category_list", "extra": {"count": len(categories)}}},
-        )
+        log_event(logger, logging.DEBUG, "Listed categories", "category_list", lambda: {"count": len(categories)})
         return categories
 
     @staticmethod
@@ -43,9 +48,12 @@ class CategoryCRUD:
         db.add(category)
         await db.commit()
         await db.refresh(category)
-        logger.info(
+        log_event(
+            logger,
+            logging.INFO,
             "Category created",
-            extra={"details": {"event": "category_create", "extra": {"category_id": category.id, "name": name}}},
+            "category_create",
+            lambda: {"category_id": category.id, "name": name},
         )
         return category
 
@@ -55,17 +63,11 @@ class CategoryCRUD:
             category.name = name
         await db.commit()
         await db.refresh(category)
-        logger.info(
-            "Category updated",
-            extra={"details": {"event": "category_update", "extra": {"category_id": category.id}}},
-        )
+        log_event(logger, logging.INFO, "Category updated", "category_update", lambda: {"category_id": category.id})
         return category
 
     @staticmethod
     async def delete(db: AsyncSession, category: Category) -> None:
         await db.delete(category)
         await db.commit()
-        logger.warning(
-            "Category deleted",
-            extra={"details": {"event": "category_delete", "extra": {"category_id": category.id}}},
-        )
+        log_event(logger, logging.WARNING, "Category deleted", "category_delete", lambda: {"category_id": category.id})
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Job
+from app.db.models.job import FAILED, QUEUED, RUNNING, SUCCEEDED
+
+
+class JobCRUD:
+    @staticmethod
+    async def enqueue(
+        db: AsyncSession,
+        *,
+        type: str,
+        payload: dict | None = None,
+        user_id: int | None = None,
+        priority: int = 0,
+        max_attempts: int = 5,
+        run_at: datetime | None = None,
+        commit: bool = True,
+    ) -> Job:
+        """Queue a job. With ``commit=False`` it becomes visible with the caller's own commit."""
+        job = Job(
+            type=type,
+            payload=payload or {},
+            user_id=user_id,
+            priority=priority,
+            max_attempts=max_attempts,
+            status=QUEUED,
+        )
+        if run_at is not None:
+            job.run_at = run_at
+        db.add(job)
+        if commit:
+            await db.commit()
+            await db.refresh(job)
+        else:
+            await db.flush()
+        return job
+
+    @staticmethod
+    async def get(db: AsyncSession, job_id: int, user_id: int | None = None) -> Job | None:
+        stmt = select(Job).where(Job.id == job_id)
+        if user_id is not None:
+            stmt = stmt.where(Job.user_id == user_id)
+        res = await db.execute(stmt)
+        return res.scalar_one_or_none()
+
+    @staticmethod
+    async def claim(db: AsyncSession, worker_id: str, types: list[str]) -> Job | None:
+        """Take the most urgent runnable job of ``types`` and commit; ``None`` when there is none.
+
+        ``SKIP LOCKED`` makes concurrent workers pass over rows another one is
+        claiming instead of queueing behind its lock.
+        """
+        candidate = (
+            select(Job.id)
+            .where(Job.status == QUEUED, Job.run_at <= func.now(), Job.type.in_(types))
+            .order_by(Job.priority.desc(), Job.run_at, Job.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        res = await db.execute(
+            update(Job)
+            .where(Job.id == candidate)
+            .values(
+                status=RUNNING,
+                attempts=Job.attempts + 1,
+                locked_by=worker_id,
+                heartbeat_at=func.now(),
+                started_at=func.now(),
+            )
+            .returning(Job)
+            .execution_options(synchronize_session=False)
+        )
+        job = res.scalar_one_or_none()
+        await db.commit()
+        return job
+
+    @staticmethod
+    async def _owned_update(db: AsyncSession, job_id: int, worker_id: str, **values) -> bool:
+        # Solo el worker que tiene el job lo modifica: tras una recuperación por heartbeat vencido
+        # el worker anterior ya no puede pisar el estado
+        res = await db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == RUNNING)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return res.rowcount == 1
+
+    @staticmethod
+    async def heartbeat(db: AsyncSession, job_id: int, worker_id: str, progress: dict | None = None) -> bool:
+        """Refresh the lease (and the reported progress); False when the job is no longer ours."""
+        values = {"heartbeat_at": func.now()}
+        if progress is not None:
+            values["progress"] = progress
+        return await JobCRUD._owned_update(db, job_id, worker_id, **values)
+
+    @staticmethod
+    async def complete(db: AsyncSession, job_id: int, worker_id: str, result: dict | None) -> bool:
+        return await JobCRUD._owned_update(
+            db, job_id, worker_id, status=SUCCEEDED, result=result, locked_by=None, finished_at=func.now()
+        )
+
+    @staticmethod
+    async def fail(db: AsyncSession, job_id: int, worker_id: str, error: str, retry_in: timedelta | None) -> bool:
+        """Record a failed attempt: back to the queue after ``retry_in``, or failed for good when None."""
+        if retry_in is None:
+            values = {"status": FAILED, "finished_at": func.now()}
+        else:
+            values = {"status": QUEUED, "run_at": func.now() + retry_in}
+        return await JobCRUD._owned_update(db, job_id, worker_id, last_error=error, locked_by=None, **values)
+
+    @staticmethod
+    async def release(db: AsyncSession, job_id: int, worker_id: str) -> bool:
+        """Give an interrupted job back (worker shutdown) without spending an attempt."""
+        return await JobCRUD._owned_update(
+            db, job_id, worker_id, status=QUEUED, attempts=Job.attempts - 1, locked_by=None, run_at=func.now()
+        )
+
+    @staticmethod
+    async def recover_stale(db: AsyncSession, stale_after: timedelta) -> int:
+        """Requeue running jobs whose worker stopped sending heartbeats (or fail them when out of attempts)."""
+        exhausted = Job.attempts >= Job.max_attempts
+        res = await db.execute(
+            update(Job)
+            .where(Job.status == RUNNING, Job.heartbeat_at < func.now() - stale_after)
+            .values(
+                status=case((exhausted, FAILED), else_=QUEUED),
+                finished_at=case((exhausted, func.now()), else_=None),
+                run_at=func.now(),
+                locked_by=None,
+                last_error="worker heartbeat lost",
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return res.rowcount
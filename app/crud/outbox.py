@@ -0,0 +1,168 @@
+from datetime import timedelta
+from typing import Any, Iterable
+
+from sqlalchemy import BigInteger, Text, cast, delete, func, insert, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.rows import fetch_dicts
+from app.db.models import Attachment, Card, OutboxEvent, OutboxOffset
+
+Position = tuple[int, int]  # (txid, id) of an outbox event
+
+
+def card_data(card: Card) -> dict[str, Any]:
+    return {
+        "id": card.id,
+        "bank_name": card.bank_name,
+        "type": card.type,
+        "card_name": card.card_name,
+        "alias": card.alias,
+    }
+
+
+def attachment_data(attachment: Attachment) -> dict[str, Any]:
+    return {
+        "id": attachment.id,
+        "transaction_id": attachment.transaction_id,
+        "transfer_id": attachment.transfer_id,
+        "content_type": attachment.content_type,
+        "size": attachment.size,
+    }
+
+
+class OutboxCRUD:
+    @staticmethod
+    async def record(db: AsyncSession, user_id: int, type: str, payloads: Iterable[dict[str, Any]]) -> None:
+        """Add one event per payload in the caller's transaction (no commit).
+
+        Pending row changes are flushed first, so an event's ``id`` is taken
+        after the write it describes (see ``read_after`` on ordering).
+        Transaction and transfer events are recorded by ``app.events.publish``.
+        """
+        rows = [{"user_id": user_id, "type": type, "payload": payload} for payload in payloads]
+        if rows:
+            await db.flush()
+            await db.execute(insert(OutboxEvent), rows)
+
+    @staticmethod
+    async def register_sinks(db: AsyncSession, sinks: Iterable[str]) -> None:
+        """Create the offsets of new sinks at the start of the outbox and commit."""
+        for sink in sinks:
+            if await db.get(OutboxOffset, sink) is None:
+                db.add(OutboxOffset(sink=sink))
+        await db.commit()
+
+    @staticmethod
+    async def claim(db: AsyncSession, sink: str, worker_id: str, lease: timedelta) -> Position | None:
+        """Lease ``sink``'s offset to ``worker_id`` and commit; ``None`` while another relay holds it.
+
+        The lease is committed before anything is read or delivered, so no
+        transaction stays open during a delivery (one would hold back the
+        watermark of every sink, see ``read_after``). Two relays racing for
+        the same row serialize on it and only the first gets the lease.
+        """
+        now = func.now()
+        res = await db.execute(
+            update(OutboxOffset)
+            .where(
+                OutboxOffset.sink == sink,
+                or_(OutboxOffset.lease_until.is_(None), OutboxOffset.lease_until < now),
+            )
+            .values(locked_by=worker_id, lease_until=now + lease)
+            .returning(OutboxOffset.txid, OutboxOffset.event_id)
+            .execution_options(synchronize_session=False)
+        )
+        row = res.one_or_none()
+        await db.commit()
+        return (row.txid, row.event_id) if row else None
+
+    @staticmethod
+    async def read_after(db: AsyncSession, after: Position, limit: int) -> list[dict]:
+        """Up to ``limit`` events after the ``(txid, id)`` position, in delivery order.
+
+        Only events of transactions older than the snapshot's ``xmin`` are
+        returned: every such transaction has committed or aborted, and any
+        later write gets a larger txid, so nothing can appear behind the
+        position afterwards. Any long-running transaction holds this back.
+
+        A txid is taken at a transaction's first write, not at its commit, so
+        two concurrent transactions may be delivered in either order. Writes
+        to one row are serialized by its lock and each event is inserted after
+        its write, so for a given entity the event ``id`` grows in write order:
+        consumers keep the last ``id`` applied per entity and skip older ones.
+        """
+        xmin = cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger)
+        stmt = (
+            select(
+                OutboxEvent.id,
+                OutboxEvent.txid,
+                OutboxEvent.user_id,
+                OutboxEvent.type,
+                OutboxEvent.payload,
+                OutboxEvent.created_at,
+            )
+            .where(tuple_(OutboxEvent.txid, OutboxEvent.id) > tuple_(*after), OutboxEvent.txid < xmin)
+            .order_by(OutboxEvent.txid, OutboxEvent.id)
+            .limit(limit)
+        )
+        return await fetch_dicts(db, stmt)
+
+    @staticmethod
+    async def advance(
+        db: AsyncSession, sink: str, worker_id: str, after: Position, position: Position, delivered: int
+    ) -> bool:
+        """Move the offset from ``after`` to ``position``, release the lease and commit.
+
+        Conditional on still holding the lease at ``after``: a relay whose
+        lease ran out mid-delivery changes nothing. Returns whether it moved.
+        """
+        res = await db.execute(
+            update(OutboxOffset)
+            .where(
+                OutboxOffset.sink == sink,
+                OutboxOffset.locked_by == worker_id,
+                tuple_(OutboxOffset.txid, OutboxOffset.event_id) == tuple_(*after),
+            )
+            .values(
+                txid=position[0],
+                event_id=position[1],
+                delivered=OutboxOffset.delivered + delivered,
+                locked_by=None,
+                lease_until=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return res.rowcount == 1
+
+    @staticmethod
+    async def release(db: AsyncSession, sink: str, worker_id: str) -> None:
+        """Give up ``worker_id``'s lease on ``sink`` without moving it, and commit."""
+        await db.execute(
+            update(OutboxOffset)
+            .where(OutboxOffset.sink == sink, OutboxOffset.locked_by == worker_id)
+            .values(locked_by=None, lease_until=None)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+    @staticmethod
+    async def purge(db: AsyncSession, limit: int) -> int:
+        """Delete up to ``limit`` events every registered sink has received, and commit.
+
+        Nothing is purged until a sink is registered.
+        """
+        res = await db.execute(select(OutboxOffset.txid, OutboxOffset.event_id))
+        positions = [tuple(row) for row in res.all()]
+        if not positions:
+            return 0
+        batch = (
+            select(OutboxEvent.id)
+            .where(tuple_(OutboxEvent.txid, OutboxEvent.id) <= tuple_(*min(positions)))
+            .order_by(OutboxEvent.txid, OutboxEvent.id)
+            .limit(limit)
+            .scalar_subquery()
+        )
+        res = await db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(batch)))
+        await db.commit()
+        return res.rowcount
@@ -0,0 +1,27 @@
+"""Read-only query helpers that skip the ORM unit of work.
+
+Listing endpoints only serialize what they read, so instead of materializing
+mapped instances (identity map, instance state, relationship proxies) they
+select exactly the columns of their response schema and get plain dicts back,
+ready for ``ORJSONResponse``. Callers pass the field names (usually
+``tuple(Schema.model_fields)``) so CRUD modules stay independent of schemas.
+"""
+from functools import lru_cache
+from typing import Any
+
+from sqlalchemy import Column, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@lru_cache
+def columns_for(model: type, fields: tuple[str, ...]) -> tuple[Column, ...]:
+    """Table columns of ``model`` named by ``fields``, in that order."""
+    table = model.__table__
+    return tuple(table.c[name] for name in fields)
+
+
+async def fetch_dicts(db: AsyncSession, stmt: Select) -> list[dict[str, Any]]:
+    """Execute a Core ``select`` and return each row as a plain dict keyed by column label."""
+    result = await db.execute(stmt)
+    keys = tuple(result.keys())
+    return [dict(zip(keys, row)) for row in result]
@@ -0,0 +1,83 @@
+from sqlalchemy import func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import StorageUsage
+
+
+class QuotaExceededError(ValueError):
+    def __init__(self, used: int, quota: int) -> None:
+        super().__init__(f"Storage quota exceeded ({used} of {quota} bytes used)")
+        self.used = used
+        self.quota = quota
+
+
+class StorageUsageCRUD:
+    @staticmethod
+    async def get_used(db: AsyncSession, user_id: int) -> int:
+        res = await db.execute(select(StorageUsage.bytes_used).where(StorageUsage.user_id == user_id))
+        return res.scalar_one_or_none() or 0
+
+    @staticmethod
+    async def add(db: AsyncSession, user_id: int, delta: int, *, quota: int | None = None) -> None:
+        """Adjust the user's usage by ``delta`` bytes in the current transaction (no commit).
+
+        With ``quota`` the increment is conditional and atomic (a single upsert
+        guarded by ``bytes_used + delta <= quota``), so concurrent uploads cannot
+        overshoot it together; ``QuotaExceededError`` is raised instead.
+        """
+        if delta < 0:
+            await db.execute(
+                update(StorageUsage)
+                .where(StorageUsage.user_id == user_id)
+                .values(bytes_used=func.greatest(StorageUsage.bytes_used + delta, 0))
+            )
+            return
+        if quota is not None and delta > quota:
+            raise QuotaExceededError(await StorageUsageCRUD.get_used(db, user_id), quota)
+        stmt = insert(StorageUsage).values(user_id=user_id, bytes_used=delta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StorageUsage.user_id],
+            set_={"bytes_used": StorageUsage.bytes_used + stmt.excluded.bytes_used, "updated_at": func.now()},
+            where=(StorageUsage.bytes_used + stmt.excluded.bytes_used <= quota) if quota is not None else None,
+        ).returning(StorageUsage.bytes_used)
+        res = await db.execute(stmt)
+        if res.scalar_one_or_none() is None:
+            raise QuotaExceededError(await StorageUsageCRUD.get_used(db, user_id), quota)
+
+    @staticmethod
+    async def rebuild(db: AsyncSession, user_id: int | None = None) -> int:
+        """Recompute usage from ``attachments`` (fixes drift); returns the number of users updated.
+
+        Writers are blocked while it runs (the lock conflicts with their row
+        updates), so no upload or delete committed meanwhile is lost.
+        """
+        await db.execute(text("LOCK TABLE storage_usage IN SHARE ROW EXCLUSIVE MODE"))
+        params = {"user_id": user_id}
+        only_user = "WHERE user_id = :user_id" if user_id is not None else ""
+        res = await db.execute(
+            text(
+                f"""
+                INSERT INTO storage_usage (user_id, bytes_used)
+                SELECT user_id, COALESCE(SUM(size), 0) FROM attachments {only_user} GROUP BY user_id
+                ON CONFLICT (user_id) DO UPDATE
+                SET bytes_used = excluded.bytes_used, updated_at = now()
+                WHERE storage_usage.bytes_used IS DISTINCT FROM excluded.bytes_used
+                """
+            ),
+            params,
+        )
+        updated = res.rowcount
+        res = await db.execute(
+            text(
+                f"""
+                UPDATE storage_usage SET bytes_used = 0, updated_at = now()
+                WHERE bytes_used <> 0
+                  AND NOT EXISTS (SELECT 1 FROM attachments a WHERE a.user_id = storage_usage.user_id)
+                  {"AND user_id = :user_id" if user_id is not None else ""}
+                """
+            ),
+            params,
+        )
+        await db.commit()
+        return updated + res.rowcount
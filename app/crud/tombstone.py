@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import delete, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.rows import fetch_dicts
+from app.db.models import Tombstone
+
+
+class TombstoneCRUD:
+    @staticmethod
+    async def record(db: AsyncSession, user_id: int, entity: str, entity_ids: Iterable[int]) -> None:
+        """Add tombstones for deleted rows in the caller's transaction (no commit)."""
+        rows = [{"user_id": user_id, "entity": entity, "entity_id": entity_id} for entity_id in entity_ids]
+        if rows:
+            await db.execute(insert(Tombstone), rows)
+
+    @staticmethod
+    async def list_since(
+        db: AsyncSession, user_id: int, after: tuple[datetime, int], before: datetime, limit: int
+    ) -> list[dict]:
+        """Tombstones after the ``(created_at, id)`` keyset position and older than ``before``, oldest first."""
+        stmt = (
+            select(Tombstone.id, Tombstone.entity, Tombstone.entity_id, Tombstone.created_at)
+            .where(
+                Tombstone.user_id == user_id,
+                tuple_(Tombstone.created_at, Tombstone.id) > tuple_(*after),
+                Tombstone.created_at < before,
+            )
+            .order_by(Tombstone.created_at, Tombstone.id)
+            .limit(limit)
+        )
+        return await fetch_dicts(db, stmt)
+
+    @staticmethod
+    async def purge(db: AsyncSession, older_than: datetime, limit: int) -> int:
+        """Delete up to ``limit`` tombstones created before ``older_than`` and commit."""
+        batch = select(Tombstone.id).where(Tombstone.created_at < older_than).limit(limit).scalar_subquery()
+        res = await db.execute(delete(Tombstone).where(Tombstone.id.in_(batch)))
+        await db.commit()
+        return res.rowcount
@@ -1,94 +1,177 @@
+import logging
 from datetime import datetime
 from decimal import Decimal
-from sqlalchemy import and_, func, select
+from sqlalchemy import and_, func, inspect, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.crud.rows import columns_for, fetch_dicts
+from app.crud.tombstone import TombstoneCRUD
 from app.db.models import Card, Transaction
-from app.core.logging_config import get_logger
+from app.db.models.tombstone import TRANSACTION
+from app.events.publish import (
+    TRANSACTION_CREATED,
+    TRANSACTION_DELETED,
+    TRANSACTION_UPDATED,
+    TRANSFER_CREATED,
+    publish,
+    transaction_data,
+)
+from app.core.logging_config import get_logger, log_event
 
 logger = get_logger(__name__)
 
 
+def on_visible_card(user_id: int):
+    # Las transacciones de una tarjeta en borrado se ocultan mientras el job las elimina por lotes
+    return Transaction.card_id.not_in(select(Card.id).where(Card.user_id == user_id, Card.deleted_at.is_not(None)))
+
+
 class TransactionCRUD:
     @staticmethod
     async def get_by_id(db: AsyncSession, transaction_id: int, user_id: int) -> Transaction | None:
         result = await db.execute(
-            select(Transaction).where(Transaction.id == transaction_id, Transaction.user_id == user_id)
+            select(Transaction).where(
+                Transaction.id == transaction_id, Transaction.user_id == user_id, on_visible_card(user_id)
+            )
         )
         transaction = result.scalar_one_or_none()
-        logger.debug(
+        log_event(
+            logger,
+            logging.DEBUG,
             "Fetched transaction by id",
-            extra={
-                "details": {
-                    "event": "transaction_lookup_id",
-                    "extra": {"transaction_id": transaction_id, "user_id": user_id, "found": bool(transaction)},
-                }
-            },
+            "transaction_lookup_id",
+            lambda: {"transaction_id": transaction_id, "user_id": user_id, "found": bool(transaction)},
         )
         return transaction
 
+    @staticmethod
+    async def transfer_exists(db: AsyncSession, user_id: int, transfer_id: int) -> bool:
+        result = await db.execute(
+            select(Transaction.id).where(Transaction.user_id == user_id, Transaction.transfer_id == transfer_id).limit(1)
+        )
+        return result.first() is not None
+
     @staticmethod
     async def list_by_user(db: AsyncSession, user_id: int) -> list[Transaction]:
-        result = await db.execute(select(Transaction).where(Transaction.user_id == user_id))
+        result = await db.execute(
+            select(Transaction).where(Transaction.user_id == user_id, on_visible_card(user_id))
+        )
         transactions = list(result.scalars().all())
-        logger.debug(
+        log_event(
+            logger,
+            logging.DEBUG,
             "Listed transactions for user",
-            extra={
-                "details": {"event": "transaction_list", "extra": {"user_id": user_id, "count": len(transactions)}}
-            },
+            "transaction_list",
+            lambda: {"user_id": user_id, "count": len(transactions)},
         )
         return transactions
 
     @staticmethod
-    async def create(db: AsyncSession, user_id: int, **kwargs) -> Transaction:
+    async def list_rows_by_user(db: AsyncSession, user_id: int, fields: tuple[str, ...]) -> list[dict]:
+        stmt = select(*columns_for(Transaction, fields)).where(Transaction.user_id == user_id, on_visible_card(user_id))
+        rows = await fetch_dicts(db, stmt)
+        log_event(
+            logger,
+            logging.DEBUG,
+            "Listed transaction rows for user",
+            "transaction_list",
+            lambda: {"user_id": user_id, "count": len(rows)},
+        )
+        return rows
+
+    @staticmethod
+    async def list_changed_rows(
+        db: AsyncSession,
+        user_id: int,
+        fields: tuple[str, ...],
+        after: tuple[datetime, int],
+        before: datetime,
+        limit: int,
+    ) -> list[dict]:
+        """Visible transactions updated after the ``(updated_at, id)`` keyset position and before ``before``."""
+        stmt = (
+            select(*columns_for(Transaction, fields))
+            .where(
+                Transaction.user_id == user_id,
+                on_visible_card(user_id),
+                tuple_(Transaction.updated_at, Transaction.id) > tuple_(*after),
+                Transaction.updated_at < before,
+            )
+            .order_by(Transaction.updated_at, Transaction.id)
+            .limit(limit)
+        )
+        return await fetch_dicts(db, stmt)
+
+    @staticmethod
+    async def create(db: AsyncSession, user_id: int, *, commit: bool = True, **kwargs) -> Transaction:
+        """Insert a transaction and its event; with ``commit=False`` the caller commits (or rolls back) both."""
         transaction = Transaction(user_id=user_id, **kwargs)
         db.add(transaction)
+        await db.flush()  # the event carries the new id
+        await publish(
+            db, user_id, TRANSACTION_CREATED, transaction_data(transaction), card_ids=[transaction.card_id]
+        )
+        if not commit:
+            return transaction
         await db.commit()
         await db.refresh(transaction)
-        logger.info(
+        log_event(
+            logger,
+            logging.INFO,
             "Transaction created",
-            extra={
-                "details": {
-                    "event": "transaction_create",
-                    "extra": {"transaction_id": transaction.id, "user_id": user_id, "type": kwargs.get("type")},
-                }
-            },
+            "transaction_create",
+            lambda: {"transaction_id": transaction.id, "user_id": user_id, "type": kwargs.get("type")},
         )
         return transaction
 
     @staticmethod
     async def update(db: AsyncSession, transaction: Transaction, **kwargs) -> Transaction:
+        previous_card_id = transaction.card_id
         for field, value in kwargs.items():
             if value is not None:
                 setattr(transaction, field, value)
+        await publish(
+            db,
+            transaction.user_id,
+            TRANSACTION_UPDATED,
+            transaction_data(transaction),
+            card_ids=[previous_card_id, transaction.card_id],
+        )
         await db.commit()
         await db.refresh(transaction)
-        logger.info(
+        log_event(
+            logger,
+            logging.INFO,
             "Transaction updated",
-            extra={
-                "details": {
-                    "event": "transaction_update",
-                    "extra": {
-                        "transaction_id": transaction.id,
-                        "updated_fields": [field for field, value in kwargs.items() if value is not None],
-                    },
-                }
+            "transaction_update",
+            lambda: {
+                "transaction_id": transaction.id,
+                "updated_fields": [field for field, value in kwargs.items() if value is not None],
             },
         )
         return transaction
 
     @staticmethod
     async def delete(db: AsyncSession, transaction: Transaction) -> None:
+        if inspect(transaction).expired_attributes:
+            # p. ej. tras un rollback: el evento necesita los valores de la fila
+            await db.refresh(transaction)
         await db.delete(transaction)
+        await publish(
+            db,
+            transaction.user_id,
+            TRANSACTION_DELETED,
+            {"id": transaction.id, "card_id": transaction.card_id, "transfer_id": transaction.transfer_id},
+            card_ids=[transaction.card_id],
+        )
+        await TombstoneCRUD.record(db, transaction.user_id, TRANSACTION, [transaction.id])
         await db.commit()
-        logger.warning(
+        log_event(
+            logger,
+            logging.WARNING,
             "Transaction deleted",
-            extra={
-                "details": {
-                    "event": "transaction_delete",
-                    "extra": {"transaction_id": transaction.id, "user_id": transaction.user_id},
-                }
-            },
+            "transaction_delete",
+            lambda: {"transaction_id": transaction.id, "user_id": transaction.user_id},
         )
 
     @staticmethod
@@ -101,12 +184,14 @@ class TransactionCRUD:
         amount: Decimal,
         description: str | None = None,
         category_id: int | None = None,
+        commit: bool = True,
     ) -> tuple[Transaction, Transaction]:
         """Create a pair of transactions to represent a transfer between user's own cards.
 
         - Source card: expenses = amount
         - Destination card: income = amount
         Both transactions share description/category and are marked executed=True.
+        With ``commit=False`` the caller commits (or rolls back) the pair and its event.
         """
         if source_card_id == destination_card_id:
             raise ValueError("La tarjeta origen y destino no pueden ser la misma")
@@ -140,24 +225,39 @@ class TransactionCRUD:
         transfer_id = expense_tx.id  # use first id as linkage
         expense_tx.transfer_id = transfer_id
         income_tx.transfer_id = transfer_id
+        await publish(
+            db,
+            user_id,
+            TRANSFER_CREATED,
+            {
+                "transfer_id": transfer_id,
+                "source": transaction_data(expense_tx),
+                "destination": transaction_data(income_tx),
+            },
+            card_ids=[source_card_id, destination_card_id],
+        )
+        if not commit:
+            return expense_tx, income_tx
         await db.commit()
-        await db.refresh(expense_tx)
-        await db.refresh(income_tx)
+        # reload both rows in one statement to pick up server-side timestamps
+        await db.execute(
+            select(Transaction)
+            .where(Transaction.id.in_([expense_tx.id, income_tx.id]))
+            .execution_options(populate_existing=True)
+        )
 
-        logger.info(
+        log_event(
+            logger,
+            logging.INFO,
             "Transfer completed",
-            extra={
-                "details": {
-                    "event": "transfer",
-                    "extra": {
-                        "user_id": user_id,
-                        "source_card_id": source_card_id,
-                        "destination_card_id": destination_card_id,
-                        "amount": str(amount),
-                        "expense_tx": expense_tx.id,
-                        "income_tx": income_tx.id,
-                    },
-                }
+            "transfer",
+            lambda: {
+                "user_id": user_id,
+                "source_card_id": source_card_id,
+                "destination_card_id": destination_card_id,
+                "amount": str(amount),
+                "expense_tx": expense_tx.id,
+                "income_tx": income_tx.id,
             },
         )
         return expense_tx, income_tx
@@ -180,6 +280,7 @@ class TransactionCRUD:
             .where(
                 and_(
                     Transaction.user_id == user_id,
+                    Card.deleted_at.is_(None),
                     Transaction.created_at >= start_date,
                     Transaction.created_at < end_date,
                 )
@@ -188,18 +289,16 @@ class TransactionCRUD:
         )
         result = await db.execute(stmt)
         rows = [dict(row._mapping) for row in result.all()]
-        logger.debug(
+        log_event(
+            logger,
+            logging.DEBUG,
             "Transaction summary generated",
-            extra={
-                "details": {
-                    "event": "transaction_summary",
-                    "extra": {
-                        "user_id": user_id,
-                        "start": start_date.isoformat(),
-                        "end": end_date.isoformat(),
-                        "count": len(rows),
-                    },
-                }
+            "transaction_summary",
+            lambda: {
+                "user_id": user_id,
+                "start": start_date.isoformat(),
+                "end": end_date.isoformat(),
+                "count": len(rows),
             },
         )
         return rows
@@ -0,0 +1,144 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import UploadSession
+
+
+class UploadSessionBusyError(RuntimeError):
+    """Another request is appending to or finalizing the same session."""
+
+
+class UploadSessionCRUD:
+    @staticmethod
+    async def create(db: AsyncSession, *, user_id: int, ttl: timedelta, **kwargs) -> UploadSession:
+        session = UploadSession(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            upload_offset=0,
+            expires_at=datetime.now(timezone.utc) + ttl,
+            **kwargs,
+        )
+        db.add(session)
+        await db.commit()
+        await db.refresh(session)
+        return session
+
+    @staticmethod
+    async def get(db: AsyncSession, user_id: int, session_id: str) -> UploadSession | None:
+        """Active (not expired) session of ``user_id``."""
+        res = await db.execute(
+            select(UploadSession).where(
+                UploadSession.id == session_id,
+                UploadSession.user_id == user_id,
+                UploadSession.expires_at > func.now(),
+            )
+        )
+        return res.scalar_one_or_none()
+
+    @staticmethod
+    async def claim(
+        db: AsyncSession, user_id: int, session_id: str, token: str, lease: timedelta
+    ) -> UploadSession | None:
+        """Lease an active session to the request ``token`` and commit.
+
+        Returns ``None`` when there is no such session and raises
+        ``UploadSessionBusyError`` while another request holds it. The lease
+        is committed, so no transaction stays open while a chunk streams in.
+        """
+        now = func.now()
+        res = await db.execute(
+            update(UploadSession)
+            .where(
+                UploadSession.id == session_id,
+                UploadSession.user_id == user_id,
+                UploadSession.expires_at > now,
+                or_(UploadSession.lease_until.is_(None), UploadSession.lease_until < now),
+            )
+            .values(locked_by=token, lease_until=now + lease)
+            .returning(UploadSession)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        session = res.scalar_one_or_none()
+        await db.commit()
+        if session is None and await UploadSessionCRUD.get(db, user_id, session_id) is not None:
+            raise UploadSessionBusyError(session_id)
+        return session
+
+    @staticmethod
+    async def renew(db: AsyncSession, session_id: str, token: str, lease: timedelta) -> bool:
+        """Extend ``token``'s lease and commit; False once it was lost."""
+        res = await db.execute(
+            update(UploadSession)
+            .where(UploadSession.id == session_id, UploadSession.locked_by == token)
+            .values(lease_until=func.now() + lease)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return res.rowcount == 1
+
+    @staticmethod
+    async def advance(db: AsyncSession, session: UploadSession, token: str, offset: int, ttl: timedelta) -> bool:
+        """Move the offset past the received chunk, release the lease and commit.
+
+        Conditional on the lease and on the offset the chunk was written at;
+        returns False (nothing changed) when another request took over.
+        """
+        # Cada fragmento recibido renueva la expiración
+        expires_at = datetime.now(timezone.utc) + ttl
+        res = await db.execute(
+            update(UploadSession)
+            .where(
+                UploadSession.id == session.id,
+                UploadSession.locked_by == token,
+                UploadSession.upload_offset == session.upload_offset,
+            )
+            .values(upload_offset=offset, expires_at=expires_at, locked_by=None, lease_until=None)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        if res.rowcount != 1:
+            return False
+        session.upload_offset, session.expires_at = offset, expires_at
+        return True
+
+    @staticmethod
+    async def release(db: AsyncSession, session_id: str, token: str) -> None:
+        await db.execute(
+            update(UploadSession)
+            .where(UploadSession.id == session_id, UploadSession.locked_by == token)
+            .values(locked_by=None, lease_until=None)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+    @staticmethod
+    async def remove(db: AsyncSession, session_id: str, token: str) -> bool:
+        """Delete the session if ``token`` still holds it, in the current transaction (no commit)."""
+        res = await db.execute(
+            delete(UploadSession)
+            .where(UploadSession.id == session_id, UploadSession.locked_by == token)
+            .execution_options(synchronize_session=False)
+        )
+        return res.rowcount == 1
+
+    @staticmethod
+    async def pop_expired(db: AsyncSession, limit: int) -> list[str]:
+        """Delete up to ``limit`` expired sessions and return their ids (sessions in use are skipped)."""
+        now = func.now()
+        expired = (
+            select(UploadSession.id)
+            .where(
+                UploadSession.expires_at <= now,
+                or_(UploadSession.lease_until.is_(None), UploadSession.lease_until < now),
+            )
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        res = await db.execute(delete(UploadSession).where(UploadSession.id.in_(expired)).returning(UploadSession.id))
+        ids = list(res.scalars())
+        await db.commit()
+        return ids
@@ -1,9 +1,13 @@
+import logging
+from datetime import datetime, timezone
+
 from sqlalchemy import select, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import User
+from app.crud.job import JobCRUD
+from app.db.models import Job, User
 from app.core.security import get_password_hash
-from app.core.logging_config import get_logger
+from app.core.logging_config import get_logger, log_event
 
 logger = get_logger(__name__)
 
@@ -13,9 +17,12 @@ class UserCRUD:
     async def get_by_id(db: AsyncSession, user_id: int) -> User | None:
         result = await db.execute(select(User).where(User.id == user_id))
         user = result.scalar_one_or_none()
-        logger.debug(
+        log_event(
+            logger,
+            logging.DEBUG,
             "Fetched user by id",
-            extra={"details": {"event": "user_lookup_id", "extra": {"user_id": user_id, "found": bool(user)}}},
+            "user_lookup_id",
+            lambda: {"user_id": user_id, "found": bool(user)},
         )
         return user
 
@@ -23,14 +30,12 @@ class UserCRUD:
     async def get_by_phone(db: AsyncSession, phone: str) -> User | None:
         result = await db.execute(select(User).where(User.phone == phone))
         user = result.scalar_one_or_none()
-        logger.debug(
+        log_event(
+            logger,
+            logging.DEBUG,
             "Fetched user by phone",
-            extra={
-                "details": {
-                    "event": "user_lookup_phone",
-                    "extra": {"phone_suffix": phone[-4:], "found": bool(user)},
-                }
-            },
+            "user_lookup_phone",
+            lambda: {"phone_suffix": phone[-4:], "found": bool(user)},
         )
         return user
 
@@ -41,14 +46,12 @@ class UserCRUD:
         db.add(user)
         await db.commit()
         await db.refresh(user)
-        logger.info(
+        log_event(
+            logger,
+            logging.INFO,
             "User created",
-            extra={
-                "details": {
-                    "event": "user_create",
-                    "extra": {"user_id": user.id, "phone_suffix": phone[-4:], "email": email},
-                }
-            },
+            "user_create",
+            lambda: {"user_id": user.id, "phone_suffix": phone[-4:], "email": email},
         )
         return user
 
@@ -61,22 +64,26 @@ class UserCRUD:
                 setattr(user, field, value)
         await db.commit()
         await db.refresh(user)
-        logger.info(
+        log_event(
+            logger,
+            logging.INFO,
             "User updated",
-            extra={
-                "details": {
-                    "event": "user_update",
-                    "extra": {"user_id": user.id, "fields": [field for field, value in kwargs.items() if value is not None]},
-                }
-            },
+            "user_update",
+            lambda: {"user_id": user.id, "fields": [field for field, value in kwargs.items() if value is not None]},
         )
         return user
 
     @staticmethod
-    async def delete(db: AsyncSession, user: User) -> None:
-        await db.delete(user)
+    async def delete(db: AsyncSession, user: User) -> Job:
+        """Disable the account now and queue the job that removes its data in batches."""
+        user.deleted_at = datetime.now(timezone.utc)
+        job = await JobCRUD.enqueue(db, type="users.delete", payload={"user_id": user.id}, user_id=user.id, commit=False)
         await db.commit()
-        logger.warning(
-            "User deleted",
-            extra={"details": {"event": "user_delete", "extra": {"user_id": user.id}}},
+        log_event(
+            logger,
+            logging.WARNING,
+            "User deletion scheduled",
+            "user_delete",
+            lambda: {"user_id": user.id, "job_id": job.id},
         )
+        return job
@@ -0,0 +1,198 @@
+import secrets
+from collections import defaultdict
+from datetime import timedelta
+from typing import Any, Iterable
+
+from sqlalchemy import delete, exists, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import WebhookDeadLetter, WebhookDelivery, WebhookSubscription
+
+_DEAD_LETTER_COLUMNS = ("subscription_id", "event_id", "type", "payload", "attempts", "last_error")
+
+
+class WebhookCRUD:
+    @staticmethod
+    async def create(db: AsyncSession, user_id: int, *, url: str, events: list[str]) -> WebhookSubscription:
+        subscription = WebhookSubscription(user_id=user_id, url=url, events=events, secret=secrets.token_hex(32))
+        db.add(subscription)
+        await db.commit()
+        await db.refresh(subscription)
+        return subscription
+
+    @staticmethod
+    async def count_by_user(db: AsyncSession, user_id: int) -> int:
+        res = await db.execute(select(func.count()).where(WebhookSubscription.user_id == user_id))
+        return res.scalar_one()
+
+    @staticmethod
+    async def list_by_user(db: AsyncSession, user_id: int) -> list[WebhookSubscription]:
+        res = await db.execute(
+            select(WebhookSubscription).where(WebhookSubscription.user_id == user_id).order_by(WebhookSubscription.id)
+        )
+        return list(res.scalars().all())
+
+    @staticmethod
+    async def get(db: AsyncSession, subscription_id: int, user_id: int) -> WebhookSubscription | None:
+        res = await db.execute(
+            select(WebhookSubscription).where(
+                WebhookSubscription.id == subscription_id, WebhookSubscription.user_id == user_id
+            )
+        )
+        return res.scalar_one_or_none()
+
+    @staticmethod
+    async def delete(db: AsyncSession, subscription: WebhookSubscription) -> None:
+        await db.delete(subscription)
+        await db.commit()
+
+    @staticmethod
+    async def enqueue(db: AsyncSession, events: Iterable[dict[str, Any]]) -> int:
+        """Queue each event for the active subscriptions of its user that want its type, and commit."""
+        events = list(events)
+        res = await db.execute(
+            select(WebhookSubscription.id, WebhookSubscription.user_id, WebhookSubscription.events).where(
+                WebhookSubscription.user_id.in_({event["user_id"] for event in events}),
+                WebhookSubscription.active.is_(True),
+            )
+        )
+        by_user: dict[int, list] = defaultdict(list)
+        for row in res.all():
+            by_user[row.user_id].append(row)
+        rows = [
+            {"subscription_id": sub.id, "event_id": event["id"], "type": event["type"], "payload": event}
+            for event in events
+            for sub in by_user[event["user_id"]]
+            if event["type"] in sub.events
+        ]
+        if rows:
+            await db.execute(insert(WebhookDelivery), rows)
+        await db.commit()
+        return len(rows)
+
+    @staticmethod
+    async def claim(db: AsyncSession, worker_id: str, lease: timedelta) -> WebhookSubscription | None:
+        """Lease the least recently served endpoint with due deliveries, and commit; ``None`` when there is none.
+
+        ``SKIP LOCKED`` lets concurrent dispatchers pass over endpoints being
+        claimed by another one; the lease keeps each endpoint with a single
+        dispatcher, so its events go out in order.
+        """
+        now = func.now()
+        candidate = (
+            select(WebhookSubscription.id)
+            .where(
+                WebhookSubscription.active.is_(True),
+                or_(WebhookSubscription.retry_at.is_(None), WebhookSubscription.retry_at <= now),
+                or_(WebhookSubscription.lease_until.is_(None), WebhookSubscription.lease_until < now),
+                exists().where(WebhookDelivery.subscription_id == WebhookSubscription.id),
+            )
+            .order_by(WebhookSubscription.updated_at, WebhookSubscription.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        res = await db.execute(
+            update(WebhookSubscription)
+            .where(WebhookSubscription.id == candidate)
+            .values(locked_by=worker_id, lease_until=now + lease)
+            .returning(WebhookSubscription)
+            .execution_options(synchronize_session=False)
+        )
+        subscription = res.scalar_one_or_none()
+        await db.commit()
+        return subscription
+
+    @staticmethod
+    async def pending(db: AsyncSession, subscription_id: int, limit: int) -> list[WebhookDelivery]:
+        res = await db.execute(
+            select(WebhookDelivery)
+            .where(WebhookDelivery.subscription_id == subscription_id)
+            .order_by(WebhookDelivery.id)
+            .limit(limit)
+        )
+        return list(res.scalars().all())
+
+    @staticmethod
+    async def _release(db: AsyncSession, subscription_id: int, worker_id: str, **values) -> None:
+        await db.execute(
+            update(WebhookSubscription)
+            .where(WebhookSubscription.id == subscription_id, WebhookSubscription.locked_by == worker_id)
+            .values(locked_by=None, lease_until=None, **values)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def succeed(db: AsyncSession, subscription_id: int, worker_id: str, delivery_ids: list[int]) -> None:
+        """Drop the delivered rows, close the endpoint's circuit and release it; commits."""
+        await db.execute(delete(WebhookDelivery).where(WebhookDelivery.id.in_(delivery_ids)))
+        await WebhookCRUD._release(db, subscription_id, worker_id, failures=0, retry_at=None)
+        await db.commit()
+
+    @staticmethod
+    async def fail(
+        db: AsyncSession,
+        subscription_id: int,
+        worker_id: str,
+        delivery_ids: list[int],
+        error: str,
+        *,
+        retry_in: timedelta,
+        max_attempts: int,
+    ) -> int:
+        """Count a failed attempt for the batch and hold the endpoint back for ``retry_in``; commits.
+
+        Deliveries out of attempts move to the dead-letter table; returns how many did.
+        """
+        await db.execute(
+            update(WebhookDelivery)
+            .where(WebhookDelivery.id.in_(delivery_ids))
+            .values(attempts=WebhookDelivery.attempts + 1, last_error=error)
+        )
+        res = await db.execute(
+            delete(WebhookDelivery)
+            .where(WebhookDelivery.id.in_(delivery_ids), WebhookDelivery.attempts >= max_attempts)
+            .returning(*(WebhookDelivery.__table__.c[name] for name in _DEAD_LETTER_COLUMNS))
+        )
+        dead = [dict(row._mapping) for row in res.all()]
+        if dead:
+            await db.execute(insert(WebhookDeadLetter), dead)
+        await WebhookCRUD._release(
+            db,
+            subscription_id,
+            worker_id,
+            failures=WebhookSubscription.failures + 1,
+            retry_at=func.now() + retry_in,
+        )
+        await db.commit()
+        return len(dead)
+
+    @staticmethod
+    async def list_dead_letters(db: AsyncSession, subscription_id: int, limit: int = 100) -> list[WebhookDeadLetter]:
+        res = await db.execute(
+            select(WebhookDeadLetter)
+            .where(WebhookDeadLetter.subscription_id == subscription_id)
+            .order_by(WebhookDeadLetter.id)
+            .limit(limit)
+        )
+        return list(res.scalars().all())
+
+    @staticmethod
+    async def redeliver(db: AsyncSession, subscription: WebhookSubscription) -> int:
+        """Queue the dead letters again with fresh attempts, close the circuit and commit."""
+        dead = WebhookDeadLetter
+        res = await db.execute(
+            delete(dead)
+            .where(dead.subscription_id == subscription.id)
+            .returning(dead.id, dead.event_id, dead.type, dead.payload)
+        )
+        rows = [
+            {"subscription_id": subscription.id, "event_id": row.event_id, "type": row.type, "payload": row.payload}
+            for row in sorted(res.all())
+        ]
+        if rows:
+            await db.execute(insert(WebhookDelivery), rows)
+        subscription.failures = 0
+        subscription.retry_at = None
+        await db.commit()
+        return len(rows)
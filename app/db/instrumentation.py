@@ -0,0 +1,176 @@
+"""Per-request SQL statement accounting.
+
+Every statement executed through any SQLAlchemy ``Engine`` is counted and timed
+while a :func:`track_queries` scope is active. The HTTP middleware opens one
+scope per request; tests can open their own scope around a request to assert a
+statement budget for an endpoint.
+"""
+from __future__ import annotations
+
+import contextlib
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_STATEMENT_PREVIEW = 500
+# reads with side effects (row locks, advisory locks, notifications, sequences) are never re-run by EXPLAIN
+_SIDE_EFFECTS = re.compile(
+    r"\bFOR\s+(NO\s+KEY\s+)?UPDATE\b|\bFOR\s+(KEY\s+)?SHARE\b|\bpg_advisory|\bpg_notify\b|\bnextval\b|\bsetval\b",
+    re.IGNORECASE,
+)
+
+_active: ContextVar[tuple["QueryStats", ...]] = ContextVar("query_stats", default=())
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration_ms: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.duration_ms += elapsed_ms
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements executed at least ``threshold`` times (likely N+1 patterns)."""
+        return [(stmt, n) for stmt, n in self.statements.most_common() if n >= threshold]
+
+
+@contextlib.contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Collect statement counts and timings for the enclosed block.
+
+    Scopes nest: a statement is recorded in every active scope, so a test scope
+    wrapping a request also sees what the request-level scope records.
+    """
+    stats = QueryStats()
+    token = _active.set(_active.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active.reset(token)
+
+
+def report_query_budget(stats: QueryStats, *, method: str, path: str) -> None:
+    """Emit structured warnings when a request exceeded its statement budget."""
+    settings = get_settings()
+    over_count = stats.count > settings.query_budget_statements
+    over_time = stats.duration_ms > settings.query_budget_ms
+    if over_count or over_time:
+        logger.warning(
+            "Query budget exceeded",
+            extra={
+                "details": {
+                    "event": "query_budget_exceeded",
+                    "extra": {
+                        "method": method,
+                        "path": path,
+                        "statements": stats.count,
+                        "statements_budget": settings.query_budget_statements,
+                        "db_duration_ms": round(stats.duration_ms, 2),
+                        "db_duration_budget_ms": settings.query_budget_ms,
+                    },
+                }
+            },
+        )
+    repeated = stats.repeated(settings.query_repeat_threshold)
+    if repeated:
+        logger.warning(
+            "Repeated statements detected",
+            extra={
+                "details": {
+                    "event": "query_n_plus_one",
+                    "extra": {
+                        "method": method,
+                        "path": path,
+                        "repeated": [
+                            {"statement": stmt[:_STATEMENT_PREVIEW], "count": n} for stmt, n in repeated
+                        ],
+                    },
+                }
+            },
+        )
+
+
+def _explain(conn: Any, statement: str, parameters: Any) -> Any:
+    """Plan of a slow plain read, run again inside a savepoint on the request's connection.
+
+    The savepoint is always rolled back, so a failing EXPLAIN (timeout, lock)
+    leaves the request's transaction usable.
+    """
+    # EXPLAIN ANALYZE re-executes the statement, so only plain reads are explained
+    if not statement.lstrip().upper().startswith("SELECT") or _SIDE_EFFECTS.search(statement):
+        return None
+    try:
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+                rows = cursor.fetchall()
+            finally:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        finally:
+            cursor.close()
+        return rows[0][0] if rows else None
+    except Exception as exc:  # noqa: BLE001
+        logger.debug(
+            "EXPLAIN capture failed",
+            extra={"details": {"event": "slow_query_explain_error", "extra": {"error": str(exc)}}},
+        )
+        return None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context) -> None:  # noqa: ANN001
+    # a failed statement never reaches after_cursor_execute: drop its start time
+    if context.connection is not None and context.execution_context is not None:
+        starts = context.connection.info.get("query_start_time")
+        if starts:
+            starts.pop()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+    starts = conn.info.get("query_start_time")
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    for stats in _active.get():
+        stats.record(statement, elapsed_ms)
+
+    settings = get_settings()
+    if elapsed_ms < settings.slow_query_ms:
+        return
+    plan = None
+    if settings.slow_query_explain and settings.database_use != "prod":
+        plan = _explain(conn, statement, parameters)
+    logger.warning(
+        "Slow query",
+        extra={
+            "details": {
+                "event": "slow_query",
+                "duration_ms": int(elapsed_ms),
+                "extra": {"statement": statement[:_STATEMENT_PREVIEW], "plan": plan},
+            }
+        },
+    )
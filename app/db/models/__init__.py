@@ -4,6 +4,12 @@ from .card import Card
 from .transaction import Transaction
 from .audit import Audit
 from .attachment import Attachment
+from .storage_usage import StorageUsage
+from .upload_session import UploadSession
+from .job import Job
+from .tombstone import Tombstone
+from .outbox import OutboxEvent, OutboxOffset
+from .webhook import WebhookDeadLetter, WebhookDelivery, WebhookSubscription
 
 __all__ = [
     "User",
@@ -12,4 +18,13 @@ __all__ = [
     "Transaction",
     "Audit",
     "Attachment",
+    "StorageUsage",
+    "UploadSession",
+    "Job",
+    "Tombstone",
+    "OutboxEvent",
+    "OutboxOffset",
+    "WebhookSubscription",
+    "WebhookDelivery",
+    "WebhookDeadLetter",
 ]
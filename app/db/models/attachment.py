@@ -16,7 +16,9 @@ class Attachment(Base):
     filename = Column(String(255), nullable=False)
     content_type = Column(String(255), nullable=True)
     size = Column(Integer, nullable=True)
-    path = Column(Text, nullable=False)  # relative path from upload root
+    path = Column(Text, nullable=False, index=True)  # relative path from upload root
+    # Content hash; identical uploads share one blob at ab/cd/<sha256> (rows referencing a path are its refcount)
+    sha256 = Column(String(64), nullable=True, index=True)
 
     user = relationship("User", backref="attachments")
     transaction = relationship("Transaction", backref="attachments")
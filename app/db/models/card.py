@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -13,5 +13,10 @@ class Card(Base):
     type = Column(String(50), nullable=False)
     card_name = Column(String(100), nullable=False)
     alias = Column(String(100), nullable=True)
+    # Set when deletion is requested: hidden at once, removed in batches by the "cards.delete" job
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
 
     user = relationship("User", backref="cards")
+
+    # keyset for delta sync (GET /sync)
+    __table_args__ = (Index("ix_cards_user_updated", "user_id", "updated_at", "id"),)
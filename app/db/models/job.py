@@ -0,0 +1,40 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, JSON, String, Text, func
+
+from app.db.base import Base
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class Job(Base):
+    """Unit of background work, claimed by workers with ``FOR UPDATE SKIP LOCKED``."""
+
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    type = Column(String(64), nullable=False)
+    status = Column(String(16), nullable=False, default=QUEUED, server_default=QUEUED)
+    priority = Column(Integer, nullable=False, default=0, server_default="0")  # higher runs first
+    payload = Column(JSON, nullable=False, default=dict)
+    # Owner allowed to see the job (None: system job); kept when the user is deleted by the job itself
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    max_attempts = Column(Integer, nullable=False, default=5, server_default="5")
+    run_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_by = Column(String(64), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    progress = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        # Only queued rows are scanned when claiming, already in claim order (id breaks run_at ties)
+        Index("ix_jobs_claim", priority.desc(), run_at, id, postgresql_where=status == QUEUED),
+        Index("ix_jobs_heartbeat", heartbeat_at, postgresql_where=status == RUNNING),
+    )
@@ -0,0 +1,43 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.db.base import Base
+
+# Event types recorded only in the outbox (transaction and transfer types live in app.events.publish)
+CARD_CREATED = "card.created"
+CARD_UPDATED = "card.updated"
+CARD_DELETED = "card.deleted"
+ATTACHMENT_CREATED = "attachment.created"
+ATTACHMENT_DELETED = "attachment.deleted"
+
+# id of the writing transaction; see app.outbox.relay for why rows are read in (txid, id) order
+CURRENT_TXID = text("pg_current_xact_id()::text::bigint")
+
+
+class OutboxEvent(Base):
+    """Domain event written in the same transaction as the change it describes."""
+
+    __tablename__ = "outbox_events"
+
+    id = Column(BigInteger, primary_key=True)
+    txid = Column(BigInteger, nullable=False, server_default=CURRENT_TXID)
+    # no foreign key: events outlive the account (e.g. the deletions of a removed user)
+    user_id = Column(Integer, nullable=False)
+    type = Column(String(64), nullable=False)
+    payload = Column(JSONB, nullable=False)
+
+    __table_args__ = (Index("ix_outbox_events_position", "txid", "id"),)
+
+
+class OutboxOffset(Base):
+    """Position of the last outbox event delivered to a sink."""
+
+    __tablename__ = "outbox_offsets"
+
+    sink = Column(String(64), primary_key=True)
+    txid = Column(BigInteger, nullable=False, default=0, server_default="0")
+    event_id = Column(BigInteger, nullable=False, default=0, server_default="0")
+    delivered = Column(BigInteger, nullable=False, default=0, server_default="0")
+    # relay feeding the sink; a committed lease, so no transaction stays open while it delivers
+    locked_by = Column(String(64), nullable=True)
+    lease_until = Column(DateTime(timezone=True), nullable=True)
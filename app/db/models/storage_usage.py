@@ -0,0 +1,12 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer
+
+from app.db.base import Base
+
+
+class StorageUsage(Base):
+    """Bytes of attachments per user, kept in step with ``attachments`` by ``AttachmentCRUD``."""
+
+    __tablename__ = "storage_usage"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    bytes_used = Column(BigInteger, nullable=False, default=0, server_default="0")
@@ -0,0 +1,19 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Index, Integer, String
+
+from app.db.base import Base
+
+CARD = "card"
+TRANSACTION = "transaction"
+
+
+class Tombstone(Base):
+    """Record of a deleted row, so delta sync can tell clients to drop it (``created_at`` is the deletion time)."""
+
+    __tablename__ = "tombstones"
+
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    entity = Column(String(16), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+
+    __table_args__ = (Index("ix_tombstones_user_created", "user_id", "created_at", "id"),)
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, Numeric, String, Text
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, Numeric, String, Text
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -20,3 +20,6 @@ class Transaction(Base):
     user = relationship("User", backref="transactions")
     card = relationship("Card", backref="transactions")
     category = relationship("Category", backref="transactions")
+
+    # keyset for delta sync (GET /sync)
+    __table_args__ = (Index("ix_transactions_user_updated", "user_id", "updated_at", "id"),)
@@ -0,0 +1,24 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, String
+
+from app.db.base import Base
+
+
+class UploadSession(Base):
+    """Resumable upload in progress; its bytes are appended to ``.incoming/<id>.upload``."""
+
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True)  # random hex, part of the session URL
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Target of the attachment created on finalize (a transaction or a transfer group)
+    transaction_id = Column(Integer, nullable=True)
+    transfer_id = Column(Integer, nullable=True)
+
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(255), nullable=True)
+    upload_length = Column(BigInteger, nullable=False)
+    upload_offset = Column(BigInteger, nullable=False, default=0, server_default="0")
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    # request appending to or finalizing the session; a committed lease, renewed while a chunk streams in
+    locked_by = Column(String(32), nullable=True)
+    lease_until = Column(DateTime(timezone=True), nullable=True)
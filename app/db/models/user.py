@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, DateTime, Integer, String
 
 from app.db.base import Base
 
@@ -12,3 +12,5 @@ class User(Base):
     telegram_id = Column(String(100), unique=True, nullable=True)
     email = Column(String(255), unique=True, nullable=False, index=True)
     password = Column(String(255), nullable=False)
+    # Set when deletion is requested: no longer authenticates, removed in batches by the "users.delete" job
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
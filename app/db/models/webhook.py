@@ -0,0 +1,58 @@
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, ForeignKey, Index, Integer, JSON, String, Text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.db.base import Base
+
+# Event types partners can subscribe to
+WEBHOOK_EVENTS = ("transaction.created", "transfer.created")
+
+
+class WebhookSubscription(Base):
+    """Partner endpoint notified of a user's events, with its delivery state."""
+
+    __tablename__ = "webhook_subscriptions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    url = Column(String(2048), nullable=False)
+    secret = Column(String(64), nullable=False)  # HMAC key of the signatures
+    events = Column(JSON, nullable=False)
+    active = Column(Boolean, nullable=False, default=True, server_default="true")
+
+    # consecutive failed batches; at WEBHOOKS_FAILURE_THRESHOLD the circuit is open
+    failures = Column(Integer, nullable=False, default=0, server_default="0")
+    retry_at = Column(DateTime(timezone=True), nullable=True)  # no attempt before (backoff or open circuit)
+    locked_by = Column(String(64), nullable=True)
+    lease_until = Column(DateTime(timezone=True), nullable=True)
+
+
+class WebhookDelivery(Base):
+    """Event waiting to be sent to a subscription, in event order."""
+
+    __tablename__ = "webhook_deliveries"
+
+    id = Column(BigInteger, primary_key=True)
+    subscription_id = Column(Integer, ForeignKey("webhook_subscriptions.id", ondelete="CASCADE"), nullable=False)
+    event_id = Column(BigInteger, nullable=False)  # outbox id, for deduplication by the partner
+    type = Column(String(64), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (Index("ix_webhook_deliveries_subscription", "subscription_id", "id"),)
+
+
+class WebhookDeadLetter(Base):
+    """Delivery given up after WEBHOOKS_MAX_ATTEMPTS; it can be queued again on request."""
+
+    __tablename__ = "webhook_dead_letters"
+
+    id = Column(BigInteger, primary_key=True)
+    subscription_id = Column(
+        Integer, ForeignKey("webhook_subscriptions.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    event_id = Column(BigInteger, nullable=False)
+    type = Column(String(64), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    attempts = Column(Integer, nullable=False)
+    last_error = Column(Text, nullable=True)
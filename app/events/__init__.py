@@ -0,0 +1,29 @@
+from functools import lru_cache
+
+from sqlalchemy.engine import make_url
+
+from app.core.config import get_settings
+from app.events.broker import Event, EventBroker, Subscription
+from app.events.publish import CHANNEL, publish, transaction_data
+from app.events.stream import sse_stream
+
+
+@lru_cache
+def get_broker() -> EventBroker:
+    """Process-wide broker; it connects on the first subscription."""
+    settings = get_settings()
+    # asyncpg takes a plain postgresql:// DSN
+    dsn = make_url(settings.database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+    return EventBroker(dsn, history=settings.events_history_size, queue_size=settings.events_queue_size)
+
+
+__all__ = [
+    "CHANNEL",
+    "Event",
+    "EventBroker",
+    "Subscription",
+    "get_broker",
+    "publish",
+    "sse_stream",
+    "transaction_data",
+]
@@ -0,0 +1,224 @@
+"""Per-process fan-out of ``user_events`` notifications to SSE connections.
+
+Each process keeps one dedicated ``LISTEN`` connection (not taken from the
+SQLAlchemy pool) and hands every notification to the subscriptions of its
+user. Postgres delivers notifications to all listeners in commit order, so
+every process sees the same sequence; the last ``history`` events are kept to
+replay what a reconnecting client missed (``Last-Event-ID``). When that id is
+no longer known (too old, or this process started later) the client gets a
+``reset`` event and should refetch its state.
+
+Each subscription buffers at most ``queue_size`` events. A client that falls
+that far behind is disconnected instead of growing the buffer; it reconnects
+and resumes from history.
+"""
+import asyncio
+import logging
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+
+import asyncpg
+import orjson
+
+from app.core.logging_config import get_logger, log_event
+from app.events.publish import CHANNEL
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    user_id: int
+    type: str
+    data: bytes  # JSON, encoded once and shared by every subscriber
+
+    def encode(self) -> bytes:
+        head = b"id: %d\n" % self.id if self.id else b""
+        return head + b"event: %s\ndata: %s\n\n" % (self.type.encode(), self.data)
+
+
+def parse_notification(payload: str) -> Event:
+    event_id, _, body = payload.partition(":")
+    message = orjson.loads(body)
+    return Event(id=int(event_id), user_id=message["u"], type=message["t"], data=orjson.dumps(message["d"]))
+
+
+@dataclass(eq=False)
+class Subscription:
+    user_id: int
+    queue: asyncio.Queue
+    dropped: bool = False
+    _closed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def offer(self, event: Event) -> bool:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped = True
+            self._closed.set()
+            return False
+        return True
+
+    def close(self) -> None:
+        self._closed.set()
+
+    def _check(self) -> None:
+        if self.dropped:
+            raise ConnectionAbortedError("subscriber too slow")
+        if self._closed.is_set() and self.queue.empty():
+            raise ConnectionAbortedError("broker stopped")
+
+    async def next(self, timeout: float) -> Event | None:
+        """Next event, or ``None`` after ``timeout`` seconds without one.
+
+        Raises ``ConnectionAbortedError`` once the subscription was dropped for
+        being too slow, or after the broker stopped.
+        """
+        self._check()
+        if not self.queue.empty():
+            return self.queue.get_nowait()
+        getter = asyncio.ensure_future(self.queue.get())
+        closed = asyncio.ensure_future(self._closed.wait())
+        try:
+            await asyncio.wait((getter, closed), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            closed.cancel()
+            if not getter.done():
+                getter.cancel()
+        if getter.done() and not getter.cancelled():
+            return getter.result()
+        self._check()
+        return None
+
+
+class EventBroker:
+    def __init__(
+        self,
+        dsn: str,
+        *,
+        history: int = 1000,
+        queue_size: int = 100,
+        connect_timeout: float = 5.0,
+        reconnect_delay: float = 1.0,
+    ) -> None:
+        self.dsn = dsn
+        self.queue_size = queue_size
+        self.connect_timeout = connect_timeout
+        self.reconnect_delay = reconnect_delay
+        self._history: deque[Event] = deque(maxlen=history)
+        self._subscribers: dict[int, set[Subscription]] = defaultdict(set)
+        self._connection: asyncpg.Connection | None = None
+        self._task: asyncio.Task | None = None
+        self._ready = asyncio.Event()
+        self._start_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        """Connect and LISTEN (idempotent); returns once notifications are being received.
+
+        Raises ``TimeoutError`` when the database cannot be reached within
+        ``connect_timeout`` (the listener keeps retrying in the background).
+        """
+        async with self._start_lock:
+            if self._task is None:
+                self._task = asyncio.create_task(self._run())
+        await asyncio.wait_for(self._ready.wait(), self.connect_timeout)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # fresh primitives: a later start() may run on another event loop
+        self._ready = asyncio.Event()
+        self._start_lock = asyncio.Lock()
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                subscription.close()
+        self._subscribers.clear()
+
+    async def subscribe(self, user_id: int, last_event_id: int | None = None) -> Subscription:
+        await self.start()
+        subscription = Subscription(user_id, asyncio.Queue(self.queue_size))
+        if last_event_id is not None:
+            for event in self._replay(user_id, last_event_id):
+                if not subscription.offer(event):
+                    break
+        self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+
+    def _replay(self, user_id: int, last_event_id: int) -> list[Event]:
+        history = list(self._history)
+        for position, event in enumerate(history):
+            if event.id == last_event_id:
+                return [later for later in history[position + 1 :] if later.user_id == user_id]
+        return [self._reset()]
+
+    def _reset(self) -> Event:
+        # carries the newest known id, so resuming from it after refetching works
+        return Event(id=self._history[-1].id if self._history else 0, user_id=0, type="reset", data=b"{}")
+
+    def dispatch(self, event: Event) -> None:
+        self._history.append(event)
+        for subscription in list(self._subscribers.get(event.user_id, ())):
+            if not subscription.offer(event):
+                self.unsubscribe(subscription)
+                log_event(
+                    logger,
+                    logging.WARNING,
+                    "Slow event subscriber dropped",
+                    "events_subscriber_dropped",
+                    lambda: {"user_id": event.user_id, "queue_size": self.queue_size},
+                )
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            event = parse_notification(payload)
+        except Exception as exc:
+            log_event(
+                logger, logging.ERROR, "Invalid event payload", "events_invalid_payload", lambda: {"error": repr(exc)}
+            )
+            return
+        self.dispatch(event)
+
+    def _on_connection_lost(self) -> None:
+        # notifications sent meanwhile are lost: history can no longer vouch for continuity
+        self._history.clear()
+        reset = self._reset()
+        for subscriptions in list(self._subscribers.values()):
+            for subscription in list(subscriptions):
+                subscription.offer(reset)
+
+    async def _run(self) -> None:
+        first = True
+        while True:
+            lost = asyncio.Event()
+            try:
+                self._connection = await asyncpg.connect(self.dsn)
+                self._connection.add_termination_listener(lambda _: lost.set())
+                await self._connection.add_listener(CHANNEL, self._on_notify)
+                if not first:
+                    self._on_connection_lost()
+                first = False
+                self._ready.set()
+                log_event(logger, logging.INFO, "Listening for events", "events_listen", lambda: {"channel": CHANNEL})
+                await lost.wait()
+                log_event(logger, logging.WARNING, "Event listener disconnected", "events_disconnected", dict)
+            except asyncio.CancelledError:
+                if self._connection is not None:
+                    await self._connection.close()
+                raise
+            except Exception as exc:
+                log_event(
+                    logger, logging.ERROR, "Event listener failed", "events_listen_failed", lambda: {"error": repr(exc)}
+                )
+            finally:
+                self._connection = None
+            await asyncio.sleep(self.reconnect_delay)
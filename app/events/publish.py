@@ -0,0 +1,91 @@
+"""Change events published on the writer's own transaction.
+
+``publish`` issues ``NOTIFY user_events`` before the caller commits: Postgres
+delivers the notification to every listening process only if (and when) the
+transaction commits, in commit order, so subscribers never see a change that
+was rolled back. Event ids come from a sequence and are what clients send back
+in ``Last-Event-ID``.
+
+The same statement inserts the event into ``outbox_events``, from where the
+outbox relay (``app.outbox``) hands it to downstream consumers.
+
+The payload is ``<id>:<json>`` and must stay under the 8000-byte NOTIFY limit,
+so events carry ids and amounts, not free text.
+"""
+from decimal import Decimal
+from typing import Any, Iterable
+
+import orjson
+from sqlalchemy import Sequence, Text, cast, func, insert, literal, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Card, OutboxEvent, Transaction
+
+CHANNEL = "user_events"
+EVENT_ID = Sequence("user_event_id_seq")
+
+TRANSACTION_CREATED = "transaction.created"
+TRANSACTION_UPDATED = "transaction.updated"
+TRANSACTION_DELETED = "transaction.deleted"
+TRANSFER_CREATED = "transfer.created"
+TRANSFER_UPDATED = "transfer.updated"
+TRANSFER_DELETED = "transfer.deleted"
+
+
+def transaction_data(transaction: Transaction) -> dict[str, Any]:
+    return {
+        "id": transaction.id,
+        "card_id": transaction.card_id,
+        "category_id": transaction.category_id,
+        "income": transaction.income,
+        "expenses": transaction.expenses,
+        "executed": transaction.executed,
+        "transfer_id": transaction.transfer_id,
+    }
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError
+
+
+def card_balances(card_ids: Iterable[int]):
+    """Scalar subquery: ``{"<card_id>": "<income - expenses>"}`` as seen by the current transaction."""
+    per_card = (
+        select(
+            Card.id.label("card_id"),
+            (
+                func.coalesce(func.sum(Transaction.income), 0) - func.coalesce(func.sum(Transaction.expenses), 0)
+            ).label("balance"),
+        )
+        .outerjoin(Transaction, Transaction.card_id == Card.id)
+        .where(Card.id.in_(sorted(set(card_ids))))
+        .group_by(Card.id)
+        .subquery()
+    )
+    return select(func.jsonb_object_agg(per_card.c.card_id, cast(per_card.c.balance, Text))).scalar_subquery()
+
+
+async def publish(
+    db: AsyncSession, user_id: int, type: str, data: dict[str, Any], *, card_ids: Iterable[int] = ()
+) -> None:
+    """Queue an event for ``user_id`` on the current transaction (no commit).
+
+    ``card_ids`` lists the cards whose balance changed; their new balances are
+    added to the event under ``balances`` by the same statement that records
+    it in the outbox and sends it, so publishing costs a single round trip on
+    top of the write itself.
+    """
+    payload = cast(literal(orjson.dumps(data, default=_default).decode()), JSONB)
+    if card_ids:
+        payload = payload.op("||")(func.jsonb_build_object("balances", card_balances(card_ids)))
+    outbox = (
+        insert(OutboxEvent).values(user_id=user_id, type=type, payload=payload).returning(OutboxEvent.payload).cte()
+    )
+    envelope = cast(literal(orjson.dumps({"u": user_id, "t": type}).decode()), JSONB)
+    message = envelope.op("||")(func.jsonb_build_object("d", outbox.c.payload))
+    await db.flush()
+    notify = func.pg_notify(CHANNEL, func.concat(EVENT_ID.next_value(), ":", cast(message, Text)))
+    await db.execute(select(notify).select_from(outbox))
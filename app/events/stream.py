@@ -0,0 +1,26 @@
+"""Server-Sent Events framing for a broker subscription."""
+from typing import AsyncIterator
+
+from app.events.broker import EventBroker, Subscription
+
+HEARTBEAT = b": ping\n\n"
+
+
+async def sse_stream(
+    broker: EventBroker, subscription: Subscription, *, heartbeat: float, retry_ms: int
+) -> AsyncIterator[bytes]:
+    """Yield SSE frames until the client goes away or the subscription is dropped.
+
+    A comment line is sent after ``heartbeat`` idle seconds so proxies keep the
+    connection open and dead clients are noticed on write.
+    """
+    try:
+        yield b"retry: %d\n\n" % retry_ms
+        while True:
+            try:
+                event = await subscription.next(heartbeat)
+            except ConnectionAbortedError:
+                return
+            yield HEARTBEAT if event is None else event.encode()
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,13 @@
+from .registry import JobType, get_job_type, job_handler, registered_types
+from .worker import JobContext, JobWorker, retry_delay
+from . import handlers  # noqa: F401  (registers the built-in job types)
+
+__all__ = [
+    "JobContext",
+    "JobType",
+    "JobWorker",
+    "get_job_type",
+    "job_handler",
+    "registered_types",
+    "retry_delay",
+]
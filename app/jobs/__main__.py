@@ -0,0 +1,41 @@
+"""Run a standalone job worker (the API process runs its own unless JOBS_WORKER_ENABLED=false).
+
+Usage (with the usual .env in place)::
+
+    python -m app.jobs [--concurrency 8] [--types storage.reconcile,storage.usage_rebuild]
+"""
+import argparse
+import asyncio
+import signal
+
+from app.db.session import engine
+from app.jobs import JobWorker
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Procesa jobs en segundo plano")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--types", default=None, help="tipos de job separados por coma (por defecto, todos)")
+    args = parser.parse_args()
+
+    overrides = {}
+    if args.concurrency:
+        overrides["concurrency"] = args.concurrency
+    if args.types:
+        overrides["types"] = [t.strip() for t in args.types.split(",") if t.strip()]
+    worker = JobWorker.from_settings(**overrides)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    worker.start()
+    try:
+        await stop.wait()
+    finally:
+        await worker.stop()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
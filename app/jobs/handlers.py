@@ -0,0 +1,92 @@
+"""Built-in job types: maintenance work that used to need a shell, and batched deletions."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from app.core.config import get_settings
+from app.crud.storage_usage import StorageUsageCRUD
+from app.crud.tombstone import TombstoneCRUD
+from app.jobs.registry import job_handler
+from app.jobs.worker import JobContext
+from app.services.deletion import purge_card, purge_user
+from app.services.resumable import purge_expired_sessions
+from app.storage import get_storage
+from app.storage.hashes import backfill_hashes
+from app.storage.reconcile import reconcile
+
+
+@job_handler("storage.reconcile")
+async def reconcile_storage(ctx: JobContext, payload: dict[str, Any]) -> dict[str, Any]:
+    stats = await reconcile(
+        get_storage(),
+        action=payload.get("action", "report"),
+        grace=timedelta(hours=payload.get("grace_hours", 24)),
+        session_factory=ctx.session_factory,
+    )
+    return dict(stats.__dict__)
+
+
+@job_handler("storage.usage_rebuild")
+async def rebuild_storage_usage(ctx: JobContext, payload: dict[str, Any]) -> dict[str, Any]:
+    async with ctx.session_factory() as db:
+        updated = await StorageUsageCRUD.rebuild(db, payload.get("user_id"))
+    return {"users": updated}
+
+
+@job_handler("storage.hash_backfill", concurrency=1)
+async def backfill_attachment_hashes(ctx: JobContext, payload: dict[str, Any]) -> dict[str, Any]:
+    stats = await backfill_hashes(
+        get_storage(),
+        batch_size=payload.get("batch_size", 500),
+        pause=payload.get("pause_ms", 0) / 1000,
+        session_factory=ctx.session_factory,
+        progress=ctx.progress,
+    )
+    return dict(stats.__dict__)
+
+
+@job_handler("uploads.purge_sessions", concurrency=1)
+async def purge_upload_sessions(ctx: JobContext, payload: dict[str, Any]) -> dict[str, Any]:
+    async with ctx.session_factory() as db:
+        removed = await purge_expired_sessions(
+            db, Path(get_settings().upload_dir), batch_size=payload.get("batch_size", 1000), max_batches=None
+        )
+    return {"removed": removed}
+
+
+def _batching() -> dict[str, Any]:
+    settings = get_settings()
+    return {"batch_size": settings.delete_batch_size, "pause": settings.delete_batch_pause_ms / 1000}
+
+
+# one at a time per worker: deletions are throttled on purpose
+@job_handler("cards.delete", concurrency=1)
+async def delete_card(ctx: JobContext, payload: dict[str, Any]) -> dict[str, Any]:
+    return await purge_card(
+        ctx.session_factory, get_storage(), payload["card_id"], progress=ctx.progress, **_batching()
+    )
+
+
+@job_handler("users.delete", concurrency=1)
+async def delete_user(ctx: JobContext, payload: dict[str, Any]) -> dict[str, Any]:
+    return await purge_user(
+        ctx.session_factory, get_storage(), payload["user_id"], progress=ctx.progress, **_batching()
+    )
+
+
+@job_handler("sync.tombstones_purge", concurrency=1)
+async def purge_tombstones(ctx: JobContext, payload: dict[str, Any]) -> dict[str, Any]:
+    """Drop tombstones past ``SYNC_TOMBSTONE_RETENTION_DAYS``; cursors older than that get 410."""
+    settings = get_settings()
+    days = payload.get("days", settings.sync_tombstone_retention_days)
+    older_than = datetime.now(timezone.utc) - timedelta(days=days)
+    removed = 0
+    while True:
+        async with ctx.session_factory() as db:
+            deleted = await TombstoneCRUD.purge(db, older_than, settings.delete_batch_size)
+        removed += deleted
+        if deleted < settings.delete_batch_size:
+            return {"removed": removed}
+        await ctx.progress(removed=removed)
+        await asyncio.sleep(settings.delete_batch_pause_ms / 1000)
@@ -0,0 +1,36 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+if TYPE_CHECKING:
+    from app.jobs.worker import JobContext
+
+JobHandler = Callable[["JobContext", dict[str, Any]], Awaitable[dict[str, Any] | None]]
+
+
+@dataclass(frozen=True)
+class JobType:
+    name: str
+    handler: JobHandler
+    # Jobs of this type running at once in one worker process
+    concurrency: int = 1
+
+
+_registry: dict[str, JobType] = {}
+
+
+def job_handler(name: str, *, concurrency: int = 1) -> Callable[[JobHandler], JobHandler]:
+    """Register ``handler(ctx, payload) -> result`` for jobs of type ``name``."""
+
+    def register(handler: JobHandler) -> JobHandler:
+        _registry[name] = JobType(name=name, handler=handler, concurrency=concurrency)
+        return handler
+
+    return register
+
+
+def get_job_type(name: str) -> JobType | None:
+    return _registry.get(name)
+
+
+def registered_types() -> list[JobType]:
+    return list(_registry.values())
@@ -0,0 +1,279 @@
+"""In-process asyncio workers for the ``jobs`` table.
+
+A ``JobWorker`` claims jobs one at a time (``FOR UPDATE SKIP LOCKED``, most
+urgent priority first) while it has free slots, runs each handler in its own
+task and records the outcome. Any number of workers, in any number of
+processes, can share the table:
+
+- at most ``concurrency`` jobs run per worker, and at most
+  ``JobType.concurrency`` of each type;
+- a running job refreshes ``heartbeat_at`` every ``heartbeat_interval``;
+  jobs whose heartbeat is older than ``stale_after`` (a crashed process) are
+  put back in the queue by whichever worker notices first;
+- a failed attempt is retried with exponential backoff until
+  ``max_attempts``, then the job is marked ``failed``.
+
+Every state change after the claim is conditional on ``locked_by``, so a
+worker that lost its lease cannot overwrite the job's new owner.
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger, log_event
+from app.crud.job import JobCRUD
+from app.db.models import Job
+from app.db.session import AsyncSessionLocal
+from app.jobs.registry import get_job_type, registered_types
+
+logger = get_logger(__name__)
+
+
+def retry_delay(attempt: int, *, base: float, cap: float) -> timedelta:
+    """Exponential backoff with jitter: half of ``base * 2**(attempt-1)`` fixed, half random."""
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return timedelta(seconds=delay / 2 + random.uniform(0, delay / 2))
+
+
+@dataclass
+class JobContext:
+    job_id: int
+    attempt: int
+    user_id: int | None
+    worker_id: str
+    session_factory: async_sessionmaker
+
+    async def progress(self, **data: Any) -> bool:
+        """Publish progress (shown by ``GET /jobs/{id}``); also refreshes the heartbeat."""
+        async with self.session_factory() as db:
+            return await JobCRUD.heartbeat(db, self.job_id, self.worker_id, progress=data)
+
+
+class JobWorker:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        *,
+        concurrency: int = 4,
+        types: list[str] | None = None,
+        poll_interval: float = 1.0,
+        heartbeat_interval: float = 10.0,
+        stale_after: float = 60.0,
+        retry_base: float = 5.0,
+        retry_max: float = 600.0,
+        worker_id: str | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.types = types
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.worker_id = (worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}")[:64]
+        self._running: dict[int, asyncio.Task] = {}
+        self._by_type: Counter[str] = Counter()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._loop_task: asyncio.Task | None = None
+
+    @classmethod
+    def from_settings(cls, session_factory: async_sessionmaker = AsyncSessionLocal, **overrides: Any) -> "JobWorker":
+        settings = get_settings()
+        options = {
+            "concurrency": settings.jobs_concurrency,
+            "poll_interval": settings.jobs_poll_seconds,
+            "heartbeat_interval": settings.jobs_heartbeat_seconds,
+            "stale_after": settings.jobs_stale_seconds,
+            "retry_base": settings.jobs_retry_base_seconds,
+            "retry_max": settings.jobs_retry_max_seconds,
+        }
+        return cls(session_factory, **{**options, **overrides})
+
+    def _claimable(self) -> list[str]:
+        if len(self._running) >= self.concurrency:
+            return []
+        return [
+            job_type.name
+            for job_type in registered_types()
+            if (self.types is None or job_type.name in self.types)
+            and self._by_type[job_type.name] < job_type.concurrency
+        ]
+
+    async def _claim(self) -> Job | None:
+        types = self._claimable()
+        if not types:
+            return None
+        async with self.session_factory() as db:
+            return await JobCRUD.claim(db, self.worker_id, types)
+
+    async def run_once(self) -> bool:
+        """Claim one job and run it to completion; False when nothing was runnable."""
+        job = await self._claim()
+        if job is None:
+            return False
+        await self._execute(job)
+        return True
+
+    def start(self) -> None:
+        self._stopping = False
+        self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Stop claiming, let running jobs finish for ``timeout`` seconds, then hand the rest back."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._loop_task is not None:
+            await self._loop_task
+            self._loop_task = None
+        tasks = list(self._running.values())
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _run(self) -> None:
+        next_recovery = 0.0
+        while not self._stopping:
+            self._wakeup.clear()
+            job = None
+            try:
+                if time.monotonic() >= next_recovery:
+                    next_recovery = time.monotonic() + self.stale_after / 2
+                    await self._recover()
+                job = await self._claim()
+            except Exception as exc:
+                log_event(
+                    logger, logging.ERROR, "Job claim failed", "job_claim_failed", lambda: {"error": repr(exc)}
+                )
+            if job is not None:
+                self._spawn(job)
+                continue
+            # idle or full: wait for a free slot or the next poll
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _recover(self) -> None:
+        async with self.session_factory() as db:
+            recovered = await JobCRUD.recover_stale(db, timedelta(seconds=self.stale_after))
+        if recovered:
+            log_event(
+                logger, logging.WARNING, "Stale jobs recovered", "job_recovered", lambda: {"count": recovered}
+            )
+
+    def _spawn(self, job: Job) -> None:
+        task = asyncio.create_task(self._execute(job))
+        self._running[job.id] = task
+        self._by_type[job.type] += 1
+
+        def done(_: asyncio.Task) -> None:
+            self._running.pop(job.id, None)
+            self._by_type[job.type] -= 1
+            self._wakeup.set()
+
+        task.add_done_callback(done)
+
+    async def _keep_alive(self, job_id: int, work: asyncio.Task, lost: asyncio.Event) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                async with self.session_factory() as db:
+                    ours = await JobCRUD.heartbeat(db, job_id, self.worker_id)
+            except Exception as exc:
+                log_event(
+                    logger,
+                    logging.WARNING,
+                    "Job heartbeat failed",
+                    "job_heartbeat_failed",
+                    lambda: {"job_id": job_id, "error": repr(exc)},
+                )
+                continue
+            if not ours:
+                # recovered as stale and possibly running elsewhere: stop our copy
+                lost.set()
+                work.cancel()
+                return
+
+    async def _execute(self, job: Job) -> None:
+        job_type = get_job_type(job.type)
+        context = JobContext(
+            job_id=job.id,
+            attempt=job.attempts,
+            user_id=job.user_id,
+            worker_id=self.worker_id,
+            session_factory=self.session_factory,
+        )
+        started = time.perf_counter()
+        lost = asyncio.Event()
+        work = asyncio.create_task(job_type.handler(context, dict(job.payload or {})))
+        lease = asyncio.create_task(self._keep_alive(job.id, work, lost))
+        try:
+            result = await work
+        except asyncio.CancelledError:
+            if lost.is_set():
+                log_event(logger, logging.WARNING, "Job lease lost", "job_lease_lost", lambda: {"job_id": job.id})
+                return
+            # worker shutting down: give the job back untouched
+            async with self.session_factory() as db:
+                await JobCRUD.release(db, job.id, self.worker_id)
+            raise
+        except Exception as exc:
+            retry_in = (
+                retry_delay(job.attempts, base=self.retry_base, cap=self.retry_max)
+                if job.attempts < job.max_attempts
+                else None
+            )
+            async with self.session_factory() as db:
+                owned = await JobCRUD.fail(db, job.id, self.worker_id, repr(exc)[:2000], retry_in)
+            if not owned:
+                log_event(logger, logging.WARNING, "Job lease lost", "job_lease_lost", lambda: {"job_id": job.id})
+                return
+            log_event(
+                logger,
+                logging.ERROR if retry_in is None else logging.WARNING,
+                "Job failed",
+                "job_failed",
+                lambda: {
+                    "job_id": job.id,
+                    "type": job.type,
+                    "attempt": job.attempts,
+                    "retry_in": retry_in.total_seconds() if retry_in else None,
+                    "error": repr(exc),
+                },
+            )
+        else:
+            async with self.session_factory() as db:
+                owned = await JobCRUD.complete(db, job.id, self.worker_id, result)
+            if not owned:
+                # requeued meanwhile (recover_stale): the outcome belongs to the next run
+                log_event(logger, logging.WARNING, "Job lease lost", "job_lease_lost", lambda: {"job_id": job.id})
+                return
+            log_event(
+                logger,
+                logging.INFO,
+                "Job completed",
+                "job_completed",
+                lambda: {
+                    "job_id": job.id,
+                    "type": job.type,
+                    "attempt": job.attempts,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                },
+            )
+        finally:
+            lease.cancel()
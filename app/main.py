@@ -16,98 +16,37 @@ from sqlalchemy.engine import create_engine
 from sqlalchemy.engine.url import make_url
 
 from app.core.config import get_settings
+from app.core.compression import CompressionMiddleware
 from app.core.logging_config import get_logger, configure_logging
+from app.core.middleware import RequestLoggingMiddleware
+from app.core.responses import ORJSONResponse
 from app.db.base import Base
 from app.db.session import AsyncSessionLocal, engine
-from app.routers import audit, auth, cards, categories, habitos, summary, transactions, users
+from app.events import get_broker
+from app.jobs import JobWorker
+from app.outbox import OutboxRelay
+from app.webhooks import WebhookDispatcher
+from app.services.thumbnails import shutdown_pool
+from app.storage import get_storage
+from app.routers import audit, auth, cards, categories, events, habitos, jobs, summary, sync, transactions, users
 from app.routers import transfers
+from app.routers import webhooks
 from app.routers import uploads
 from app.crud.category import CategoryCRUD
 
 settings = get_settings()
 logger = get_logger(__name__)
-app = FastAPI(title=settings.app_name, version=settings.app_version)
-
-@app.middleware("http")
-async def log_requests(request: Request, call_next: Callable):
-    start_time = time.perf_counter()
-    
-    # Log de inicio con estructura JSON
-    logger.info(
-        "HTTP request started", 
-        extra={
-            "details": {
-                "event": "request_start",
-                "extra": {
-                    "method": request.method,
-                    "path": request.url.path,
-                    "user_agent": request.headers.get("user-agent"),
-                    "client_ip": request.client.host if request.client else None
-                }
-            }
-        }
+app = FastAPI(title=settings.app_name, version=settings.app_version, default_response_class=ORJSONResponse)
+
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_min_size,
+        offload_size=settings.compression_offload_size,
+        encodings=tuple(e.strip() for e in settings.compression_encodings.split(",") if e.strip()),
     )
-    
-    try:
-        response = await call_next(request)
-    except Exception as exc:  # noqa: BLE001
-        duration_ms = int((time.perf_counter() - start_time) * 1000)
-        logger.error(
-            "Unhandled exception in request",
-            extra={
-                "details": {
-                    "event": "request_error",
-                    "status_code": 500,
-                    "duration_ms": duration_ms,
-                    "extra": {
-                        "method": request.method,
-                        "path": request.url.path,
-                        "error": str(exc),
-                        "error_type": type(exc).__name__
-                    },
-                }
-            },
-        )
-        raise
-    
-    duration_ms = int((time.perf_counter() - start_time) * 1000)
-    
-    # Determinar el nivel de log basado en el status code
-    log_level = "error" if response.status_code >= 400 else "info"
-    log_message = "HTTP request completed"
-    
-    if log_level == "error":
-        logger.error(
-            log_message,
-            extra={
-                "details": {
-                    "event": "request_completed",
-                    "status_code": response.status_code,
-                    "duration_ms": duration_ms,
-                    "extra": {
-                        "method": request.method,
-                        "path": request.url.path,
-                    },
-                }
-            },
-        )
-    else:
-        logger.info(
-            log_message,
-            extra={
-                "details": {
-                    "event": "request_completed",
-                    "status_code": response.status_code,
-                    "duration_ms": duration_ms,
-                    "extra": {
-                        "method": request.method,
-                        "path": request.url.path,
-                    },
-                }
-            },
-        )
-    
-    return response
+# registrado al final para quedar por fuera: la duración incluye la compresión
+app.add_middleware(RequestLoggingMiddleware)
 
 logger.info(
     "HTTP middleware registered successfully",
@@ -115,7 +54,8 @@ logger.info(
         "details": {
             "event": "middleware_setup",
             "extra": {
-                "middleware": "log_requests"
+                "middleware": "RequestLoggingMiddleware",
+                "compression": settings.compression_enabled,
             }
         }
     }
@@ -249,6 +189,16 @@ async def startup_event() -> None:
     # Allow tests to disable category seeding to avoid cross-loop DB usage
     if os.getenv("DISABLE_STARTUP_SEED") != "1":
         await seed_categories()
+    # Worker de jobs en el mismo proceso; los tests lo desactivan (usan la base de pruebas)
+    if settings.jobs_worker_enabled and os.getenv("DISABLE_STARTUP_WORKERS") != "1":
+        app.state.job_worker = JobWorker.from_settings()
+        app.state.job_worker.start()
+    if settings.outbox_relay_enabled and settings.outbox_sinks and os.getenv("DISABLE_STARTUP_WORKERS") != "1":
+        app.state.outbox_relay = OutboxRelay.from_settings()
+        app.state.outbox_relay.start()
+    if settings.webhooks_worker_enabled and os.getenv("DISABLE_STARTUP_WORKERS") != "1":
+        app.state.webhook_dispatcher = WebhookDispatcher.from_settings()
+        app.state.webhook_dispatcher.start()
     # Re-aplicar configuración de loggers por si Uvicorn alteró propagación/handlers
     configure_logging()
     logger.info(
@@ -257,6 +207,23 @@ async def startup_event() -> None:
     )
 
 
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    # Cierra el pool de conexiones del backend de almacenamiento (S3)
+    worker = getattr(app.state, "job_worker", None)
+    if worker is not None:
+        await worker.stop()
+    relay = getattr(app.state, "outbox_relay", None)
+    if relay is not None:
+        await relay.stop()
+    dispatcher = getattr(app.state, "webhook_dispatcher", None)
+    if dispatcher is not None:
+        await dispatcher.stop()
+    await get_broker().stop()
+    await get_storage().close()
+    shutdown_pool()
+
+
 @app.get("/health", tags=["System"])
 async def healthcheck():
     logger.info("Health check", extra={"details": {"event": "health"}})
@@ -272,4 +239,8 @@ app.include_router(summary.router)
 app.include_router(audit.router)
 app.include_router(habitos.router)
 app.include_router(transfers.router)
+app.include_router(jobs.router)
+app.include_router(events.router)
+app.include_router(sync.router)
+app.include_router(webhooks.router)
 app.include_router(uploads)
\ No newline at end of file
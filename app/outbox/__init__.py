@@ -0,0 +1,4 @@
+from .relay import OutboxRelay
+from .sinks import FileSink, HttpSink, NotifySink, OutboxSink, build_sinks, to_ndjson
+
+__all__ = ["FileSink", "HttpSink", "NotifySink", "OutboxRelay", "OutboxSink", "build_sinks", "to_ndjson"]
@@ -0,0 +1,37 @@
+"""Run a standalone outbox relay (the API process runs its own when OUTBOX_SINKS is set).
+
+Usage (with the usual .env in place)::
+
+    python -m app.outbox [--sinks file,http,notify]
+"""
+import argparse
+import asyncio
+import signal
+
+from app.db.session import engine
+from app.outbox import OutboxRelay
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Entrega los eventos del outbox a sus destinos")
+    parser.add_argument("--sinks", default=None, help="destinos separados por coma (por defecto, OUTBOX_SINKS)")
+    args = parser.parse_args()
+
+    relay = OutboxRelay.from_settings(sinks=args.sinks)
+    if not relay.sinks:
+        parser.error("no hay destinos configurados (OUTBOX_SINKS o --sinks)")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    relay.start()
+    try:
+        await stop.wait()
+    finally:
+        await relay.stop()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,208 @@
+"""Relay from the ``outbox_events`` table to the configured sinks.
+
+Writes record their events in the outbox inside their own transaction (see
+``app.events.publish`` and ``OutboxCRUD.record``), so an event exists if and
+only if its change committed. The relay then feeds each sink on its own:
+
+- it takes a committed lease on the sink's row in ``outbox_offsets``, so
+  any number of relays can run and each sink is fed by one of them at a
+  time;
+- it reads the next ``batch_size`` events after the sink's ``(txid, id)``
+  offset and commits, delivers them with no transaction open, and only
+  then moves the offset in a new short transaction, conditional on the old
+  position: a crash or a failed delivery means the batch is sent again (at
+  least once);
+- events are read in ``(txid, id)`` order, once their transaction is older
+  than every running one, so an offset never skips a late commit. That is
+  the order in which transactions first wrote, not their commit order: per
+  entity, consumers order changes by event ``id`` (see
+  ``OutboxCRUD.read_after``);
+- a sink that fails backs off exponentially without holding up the others;
+- events every sink has received are purged in batches.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger, log_event
+from app.crud.outbox import OutboxCRUD
+from app.db.session import AsyncSessionLocal
+from app.jobs.worker import retry_delay
+from app.outbox.sinks import Event, OutboxSink, build_sinks
+
+logger = get_logger(__name__)
+
+
+def to_event(row: dict[str, Any]) -> Event:
+    return {
+        "id": row["id"],
+        "user_id": row["user_id"],
+        "type": row["type"],
+        "data": row["payload"],
+        "created_at": row["created_at"],
+    }
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        sinks: list[OutboxSink],
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        *,
+        batch_size: int = 500,
+        poll_interval: float = 1.0,
+        purge_interval: float = 60.0,
+        retry_base: float = 1.0,
+        retry_max: float = 300.0,
+        lease: float = 120.0,
+        worker_id: str | None = None,
+    ) -> None:
+        self.sinks = sinks
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.purge_interval = purge_interval
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        # must outlast a delivery, or another relay may send the batch again meanwhile
+        self.lease = timedelta(seconds=lease)
+        self.worker_id = (worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}")[:64]
+        self._failures: dict[str, int] = {}
+        self._retry_at: dict[str, float] = {}
+        self._registered = False
+        self._stop = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @classmethod
+    def from_settings(
+        cls, session_factory: async_sessionmaker = AsyncSessionLocal, *, sinks: str | None = None, **overrides: Any
+    ) -> "OutboxRelay":
+        settings = get_settings()
+        options = {
+            "batch_size": settings.outbox_batch_size,
+            "poll_interval": settings.outbox_poll_seconds,
+            "purge_interval": settings.outbox_purge_seconds,
+            "retry_base": settings.outbox_retry_base_seconds,
+            "retry_max": settings.outbox_retry_max_seconds,
+            "lease": settings.outbox_lease_seconds,
+        }
+        names = sinks if sinks is not None else settings.outbox_sinks
+        return cls(build_sinks(names, settings, session_factory), session_factory, **{**options, **overrides})
+
+    async def _register(self) -> None:
+        if not self._registered:
+            async with self.session_factory() as db:
+                await OutboxCRUD.register_sinks(db, [sink.name for sink in self.sinks])
+            self._registered = True
+
+    async def relay(self, sink: OutboxSink) -> int:
+        """Deliver the next batch to ``sink``; returns how many events it got (0 if another relay has it)."""
+        async with self.session_factory() as db:
+            after = await OutboxCRUD.claim(db, sink.name, self.worker_id, self.lease)
+            if after is None:
+                return 0
+            try:
+                rows = await OutboxCRUD.read_after(db, after, self.batch_size)
+                await db.commit()  # nothing stays open while the sink works
+                if rows:
+                    await sink.deliver([to_event(row) for row in rows])
+            except Exception:
+                await db.rollback()
+                await OutboxCRUD.release(db, sink.name, self.worker_id)
+                raise
+            if not rows:
+                await OutboxCRUD.release(db, sink.name, self.worker_id)
+                return 0
+            moved = await OutboxCRUD.advance(
+                db, sink.name, self.worker_id, after, (rows[-1]["txid"], rows[-1]["id"]), len(rows)
+            )
+        if not moved:
+            log_event(
+                logger,
+                logging.WARNING,
+                "Outbox lease lost",
+                "outbox_lease_lost",
+                lambda: {"sink": sink.name, "events": len(rows)},
+            )
+            return 0
+        return len(rows)
+
+    async def _relay_or_back_off(self, sink: OutboxSink) -> int:
+        if time.monotonic() < self._retry_at.get(sink.name, 0.0):
+            return 0
+        try:
+            delivered = await self.relay(sink)
+        except Exception as exc:
+            failures = self._failures[sink.name] = self._failures.get(sink.name, 0) + 1
+            delay = retry_delay(failures, base=self.retry_base, cap=self.retry_max).total_seconds()
+            self._retry_at[sink.name] = time.monotonic() + delay
+            log_event(
+                logger,
+                logging.WARNING,
+                "Outbox delivery failed",
+                "outbox_delivery_failed",
+                lambda: {"sink": sink.name, "failures": failures, "retry_in": round(delay, 2), "error": repr(exc)},
+            )
+            return 0
+        self._failures.pop(sink.name, None)
+        self._retry_at.pop(sink.name, None)
+        return delivered
+
+    async def run_once(self) -> int:
+        """Deliver one batch to every sink that is not backing off; returns the events delivered."""
+        await self._register()
+        delivered = await asyncio.gather(*(self._relay_or_back_off(sink) for sink in self.sinks))
+        return sum(delivered)
+
+    async def purge(self) -> int:
+        """Delete, in batches, the events every sink has received."""
+        removed = 0
+        while True:
+            async with self.session_factory() as db:
+                deleted = await OutboxCRUD.purge(db, self.batch_size)
+            removed += deleted
+            if deleted < self.batch_size:
+                break
+        if removed:
+            log_event(logger, logging.INFO, "Outbox purged", "outbox_purged", lambda: {"removed": removed})
+        return removed
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        for sink in self.sinks:
+            await sink.close()
+
+    async def _run(self) -> None:
+        next_purge = time.monotonic() + self.purge_interval
+        while not self._stop.is_set():
+            delivered = 0
+            try:
+                delivered = await self.run_once()
+                if time.monotonic() >= next_purge:
+                    next_purge = time.monotonic() + self.purge_interval
+                    await self.purge()
+            except Exception as exc:
+                log_event(
+                    logger, logging.ERROR, "Outbox relay failed", "outbox_relay_failed", lambda: {"error": repr(exc)}
+                )
+            if delivered:
+                continue  # there may be more waiting
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
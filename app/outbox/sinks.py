@@ -0,0 +1,119 @@
+"""Destinations the outbox relay delivers events to.
+
+A sink receives batches of events in outbox order and either accepts the
+whole batch or raises; a failed batch is delivered again later, so sinks
+(and their consumers) see every event at least once and deduplicate by
+``id``. Every event is a dict with ``id``, ``user_id``, ``type``, ``data``
+and ``created_at``.
+"""
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import anyio
+import httpx
+import orjson
+from sqlalchemy import ARRAY, Text, bindparam, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import Settings
+
+Event = dict[str, Any]
+
+
+def to_ndjson(events: list[Event]) -> bytes:
+    return b"".join(orjson.dumps(event) + b"\n" for event in events)
+
+
+class OutboxSink(ABC):
+    name: str
+
+    @abstractmethod
+    async def deliver(self, events: list[Event]) -> None:
+        """Hand over ``events``; raising leaves them pending for a later retry."""
+
+    async def close(self) -> None:
+        return None
+
+
+class FileSink(OutboxSink):
+    """Appends events as NDJSON to one file per UTC day (``outbox-YYYY-MM-DD.ndjson``)."""
+
+    def __init__(self, directory: str | Path, *, name: str = "file") -> None:
+        self.directory = Path(directory)
+        self.name = name
+
+    async def deliver(self, events: list[Event]) -> None:
+        path = self.directory / f"outbox-{datetime.now(timezone.utc):%Y-%m-%d}.ndjson"
+        await anyio.to_thread.run_sync(self._append, path, to_ndjson(events))
+
+    @staticmethod
+    def _append(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "ab") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())  # the offset only moves once the lines are on disk
+
+
+class HttpSink(OutboxSink):
+    """POSTs each batch as ``application/x-ndjson``; any non-2xx answer fails the batch."""
+
+    def __init__(self, url: str, *, timeout: float = 10.0, name: str = "http") -> None:
+        self.url = url
+        self.name = name
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    async def deliver(self, events: list[Event]) -> None:
+        response = await self._client.post(
+            self.url, content=to_ndjson(events), headers={"Content-Type": "application/x-ndjson"}
+        )
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class NotifySink(OutboxSink):
+    """Sends each event as a Postgres ``NOTIFY`` on ``channel``, all of a batch in one transaction.
+
+    Payloads are limited to 8000 bytes, which outbox events (ids and amounts)
+    stay well under.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, channel: str = "outbox_events", *, name: str = "notify"):
+        self.session_factory = session_factory
+        self.channel = channel
+        self.name = name
+
+    async def deliver(self, events: list[Event]) -> None:
+        payloads = [orjson.dumps(event).decode() for event in events]
+        payload = func.unnest(bindparam("payloads", payloads, type_=ARRAY(Text))).column_valued("payload")
+        async with self.session_factory() as db:
+            await db.execute(select(func.pg_notify(self.channel, payload)))
+            await db.commit()
+
+
+def build_sinks(names: str | None, settings: Settings, session_factory: async_sessionmaker) -> list[OutboxSink]:
+    """Sinks named in ``names`` (comma separated: ``file``, ``http``, ``notify``, ``webhooks``)."""
+    sinks: list[OutboxSink] = []
+    for name in (n.strip() for n in (names or "").split(",")):
+        if not name:
+            continue
+        if name == "file":
+            sinks.append(FileSink(settings.outbox_file_dir))
+        elif name == "http":
+            if not settings.outbox_http_url:
+                raise RuntimeError("OUTBOX_SINKS=http requiere OUTBOX_HTTP_URL")
+            sinks.append(HttpSink(settings.outbox_http_url, timeout=settings.outbox_http_timeout))
+        elif name == "notify":
+            sinks.append(NotifySink(session_factory, settings.outbox_notify_channel))
+        elif name == "webhooks":
+            from app.webhooks.sink import WebhookSink
+
+            sinks.append(WebhookSink(session_factory))
+        else:
+            raise ValueError(f"Unknown outbox sink: {name!r}")
+    return sinks
@@ -9,4 +9,8 @@ __all__ = [
     "audit",
     "habitos",
     "transfers",
+    "jobs",
+    "events",
+    "sync",
+    "webhooks",
 ]
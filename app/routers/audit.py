@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.dependencies import get_current_user
+from app.core.responses import ORJSONResponse
 from app.crud.audit import AuditCRUD
 from app.db.models import User
 from app.db.session import get_db
@@ -9,11 +10,13 @@ from app.schemas.audit import AuditResponse
 
 router = APIRouter(prefix="/audit", tags=["audit"])
 
+AUDIT_FIELDS = tuple(AuditResponse.model_fields)
+
 
 @router.get("", response_model=list[AuditResponse])
 async def list_audit_logs(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    logs = await AuditCRUD.list_logs(db, user_id=current_user.id)
-    return logs
+    rows = await AuditCRUD.list_log_rows(db, AUDIT_FIELDS, user_id=current_user.id)
+    return ORJSONResponse(rows)
@@ -1,3 +1,5 @@
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,7 +10,7 @@ from app.db.session import get_db
 from app.schemas.auth import LoginRequest, Token
 from app.schemas.user import UserCreate, UserResponse
 from app.services.audit import register_audit
-from app.core.logging_config import get_logger
+from app.core.logging_config import get_logger, log_event
 
 logger = get_logger(__name__)
 
@@ -20,17 +22,17 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSessi
     phone = form_data.username
     password = form_data.password
     user = await UserCRUD.get_by_phone(db, phone=phone)
-    if not user or not verify_password(password, user.password):
-        logger.warning(
-            "Login failed",
-            extra={"details": {"event": "auth_login_failed", "extra": {"phone_suffix": phone[-4:]}}},
-        )
+    if not user or user.deleted_at is not None or not verify_password(password, user.password):
+        log_event(logger, logging.WARNING, "Login failed", "auth_login_failed", lambda: {"phone_suffix": phone[-4:]})
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales inválidas")
 
     token = create_access_token({"sub": str(user.id)})
-    logger.info(
+    log_event(
+        logger,
+        logging.INFO,
         "Login successful",
-        extra={"details": {"event": "auth_login", "extra": {"user_id": user.id, "phone_suffix": phone[-4:]}}},
+        "auth_login",
+        lambda: {"user_id": user.id, "phone_suffix": phone[-4:]},
     )
     return Token(access_token=token)
 
@@ -38,16 +40,22 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSessi
 @router.post("/login-phone", response_model=Token)
 async def login_with_body(payload: LoginRequest, db: AsyncSession = Depends(get_db)):
     user = await UserCRUD.get_by_phone(db, phone=payload.phone)
-    if not user or not verify_password(payload.password, user.password):
-        logger.warning(
+    if not user or user.deleted_at is not None or not verify_password(payload.password, user.password):
+        log_event(
+            logger,
+            logging.WARNING,
             "Login failed",
-            extra={"details": {"event": "auth_login_failed", "extra": {"phone_suffix": payload.phone[-4:]}}},
+            "auth_login_failed",
+            lambda: {"phone_suffix": payload.phone[-4:]},
         )
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales inválidas")
     token = create_access_token({"sub": str(user.id)})
-    logger.info(
+    log_event(
+        logger,
+        logging.INFO,
         "Login successful",
-        extra={"details": {"event": "auth_login", "extra": {"user_id": user.id, "phone_suffix": payload.phone[-4:]}}},
+        "auth_login",
+        lambda: {"user_id": user.id, "phone_suffix": payload.phone[-4:]},
     )
     return Token(access_token=token)
 
@@ -56,9 +64,12 @@ async def login_with_body(payload: LoginRequest, db: AsyncSession = Depends(get_
 async def register(payload: UserCreate, db: AsyncSession = Depends(get_db)):
     existing = await UserCRUD.get_by_phone(db, phone=payload.phone)
     if existing:
-        logger.warning(
+        log_event(
+            logger,
+            logging.WARNING,
             "User registration rejected",
-            extra={"details": {"event": "auth_register_rejected", "extra": {"phone_suffix": payload.phone[-4:]}}},
+            "auth_register_rejected",
+            lambda: {"phone_suffix": payload.phone[-4:]},
         )
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El teléfono ya está registrado")
     user = await UserCRUD.create(
@@ -70,8 +81,11 @@ async def register(payload: UserCreate, db: AsyncSession = Depends(get_db)):
         password=payload.password,
     )
     await register_audit(db, user_id=user.id, action="create", resource="user", details={"user_id": user.id})
-    logger.info(
+    log_event(
+        logger,
+        logging.INFO,
         "User registered",
-        extra={"details": {"event": "auth_register", "extra": {"user_id": user.id, "phone_suffix": payload.phone[-4:]}}},
+        "auth_register",
+        lambda: {"user_id": user.id, "phone_suffix": payload.phone[-4:]},
     )
     return user
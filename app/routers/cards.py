@@ -1,23 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, sparse_fields
+from app.core.responses import ORJSONResponse
 from app.crud.card import CardCRUD
 from app.db.models import User
 from app.db.session import get_db
 from app.schemas.card import CardCreate, CardResponse, CardUpdate
+from app.schemas.job import JobAccepted
 from app.services.audit import register_audit
 
 router = APIRouter(prefix="/cards", tags=["cards"])
 
+CARD_FIELDS = tuple(CardResponse.model_fields)
+
 
 @router.get("", response_model=list[CardResponse])
 async def list_cards(
+    fields: tuple[str, ...] = Depends(sparse_fields(CARD_FIELDS)),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    cards = await CardCRUD.list_by_user(db, current_user.id)
-    return cards
+    rows = await CardCRUD.list_rows_by_user(db, current_user.id, fields)
+    return ORJSONResponse(rows)
 
 
 @router.post("", response_model=CardResponse, status_code=status.HTTP_201_CREATED)
@@ -70,21 +75,24 @@ async def update_card(
     return updated
 
 
-@router.delete("/{card_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{card_id}", response_model=JobAccepted, status_code=status.HTTP_202_ACCEPTED)
 async def delete_card(
     card_id: int,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     card = await CardCRUD.get_by_id(db, card_id, current_user.id)
     if not card:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tarjeta no encontrada")
-    await CardCRUD.delete(db, card)
+    # La tarjeta desaparece ya; sus movimientos se borran por lotes en segundo plano
+    job = await CardCRUD.delete(db, card)
     await register_audit(
         db,
         user_id=current_user.id,
         action="delete",
         resource="card",
-        details={"card_id": card_id},
+        details={"card_id": card_id, "job_id": job.id},
     )
-    return None
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return JobAccepted(job_id=job.id)
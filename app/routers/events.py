@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.dependencies import get_current_user
+from app.db.models import User
+from app.db.session import get_db
+from app.events import get_broker, sse_stream
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+@router.get("/stream")
+async def stream_events(
+    last_event_id: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Cambios del usuario (transacciones, transferencias y saldos por tarjeta) como Server-Sent Events."""
+    settings = get_settings()
+    user_id = current_user.id
+    # La conexión no se usa durante el stream: devolverla al pool en lugar de retenerla por horas
+    await db.close()
+    try:
+        resume_from = int(last_event_id) if last_event_id else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Last-Event-ID inválido")
+    broker = get_broker()
+    try:
+        subscription = await broker.subscribe(user_id, resume_from)
+    except (OSError, TimeoutError):
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Eventos no disponibles")
+    return StreamingResponse(
+        sse_stream(
+            broker, subscription, heartbeat=settings.events_heartbeat_seconds, retry_ms=settings.events_retry_ms
+        ),
+        media_type="text/event-stream",
+        # no-transform: sin compresión ni buffering intermedio de cada evento
+        headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"},
+    )
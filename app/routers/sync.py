@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.dependencies import get_current_user
+from app.core.responses import ORJSONResponse
+from app.db.models import User
+from app.db.session import get_db
+from app.schemas.card import CardResponse
+from app.schemas.sync import SyncResponse
+from app.schemas.transaction import TransactionResponse
+from app.services.sync import CursorExpiredError, changes_since, decode_cursor
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+CARD_FIELDS = tuple(CardResponse.model_fields)
+TRANSACTION_FIELDS = tuple(TransactionResponse.model_fields)
+
+
+@router.get("", response_model=SyncResponse)
+async def sync_changes(
+    cursor: str | None = Query(None, description="Cursor devuelto por la llamada anterior; sin él, sincronización completa"),
+    limit: int = Query(500, ge=1, le=1000, description="Máximo de filas por tipo en esta página"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    try:
+        position = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+    settings = get_settings()
+    try:
+        page = await changes_since(
+            db,
+            current_user.id,
+            position,
+            card_fields=CARD_FIELDS,
+            transaction_fields=TRANSACTION_FIELDS,
+            limit=limit,
+            settle=timedelta(seconds=settings.sync_settle_seconds),
+            retention=timedelta(days=settings.sync_tombstone_retention_days),
+        )
+    except CursorExpiredError:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE, detail="Cursor expirado: vuelve a sincronizar sin cursor"
+        )
+    return ORJSONResponse(page)
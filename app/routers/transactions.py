@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, sparse_fields
+from app.core.responses import ORJSONResponse
 from app.crud.card import CardCRUD
 from app.crud.transaction import TransactionCRUD
 from app.db.models import User
@@ -11,14 +12,17 @@ from app.services.audit import register_audit
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
+TRANSACTION_FIELDS = tuple(TransactionResponse.model_fields)
+
 
 @router.get("", response_model=list[TransactionResponse])
 async def list_transactions(
+    fields: tuple[str, ...] = Depends(sparse_fields(TRANSACTION_FIELDS)),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    transactions = await TransactionCRUD.list_by_user(db, current_user.id)
-    return transactions
+    rows = await TransactionCRUD.list_rows_by_user(db, current_user.id, fields)
+    return ORJSONResponse(rows)
 
 
 @router.post("", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED)
@@ -1,23 +1,33 @@
+import logging
 from collections import defaultdict
 from decimal import Decimal
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import func, select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, sparse_fields
+from app.core.responses import ORJSONResponse
 from app.crud.card import CardCRUD
 from app.crud.category import CategoryCRUD
-from app.crud.transaction import TransactionCRUD
+from app.crud.tombstone import TombstoneCRUD
+from app.crud.transaction import TransactionCRUD, on_visible_card
 from app.db.models import Transaction, User
+from app.db.models.tombstone import TRANSACTION
 from app.db.session import get_db
+from app.events.publish import TRANSFER_DELETED, TRANSFER_UPDATED, publish
 from app.schemas.transfer import TransferRequest, TransferResponse, TransferTransaction
-from app.core.logging_config import get_logger
+from app.core.logging_config import get_logger, log_event
+from app.crud.rows import columns_for, fetch_dicts
 from app.services.audit import register_audit
 
 logger = get_logger(__name__)
 
 router = APIRouter(prefix="/transfers", tags=["transfers"])
 
+TRANSFER_TRANSACTION_FIELDS = tuple(TransferTransaction.model_fields)
+# Columnas que el listado necesita para agrupar y orientar cada par, se pidan o no
+_PAIRING_FIELDS = frozenset({"transfer_id", "income", "expenses"})
+
 
 async def _get_card_balance(db: AsyncSession, user_id: int, card_id: int) -> Decimal:
     stmt = select(
@@ -53,13 +63,16 @@ async def create_transfer(
     balance = await _get_card_balance(db, current_user.id, payload.source_card_id)
     amount = payload.amount.quantize(Decimal("0.01"))
     if balance < amount:
-        logger.warning(
+        log_event(
+            logger,
+            logging.WARNING,
             "Insufficient funds for transfer",
-            extra={
-                "details": {
-                    "event": "transfer_insufficient_funds",
-                    "extra": {"user_id": current_user.id, "card_id": payload.source_card_id, "balance": str(balance), "attempt": str(amount)},
-                }
+            "transfer_insufficient_funds",
+            lambda: {
+                "user_id": current_user.id,
+                "card_id": payload.source_card_id,
+                "balance": str(balance),
+                "attempt": str(amount),
             },
         )
         raise HTTPException(status_code=400, detail="Fondos insuficientes en la tarjeta origen")
@@ -91,18 +104,16 @@ async def create_transfer(
         },
     )
 
-    logger.info(
+    log_event(
+        logger,
+        logging.INFO,
         "Transfer requested",
-        extra={
-            "details": {
-                "event": "transfer_request",
-                "extra": {
-                    "user_id": current_user.id,
-                    "source_card_id": payload.source_card_id,
-                    "destination_card_id": payload.destination_card_id,
-                    "amount": str(amount),
-                },
-            }
+        "transfer_request",
+        lambda: {
+            "user_id": current_user.id,
+            "source_card_id": payload.source_card_id,
+            "destination_card_id": payload.destination_card_id,
+            "amount": str(amount),
         },
     )
 
@@ -120,16 +131,23 @@ async def get_transfer(
 ):
     # fetch both transactions belonging to this transfer and user
     stmt = select(Transaction).where(
-        and_(Transaction.user_id == current_user.id, Transaction.transfer_id == transfer_id)
+        and_(
+            Transaction.user_id == current_user.id,
+            Transaction.transfer_id == transfer_id,
+            on_visible_card(current_user.id),
+        )
     )
     result = await db.execute(stmt)
     txs = list(result.scalars().all())
     if not txs:
         raise HTTPException(status_code=404, detail="Transferencia no encontrada")
     if len(txs) != 2:
-        logger.warning(
+        log_event(
+            logger,
+            logging.WARNING,
             "Unexpected transfer size",
-            extra={"details": {"event": "transfer_read_incomplete", "extra": {"transfer_id": transfer_id, "count": len(txs)}}},
+            "transfer_read_incomplete",
+            lambda: {"transfer_id": transfer_id, "count": len(txs)},
         )
     # Try to pick expense as source and income as destination
     source_tx = next((t for t in txs if Decimal(str(t.expenses)) > 0), txs[0])
@@ -144,13 +162,20 @@ async def get_transfer(
 async def list_transfers(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    fields: tuple[str, ...] = Depends(sparse_fields(TRANSFER_TRANSACTION_FIELDS)),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     # Get page of transfer_ids ordered by latest created_at
     ids_stmt = (
         select(Transaction.transfer_id)
-        .where(and_(Transaction.user_id == current_user.id, Transaction.transfer_id.is_not(None)))
+        .where(
+            and_(
+                Transaction.user_id == current_user.id,
+                Transaction.transfer_id.is_not(None),
+                on_visible_card(current_user.id),
+            )
+        )
         .group_by(Transaction.transfer_id)
         .order_by(func.max(Transaction.created_at).desc())
         .limit(limit)
@@ -159,34 +184,36 @@ async def list_transfers(
     ids_result = await db.execute(ids_stmt)
     transfer_ids = [row[0] for row in ids_result.all()]
     if not transfer_ids:
-        return []
+        return ORJSONResponse([])
 
-    # Fetch all transactions for those transfer_ids
-    tx_stmt = select(Transaction).where(
-        and_(Transaction.user_id == current_user.id, Transaction.transfer_id.in_(transfer_ids))
+    # Fetch all transactions for those transfer_ids as plain rows
+    selected = tuple(name for name in TRANSFER_TRANSACTION_FIELDS if name in fields or name in _PAIRING_FIELDS)
+    tx_stmt = select(*columns_for(Transaction, selected)).where(
+        and_(
+            Transaction.user_id == current_user.id,
+            Transaction.transfer_id.in_(transfer_ids),
+            on_visible_card(current_user.id),
+        )
     )
-    tx_result = await db.execute(tx_stmt)
-    txs = list(tx_result.scalars().all())
+    txs = await fetch_dicts(db, tx_stmt)
 
-    grouped: dict[int, list[Transaction]] = defaultdict(list)
+    grouped: dict[int, list[dict]] = defaultdict(list)
     for t in txs:
-        if t.transfer_id is not None:
-            grouped[int(t.transfer_id)].append(t)
+        if t["transfer_id"] is not None:
+            grouped[int(t["transfer_id"])].append(t)
 
-    responses: list[TransferResponse] = []
+    responses: list[dict] = []
     for tid in transfer_ids:
         pair = grouped.get(int(tid), [])
         if not pair:
             continue
-        source_tx = next((t for t in pair if Decimal(str(t.expenses)) > 0), pair[0])
-        destination_tx = next((t for t in pair if Decimal(str(t.income)) > 0 and t is not source_tx), pair[-1])
-        responses.append(
-            TransferResponse(
-                source_transaction=TransferTransaction.model_validate(source_tx),
-                destination_transaction=TransferTransaction.model_validate(destination_tx),
-            )
-        )
-    return responses
+        source_tx = next((t for t in pair if t["expenses"] > 0), pair[0])
+        destination_tx = next((t for t in pair if t["income"] > 0 and t is not source_tx), pair[-1])
+        if len(selected) != len(fields):
+            source_tx = {name: source_tx[name] for name in fields}
+            destination_tx = {name: destination_tx[name] for name in fields}
+        responses.append({"source_transaction": source_tx, "destination_transaction": destination_tx})
+    return ORJSONResponse(responses)
 
 
 @router.delete("/{transfer_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -197,7 +224,11 @@ async def delete_transfer(
 ):
     # Fetch both transactions for this transfer and user
     stmt = select(Transaction).where(
-        and_(Transaction.user_id == current_user.id, Transaction.transfer_id == transfer_id)
+        and_(
+            Transaction.user_id == current_user.id,
+            Transaction.transfer_id == transfer_id,
+            on_visible_card(current_user.id),
+        )
     )
     result = await db.execute(stmt)
     txs = list(result.scalars().all())
@@ -207,6 +238,14 @@ async def delete_transfer(
     # Delete both
     for t in txs:
         await db.delete(t)
+    await publish(
+        db,
+        current_user.id,
+        TRANSFER_DELETED,
+        {"transfer_id": transfer_id, "transaction_ids": [t.id for t in txs]},
+        card_ids=[t.card_id for t in txs],
+    )
+    await TombstoneCRUD.record(db, current_user.id, TRANSACTION, [t.id for t in txs])
     await db.commit()
 
     await register_audit(
@@ -233,7 +272,11 @@ async def update_transfer(
             raise HTTPException(status_code=404, detail="Categoría no encontrada")
 
     stmt = select(Transaction).where(
-        and_(Transaction.user_id == current_user.id, Transaction.transfer_id == transfer_id)
+        and_(
+            Transaction.user_id == current_user.id,
+            Transaction.transfer_id == transfer_id,
+            on_visible_card(current_user.id),
+        )
     )
     result = await db.execute(stmt)
     txs = list(result.scalars().all())
@@ -250,10 +293,16 @@ async def update_transfer(
             t.category_id = category_id
             changed = True
     if changed:
+        await publish(
+            db,
+            current_user.id,
+            TRANSFER_UPDATED,
+            {"transfer_id": transfer_id, "description_changed": description is not None, "category_id": txs[0].category_id},
+        )
         await db.commit()
-        # refresh any two to return
-        for t in txs:
-            await db.refresh(t)
+        # reload both rows in one statement to pick up server-side updated_at
+        result = await db.execute(stmt.execution_options(populate_existing=True))
+        txs = list(result.scalars().all())
 
         await register_audit(
             db,
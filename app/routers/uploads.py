@@ -1,38 +1,66 @@
-import os
+import asyncio
+import contextlib
 import uuid
+from datetime import date, datetime, time, timedelta, timezone
 from pathlib import Path
 from decimal import Decimal
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, Query
-from fastapi.responses import FileResponse, Response
+from typing import Any, AsyncIterator, Callable, Coroutine, get_origin
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, Header, HTTPException, Request, UploadFile, Query
+from fastapi.responses import Response, StreamingResponse
+from fastapi.routing import APIRoute
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import ClientDisconnect
+from starlette.types import Message
 
 from app.core.config import get_settings
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, sparse_fields
+from app.core.responses import ORJSONResponse
+from app.core.security import decode_token
 from app.db.models import User
 from app.db.session import get_db
 from app.crud.transaction import TransactionCRUD
 from app.crud.attachment import AttachmentCRUD
-
-router = APIRouter(prefix="/uploads", tags=["uploads"])
-
-
-def _ensure_dir(base: Path):
-    base.mkdir(parents=True, exist_ok=True)
+from app.crud.storage_usage import QuotaExceededError, StorageUsageCRUD
+from app.crud.upload_session import UploadSessionBusyError, UploadSessionCRUD
+from app.schemas.upload_session import UploadSessionCreate, UploadSessionResponse
+from app.services.archive import attachments_zip
+from app.services.downloads import attachment_response
+from app.services.resumable import (
+    append_chunk,
+    create_session_file,
+    discard_session_file,
+    hash_session_file,
+    purge_expired_sessions,
+    session_path,
+)
+from app.services.thumbnails import ensure_thumbnail
+from app.services.storage import SpooledUpload, commit_upload, discard_upload, release_attachment, spool_upload
+from app.storage import StorageBackend, blob_key, get_storage
+
+# Margen para los campos del formulario y los delimitadores multipart
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Campos expuestos en los listados de adjuntos
+ATTACHMENT_FIELDS = ("id", "filename", "content_type", "size", "transaction_id", "transfer_id", "path", "sha256")
 
 
 def _parse_csv(value: str | None) -> set[str]:
     return set([v.strip().lower() for v in value.split(",") if v.strip()]) if value else set()
 
 
-def _validate_file_type(file: UploadFile, content: bytes) -> None:
+def _validate_file_type(file: UploadFile) -> None:
+    _check_file_type(file.filename, file.content_type)
+
+
+def _check_file_type(filename: str, content_type: str | None) -> None:
     settings = get_settings()
     allowed_ct = _parse_csv(settings.upload_allowed_content_types) or {"application/pdf"}
     blocked_ct = _parse_csv(settings.upload_blocked_content_types) or {"image/svg+xml"}
     allowed_ext = _parse_csv(settings.upload_allowed_exts) or {".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".tif", ".tiff", ".pdf"}
     blocked_ext = _parse_csv(settings.upload_blocked_exts) or {".svg", ".svgz"}
 
-    ct = (file.content_type or "").lower()
-    ext = (Path(file.filename).suffix or "").lower()
+    ct = (content_type or "").lower()
+    ext = (Path(filename).suffix or "").lower()
 
     if ct in blocked_ct or ext in blocked_ext:
         raise HTTPException(status_code=415, detail="Tipo de archivo bloqueado.")
@@ -46,15 +74,220 @@ def _validate_file_type(file: UploadFile, content: bytes) -> None:
     raise HTTPException(status_code=415, detail="Tipo de archivo no permitido.")
 
 
-def _validate_file_size(content: bytes) -> None:
+def _max_upload_bytes() -> int:
+    return get_settings().upload_max_mb * 1024 * 1024
+
+
+def _quota_bytes() -> int | None:
+    quota_mb = get_settings().upload_quota_mb
+    return quota_mb * 1024 * 1024 if quota_mb > 0 else None
+
+
+def _quota_detail(available: int) -> str:
+    return f"Cuota de almacenamiento excedida. Disponible: {available / (1024 * 1024):.1f}MB."
+
+
+async def _upload_budget(db: AsyncSession, user_id: int) -> tuple[int, str | None]:
+    """Largest file ``user_id`` may upload now, and the 413 message when the limit is their quota."""
+    max_bytes = _max_upload_bytes()
+    quota = _quota_bytes()
+    if quota:
+        # O(1): contador por usuario en storage_usage, no SUM(size) sobre attachments
+        available = max(quota - await StorageUsageCRUD.get_used(db, user_id), 0)
+        if available < max_bytes:
+            return available, _quota_detail(available)
+    return max_bytes, None
+
+
+def _token_user_id(request: Request) -> int | None:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    payload = decode_token(token) if scheme.lower() == "bearer" and token else None
+    try:
+        return int(payload["sub"]) if payload and "sub" in payload else None
+    except (TypeError, ValueError):
+        return None
+
+
+class UploadLimitRoute(APIRoute):
+    """Route class that enforces the upload size while the body is received.
+
+    FastAPI parses the whole multipart body before the endpoint runs, so the
+    per-file check in ``spool_upload`` alone would still accept (and spool) an
+    arbitrarily large request. Here the declared ``Content-Length`` is checked
+    up front and streamed bodies are counted chunk by chunk, failing with 413
+    as soon as the limit (plus room for the form fields) is passed. The limit
+    is the smaller of ``UPLOAD_MAX_MB`` and the user's remaining quota, so an
+    upload that cannot fit is refused before any byte reaches the disk
+    (authentication itself is still enforced by the endpoint's dependencies).
+    Endpoints taking ``list[UploadFile]`` accept up to ``UPLOAD_MAX_FILES``
+    files of that size, still capped by the remaining quota.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        multiple = any(get_origin(field.field_info.annotation) is list for field in self.dependant.body_params)
+
+        async def limited_handler(request: Request) -> Response:
+            if request.method != "POST":
+                return await handler(request)
+            max_bytes, detail = _max_upload_bytes(), None
+            user_id = _token_user_id(request)
+            if user_id is not None and _quota_bytes():
+                # Dependencies have not run yet: open a short session the way get_db does
+                provider = request.app.dependency_overrides.get(get_db, get_db)
+                async with contextlib.aclosing(provider()) as sessions:
+                    max_bytes, detail = await _upload_budget(await anext(sessions), user_id)
+            if multiple and detail is None:
+                max_bytes *= get_settings().upload_max_files
+            limit = max_bytes + MULTIPART_OVERHEAD
+            too_large = HTTPException(
+                status_code=413,
+                detail=detail or f"Archivo demasiado grande. Máximo {get_settings().upload_max_mb}MB.",
+            )
+            declared = request.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > limit:
+                raise too_large
+            received = 0
+
+            async def receive() -> Message:
+                nonlocal received
+                message = await request.receive()
+                if message["type"] == "http.request":
+                    received += len(message.get("body", b""))
+                    if received > limit:
+                        raise too_large
+                return message
+
+            return await handler(Request(request.scope, receive))
+
+        return limited_handler
+
+
+router = APIRouter(prefix="/uploads", tags=["uploads"], route_class=UploadLimitRoute)
+
+
+def _schedule_thumbnail(
+    background_tasks: BackgroundTasks, storage: StorageBackend, key: str, content_type: str | None
+) -> None:
+    # Se genera después de enviar la respuesta; si falla, se reintenta al pedir la miniatura
+    if get_settings().thumbnails_enabled:
+        background_tasks.add_task(ensure_thumbnail, storage, key, content_type)
+
+
+def _content_tag(path: str, sha256: str | None) -> str | None:
+    # Solo las claves direccionadas por contenido son inmutables; las heredadas pueden reescribirse
+    return sha256 if sha256 and path == blob_key(sha256) else None
+
+
+def _file_error(file: UploadFile, exc: HTTPException) -> dict:
+    return {"filename": file.filename, "status": "error", "status_code": exc.status_code, "detail": exc.detail}
+
+
+async def _attach_files(
+    files: list[UploadFile],
+    *,
+    db: AsyncSession,
+    storage: StorageBackend,
+    background_tasks: BackgroundTasks,
+    user_id: int,
+    transaction_id: int | None,
+    transfer_id: int | None,
+) -> list[dict]:
+    """Validate, spool and link several files to an existing transaction or transfer.
+
+    Files are streamed concurrently (at most ``UPLOAD_CONCURRENCY`` at once);
+    a file that is refused (type, size, quota) gets an error entry and does not
+    affect the others. The accepted ones are inserted with a single statement
+    and their blobs placed after the commit. Results keep the request order.
+    """
     settings = get_settings()
-    max_bytes = settings.upload_max_mb * 1024 * 1024
-    if len(content) > max_bytes:
-        raise HTTPException(status_code=413, detail=f"Archivo demasiado grande. Máximo {settings.upload_max_mb}MB.")
+    if len(files) > settings.upload_max_files:
+        raise HTTPException(status_code=400, detail=f"Máximo {settings.upload_max_files} archivos por petición")
+    base = Path(settings.upload_dir)
+    max_bytes, detail = await _upload_budget(db, user_id)
+    limiter = asyncio.Semaphore(settings.upload_concurrency)
+
+    async def spool(file: UploadFile) -> SpooledUpload:
+        async with limiter:
+            _validate_file_type(file)
+            return await spool_upload(file, base, max_bytes, detail=detail)
+
+    outcomes = await asyncio.gather(*(spool(file) for file in files), return_exceptions=True)
+    spooled = [o for o in outcomes if isinstance(o, SpooledUpload)]
+    failure = next((o for o in outcomes if isinstance(o, BaseException) and not isinstance(o, HTTPException)), None)
+    if failure is not None:
+        for item in spooled:
+            await discard_upload(item)
+        raise failure
+
+    # Cada archivo cabe por separado; en conjunto se aceptan en orden mientras quede cuota
+    quota = _quota_bytes()
+    available = max(quota - await StorageUsageCRUD.get_used(db, user_id), 0) if quota else None
+    results: list[dict | None] = [None] * len(files)
+    accepted: list[tuple[int, SpooledUpload]] = []
+    for index, (file, outcome) in enumerate(zip(files, outcomes)):
+        if isinstance(outcome, HTTPException):
+            results[index] = _file_error(file, outcome)
+        elif available is not None and outcome.size > available:
+            await discard_upload(outcome)
+            results[index] = _file_error(file, HTTPException(status_code=413, detail=_quota_detail(available)))
+        else:
+            if available is not None:
+                available -= outcome.size
+            accepted.append((index, outcome))
+
+    if accepted:
+        try:
+            ids = await AttachmentCRUD.create_many(
+                db,
+                user_id=user_id,
+                rows=[
+                    {
+                        "filename": files[index].filename,
+                        "path": blob_key(item.sha256),
+                        "content_type": files[index].content_type,
+                        "size": item.size,
+                        "sha256": item.sha256,
+                        "transaction_id": transaction_id,
+                        "transfer_id": transfer_id,
+                    }
+                    for index, item in accepted
+                ],
+                quota=quota,
+            )
+        except QuotaExceededError as exc:
+            # Otra carga concurrente consumió la cuota entre la comprobación y la inserción
+            for _, item in accepted:
+                await discard_upload(item)
+            await db.rollback()
+            raise HTTPException(status_code=413, detail=_quota_detail(max(exc.quota - exc.used, 0))) from exc
+        except BaseException:
+            for _, item in accepted:
+                await discard_upload(item)
+            raise
+
+        async def place(item: SpooledUpload) -> None:
+            async with limiter:
+                await commit_upload(item, blob_key(item.sha256), storage)
+
+        await asyncio.gather(*(place(item) for _, item in accepted))
+        for attachment_id, (index, item) in zip(ids, accepted):
+            key = blob_key(item.sha256)
+            _schedule_thumbnail(background_tasks, storage, key, files[index].content_type)
+            results[index] = {
+                "filename": files[index].filename,
+                "status": "created",
+                "attachment_id": attachment_id,
+                "size": item.size,
+                "sha256": item.sha256,
+                "stored_as": str(storage.local_path(key) or key),
+            }
+    return results
 
 
 @router.post("/transactions")
 async def upload_and_create_transaction(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     description: str = Form(...),
     card_id: int = Form(...),
@@ -63,55 +296,68 @@ async def upload_and_create_transaction(
     expenses: str = Form("0.00"),
     executed: bool = Form(True),
     db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage),
     current_user: User = Depends(get_current_user),
 ):
     settings = get_settings()
     base = Path(settings.upload_dir)
-    _ensure_dir(base)
-
-    # Persist file to disk
-    ext = Path(file.filename).suffix or ""
-    dest_name = f"{uuid.uuid4().hex}{ext}"
-    dest_path = base / dest_name
-    content = await file.read()
-    _validate_file_size(content)
-    _validate_file_type(file, content)
-    dest_path.write_bytes(content)
-
-    # Create transaction
-    tx = await TransactionCRUD.create(
-        db,
-        user_id=current_user.id,
-        card_id=card_id,
-        description=description,
-        category_id=category_id,
-        income=Decimal(income),
-        expenses=Decimal(expenses),
-        executed=executed,
-    )
+    _validate_file_type(file)
 
-    # Link attachment
-    att = await AttachmentCRUD.create(
-        db,
-        user_id=current_user.id,
-        filename=file.filename,
-        path=str(dest_path.relative_to(base)),
-        content_type=file.content_type,
-        size=len(content),
-        transaction_id=tx.id,
-        transfer_id=None,
-    )
+    # Stream to a temp file; it only becomes visible once the DB rows exist
+    max_bytes, detail = await _upload_budget(db, current_user.id)
+    spooled = await spool_upload(file, base, max_bytes, detail=detail)
+    dest_name = blob_key(spooled.sha256)
+    try:
+        # Create transaction; it commits together with the attachment and the quota charge
+        tx = await TransactionCRUD.create(
+            db,
+            user_id=current_user.id,
+            card_id=card_id,
+            description=description,
+            category_id=category_id,
+            income=Decimal(income),
+            expenses=Decimal(expenses),
+            executed=executed,
+            commit=False,
+        )
+
+        # Link attachment
+        await AttachmentCRUD.lock_path(db, dest_name)
+        att = await AttachmentCRUD.create(
+            db,
+            user_id=current_user.id,
+            filename=file.filename,
+            path=dest_name,
+            content_type=file.content_type,
+            size=spooled.size,
+            sha256=spooled.sha256,
+            transaction_id=tx.id,
+            transfer_id=None,
+            quota=_quota_bytes(),
+        )
+    except QuotaExceededError as exc:
+        # Otra carga concurrente consumió la cuota: la transacción nunca llega a confirmarse
+        await discard_upload(spooled)
+        await db.rollback()
+        raise HTTPException(status_code=413, detail=_quota_detail(max(exc.quota - exc.used, 0))) from exc
+    except BaseException:
+        await discard_upload(spooled)
+        raise
+    await commit_upload(spooled, dest_name, storage)
+    _schedule_thumbnail(background_tasks, storage, dest_name, file.content_type)
 
     return {
         "transaction_id": tx.id,
         "attachment_id": att.id,
         "filename": att.filename,
-        "stored_as": str(dest_path),
+        "stored_as": str(storage.local_path(dest_name) or dest_name),
+        "sha256": spooled.sha256,
     }
 
 
 @router.post("/transfers")
 async def upload_and_create_transfer(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     source_card_id: int = Form(...),
     destination_card_id: int = Form(...),
@@ -119,92 +365,408 @@ async def upload_and_create_transfer(
     description: str | None = Form(None),
     category_id: int | None = Form(None),
     db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage),
     current_user: User = Depends(get_current_user),
 ):
     settings = get_settings()
     base = Path(settings.upload_dir)
-    _ensure_dir(base)
-
-    # Save file
-    ext = Path(file.filename).suffix or ""
-    dest_name = f"{uuid.uuid4().hex}{ext}"
-    dest_path = base / dest_name
-    content = await file.read()
-    _validate_file_size(content)
-    _validate_file_type(file, content)
-    dest_path.write_bytes(content)
-
-    # Create transfer (pair of transactions)
-    expense_tx, income_tx = await TransactionCRUD.transfer(
-        db,
+    _validate_file_type(file)
+
+    # Save file (streamed to a temp file, moved into place after the DB commit)
+    max_bytes, detail = await _upload_budget(db, current_user.id)
+    spooled = await spool_upload(file, base, max_bytes, detail=detail)
+    dest_name = blob_key(spooled.sha256)
+    try:
+        # Create transfer (pair of transactions)
+        expense_tx, income_tx = await TransactionCRUD.transfer(
+            db,
+            user_id=current_user.id,
+            source_card_id=source_card_id,
+            destination_card_id=destination_card_id,
+            amount=Decimal(amount),
+            description=description,
+            category_id=category_id,
+            commit=False,
+        )
+
+        transfer_id = expense_tx.transfer_id
+        await AttachmentCRUD.lock_path(db, dest_name)
+        att = await AttachmentCRUD.create(
+            db,
+            user_id=current_user.id,
+            filename=file.filename,
+            path=dest_name,
+            content_type=file.content_type,
+            size=spooled.size,
+            sha256=spooled.sha256,
+            transaction_id=None,
+            transfer_id=transfer_id,
+            quota=_quota_bytes(),
+        )
+    except QuotaExceededError as exc:
+        await discard_upload(spooled)
+        await db.rollback()
+        raise HTTPException(status_code=413, detail=_quota_detail(max(exc.quota - exc.used, 0))) from exc
+    except BaseException:
+        await discard_upload(spooled)
+        raise
+    await commit_upload(spooled, dest_name, storage)
+    _schedule_thumbnail(background_tasks, storage, dest_name, file.content_type)
+
+    return {
+        "transfer_id": transfer_id,
+        "source_transaction_id": expense_tx.id,
+        "destination_transaction_id": income_tx.id,
+        "attachment_id": att.id,
+        "filename": att.filename,
+        "stored_as": str(storage.local_path(dest_name) or dest_name),
+        "sha256": spooled.sha256,
+    }
+
+@router.post("/transactions/{transaction_id}/attachments")
+async def attach_to_transaction(
+    transaction_id: int,
+    background_tasks: BackgroundTasks,
+    files: list[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage),
+    current_user: User = Depends(get_current_user),
+):
+    if await TransactionCRUD.get_by_id(db, transaction_id, current_user.id) is None:
+        raise HTTPException(status_code=404, detail="Transacción no encontrada")
+    results = await _attach_files(
+        files,
+        db=db,
+        storage=storage,
+        background_tasks=background_tasks,
         user_id=current_user.id,
-        source_card_id=source_card_id,
-        destination_card_id=destination_card_id,
-        amount=Decimal(amount),
-        description=description,
-        category_id=category_id,
+        transaction_id=transaction_id,
+        transfer_id=None,
     )
+    return {"transaction_id": transaction_id, "results": results}
 
-    transfer_id = expense_tx.transfer_id
-    att = await AttachmentCRUD.create(
-        db,
+@router.post("/transfers/{transfer_id}/attachments")
+async def attach_to_transfer(
+    transfer_id: int,
+    background_tasks: BackgroundTasks,
+    files: list[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage),
+    current_user: User = Depends(get_current_user),
+):
+    if not await TransactionCRUD.transfer_exists(db, current_user.id, transfer_id):
+        raise HTTPException(status_code=404, detail="Transferencia no encontrada")
+    results = await _attach_files(
+        files,
+        db=db,
+        storage=storage,
+        background_tasks=background_tasks,
         user_id=current_user.id,
-        filename=file.filename,
-        path=str(dest_path.relative_to(base)),
-        content_type=file.content_type,
-        size=len(content),
         transaction_id=None,
         transfer_id=transfer_id,
     )
+    return {"transfer_id": transfer_id, "results": results}
+
+def _session_ttl() -> timedelta:
+    return timedelta(hours=get_settings().upload_session_ttl_hours)
+
+
+def _session_headers(session) -> dict[str, str]:
+    return {
+        "Upload-Offset": str(session.upload_offset),
+        "Upload-Length": str(session.upload_length),
+        "Upload-Expires": session.expires_at.isoformat(),
+        "Cache-Control": "no-store",
+    }
+
+
+def _session_lease() -> timedelta:
+    return timedelta(seconds=get_settings().upload_session_lease_seconds)
+
+
+_SESSION_BUSY = "La carga está siendo usada por otra petición"
+
+
+async def _claimed_session(db: AsyncSession, user_id: int, session_id: str, token: str):
+    try:
+        session = await UploadSessionCRUD.claim(db, user_id, session_id, token, _session_lease())
+    except UploadSessionBusyError as exc:
+        raise HTTPException(status_code=423, detail=_SESSION_BUSY) from exc
+    if session is None:
+        raise HTTPException(status_code=404, detail="Carga no encontrada")
+    return session
+
+
+@contextlib.asynccontextmanager
+async def _held_lease(db: AsyncSession, session_id: str, token: str) -> AsyncIterator[asyncio.Event]:
+    """Renew the session lease every third of its length until the block ends.
+
+    The yielded event is set once the lease could not be renewed (another
+    request may own the session by then).
+    """
+    lease = _session_lease()
+    lost, done = asyncio.Event(), asyncio.Event()
+
+    async def renew() -> None:
+        while not done.is_set():
+            try:
+                await asyncio.wait_for(done.wait(), lease.total_seconds() / 3)
+            except asyncio.TimeoutError:
+                try:
+                    renewed = await UploadSessionCRUD.renew(db, session_id, token, lease)
+                except Exception:  # noqa: BLE001
+                    renewed = False
+                if not renewed:
+                    lost.set()
+                    return
+
+    task = asyncio.create_task(renew())
+    try:
+        yield lost
+    finally:
+        done.set()
+        await task  # never cancelled mid-statement: it shares the request's session
+
+
+async def _check_target(db: AsyncSession, user_id: int, transaction_id: int | None, transfer_id: int | None) -> None:
+    if transaction_id is not None and await TransactionCRUD.get_by_id(db, transaction_id, user_id) is None:
+        raise HTTPException(status_code=404, detail="Transacción no encontrada")
+    if transfer_id is not None and not await TransactionCRUD.transfer_exists(db, user_id, transfer_id):
+        raise HTTPException(status_code=404, detail="Transferencia no encontrada")
+
+
+@router.post("/sessions", status_code=201, response_model=UploadSessionResponse)
+async def create_upload_session(
+    payload: UploadSessionCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    base = Path(get_settings().upload_dir)
+    # Las mismas reglas que la carga directa, comprobadas antes de recibir ningún byte
+    _check_file_type(payload.filename, payload.content_type)
+    max_bytes, detail = await _upload_budget(db, current_user.id)
+    if payload.upload_length > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=detail or f"Archivo demasiado grande. Máximo {get_settings().upload_max_mb}MB.",
+        )
+    await _check_target(db, current_user.id, payload.transaction_id, payload.transfer_id)
+    await purge_expired_sessions(db, base)
+
+    session = await UploadSessionCRUD.create(
+        db, user_id=current_user.id, ttl=_session_ttl(), **payload.model_dump()
+    )
+    await create_session_file(base, session.id)
+    return ORJSONResponse(
+        UploadSessionResponse.model_validate(session).model_dump(mode="json"),
+        status_code=201,
+        headers={**_session_headers(session), "Location": f"{router.prefix}/sessions/{session.id}"},
+    )
+
+
+@router.head("/sessions/{session_id}")
+async def upload_session_offset(
+    session_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    session = await UploadSessionCRUD.get(db, current_user.id, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Carga no encontrada")
+    return Response(status_code=200, headers=_session_headers(session))
+
+
+@router.patch("/sessions/{session_id}", status_code=204)
+async def append_upload_chunk(
+    request: Request,
+    session_id: str,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    content_type: str = Header("", alias="Content-Type"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if content_type.split(";")[0].strip().lower() != "application/offset+octet-stream":
+        raise HTTPException(status_code=415, detail="Content-Type debe ser application/offset+octet-stream")
+    # Lease confirmado y renovado mientras llega el fragmento: ninguna transacción queda abierta
+    # durante la recepción, y un PATCH simultáneo recibe 423
+    token = uuid.uuid4().hex
+    session = await _claimed_session(db, current_user.id, session_id, token)
+    try:
+        if upload_offset != session.upload_offset:
+            raise HTTPException(
+                status_code=409,
+                detail="Upload-Offset no coincide con el recibido",
+                headers=_session_headers(session),
+            )
+
+        async with _held_lease(db, session.id, token) as lost:
+
+            async def body():
+                try:
+                    async for chunk in request.stream():
+                        if lost.is_set():
+                            raise HTTPException(status_code=409, detail=_SESSION_BUSY)
+                        yield chunk
+                except ClientDisconnect:
+                    # Conexión cortada: se conserva lo recibido para reanudar desde ahí
+                    return
+
+            written = await append_chunk(
+                session_path(Path(get_settings().upload_dir), session.id),
+                session.upload_offset,
+                body(),
+                session.upload_length - session.upload_offset,
+            )
+    except BaseException:
+        await UploadSessionCRUD.release(db, session.id, token)
+        raise
+    # Solo avanza si la sesión sigue en el offset en que se escribió el fragmento
+    if not await UploadSessionCRUD.advance(db, session, token, session.upload_offset + written, _session_ttl()):
+        raise HTTPException(status_code=409, detail=_SESSION_BUSY)
+    return Response(status_code=204, headers=_session_headers(session))
+
+
+@router.post("/sessions/{session_id}/finalize")
+async def finalize_upload_session(
+    session_id: str,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage),
+    current_user: User = Depends(get_current_user),
+):
+    base = Path(get_settings().upload_dir)
+    token = uuid.uuid4().hex
+    session = await _claimed_session(db, current_user.id, session_id, token)
+    try:
+        if session.upload_offset != session.upload_length:
+            raise HTTPException(
+                status_code=409, detail="La carga está incompleta", headers=_session_headers(session)
+            )
+        try:
+            _check_file_type(session.filename, session.content_type)
+        except HTTPException:
+            # Las reglas cambiaron desde que se abrió la carga: ya no puede completarse
+            await discard_session_file(base, session.id)
+            await UploadSessionCRUD.remove(db, session.id, token)
+            await db.commit()
+            raise
+        await _check_target(db, current_user.id, session.transaction_id, session.transfer_id)
+
+        temp_path = session_path(base, session.id)
+        try:
+            async with _held_lease(db, session.id, token):
+                size, sha256 = await hash_session_file(temp_path)
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=410, detail="Los datos de la carga ya no están disponibles") from exc
+        if size != session.upload_length:
+            raise HTTPException(status_code=409, detail="La carga está incompleta")
+        spooled = SpooledUpload(temp_path=temp_path, size=size, sha256=sha256)
+        dest_name = blob_key(sha256)
+        filename, content_type = session.filename, session.content_type
+        await AttachmentCRUD.lock_path(db, dest_name)
+        # la sesión se borra en la misma transacción que crea el adjunto, si la petición aún la tiene
+        if not await UploadSessionCRUD.remove(db, session.id, token):
+            await db.rollback()
+            raise HTTPException(status_code=423, detail=_SESSION_BUSY)
+        att = await AttachmentCRUD.create(
+            db,
+            user_id=current_user.id,
+            filename=filename,
+            path=dest_name,
+            content_type=content_type,
+            size=size,
+            sha256=sha256,
+            transaction_id=session.transaction_id,
+            transfer_id=session.transfer_id,
+            quota=_quota_bytes(),
+        )
+    except QuotaExceededError as exc:
+        # La sesión se conserva: puede finalizarse tras liberar espacio
+        await db.rollback()
+        await UploadSessionCRUD.release(db, session.id, token)
+        raise HTTPException(status_code=413, detail=_quota_detail(max(exc.quota - exc.used, 0))) from exc
+    except BaseException:
+        await db.rollback()
+        await UploadSessionCRUD.release(db, session.id, token)
+        raise
+    await commit_upload(spooled, dest_name, storage)
+    _schedule_thumbnail(background_tasks, storage, dest_name, content_type)
 
     return {
-        "transfer_id": transfer_id,
-        "source_transaction_id": expense_tx.id,
-        "destination_transaction_id": income_tx.id,
         "attachment_id": att.id,
+        "transaction_id": att.transaction_id,
+        "transfer_id": att.transfer_id,
         "filename": att.filename,
-        "stored_as": str(dest_path),
+        "stored_as": str(storage.local_path(dest_name) or dest_name),
+        "sha256": sha256,
     }
 
+
+@router.delete("/sessions/{session_id}", status_code=204)
+async def abort_upload_session(
+    session_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    token = uuid.uuid4().hex
+    session = await _claimed_session(db, current_user.id, session_id, token)
+    await UploadSessionCRUD.remove(db, session.id, token)
+    await db.commit()
+    await discard_session_file(Path(get_settings().upload_dir), session_id)
+    return Response(status_code=204)
+
+
 @router.get("/transactions/{transaction_id}/attachments")
 async def list_attachments_by_transaction(
     transaction_id: int,
+    fields: tuple[str, ...] = Depends(sparse_fields(ATTACHMENT_FIELDS)),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    items = await AttachmentCRUD.list_by_transaction(db, current_user.id, transaction_id)
-    return [
-        {
-            "id": a.id,
-            "filename": a.filename,
-            "content_type": a.content_type,
-            "size": a.size,
-            "transaction_id": a.transaction_id,
-            "transfer_id": a.transfer_id,
-            "path": a.path,
-        }
-        for a in items
-    ]
+    rows = await AttachmentCRUD.list_rows_by_transaction(db, current_user.id, transaction_id, fields)
+    return ORJSONResponse(rows)
 
 @router.get("/transfers/{transfer_id}/attachments")
 async def list_attachments_by_transfer(
     transfer_id: int,
+    fields: tuple[str, ...] = Depends(sparse_fields(ATTACHMENT_FIELDS)),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    rows = await AttachmentCRUD.list_rows_by_transfer(db, current_user.id, transfer_id, fields)
+    return ORJSONResponse(rows)
+
+@router.get("/attachments/export")
+async def export_attachments(
+    date_from: date | None = Query(None, description="Fecha inicial (inclusive) de la transacción"),
+    date_to: date | None = Query(None, description="Fecha final (inclusive) de la transacción"),
+    card_id: int | None = Query(None),
+    transaction_id: int | None = Query(None),
+    transfer_id: int | None = Query(None),
     db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage),
     current_user: User = Depends(get_current_user),
 ):
-    items = await AttachmentCRUD.list_by_transfer(db, current_user.id, transfer_id)
-    return [
-        {
-            "id": a.id,
-            "filename": a.filename,
-            "content_type": a.content_type,
-            "size": a.size,
-            "transaction_id": a.transaction_id,
-            "transfer_id": a.transfer_id,
-            "path": a.path,
-        }
-        for a in items
-    ]
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="La fecha inicio debe ser menor o igual a la fecha fin")
+    # Solo se cargan los metadatos; los archivos se leen uno a uno mientras se envía el ZIP
+    rows = await AttachmentCRUD.list_export_rows(
+        db,
+        current_user.id,
+        start=datetime.combine(date_from, time.min, timezone.utc) if date_from else None,
+        end=datetime.combine(date_to + timedelta(days=1), time.min, timezone.utc) if date_to else None,
+        card_id=card_id,
+        transaction_id=transaction_id,
+        transfer_id=transfer_id,
+    )
+    if not rows:
+        raise HTTPException(status_code=404, detail="No hay adjuntos para los filtros indicados")
+    name = "_".join(["adjuntos", *(d.isoformat() for d in (date_from, date_to) if d)]) + ".zip"
+    return StreamingResponse(
+        attachments_zip(storage, rows),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{name}"', "Cache-Control": "no-transform"},
+    )
 
 @router.get("/attachments/{attachment_id}")
 async def get_attachment(
@@ -223,81 +785,102 @@ async def get_attachment(
         "transaction_id": a.transaction_id,
         "transfer_id": a.transfer_id,
         "path": a.path,
+        "sha256": a.sha256,
     }
 
 @router.get("/attachments/{attachment_id}/download")
 async def download_attachment(
+    request: Request,
     attachment_id: int,
     inline: bool = Query(False, description="Si true, intenta mostrar en el navegador"),
     db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage),
     current_user: User = Depends(get_current_user),
 ):
-    settings = get_settings()
-    base = Path(settings.upload_dir)
     a = await AttachmentCRUD.get_by_id(db, current_user.id, attachment_id)
     if not a:
         raise HTTPException(status_code=404, detail="Adjunto no encontrado")
-    file_path = base / a.path
-    if not file_path.exists():
+    stored = await storage.stat(a.path)
+    if stored is None:
         raise HTTPException(status_code=410, detail="Archivo no disponible")
-    resp = FileResponse(path=str(file_path), filename=a.filename, media_type=a.content_type or "application/octet-stream")
-    if inline:
-        # Ajustar Content-Disposition a inline; FastAPI pone attachment por defecto con filename
-        disp = f"inline; filename*=UTF-8''{a.filename}"
-        resp.headers["Content-Disposition"] = disp
-    return resp
+    settings = get_settings()
+    # Cache-Control lleva no-transform: ya suelen venir comprimidos (imágenes/PDF) y se sirven por rangos
+    return await attachment_response(
+        request,
+        storage,
+        stored,
+        filename=a.filename,
+        media_type=a.content_type or "application/octet-stream",
+        content_tag=_content_tag(a.path, a.sha256),
+        inline=inline,
+        offload=settings.download_offload,
+        accel_prefix=settings.download_accel_prefix,
+    )
+
+@router.get("/attachments/{attachment_id}/thumbnail")
+async def attachment_thumbnail(
+    request: Request,
+    attachment_id: int,
+    db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage),
+    current_user: User = Depends(get_current_user),
+):
+    a = await AttachmentCRUD.get_by_id(db, current_user.id, attachment_id)
+    if not a:
+        raise HTTPException(status_code=404, detail="Adjunto no encontrado")
+    # Normalmente ya existe (se genera tras la carga); si no, se genera ahora
+    key = await ensure_thumbnail(storage, a.path, a.content_type)
+    stored = await storage.stat(key) if key else None
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Vista previa no disponible")
+    settings = get_settings()
+    tag = _content_tag(a.path, a.sha256)
+    return await attachment_response(
+        request,
+        storage,
+        stored,
+        filename=f"{Path(a.filename).stem}.webp",
+        media_type="image/webp",
+        content_tag=f"{tag}-{settings.thumbnail_max_px}" if tag else None,
+        inline=True,
+        offload=settings.download_offload,
+        accel_prefix=settings.download_accel_prefix,
+    )
 
 @router.delete("/attachments/{attachment_id}")
 async def delete_attachment(
     attachment_id: int,
     db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage),
     current_user: User = Depends(get_current_user),
 ):
-    settings = get_settings()
-    base = Path(settings.upload_dir)
     a = await AttachmentCRUD.get_by_id(db, current_user.id, attachment_id)
     if not a:
         raise HTTPException(status_code=404, detail="Adjunto no encontrado")
-    # try delete file from disk
-    try:
-        p = base / a.path
-        if p.exists():
-            p.unlink()
-    except Exception:
-        # no-op: if file removal fails, still remove DB record
-        pass
-    await AttachmentCRUD.delete(db, a)
+    # the blob may be shared by identical uploads: only the last reference unlinks it
+    await release_attachment(db, a, storage)
     return {"deleted": True}
 
 
+@router.get("/usage")
+async def storage_usage(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return {
+        "used_bytes": await StorageUsageCRUD.get_used(db, current_user.id),
+        "quota_bytes": _quota_bytes(),
+    }
+
+
 @router.get("/attachments")
 async def list_attachments(
     offset: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
+    fields: tuple[str, ...] = Depends(sparse_fields(ATTACHMENT_FIELDS)),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     # Simple paginación por usuario
-    from sqlalchemy import select
-    from app.db.models import Attachment
-
-    res = await db.execute(
-        select(Attachment)
-        .where(Attachment.user_id == current_user.id)
-        .order_by(Attachment.id.desc())
-        .offset(offset)
-        .limit(limit)
-    )
-    items = list(res.scalars().all())
-    return [
-        {
-            "id": a.id,
-            "filename": a.filename,
-            "content_type": a.content_type,
-            "size": a.size,
-            "transaction_id": a.transaction_id,
-            "transfer_id": a.transfer_id,
-            "path": a.path,
-        }
-        for a in items
-    ]
+    rows = await AttachmentCRUD.list_rows_by_user(db, current_user.id, fields, offset=offset, limit=limit)
+    return ORJSONResponse(rows)
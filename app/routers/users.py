@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.dependencies import get_current_user
 from app.crud.user import UserCRUD
 from app.db.models import User
 from app.db.session import get_db
+from app.schemas.job import JobAccepted
 from app.schemas.user import UserCreate, UserResponse, UserUpdate
 from app.services.audit import register_audit
-from app.core.logging_config import get_logger
+from app.core.logging_config import get_logger, log_event
 
 logger = get_logger(__name__)
 
@@ -18,9 +21,12 @@ router = APIRouter(prefix="/users", tags=["users"])
 async def register_user(payload: UserCreate, db: AsyncSession = Depends(get_db)):
     existing = await UserCRUD.get_by_phone(db, phone=payload.phone)
     if existing:
-        logger.warning(
+        log_event(
+            logger,
+            logging.WARNING,
             "User registration rejected",
-            extra={"details": {"event": "user_register_rejected", "extra": {"phone_suffix": payload.phone[-4:]}}},
+            "user_register_rejected",
+            lambda: {"phone_suffix": payload.phone[-4:]},
         )
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El teléfono ya está registrado")
     user = await UserCRUD.create(
@@ -32,19 +38,19 @@ async def register_user(payload: UserCreate, db: AsyncSession = Depends(get_db))
         password=payload.password,
     )
     await register_audit(db, user_id=user.id, action="create", resource="user", details={"user_id": user.id})
-    logger.info(
+    log_event(
+        logger,
+        logging.INFO,
         "User registered via users endpoint",
-        extra={"details": {"event": "user_register", "extra": {"user_id": user.id, "phone_suffix": payload.phone[-4:]}}},
+        "user_register",
+        lambda: {"user_id": user.id, "phone_suffix": payload.phone[-4:]},
     )
     return user
 
 
 @router.get("/me", response_model=UserResponse)
 async def get_profile(current_user: User = Depends(get_current_user)):
-    logger.debug(
-        "Profile retrieved",
-        extra={"details": {"event": "user_profile_get", "extra": {"user_id": current_user.id}}},
-    )
+    log_event(logger, logging.DEBUG, "Profile retrieved", "user_profile_get", lambda: {"user_id": current_user.id})
     return current_user
 
 
@@ -56,22 +62,25 @@ async def update_profile(
 ):
     user = await UserCRUD.update(db, current_user, **payload.dict(exclude_unset=True))
     await register_audit(db, user_id=user.id, action="update", resource="user", details={"user_id": user.id})
-    logger.info(
-        "User profile updated",
-        extra={"details": {"event": "user_profile_update", "extra": {"user_id": user.id}}},
-    )
+    log_event(logger, logging.INFO, "User profile updated", "user_profile_update", lambda: {"user_id": user.id})
     return user
 
 
-@router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/me", response_model=JobAccepted, status_code=status.HTTP_202_ACCEPTED)
 async def delete_profile(
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    await UserCRUD.delete(db, current_user)
+    # Auditar antes de programar el borrado: el job desvincula las entradas del usuario
     await register_audit(db, user_id=current_user.id, action="delete", resource="user", details={"user_id": current_user.id})
-    logger.warning(
+    job = await UserCRUD.delete(db, current_user)
+    log_event(
+        logger,
+        logging.WARNING,
         "User profile deleted",
-        extra={"details": {"event": "user_profile_delete", "extra": {"user_id": current_user.id}}},
+        "user_profile_delete",
+        lambda: {"user_id": current_user.id, "job_id": job.id},
     )
-    return None
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return JobAccepted(job_id=job.id)
@@ -0,0 +1,95 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.dependencies import get_current_user
+from app.crud.webhook import WebhookCRUD
+from app.db.models import User
+from app.db.session import get_db
+from app.schemas.webhook import (
+    WebhookCreate,
+    WebhookCreated,
+    WebhookDeadLetterResponse,
+    WebhookRedelivered,
+    WebhookResponse,
+)
+from app.services.audit import register_audit
+
+router = APIRouter(prefix="/webhooks", tags=["webhooks"])
+
+
+async def _get_owned(db: AsyncSession, webhook_id: int, user: User):
+    subscription = await WebhookCRUD.get(db, webhook_id, user.id)
+    if not subscription:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Webhook no encontrado")
+    return subscription
+
+
+@router.post("", response_model=WebhookCreated, status_code=status.HTTP_201_CREATED)
+async def create_webhook(
+    payload: WebhookCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    limit = get_settings().webhooks_max_per_user
+    if await WebhookCRUD.count_by_user(db, current_user.id) >= limit:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=f"Se permiten como máximo {limit} webhooks por usuario"
+        )
+    subscription = await WebhookCRUD.create(
+        db, current_user.id, url=str(payload.url), events=sorted(set(payload.events))
+    )
+    await register_audit(
+        db,
+        user_id=current_user.id,
+        action="create",
+        resource="webhook",
+        details={"webhook_id": subscription.id},
+    )
+    return subscription
+
+
+@router.get("", response_model=list[WebhookResponse])
+async def list_webhooks(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return await WebhookCRUD.list_by_user(db, current_user.id)
+
+
+@router.delete("/{webhook_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_webhook(
+    webhook_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    subscription = await _get_owned(db, webhook_id, current_user)
+    await WebhookCRUD.delete(db, subscription)
+    await register_audit(
+        db,
+        user_id=current_user.id,
+        action="delete",
+        resource="webhook",
+        details={"webhook_id": webhook_id},
+    )
+    return None
+
+
+@router.get("/{webhook_id}/dead-letters", response_model=list[WebhookDeadLetterResponse])
+async def list_dead_letters(
+    webhook_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    subscription = await _get_owned(db, webhook_id, current_user)
+    return await WebhookCRUD.list_dead_letters(db, subscription.id)
+
+
+@router.post("/{webhook_id}/dead-letters/redeliver", response_model=WebhookRedelivered)
+async def redeliver_dead_letters(
+    webhook_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    subscription = await _get_owned(db, webhook_id, current_user)
+    return WebhookRedelivered(requeued=await WebhookCRUD.redeliver(db, subscription))
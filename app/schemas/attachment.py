@@ -19,6 +19,7 @@ class AttachmentResponse(AttachmentBase):
     transaction_id: int | None = None
     transfer_id: int | None = None
     path: str
+    sha256: str | None = None
     created_at: datetime
     updated_at: datetime
 
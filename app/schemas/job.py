@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class JobAccepted(BaseModel):
+    """Body of a 202 response; the job is followed at ``GET /jobs/{job_id}``."""
+
+    job_id: int
+
+
+class JobResponse(BaseModel):
+    id: int
+    type: str
+    status: str
+    priority: int
+    attempts: int
+    max_attempts: int
+    progress: dict[str, Any] | None = None
+    result: dict[str, Any] | None = None
+    last_error: str | None = None
+    run_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
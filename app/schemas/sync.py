@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from app.schemas.card import CardResponse
+from app.schemas.transaction import TransactionResponse
+
+
+class TombstoneResponse(BaseModel):
+    entity: str  # "card" | "transaction"
+    id: int
+    deleted_at: datetime
+
+
+class SyncResponse(BaseModel):
+    cards: list[CardResponse]
+    transactions: list[TransactionResponse]
+    tombstones: list[TombstoneResponse]
+    cursor: str
+    has_more: bool
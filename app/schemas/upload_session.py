@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field, model_validator
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str = Field(..., max_length=255)
+    content_type: str | None = Field(None, max_length=255)
+    upload_length: int = Field(..., gt=0, description="Total size of the file in bytes")
+    transaction_id: int | None = Field(None, description="Transaction the file will be attached to")
+    transfer_id: int | None = Field(None, description="Transfer the file will be attached to")
+
+    @model_validator(mode="after")
+    def one_target(self) -> "UploadSessionCreate":
+        if (self.transaction_id is None) == (self.transfer_id is None):
+            raise ValueError("Indica transaction_id o transfer_id (solo uno)")
+        return self
+
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    filename: str
+    upload_length: int
+    upload_offset: int
+    expires_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,60 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel, Field, HttpUrl, field_validator
+
+from app.core.config import get_settings
+from app.webhooks.targets import check_url
+
+WebhookEvent = Literal["transaction.created", "transfer.created"]
+
+
+class WebhookCreate(BaseModel):
+    url: HttpUrl
+    events: list[WebhookEvent] = Field(default=["transaction.created", "transfer.created"], min_length=1)
+
+    @field_validator("url")
+    @classmethod
+    def _public_url(cls, url: HttpUrl) -> HttpUrl:
+        settings = get_settings()
+        check_url(
+            str(url),
+            require_https=settings.database_use == "prod",
+            allow_private=settings.webhooks_allow_private_targets,
+        )
+        return url
+
+
+class WebhookResponse(BaseModel):
+    id: int
+    url: str
+    events: list[str]
+    active: bool
+    failures: int
+    retry_at: datetime | None = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class WebhookCreated(WebhookResponse):
+    """Only returned on creation: the secret that signs the requests is not shown again."""
+
+    secret: str
+
+
+class WebhookDeadLetterResponse(BaseModel):
+    id: int
+    event_id: int
+    type: str
+    attempts: int
+    last_error: str | None = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class WebhookRedelivered(BaseModel):
+    requeued: int
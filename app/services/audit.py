@@ -1,9 +1,10 @@
+import logging
 from typing import Any
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.audit import AuditCRUD
-from app.core.logging_config import get_logger
+from app.core.logging_config import get_logger, log_event
 
 logger = get_logger(__name__)
 
@@ -17,12 +18,10 @@ async def register_audit(
     details: dict[str, Any] | None = None,
 ) -> None:
     await AuditCRUD.create(db, user_id=user_id, action=action, resource=resource, details=details)
-    logger.debug(
+    log_event(
+        logger,
+        logging.DEBUG,
         "Audit entry recorded",
-        extra={
-            "details": {
-                "event": "audit_register",
-                "extra": {"user_id": user_id, "action": action, "resource": resource},
-            }
-        },
+        "audit_register",
+        lambda: {"user_id": user_id, "action": action, "resource": resource},
     )
@@ -0,0 +1,186 @@
+"""Batched removal of cards and users, run by the ``cards.delete`` / ``users.delete`` jobs.
+
+The request only hides the entity (``deleted_at``) and queues the job. The job
+then deletes its rows ``batch_size`` at a time, each batch in its own short
+transaction followed by a pause, so row locks are held for milliseconds and
+other users' requests never queue behind a single huge ``ON DELETE CASCADE``.
+By the time the card or user row itself is deleted nothing references it any
+more and the cascade has nothing left to do.
+
+Every step is idempotent: a job interrupted halfway is simply run again.
+
+The batches emit no per-row outbox events or sync tombstones. Each card gets
+a single ``card.deleted`` event and tombstone instead, recorded by
+``CardCRUD.delete`` or, for the cards of a deleted user, by ``purge_user``.
+Outbox consumers (the relay sinks, webhooks) must treat ``card.deleted`` as
+the deletion of all of that card's transactions and their attachments, as
+delta sync already does with the card tombstone.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger, log_event
+from app.crud.outbox import OutboxCRUD
+from app.db.models import Attachment, Audit, Card, Tombstone, Transaction, UploadSession, User
+from app.db.models.outbox import CARD_DELETED
+from app.services.resumable import discard_session_file
+from app.services.storage import release_attachments
+from app.storage import StorageBackend
+
+logger = get_logger(__name__)
+
+Progress = Callable[..., Awaitable[Any]]
+
+
+async def _report(progress: Progress | None, **data: Any) -> None:
+    if progress is not None:
+        await progress(**data)
+
+
+async def purge_card(
+    session_factory: async_sessionmaker,
+    storage: StorageBackend,
+    card_id: int,
+    *,
+    batch_size: int = 500,
+    pause: float = 0.05,
+    progress: Progress | None = None,
+) -> dict[str, int]:
+    """Delete a card's transactions and attachments in batches, then the card.
+
+    A transfer's attachments are removed once no transaction of the transfer
+    is left, so a transfer to a card that still exists keeps them.
+    """
+    stats = {"transactions": 0, "attachments_blobs": 0}
+    while True:
+        async with session_factory() as db:
+            res = await db.execute(
+                select(Transaction.id, Transaction.transfer_id)
+                .where(Transaction.card_id == card_id)
+                .order_by(Transaction.id)
+                .limit(batch_size)
+            )
+            rows = res.all()
+            if not rows:
+                break
+            ids = [row.id for row in rows]
+            transfer_ids = {row.transfer_id for row in rows if row.transfer_id is not None}
+            blobs = await release_attachments(db, storage, Attachment.transaction_id.in_(ids))
+            await db.execute(delete(Transaction).where(Transaction.id.in_(ids)))
+            if transfer_ids:
+                remaining = select(Transaction.transfer_id).where(Transaction.transfer_id.in_(transfer_ids))
+                blobs += await release_attachments(
+                    db, storage, Attachment.transfer_id.in_(transfer_ids), Attachment.transfer_id.not_in(remaining)
+                )
+            await db.commit()
+        stats["transactions"] += len(ids)
+        stats["attachments_blobs"] += blobs
+        await _report(progress, card_id=card_id, **stats)
+        await asyncio.sleep(pause)
+
+    async with session_factory() as db:
+        await db.execute(delete(Card).where(Card.id == card_id))
+        await db.commit()
+    log_event(logger, logging.WARNING, "Card purged", "card_purged", lambda: {"card_id": card_id, **stats})
+    return stats
+
+
+async def purge_user(
+    session_factory: async_sessionmaker,
+    storage: StorageBackend,
+    user_id: int,
+    *,
+    batch_size: int = 500,
+    pause: float = 0.05,
+    progress: Progress | None = None,
+) -> dict[str, int]:
+    """Delete everything a user owns in batches, detach their audit entries, then delete the user."""
+    stats = {"cards": 0, "transactions": 0, "attachments_blobs": 0, "upload_sessions": 0, "audit_entries": 0}
+
+    async def step(**data: Any) -> None:
+        await _report(progress, user_id=user_id, **{**stats, **data})
+
+    while True:
+        async with session_factory() as db:
+            card = await db.scalar(select(Card).where(Card.user_id == user_id).order_by(Card.id).limit(1))
+            if card is None:
+                break
+            card_id = card.id
+            if card.deleted_at is None:
+                # not deleted through CardCRUD.delete: announce it before its rows go
+                card.deleted_at = datetime.now(timezone.utc)
+                await OutboxCRUD.record(db, user_id, CARD_DELETED, [{"id": card_id}])
+                await db.commit()
+        card_stats = await purge_card(
+            session_factory, storage, card_id, batch_size=batch_size, pause=pause, progress=step
+        )
+        stats["cards"] += 1
+        stats["transactions"] += card_stats["transactions"]
+        stats["attachments_blobs"] += card_stats["attachments_blobs"]
+
+    # attachments not tied to a transaction any more (e.g. of a transfer whose other card is also gone)
+    while True:
+        async with session_factory() as db:
+            batch = select(Attachment.id).where(Attachment.user_id == user_id).limit(batch_size)
+            ids = list((await db.execute(batch)).scalars())
+            if not ids:
+                break
+            stats["attachments_blobs"] += await release_attachments(db, storage, Attachment.id.in_(ids))
+            await db.commit()
+        await step()
+        await asyncio.sleep(pause)
+
+    base = Path(get_settings().upload_dir)
+    while True:
+        async with session_factory() as db:
+            batch = select(UploadSession.id).where(UploadSession.user_id == user_id).limit(batch_size)
+            res = await db.execute(
+                delete(UploadSession).where(UploadSession.id.in_(batch.scalar_subquery())).returning(UploadSession.id)
+            )
+            session_ids = list(res.scalars())
+            await db.commit()
+        if not session_ids:
+            break
+        for session_id in session_ids:
+            await discard_session_file(base, session_id)
+        stats["upload_sessions"] += len(session_ids)
+
+    # the audit trail outlives the account, unlinked from it
+    while True:
+        async with session_factory() as db:
+            batch = select(Audit.id).where(Audit.user_id == user_id).limit(batch_size)
+            res = await db.execute(
+                update(Audit)
+                .where(Audit.id.in_(batch.scalar_subquery()))
+                .values(user_id=None)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        if not res.rowcount:
+            break
+        stats["audit_entries"] += res.rowcount
+        await step()
+        await asyncio.sleep(pause)
+
+    # sync tombstones are only meaningful to the account's own devices
+    while True:
+        async with session_factory() as db:
+            batch = select(Tombstone.id).where(Tombstone.user_id == user_id).limit(batch_size)
+            res = await db.execute(delete(Tombstone).where(Tombstone.id.in_(batch.scalar_subquery())))
+            await db.commit()
+        if res.rowcount < batch_size:
+            break
+        await asyncio.sleep(pause)
+
+    async with session_factory() as db:
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.commit()
+    log_event(logger, logging.WARNING, "User purged", "user_purged", lambda: {"user_id": user_id, **stats})
+    return stats
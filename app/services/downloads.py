@@ -0,0 +1,140 @@
+"""HTTP semantics for attachment downloads.
+
+``direct`` mode serves the bytes from the app with validators (``ETag``,
+``Last-Modified``), conditional requests (304) and single byte ranges (206/416).
+``x-accel`` (nginx) and ``x-sendfile`` (Apache/lighttpd) modes only authorize
+the request and return an empty response with the internal location; the web
+server then streams the file (and handles ranges) without holding an app worker.
+Offloading applies to the local backend only; remote blobs are always direct.
+"""
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from app.storage import StorageBackend, StoredObject
+
+# Content-addressed blobs never change under the same key
+IMMUTABLE_CACHE = "private, max-age=31536000, immutable, no-transform"
+# Legacy keys may be rewritten by the migration tool: revalidate every time
+REVALIDATE_CACHE = "private, no-cache, no-transform"
+
+
+def _etag(stored: StoredObject, content_tag: str | None) -> str:
+    if content_tag:
+        return f'"{content_tag}"'
+    return f'"{int(stored.modified.timestamp()):x}-{stored.size:x}"'
+
+
+def _content_disposition(filename: str, inline: bool) -> str:
+    return f"{'inline' if inline else 'attachment'}; filename*=UTF-8''{quote(filename)}"
+
+
+def _not_modified(request: Request, etag: str, stored: StoredObject) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(stored.modified.timestamp()) <= int(parsedate_to_datetime(if_modified_since).timestamp())
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """``(start, end)`` inclusive for a single ``bytes=`` range.
+
+    Returns ``None`` when the header should be ignored (syntax we do not serve,
+    e.g. multiple ranges: the full body is sent instead) and raises
+    ``ValueError`` when the range cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if not first:  # suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise ValueError("empty suffix range")
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        if not first and last.isdigit():
+            raise
+        return None
+    if start >= size or end < start:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def _range_applies(request: Request, etag: str, last_modified: str) -> bool:
+    if_range = request.headers.get("if-range")
+    return if_range is None or if_range.strip() in (etag, last_modified)
+
+
+async def attachment_response(
+    request: Request,
+    storage: StorageBackend,
+    stored: StoredObject,
+    *,
+    filename: str,
+    media_type: str,
+    content_tag: str | None,
+    inline: bool,
+    offload: str = "direct",
+    accel_prefix: str = "/protected-uploads/",
+) -> Response:
+    """Serve ``stored`` with validators, conditional and range handling, or offloaded.
+
+    ``content_tag`` identifies the exact bytes (the sha256 for content-addressed
+    blobs); when given it becomes the ETag and the response is cacheable as
+    immutable, otherwise clients revalidate on every use.
+    """
+    etag = _etag(stored, content_tag)
+    last_modified = formatdate(stored.modified.timestamp(), usegmt=True)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": IMMUTABLE_CACHE if content_tag else REVALIDATE_CACHE,
+        "Content-Disposition": _content_disposition(filename, inline),
+        "Accept-Ranges": "bytes",
+    }
+
+    if _not_modified(request, etag, stored):
+        return Response(status_code=304, headers={k: headers[k] for k in ("ETag", "Last-Modified", "Cache-Control")})
+
+    file_path = storage.local_path(stored.key)
+    if file_path is not None and offload == "x-accel":
+        headers["X-Accel-Redirect"] = accel_prefix.rstrip("/") + "/" + quote(stored.key)
+        return Response(headers=headers, media_type=media_type)
+    if file_path is not None and offload == "x-sendfile":
+        headers["X-Sendfile"] = str(file_path)
+        return Response(headers=headers, media_type=media_type)
+
+    range_header = request.headers.get("range")
+    if range_header and _range_applies(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, stored.size)
+        except ValueError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{stored.size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{stored.size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                storage.open(stored.key, start, end), status_code=206, headers=headers, media_type=media_type
+            )
+
+    headers["Content-Length"] = str(stored.size)
+    if file_path is not None:
+        return FileResponse(path=str(file_path), headers=headers, media_type=media_type)
+    # Backend remoto: se reenvía por bloques sin cargar el archivo en memoria
+    return StreamingResponse(storage.open(stored.key), headers=headers, media_type=media_type)
@@ -0,0 +1,66 @@
+"""Thumbnail rendering, executed inside the thumbnail process pool.
+
+Kept free of app imports so that spawned workers start quickly. Pillow and
+pypdfium2 are optional: without them the matching previews are simply not
+offered.
+"""
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional
+    Image = None
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # pragma: no cover - optional
+    pdfium = None
+
+WEBP_QUALITY = 80
+
+
+def can_render(content_type: str | None) -> bool:
+    ct = (content_type or "").lower()
+    if ct == "application/pdf":
+        return Image is not None and pdfium is not None
+    return ct.startswith("image/") and Image is not None
+
+
+def _pdf_first_page(src: str, max_px: int):
+    pdf = pdfium.PdfDocument(src)
+    try:
+        if len(pdf) == 0:
+            return None
+        page = pdf[0]
+        try:
+            width, height = page.get_size()
+            bitmap = page.render(scale=max_px / max(width, height, 1))
+            return bitmap.to_pil()
+        finally:
+            page.close()
+    finally:
+        pdf.close()
+
+
+def _image(src: str, max_px: int):
+    with Image.open(src) as img:
+        # JPEG: let the decoder downscale by 1/2..1/8 instead of decoding full size
+        img.draft("RGB", (max_px, max_px))
+        return ImageOps.exif_transpose(img)
+
+
+def render_thumbnail(src: str, dst: str, content_type: str, max_px: int) -> bool:
+    """Write a WebP preview of ``src`` no larger than ``max_px`` per side to ``dst``.
+
+    Returns ``False`` when the file has nothing to render (e.g. an empty PDF);
+    corrupt or oversized inputs raise.
+    """
+    if content_type.lower() == "application/pdf":
+        img = _pdf_first_page(src, max_px)
+    else:
+        img = _image(src, max_px)
+    if img is None:
+        return False
+    img.thumbnail((max_px, max_px))
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+    img.save(dst, "WEBP", quality=WEBP_QUALITY, method=4)
+    return True
@@ -0,0 +1,149 @@
+"""Temp files of resumable uploads and the clean-up of expired sessions.
+
+Each session owns ``UPLOAD_DIR/.incoming/<id>.upload``. Chunks are written at
+the session's current offset (anything past it, e.g. from a chunk that was
+refused, is truncated first) and flushed to disk before the new offset is
+committed, so the offset in the database never points past durable bytes.
+
+Expired sessions are removed together with their files, one batch whenever
+a new session is created. A full sweep is the ``uploads.purge_sessions`` job
+(worth scheduling, since nothing else runs it while no uploads start) or::
+
+    python -m app.services.resumable
+
+Files whose session row is gone are removed by ``app.storage.reconcile``.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO
+
+import anyio
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger, log_event
+from app.crud.upload_session import UploadSessionCRUD
+from app.db.session import AsyncSessionLocal, engine
+from app.services.storage import CHUNK_SIZE, INCOMING_DIR, _unlink
+
+logger = get_logger(__name__)
+
+SESSION_SUFFIX = ".upload"
+
+
+def session_path(base: Path, session_id: str) -> Path:
+    return base / INCOMING_DIR / f"{session_id}{SESSION_SUFFIX}"
+
+
+def _create(path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+
+
+async def create_session_file(base: Path, session_id: str) -> Path:
+    path = session_path(base, session_id)
+    await anyio.to_thread.run_sync(_create, path)
+    return path
+
+
+def _open_at(path: Path, offset: int) -> BinaryIO:
+    out = open(path, "r+b")
+    out.truncate(offset)
+    out.seek(offset)
+    return out
+
+
+def _flush(out: BinaryIO) -> None:
+    out.flush()
+    os.fsync(out.fileno())
+    out.close()
+
+
+async def append_chunk(path: Path, offset: int, chunks: AsyncIterator[bytes], max_bytes: int) -> int:
+    """Write ``chunks`` at ``offset`` and return how many bytes were written.
+
+    More than ``max_bytes`` (what is left of the declared length) raises 413;
+    the caller keeps its offset, so the extra bytes are dropped by the next
+    chunk.
+    """
+    if not await anyio.to_thread.run_sync(path.exists):
+        raise HTTPException(status_code=410, detail="Los datos de la carga ya no están disponibles")
+    out = await anyio.to_thread.run_sync(_open_at, path, offset)
+    written = 0
+    try:
+        async for chunk in chunks:
+            written += len(chunk)
+            if written > max_bytes:
+                raise HTTPException(status_code=413, detail="El fragmento excede el tamaño declarado")
+            await anyio.to_thread.run_sync(out.write, chunk)
+        await anyio.to_thread.run_sync(_flush, out)
+    except BaseException:
+        await anyio.to_thread.run_sync(out.close)
+        raise
+    return written
+
+
+def _hash_file(path: Path) -> tuple[int, str]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as src:
+        while block := src.read(CHUNK_SIZE):
+            size += len(block)
+            digest.update(block)
+    return size, digest.hexdigest()
+
+
+async def hash_session_file(path: Path) -> tuple[int, str]:
+    """Size and SHA-256 of a completed upload (read once, in the thread pool)."""
+    return await anyio.to_thread.run_sync(_hash_file, path)
+
+
+async def discard_session_file(base: Path, session_id: str) -> None:
+    await anyio.to_thread.run_sync(_unlink, session_path(base, session_id))
+
+
+async def purge_expired_sessions(
+    db: AsyncSession, base: Path, *, batch_size: int = 100, max_batches: int | None = 1
+) -> int:
+    """Delete expired sessions and their temp files; returns how many were removed.
+
+    Runs ``max_batches`` batches (``None``: until none is left). Sessions held by
+    a request (leased) are skipped.
+    """
+    removed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = await UploadSessionCRUD.pop_expired(db, batch_size)
+        for session_id in ids:
+            await discard_session_file(base, session_id)
+        removed += len(ids)
+        batches += 1
+        if len(ids) < batch_size:
+            break
+    if removed:
+        log_event(
+            logger,
+            logging.INFO,
+            "Expired upload sessions removed",
+            "upload_sessions_purged",
+            lambda: {"removed": removed},
+        )
+    return removed
+
+
+async def main() -> None:
+    base = Path(get_settings().upload_dir)
+    try:
+        async with AsyncSessionLocal() as db:
+            removed = await purge_expired_sessions(db, base, batch_size=1000, max_batches=None)
+    finally:
+        await engine.dispose()
+    print(f"removed={removed}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+import anyio
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger, log_event
+from app.crud.attachment import AttachmentCRUD
+from app.db.models import Attachment
+from app.storage import StorageBackend, thumbnail_key
+
+logger = get_logger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+# Staging area inside the upload root; with the local backend the final move is a same-filesystem rename
+INCOMING_DIR = ".incoming"
+
+
+@dataclass
+class SpooledUpload:
+    temp_path: Path
+    size: int
+    sha256: str
+
+
+def _open_temp(base: Path) -> tuple[Path, object]:
+    incoming = base / INCOMING_DIR
+    incoming.mkdir(parents=True, exist_ok=True)
+    temp_path = incoming / f"{uuid.uuid4().hex}.part"
+    return temp_path, open(temp_path, "wb")
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+async def spool_upload(file: UploadFile, base: Path, max_bytes: int, *, detail: str | None = None) -> SpooledUpload:
+    """Copy ``file`` into a temp file under ``base`` in fixed-size chunks.
+
+    Only one chunk is held in memory at a time; the SHA-256 is computed on the
+    way through and every disk operation runs in the thread pool. Exceeding
+    ``max_bytes`` removes the partial file and raises 413 immediately (with
+    ``detail`` as message when given, e.g. when the limit is the user's quota).
+    """
+    temp_path, out = await anyio.to_thread.run_sync(_open_temp, base)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while chunk := await file.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=detail or f"Archivo demasiado grande. Máximo {max_bytes // (1024 * 1024)}MB.",
+                )
+            digest.update(chunk)
+            await anyio.to_thread.run_sync(out.write, chunk)
+        await anyio.to_thread.run_sync(out.close)
+    except BaseException:
+        await anyio.to_thread.run_sync(out.close)
+        await anyio.to_thread.run_sync(_unlink, temp_path)
+        raise
+    return SpooledUpload(temp_path=temp_path, size=size, sha256=digest.hexdigest())
+
+
+async def commit_upload(spooled: SpooledUpload, key: str, storage: StorageBackend) -> None:
+    """Hand a spooled upload to the storage backend (call after the DB commit).
+
+    When the blob already exists the upload was a duplicate and the temp file
+    is dropped. The attachment row is committed first, so a concurrent
+    ``release_attachment`` can no longer see the blob as unreferenced.
+    """
+    try:
+        stored = await storage.put_file(key, spooled.temp_path)
+    except BaseException:
+        await discard_upload(spooled)
+        raise
+    log_event(
+        logger,
+        logging.DEBUG,
+        "Upload stored" if stored else "Upload deduplicated",
+        "upload_stored" if stored else "upload_deduplicated",
+        lambda: {"key": key, "backend": storage.name, "size": spooled.size, "sha256": spooled.sha256},
+    )
+
+
+async def discard_upload(spooled: SpooledUpload) -> None:
+    await anyio.to_thread.run_sync(_unlink, spooled.temp_path)
+
+
+async def release_attachment(db: AsyncSession, attachment: Attachment, storage: StorageBackend) -> None:
+    """Delete an attachment row and unlink its blob (and preview) when it was the last reference.
+
+    The unlink happens while the per-path advisory lock is held (before the
+    commit), so an upload of the same content either commits first and keeps
+    the blob alive, or runs afterwards and stores it again.
+    """
+    remaining = await AttachmentCRUD.delete_reference(db, attachment)
+    if remaining == 0:
+        try:
+            await storage.delete(attachment.path)
+            await storage.delete(thumbnail_key(attachment.path, get_settings().thumbnail_max_px))
+        except Exception as exc:
+            # the DB record is removed anyway; the blob is left for app.storage.reconcile
+            log_event(
+                logger,
+                logging.WARNING,
+                "Blob removal failed",
+                "attachment_blob_delete_failed",
+                lambda: {"path": attachment.path, "error": repr(exc)},
+            )
+    await db.commit()
+    log_event(
+        logger,
+        logging.DEBUG,
+        "Attachment released",
+        "attachment_released",
+        lambda: {"attachment_id": attachment.id, "path": attachment.path, "remaining_refs": remaining},
+    )
+
+
+async def release_attachments(db: AsyncSession, storage: StorageBackend, *conditions) -> int:
+    """Bulk ``release_attachment``: delete the matching rows and unlink blobs left unreferenced.
+
+    Does not commit; the caller commits right after so the path locks are short.
+    Returns how many blobs were unlinked.
+    """
+    orphaned = await AttachmentCRUD.delete_references(db, *conditions)
+    max_px = get_settings().thumbnail_max_px
+    for path in orphaned:
+        try:
+            await storage.delete(path)
+            await storage.delete(thumbnail_key(path, max_px))
+        except Exception as exc:
+            log_event(
+                logger,
+                logging.WARNING,
+                "Blob removal failed",
+                "attachment_blob_delete_failed",
+                lambda: {"path": path, "error": repr(exc)},
+            )
+    return len(orphaned)
@@ -0,0 +1,119 @@
+"""Delta sync: everything that changed for a user since an opaque cursor.
+
+Cards and transactions are returned as upserts, walked by ``(updated_at, id)``
+keysets; deletions come from the ``tombstones`` table walked by
+``(created_at, id)``. A transfer is the pair of transactions sharing its
+``transfer_id``, and a card tombstone also stands for all its transactions.
+
+``now()`` is a transaction's start time, so a write can commit with an
+``updated_at`` slightly in the past. Only rows older than ``settle`` seconds
+are handed out (the horizon); a stream that is exhausted moves its cursor to
+the horizon, so nothing committed later with an earlier timestamp is skipped
+and idle streams do not age.
+
+Tombstones are purged after ``retention``; a cursor older than that can no
+longer be served (``CursorExpiredError``) and the client starts over.
+"""
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import orjson
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.card import CardCRUD
+from app.crud.tombstone import TombstoneCRUD
+from app.crud.transaction import TransactionCRUD
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+CURSOR_VERSION = 1
+
+Position = tuple[datetime, int]
+
+
+class CursorExpiredError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class SyncCursor:
+    cards: Position
+    transactions: Position
+    tombstones: Position
+
+
+def encode_cursor(cursor: SyncCursor) -> str:
+    body = {
+        "v": CURSOR_VERSION,
+        "c": [cursor.cards[0].isoformat(), cursor.cards[1]],
+        "t": [cursor.transactions[0].isoformat(), cursor.transactions[1]],
+        "d": [cursor.tombstones[0].isoformat(), cursor.tombstones[1]],
+    }
+    return base64.urlsafe_b64encode(orjson.dumps(body)).rstrip(b"=").decode()
+
+
+def decode_cursor(token: str) -> SyncCursor:
+    """Parse a cursor from ``encode_cursor``; ``ValueError`` when it is not one."""
+    try:
+        body = orjson.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if body.get("v") != CURSOR_VERSION:
+            raise ValueError("unknown cursor version")
+        positions = [(datetime.fromisoformat(body[key][0]), int(body[key][1])) for key in ("c", "t", "d")]
+    except (binascii.Error, orjson.JSONDecodeError, KeyError, IndexError, TypeError, AttributeError) as exc:
+        raise ValueError("invalid cursor") from exc
+    if any(position[0].tzinfo is None for position in positions):
+        raise ValueError("invalid cursor")
+    return SyncCursor(*positions)
+
+
+def _advance(rows: list[dict], key: str, limit: int, horizon: datetime) -> Position:
+    if len(rows) < limit:
+        return (horizon, 0)
+    return (rows[-1][key], rows[-1]["id"])
+
+
+async def changes_since(
+    db: AsyncSession,
+    user_id: int,
+    cursor: SyncCursor | None,
+    *,
+    card_fields: tuple[str, ...],
+    transaction_fields: tuple[str, ...],
+    limit: int,
+    settle: timedelta,
+    retention: timedelta,
+) -> dict[str, Any]:
+    """One page of changes; ``has_more`` asks the client to call again with the returned cursor.
+
+    Without a cursor the page starts a full snapshot. Past deletions are not
+    part of a snapshot, so its tombstone stream starts at the horizon.
+    """
+    now = await db.scalar(select(func.now()))
+    horizon = now - settle
+    if cursor is None:
+        cursor = SyncCursor(cards=(EPOCH, 0), transactions=(EPOCH, 0), tombstones=(horizon, 0))
+    elif cursor.tombstones[0] < now - retention:
+        raise CursorExpiredError
+
+    cards = await CardCRUD.list_changed_rows(db, user_id, card_fields, cursor.cards, horizon, limit)
+    transactions = await TransactionCRUD.list_changed_rows(
+        db, user_id, transaction_fields, cursor.transactions, horizon, limit
+    )
+    tombstones = await TombstoneCRUD.list_since(db, user_id, cursor.tombstones, horizon, limit)
+    next_cursor = SyncCursor(
+        cards=_advance(cards, "updated_at", limit, horizon),
+        transactions=_advance(transactions, "updated_at", limit, horizon),
+        tombstones=_advance(tombstones, "created_at", limit, horizon),
+    )
+    return {
+        "cards": cards,
+        "transactions": transactions,
+        "tombstones": [
+            {"entity": row["entity"], "id": row["entity_id"], "deleted_at": row["created_at"]} for row in tombstones
+        ],
+        "cursor": encode_cursor(next_cursor),
+        "has_more": limit in (len(cards), len(transactions), len(tombstones)),
+    }
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import anyio
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger, log_event
+from app.services.imaging import can_render, render_thumbnail
+from app.services.storage import INCOMING_DIR
+from app.storage import StorageBackend, thumbnail_key
+
+logger = get_logger(__name__)
+
+# Generations in progress, so concurrent requests for the same preview share one render
+_inflight: dict[str, asyncio.Future] = {}
+
+
+@lru_cache
+def _get_pool() -> ProcessPoolExecutor:
+    # spawn: forking a process that holds an event loop, DB connections and threads is unsafe
+    return ProcessPoolExecutor(
+        max_workers=get_settings().thumbnail_workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def shutdown_pool() -> None:
+    if _get_pool.cache_info().currsize:
+        _get_pool().shutdown(wait=False, cancel_futures=True)
+        _get_pool.cache_clear()
+
+
+def _unlink(path: Path) -> None:
+    path.unlink(missing_ok=True)
+
+
+async def _download(storage: StorageBackend, key: str, staging: Path) -> Path:
+    temp_path = staging / f"{uuid.uuid4().hex}.part"
+    fh = await anyio.open_file(temp_path, "wb")
+    try:
+        async for chunk in storage.open(key):
+            await fh.write(chunk)
+    except BaseException:
+        await fh.aclose()
+        await anyio.to_thread.run_sync(_unlink, temp_path)
+        raise
+    await fh.aclose()
+    return temp_path
+
+
+async def _generate(storage: StorageBackend, key: str, thumb: str, content_type: str, max_px: int) -> str | None:
+    if await storage.stat(key) is None:
+        return None
+    staging = Path(get_settings().upload_dir) / INCOMING_DIR
+    await anyio.to_thread.run_sync(lambda: staging.mkdir(parents=True, exist_ok=True))
+    local = storage.local_path(key)
+    src = local if local is not None else await _download(storage, key, staging)
+    dst = staging / f"{uuid.uuid4().hex}.webp.part"
+    try:
+        loop = asyncio.get_running_loop()
+        rendered = await loop.run_in_executor(
+            _get_pool(), render_thumbnail, str(src), str(dst), content_type, max_px
+        )
+        if not rendered:
+            return None
+        await storage.put_file(thumb, dst)
+    finally:
+        await anyio.to_thread.run_sync(_unlink, dst)
+        if local is None:
+            await anyio.to_thread.run_sync(_unlink, src)
+    log_event(logger, logging.DEBUG, "Thumbnail generated", "thumbnail_generated", lambda: {"key": thumb})
+    return thumb
+
+
+async def ensure_thumbnail(storage: StorageBackend, key: str, content_type: str | None) -> str | None:
+    """Key of the WebP preview of ``key``, rendering it first when missing.
+
+    Images are downscaled and PDFs rendered from their first page in the
+    process pool, so the event loop only waits. Returns ``None`` when no
+    preview can be produced (unsupported type, missing or unreadable file);
+    failures are logged, never raised, so this is safe as a background task.
+    """
+    if not can_render(content_type):
+        return None
+    max_px = get_settings().thumbnail_max_px
+    thumb = thumbnail_key(key, max_px)
+    try:
+        if await storage.exists(thumb):
+            return thumb
+        task = _inflight.get(thumb)
+        if task is None:
+            task = asyncio.ensure_future(_generate(storage, key, thumb, content_type, max_px))
+            _inflight[thumb] = task
+            task.add_done_callback(lambda _: _inflight.pop(thumb, None))
+        return await asyncio.shield(task)
+    except Exception as exc:
+        log_event(
+            logger,
+            logging.WARNING,
+            "Thumbnail generation failed",
+            "thumbnail_failed",
+            lambda: {"key": key, "content_type": content_type, "error": repr(exc)},
+        )
+        return None
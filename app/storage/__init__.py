@@ -0,0 +1,37 @@
+from functools import lru_cache
+
+from app.core.config import Settings, get_settings
+from app.storage.base import StorageBackend, StoredObject, blob_key, thumbnail_key
+from app.storage.local import LocalStorage
+
+
+def build_storage(backend: str, settings: Settings) -> StorageBackend:
+    if backend == "local":
+        return LocalStorage(settings.upload_dir)
+    if backend == "s3":
+        from app.storage.s3 import S3Storage
+
+        if not settings.s3_bucket:
+            raise RuntimeError("STORAGE_BACKEND=s3 requiere S3_BUCKET")
+        return S3Storage(
+            settings.s3_bucket,
+            prefix=settings.s3_prefix,
+            endpoint_url=settings.s3_endpoint_url,
+            region=settings.s3_region,
+            access_key_id=settings.s3_access_key_id,
+            secret_access_key=settings.s3_secret_access_key,
+            max_pool_connections=settings.s3_max_pool_connections,
+            multipart_threshold=settings.s3_multipart_threshold_mb * 1024 * 1024,
+            part_size=settings.s3_part_size_mb * 1024 * 1024,
+        )
+    raise ValueError(f"Unknown storage backend: {backend!r}")
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+    """Process-wide storage backend selected by ``STORAGE_BACKEND`` (usable as a dependency)."""
+    settings = get_settings()
+    return build_storage(settings.storage_backend, settings)
+
+
+__all__ = ["LocalStorage", "StorageBackend", "StoredObject", "blob_key", "build_storage", "get_storage", "thumbnail_key"]
@@ -0,0 +1,71 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def blob_key(sha256: str) -> str:
+    """Sharded, content-addressed key of a blob: ``ab/cd/<sha256>``.
+
+    Two levels of 256 prefixes keep every directory (or S3 listing prefix)
+    small even with millions of attachments.
+    """
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def thumbnail_key(key: str, max_px: int) -> str:
+    """Key of the WebP preview stored next to the blob ``key`` (one per size)."""
+    return f"{key}.thumb{max_px}.webp"
+
+
+@dataclass
+class StoredObject:
+    key: str
+    size: int
+    modified: datetime
+
+
+class StorageBackend(ABC):
+    """Where attachment blobs live. Keys are the relative paths kept in ``attachments.path``."""
+
+    name: str
+
+    @abstractmethod
+    async def put_file(self, key: str, src: Path) -> bool:
+        """Store the local file ``src`` under ``key``, consuming ``src``.
+
+        Returns ``False`` when ``key`` already existed (the upload was a duplicate).
+        """
+
+    @abstractmethod
+    async def stat(self, key: str) -> StoredObject | None:
+        """Size and modification time of ``key``, or ``None`` when it does not exist."""
+
+    async def exists(self, key: str) -> bool:
+        return await self.stat(key) is not None
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove ``key``; missing keys are ignored."""
+
+    @abstractmethod
+    async def rename(self, key: str, new_key: str) -> None:
+        """Move ``key`` to ``new_key``, replacing it if present."""
+
+    @abstractmethod
+    def open(self, key: str, start: int = 0, end: int | None = None) -> AsyncIterator[bytes]:
+        """Stream the bytes of ``key`` from ``start`` to ``end`` (inclusive) in chunks."""
+
+    @abstractmethod
+    def iter_keys(self) -> AsyncIterator[str]:
+        """Every stored key (used by maintenance tools)."""
+
+    def local_path(self, key: str) -> Path | None:
+        """Filesystem path of ``key`` when the backend is local (enables ``FileResponse``/sendfile)."""
+        return None
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,127 @@
+"""Backfill ``attachments.sha256`` for blobs stored before content addressing.
+
+Migration ``0005_attachment_sha256`` only adds the column. Rows from before
+it keep their legacy key and a NULL hash until this runs: it walks them in
+keyset-paginated batches, streams each blob from the storage backend and
+writes the batch's hashes in one short transaction, pausing between batches
+so uploads and deletes on ``attachments`` are never held back. Missing blobs
+stay NULL; running it again only revisits those.
+
+Usage (with the usual .env in place)::
+
+    python -m app.storage.hashes
+    python -m app.storage.hashes --batch-size 200 --pause-ms 100
+
+or enqueue the ``storage.hash_backfill`` job.
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger, log_event
+from app.db.models import Attachment
+from app.db.session import AsyncSessionLocal, engine
+from app.storage import StorageBackend, build_storage
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class BackfillStats:
+    hashed: int = 0
+    missing: int = 0
+
+
+async def _sha256(storage: StorageBackend, key: str) -> str | None:
+    if await storage.stat(key) is None:
+        return None
+    digest = hashlib.sha256()
+    async for chunk in storage.open(key):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def backfill_hashes(
+    storage: StorageBackend,
+    *,
+    batch_size: int = 500,
+    pause: float = 0.0,
+    concurrency: int = 8,
+    session_factory: async_sessionmaker = AsyncSessionLocal,
+    progress: Callable[..., Awaitable[Any]] | None = None,
+) -> BackfillStats:
+    stats = BackfillStats()
+    limiter = asyncio.Semaphore(concurrency)
+
+    async def hash_path(path: str) -> str | None:
+        async with limiter:
+            return await _sha256(storage, path)
+
+    last_id = 0
+    while True:
+        async with session_factory() as db:
+            res = await db.execute(
+                select(Attachment.id, Attachment.path)
+                .where(Attachment.id > last_id, Attachment.sha256.is_(None))
+                .order_by(Attachment.id)
+                .limit(batch_size)
+            )
+            rows = res.all()
+        if not rows:
+            return stats
+        last_id = rows[-1].id
+
+        # legacy keys are per row, but rows may already share one: hash each blob once
+        paths = sorted({row.path for row in rows})
+        digests = dict(zip(paths, await asyncio.gather(*(hash_path(path) for path in paths))))
+        hashes = [{"row_id": row.id, "digest": digests[row.path]} for row in rows if digests[row.path]]
+        stats.missing += len(rows) - len(hashes)
+        if hashes:
+            table = Attachment.__table__
+            async with session_factory() as db:
+                await db.execute(
+                    update(table)
+                    .where(table.c.id == bindparam("row_id"), table.c.sha256.is_(None))
+                    .values(sha256=bindparam("digest")),
+                    hashes,
+                )
+                await db.commit()
+            stats.hashed += len(hashes)
+
+        log_event(
+            logger, logging.INFO, "Hash backfill progress", "hash_backfill_progress", lambda: dict(stats.__dict__)
+        )
+        if progress is not None:
+            await progress(**stats.__dict__)
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Calcula el sha256 de los adjuntos anteriores a la migración 0005")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause-ms", type=int, default=0, help="espera entre lotes")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    storage = build_storage(settings.storage_backend, settings)
+    try:
+        stats = await backfill_hashes(
+            storage, batch_size=args.batch_size, pause=args.pause_ms / 1000, concurrency=args.concurrency
+        )
+    finally:
+        await storage.close()
+        await engine.dispose()
+    print(stats)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
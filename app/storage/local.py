@@ -0,0 +1,115 @@
+import itertools
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator
+
+import anyio
+
+from app.storage.base import CHUNK_SIZE, StorageBackend, StoredObject
+
+# directory entries read per thread hop while listing keys
+SCAN_CHUNK = 1000
+
+
+class LocalStorage(StorageBackend):
+    """Blobs as files under ``root``; sharded keys map to nested directories.
+
+    Every filesystem call runs in the thread pool.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return path
+
+    def local_path(self, key: str) -> Path | None:
+        return self._path(key)
+
+    async def put_file(self, key: str, src: Path) -> bool:
+        dest = self._path(key)
+
+        def _place() -> bool:
+            if dest.exists():
+                src.unlink()
+                return False
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            # same filesystem as the staging area: atomic rename, no copy
+            os.replace(src, dest)
+            return True
+
+        return await anyio.to_thread.run_sync(_place)
+
+    async def stat(self, key: str) -> StoredObject | None:
+        try:
+            st = await anyio.to_thread.run_sync(os.stat, self._path(key))
+        except FileNotFoundError:
+            return None
+        return StoredObject(key=key, size=st.st_size, modified=datetime.fromtimestamp(st.st_mtime, timezone.utc))
+
+    async def delete(self, key: str) -> None:
+        try:
+            await anyio.to_thread.run_sync(os.unlink, self._path(key))
+        except FileNotFoundError:
+            pass
+
+    async def rename(self, key: str, new_key: str) -> None:
+        src, dest = self._path(key), self._path(new_key)
+
+        def _move() -> None:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(src, dest)
+
+        await anyio.to_thread.run_sync(_move)
+
+    async def open(self, key: str, start: int = 0, end: int | None = None) -> AsyncIterator[bytes]:
+        remaining = None if end is None else end - start + 1
+        fh = await anyio.open_file(self._path(key), "rb")
+        try:
+            await fh.seek(start)
+            while remaining is None or remaining > 0:
+                chunk = await fh.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            await fh.aclose()
+
+    def _scan_chunk(self, entries) -> tuple[list[str], list[Path], bool]:  # noqa: ANN001
+        """Next ``SCAN_CHUNK`` entries of an open ``os.scandir``; the flag is set once it is exhausted."""
+        files, dirs, seen = [], [], 0
+        for entry in itertools.islice(entries, SCAN_CHUNK):
+            seen += 1
+            if entry.is_dir(follow_symlinks=False):
+                if not entry.name.startswith("."):
+                    dirs.append(Path(entry.path))
+            elif entry.is_file(follow_symlinks=False):
+                files.append(Path(entry.path).relative_to(self.root).as_posix())
+        return files, dirs, seen < SCAN_CHUNK
+
+    async def iter_keys(self) -> AsyncIterator[str]:
+        # one scandir iterator is consumed across thread hops, SCAN_CHUNK entries at a time,
+        # so a huge flat directory (the pre-sharding upload root) is never listed in full
+        pending = [self.root]
+        while pending:
+            try:
+                entries = await anyio.to_thread.run_sync(os.scandir, pending.pop())
+            except FileNotFoundError:
+                continue
+            try:
+                done = False
+                while not done:
+                    files, dirs, done = await anyio.to_thread.run_sync(self._scan_chunk, entries)
+                    pending.extend(dirs)
+                    for key in files:
+                        yield key
+            finally:
+                entries.close()
@@ -0,0 +1,182 @@
+"""Copy attachment blobs between storage backends.
+
+Walks the distinct ``attachments.path`` values in keyset-paginated batches and
+copies every blob that is missing on the target, streaming it through a temp
+file in ``UPLOAD_DIR/.incoming`` with a few copies in flight. With ``--rekey``,
+legacy flat keys (``<uuid>.<ext>``) whose hash is known are stored under their
+sharded content key and the rows are repointed. With ``--delete-source`` the
+source blob is removed once it is safely on the target.
+
+Usage (with the usual .env in place)::
+
+    python -m app.storage.migrate --source local --target s3
+    python -m app.storage.migrate --source local --target local --rekey --delete-source
+"""
+import argparse
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+import anyio
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger, log_event
+from app.crud.attachment import AttachmentCRUD
+from app.db.models import Attachment
+from app.db.session import AsyncSessionLocal, engine
+from app.services.storage import INCOMING_DIR
+from app.storage import StorageBackend, blob_key, build_storage
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class MigrationStats:
+    copied: int = 0
+    skipped: int = 0
+    missing: int = 0
+    rekeyed: int = 0
+    deleted: int = 0
+
+
+async def _copy(source: StorageBackend, target: StorageBackend, key: str, new_key: str, staging: Path) -> bool:
+    """Copy ``key`` from ``source`` to ``new_key`` on ``target``; False when the source blob is missing."""
+    if await source.stat(key) is None:
+        return False
+    temp_path = staging / f"{uuid.uuid4().hex}.part"
+    fh = await anyio.open_file(temp_path, "wb")
+    try:
+        async for chunk in source.open(key):
+            await fh.write(chunk)
+    except BaseException:
+        await fh.aclose()
+        temp_path.unlink(missing_ok=True)
+        raise
+    await fh.aclose()
+    await target.put_file(new_key, temp_path)
+    return True
+
+
+async def _migrate_key(
+    source: StorageBackend,
+    target: StorageBackend,
+    key: str,
+    sha256: str | None,
+    *,
+    rekey: bool,
+    delete_source: bool,
+    staging: Path,
+    stats: MigrationStats,
+    session_factory: async_sessionmaker,
+) -> None:
+    new_key = blob_key(sha256) if rekey and sha256 else key
+    same_place = source is target and new_key == key
+    if same_place or await target.exists(new_key):
+        stats.skipped += 1
+    elif await _copy(source, target, key, new_key, staging):
+        stats.copied += 1
+    else:
+        stats.missing += 1
+        log_event(logger, logging.WARNING, "Blob missing on source", "storage_migrate_missing", lambda: {"key": key})
+        return
+
+    if new_key != key:
+        async with session_factory() as db:
+            await AttachmentCRUD.lock_path(db, key)
+            await db.execute(update(Attachment).where(Attachment.path == key).values(path=new_key))
+            await db.commit()
+        stats.rekeyed += 1
+    if delete_source and not same_place:
+        await source.delete(key)
+        stats.deleted += 1
+
+
+async def migrate(
+    source: StorageBackend,
+    target: StorageBackend,
+    *,
+    rekey: bool = False,
+    delete_source: bool = False,
+    batch_size: int = 500,
+    concurrency: int = 8,
+    session_factory: async_sessionmaker = AsyncSessionLocal,
+) -> MigrationStats:
+    staging = Path(get_settings().upload_dir) / INCOMING_DIR
+    staging.mkdir(parents=True, exist_ok=True)
+    stats = MigrationStats()
+    limiter = asyncio.Semaphore(concurrency)
+
+    async def run(key: str, sha256: str | None) -> None:
+        async with limiter:
+            await _migrate_key(
+                source,
+                target,
+                key,
+                sha256,
+                rekey=rekey,
+                delete_source=delete_source,
+                staging=staging,
+                stats=stats,
+                session_factory=session_factory,
+            )
+
+    last_path = ""
+    while True:
+        async with session_factory() as db:
+            res = await db.execute(
+                select(Attachment.path, Attachment.sha256)
+                .where(Attachment.path > last_path)
+                .distinct(Attachment.path)
+                .order_by(Attachment.path)
+                .limit(batch_size)
+            )
+            rows = res.all()
+        if not rows:
+            break
+        last_path = rows[-1].path
+        await asyncio.gather(*(run(row.path, row.sha256) for row in rows))
+        log_event(
+            logger,
+            logging.INFO,
+            "Storage migration progress",
+            "storage_migrate_progress",
+            lambda: {"last_key": last_path, **stats.__dict__},
+        )
+    return stats
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Copia los adjuntos entre backends de almacenamiento")
+    parser.add_argument("--source", choices=("local", "s3"), required=True)
+    parser.add_argument("--target", choices=("local", "s3"), required=True)
+    parser.add_argument("--rekey", action="store_true", help="mueve las claves planas heredadas a ab/cd/<sha256>")
+    parser.add_argument("--delete-source", action="store_true", help="borra el archivo de origen tras copiarlo")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    source = build_storage(args.source, settings)
+    target = source if args.target == args.source else build_storage(args.target, settings)
+    try:
+        stats = await migrate(
+            source,
+            target,
+            rekey=args.rekey,
+            delete_source=args.delete_source,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+        )
+    finally:
+        await source.close()
+        await target.close()
+        await engine.dispose()
+    print(stats)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,277 @@
+"""Reconcile stored blobs with the ``attachments`` table.
+
+Three passes, each with bounded memory:
+
+1. Walk the storage keys (``os.scandir`` for the local backend, paginated
+   listings for S3) in batches and look each batch up with a single
+   ``path IN (...)`` query. Keys without a row are orphans; previews
+   (``<key>.thumb<px>.webp``) belong to their original. Orphans older than the
+   grace period are reported, quarantined under ``.quarantine/`` or deleted;
+   each one is re-checked under the per-path advisory lock so it cannot race
+   an upload of the same content.
+2. Remove temp files left in ``UPLOAD_DIR/.incoming`` by interrupted uploads,
+   and resumable upload files whose ``upload_sessions`` row is gone.
+3. Walk the distinct ``attachments.path`` values in keyset-paginated batches
+   and report the rows whose blob is missing.
+
+Usage (with the usual .env in place)::
+
+    python -m app.storage.reconcile                       # report only
+    python -m app.storage.reconcile --action quarantine --grace-hours 24
+    python -m app.storage.reconcile --action delete
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterator, Literal
+
+import anyio
+from sqlalchemy import exists, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger, log_event
+from app.crud.attachment import AttachmentCRUD
+from app.db.models import Attachment, UploadSession
+from app.db.session import AsyncSessionLocal, engine
+from app.services.resumable import SESSION_SUFFIX, discard_session_file
+from app.services.storage import INCOMING_DIR
+from app.storage import StorageBackend, build_storage
+from app.storage.local import SCAN_CHUNK
+
+logger = get_logger(__name__)
+
+QUARANTINE_DIR = ".quarantine"
+_THUMBNAIL = re.compile(r"^(?P<key>.+)\.thumb\d+\.webp$")
+
+Action = Literal["report", "quarantine", "delete"]
+
+
+@dataclass
+class ReconcileStats:
+    scanned: int = 0
+    orphans: int = 0
+    within_grace: int = 0
+    removed: int = 0
+    stale_parts: int = 0
+    stale_sessions: int = 0
+    missing: int = 0
+
+
+def owner_key(key: str) -> str:
+    """Attachment path a stored key belongs to (a preview belongs to its original)."""
+    match = _THUMBNAIL.match(key)
+    return match["key"] if match else key
+
+
+async def _batches(keys: AsyncIterator[str], size: int) -> AsyncIterator[list[str]]:
+    batch: list[str] = []
+    async for key in keys:
+        # staging and quarantine areas (S3 lists them as ordinary prefixes)
+        if key.startswith("."):
+            continue
+        batch.append(key)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _referenced(session_factory: async_sessionmaker, paths: set[str]) -> set[str]:
+    async with session_factory() as db:
+        res = await db.execute(select(Attachment.path).where(Attachment.path.in_(paths)).distinct())
+        return set(res.scalars())
+
+
+async def _resolve_orphan(
+    storage: StorageBackend,
+    key: str,
+    *,
+    action: Action,
+    cutoff: datetime,
+    stats: ReconcileStats,
+    session_factory: async_sessionmaker,
+) -> None:
+    stored = await storage.stat(key)
+    if stored is None:
+        return
+    if stored.modified > cutoff:
+        # possibly an upload whose row is not visible yet
+        stats.within_grace += 1
+        return
+    if action != "report":
+        async with session_factory() as db:
+            # same lock as uploads/deletes of this path: no row can appear while we remove it
+            await AttachmentCRUD.lock_path(db, owner_key(key))
+            if await db.scalar(select(exists().where(Attachment.path == owner_key(key)))):
+                return
+            if action == "delete":
+                await storage.delete(key)
+            else:
+                await storage.rename(key, f"{QUARANTINE_DIR}/{key}")
+            await db.commit()
+        stats.removed += 1
+    log_event(
+        logger,
+        logging.WARNING,
+        "Orphan blob",
+        "reconcile_orphan",
+        lambda: {"key": key, "size": stored.size, "modified": stored.modified.isoformat(), "action": action},
+    )
+
+
+def _scan_incoming(entries, cutoff: float) -> tuple[int, list[str], bool]:  # noqa: ANN001
+    """Next ``SCAN_CHUNK`` entries of ``.incoming``: unlinks old ``.part`` files, returns old session ids."""
+    removed, session_ids, seen = 0, [], 0
+    for entry in itertools.islice(entries, SCAN_CHUNK):
+        seen += 1
+        stem, suffix = os.path.splitext(entry.name)
+        if suffix not in (".part", SESSION_SUFFIX) or not entry.is_file(follow_symlinks=False):
+            continue
+        if entry.stat(follow_symlinks=False).st_mtime >= cutoff:
+            continue
+        if suffix == ".part":
+            Path(entry.path).unlink(missing_ok=True)
+            removed += 1
+        else:
+            session_ids.append(stem)
+    return removed, session_ids, seen < SCAN_CHUNK
+
+
+async def _clean_incoming(
+    staging: Path, cutoff: float, stats: ReconcileStats, session_factory: async_sessionmaker
+) -> None:
+    try:
+        entries = await anyio.to_thread.run_sync(os.scandir, staging)
+    except FileNotFoundError:
+        return
+    try:
+        done = False
+        while not done:
+            removed, session_ids, done = await anyio.to_thread.run_sync(_scan_incoming, entries, cutoff)
+            stats.stale_parts += removed
+            if not session_ids:
+                continue
+            # the session row is committed before its file is created and deleted before it is
+            # unlinked, so a file without a row belongs to a session that is already gone
+            async with session_factory() as db:
+                res = await db.execute(select(UploadSession.id).where(UploadSession.id.in_(session_ids)))
+                live = set(res.scalars())
+            for session_id in session_ids:
+                if session_id not in live:
+                    await discard_session_file(staging.parent, session_id)
+                    stats.stale_sessions += 1
+    finally:
+        entries.close()
+
+
+async def _report_missing(
+    storage: StorageBackend,
+    *,
+    batch_size: int,
+    limiter: asyncio.Semaphore,
+    stats: ReconcileStats,
+    session_factory: async_sessionmaker,
+) -> None:
+    async def check(path: str, ids: list[int]) -> None:
+        async with limiter:
+            if await storage.exists(path):
+                return
+        stats.missing += len(ids)
+        log_event(
+            logger,
+            logging.WARNING,
+            "Attachment blob missing",
+            "reconcile_missing",
+            lambda: {"path": path, "attachment_ids": ids},
+        )
+
+    last_path = ""
+    while True:
+        async with session_factory() as db:
+            res = await db.execute(
+                select(Attachment.path, func.array_agg(Attachment.id))
+                .where(Attachment.path > last_path)
+                .group_by(Attachment.path)
+                .order_by(Attachment.path)
+                .limit(batch_size)
+            )
+            rows = res.all()
+        if not rows:
+            break
+        last_path = rows[-1][0]
+        await asyncio.gather(*(check(path, ids) for path, ids in rows))
+
+
+async def reconcile(
+    storage: StorageBackend,
+    *,
+    action: Action = "report",
+    grace: timedelta = timedelta(hours=24),
+    batch_size: int = 1000,
+    concurrency: int = 16,
+    session_factory: async_sessionmaker = AsyncSessionLocal,
+) -> ReconcileStats:
+    stats = ReconcileStats()
+    limiter = asyncio.Semaphore(concurrency)
+    cutoff = datetime.now(timezone.utc) - grace
+
+    async def resolve(key: str) -> None:
+        async with limiter:
+            await _resolve_orphan(
+                storage, key, action=action, cutoff=cutoff, stats=stats, session_factory=session_factory
+            )
+
+    async for batch in _batches(storage.iter_keys(), batch_size):
+        stats.scanned += len(batch)
+        owners = {key: owner_key(key) for key in batch}
+        referenced = await _referenced(session_factory, set(owners.values()))
+        orphans = [key for key, owner in owners.items() if owner not in referenced]
+        stats.orphans += len(orphans)
+        await asyncio.gather(*(resolve(key) for key in orphans))
+        log_event(
+            logger, logging.INFO, "Reconcile progress", "reconcile_progress", lambda: dict(stats.__dict__)
+        )
+
+    staging = Path(get_settings().upload_dir) / INCOMING_DIR
+    await _clean_incoming(staging, time.time() - grace.total_seconds(), stats, session_factory)
+    await _report_missing(
+        storage, batch_size=batch_size, limiter=limiter, stats=stats, session_factory=session_factory
+    )
+    return stats
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Concilia los archivos almacenados con la tabla attachments")
+    parser.add_argument("--action", choices=("report", "quarantine", "delete"), default="report")
+    parser.add_argument("--grace-hours", type=float, default=24, help="antigüedad mínima de un huérfano para actuar")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    storage = build_storage(settings.storage_backend, settings)
+    try:
+        stats = await reconcile(
+            storage,
+            action=args.action,
+            grace=timedelta(hours=args.grace_hours),
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+        )
+    finally:
+        await storage.close()
+        await engine.dispose()
+    print(stats)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
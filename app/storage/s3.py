@@ -0,0 +1,163 @@
+import asyncio
+import contextlib
+import os
+from pathlib import Path
+from typing import AsyncIterator
+
+import anyio
+
+from app.storage.base import CHUNK_SIZE, StorageBackend, StoredObject
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+    from botocore.exceptions import ClientError
+except ImportError:  # pragma: no cover - optional
+    get_session = None
+
+
+def _read_part(fh, size: int) -> bytes:
+    return fh.read(size)
+
+
+class S3Storage(StorageBackend):
+    """Blobs in an S3-compatible bucket (AWS S3, MinIO, ...) through aiobotocore.
+
+    One client is created lazily and reused, so HTTP connections are pooled
+    (``max_pool_connections``). Files of ``multipart_threshold`` bytes or more
+    are uploaded with the multipart API one ``part_size`` part at a time, which
+    keeps memory bounded; a failed multipart upload is aborted.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        *,
+        prefix: str = "",
+        endpoint_url: str | None = None,
+        region: str | None = None,
+        access_key_id: str | None = None,
+        secret_access_key: str | None = None,
+        max_pool_connections: int = 20,
+        multipart_threshold: int = 8 * 1024 * 1024,
+        part_size: int = 8 * 1024 * 1024,
+    ) -> None:
+        if get_session is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 requiere el paquete 'aiobotocore'")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.multipart_threshold = multipart_threshold
+        # S3 rejects parts under 5 MiB (except the last one)
+        self.part_size = max(part_size, 5 * 1024 * 1024)
+        self._client_kwargs = {
+            "endpoint_url": endpoint_url,
+            "region_name": region,
+            "aws_access_key_id": access_key_id,
+            "aws_secret_access_key": secret_access_key,
+            "config": AioConfig(max_pool_connections=max_pool_connections),
+        }
+        self._client = None
+        self._stack: contextlib.AsyncExitStack | None = None
+        self._lock = asyncio.Lock()
+
+    async def _get_client(self):
+        if self._client is None:
+            async with self._lock:
+                if self._client is None:
+                    stack = contextlib.AsyncExitStack()
+                    self._client = await stack.enter_async_context(
+                        get_session().create_client("s3", **self._client_kwargs)
+                    )
+                    self._stack = stack
+        return self._client
+
+    async def close(self) -> None:
+        if self._stack is not None:
+            await self._stack.aclose()
+        self._client = None
+        self._stack = None
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    async def put_file(self, key: str, src: Path) -> bool:
+        if await self.exists(key):
+            await anyio.to_thread.run_sync(src.unlink)
+            return False
+        client = await self._get_client()
+        size = (await anyio.to_thread.run_sync(os.stat, src)).st_size
+        fh = await anyio.to_thread.run_sync(open, src, "rb")
+        try:
+            if size < self.multipart_threshold:
+                body = await anyio.to_thread.run_sync(_read_part, fh, size)
+                await client.put_object(Bucket=self.bucket, Key=self._key(key), Body=body)
+            else:
+                await self._multipart_upload(client, self._key(key), fh)
+        finally:
+            await anyio.to_thread.run_sync(fh.close)
+        await anyio.to_thread.run_sync(src.unlink)
+        return True
+
+    async def _multipart_upload(self, client, key: str, fh) -> None:
+        upload = await client.create_multipart_upload(Bucket=self.bucket, Key=key)
+        upload_id = upload["UploadId"]
+        parts = []
+        try:
+            number = 1
+            while part := await anyio.to_thread.run_sync(_read_part, fh, self.part_size):
+                res = await client.upload_part(
+                    Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=part
+                )
+                parts.append({"PartNumber": number, "ETag": res["ETag"]})
+                number += 1
+            await client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+        except BaseException:
+            with contextlib.suppress(Exception):
+                await client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+    async def stat(self, key: str) -> StoredObject | None:
+        client = await self._get_client()
+        try:
+            res = await client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return StoredObject(key=key, size=res["ContentLength"], modified=res["LastModified"])
+
+    async def delete(self, key: str) -> None:
+        client = await self._get_client()
+        await client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    async def rename(self, key: str, new_key: str) -> None:
+        # S3 has no rename: server-side copy, then delete the original
+        client = await self._get_client()
+        await client.copy_object(
+            Bucket=self.bucket, Key=self._key(new_key), CopySource={"Bucket": self.bucket, "Key": self._key(key)}
+        )
+        await client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    async def open(self, key: str, start: int = 0, end: int | None = None) -> AsyncIterator[bytes]:
+        client = await self._get_client()
+        kwargs = {}
+        if start or end is not None:
+            kwargs["Range"] = f"bytes={start}-{'' if end is None else end}"
+        res = await client.get_object(Bucket=self.bucket, Key=self._key(key), **kwargs)
+        body = res["Body"]
+        try:
+            while chunk := await body.read(CHUNK_SIZE):
+                yield chunk
+        finally:
+            body.close()
+
+    async def iter_keys(self) -> AsyncIterator[str]:
+        client = await self._get_client()
+        paginator = client.get_paginator("list_objects_v2")
+        async for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get("Contents", []):
+                yield item["Key"][len(self.prefix):]
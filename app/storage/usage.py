@@ -0,0 +1,32 @@
+"""Rebuild the per-user storage usage counters from the ``attachments`` table.
+
+The counters are maintained in the same transaction as attachment inserts and
+deletes; this recomputes them (e.g. after rows were removed by hand or through
+a cascade) while briefly blocking writers of ``storage_usage``.
+
+Usage (with the usual .env in place)::
+
+    python -m app.storage.usage
+    python -m app.storage.usage --user-id 42
+"""
+import argparse
+import asyncio
+
+from app.crud.storage_usage import StorageUsageCRUD
+from app.db.session import AsyncSessionLocal, engine
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Recalcula el uso de almacenamiento por usuario")
+    parser.add_argument("--user-id", type=int, default=None, help="solo este usuario")
+    args = parser.parse_args()
+    try:
+        async with AsyncSessionLocal() as db:
+            updated = await StorageUsageCRUD.rebuild(db, args.user_id)
+    finally:
+        await engine.dispose()
+    print(f"storage usage rebuilt: {updated} counters corrected")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,5 @@
+from .dispatcher import WebhookDispatcher
+from .signing import SIGNATURE_HEADER, TIMESTAMP_HEADER, sign, verify
+from .sink import WebhookSink
+
+__all__ = ["SIGNATURE_HEADER", "TIMESTAMP_HEADER", "WebhookDispatcher", "WebhookSink", "sign", "verify"]
@@ -0,0 +1,244 @@
+"""Delivery of queued webhook events to partner endpoints.
+
+Events reach ``webhook_deliveries`` through the outbox (``WebhookSink``), so
+API writes never wait on a partner. ``concurrency`` loops per dispatcher, in
+any number of processes, then:
+
+- lease one endpoint with due deliveries (``FOR UPDATE SKIP LOCKED``; the
+  least recently served first) and send up to ``batch_size`` of its events
+  in a single signed POST, in event order, over a shared keep-alive pool;
+- on a 2xx drop them; otherwise count an attempt and hold the endpoint back
+  with exponential backoff. Events out of attempts go to
+  ``webhook_dead_letters``;
+- after ``failure_threshold`` failed batches in a row the endpoint's circuit
+  opens: nothing is sent for ``cooldown`` seconds, then a single event probes
+  it and a success closes the circuit again.
+
+Delivery is at least once (a lease that expires mid-request is retried by
+another loop); partners deduplicate by event ``id``.
+
+Requests only go to public addresses (see ``app.webhooks.targets``) and
+never follow redirects. ``last_error`` stores a coarse class (``timeout``,
+``connection_error``, ``HTTP 503``...) that users can read; the transport
+detail is only logged.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+from typing import Any
+
+import httpx
+import orjson
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger, log_event
+from app.crud.webhook import WebhookCRUD
+from app.db.models import WebhookSubscription
+from app.db.session import AsyncSessionLocal
+from app.jobs.worker import retry_delay
+from app.webhooks.signing import SIGNATURE_HEADER, TIMESTAMP_HEADER, sign
+from app.webhooks.targets import TargetNotAllowedError, resolve
+
+logger = get_logger(__name__)
+
+
+class WebhookDispatcher:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        *,
+        concurrency: int = 4,
+        batch_size: int = 50,
+        timeout: float = 10.0,
+        poll_interval: float = 1.0,
+        max_attempts: int = 8,
+        retry_base: float = 5.0,
+        retry_max: float = 600.0,
+        failure_threshold: int = 5,
+        cooldown: float = 300.0,
+        allow_private: bool = False,
+        worker_id: str | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.allow_private = allow_private
+        # long enough for the request to time out before another loop may take the endpoint
+        self.lease = timedelta(seconds=timeout * 3)
+        self.worker_id = (worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}")[:64]
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2),
+            headers={"User-Agent": "colli-finance-webhooks"},
+            follow_redirects=False,
+        )
+        self._stop = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    @classmethod
+    def from_settings(
+        cls, session_factory: async_sessionmaker = AsyncSessionLocal, **overrides: Any
+    ) -> "WebhookDispatcher":
+        settings = get_settings()
+        options = {
+            "concurrency": settings.webhooks_concurrency,
+            "batch_size": settings.webhooks_batch_size,
+            "timeout": settings.webhooks_timeout_seconds,
+            "poll_interval": settings.webhooks_poll_seconds,
+            "max_attempts": settings.webhooks_max_attempts,
+            "retry_base": settings.webhooks_retry_base_seconds,
+            "retry_max": settings.webhooks_retry_max_seconds,
+            "failure_threshold": settings.webhooks_failure_threshold,
+            "cooldown": settings.webhooks_cooldown_seconds,
+            "allow_private": settings.webhooks_allow_private_targets,
+        }
+        return cls(session_factory, **{**options, **overrides})
+
+    async def run_once(self) -> bool:
+        """Send one batch to one endpoint; False when no endpoint had anything due."""
+        async with self.session_factory() as db:
+            subscription = await WebhookCRUD.claim(db, self.worker_id, self.lease)
+        if subscription is None:
+            return False
+        await self._deliver(subscription)
+        return True
+
+    async def _post(self, subscription: WebhookSubscription, events: list[dict]) -> str | None:
+        """POST a batch; returns the error class, or ``None`` on a 2xx."""
+        url = httpx.URL(subscription.url)
+        try:
+            address = await resolve(
+                url.host, url.port or (443 if url.scheme == "https" else 80), allow_private=self.allow_private
+            )
+        except TargetNotAllowedError:
+            return "address_not_allowed"
+        except OSError as exc:
+            return self._request_error(subscription, "dns_error", exc)
+
+        body = orjson.dumps({"events": events})
+        timestamp = int(time.time())
+        headers = {
+            "Host": url.netloc.decode("ascii"),
+            "Content-Type": "application/json",
+            TIMESTAMP_HEADER: str(timestamp),
+            SIGNATURE_HEADER: sign(subscription.secret, timestamp, body),
+        }
+        # connect to the address just checked; TLS still verifies the certificate against the name
+        extensions = {"sni_hostname": url.host} if url.scheme == "https" else {}
+        try:
+            response = await self._client.post(
+                url.copy_with(host=address), content=body, headers=headers, extensions=extensions
+            )
+        except httpx.TimeoutException as exc:
+            return self._request_error(subscription, "timeout", exc)
+        except httpx.ConnectError as exc:
+            return self._request_error(subscription, "connection_error", exc)
+        except httpx.HTTPError as exc:
+            return self._request_error(subscription, "request_error", exc)
+        return None if response.is_success else f"HTTP {response.status_code}"
+
+    @staticmethod
+    def _request_error(subscription: WebhookSubscription, error: str, exc: Exception) -> str:
+        log_event(
+            logger,
+            logging.DEBUG,
+            "Webhook request error",
+            "webhook_request_error",
+            lambda: {"subscription_id": subscription.id, "error": error, "detail": repr(exc)},
+        )
+        return error
+
+    async def _deliver(self, subscription: WebhookSubscription) -> None:
+        probing = subscription.failures >= self.failure_threshold  # half-open: one event tests the endpoint
+        async with self.session_factory() as db:
+            deliveries = await WebhookCRUD.pending(db, subscription.id, 1 if probing else self.batch_size)
+        ids = [delivery.id for delivery in deliveries]
+        started = time.perf_counter()
+        error = await self._post(subscription, [delivery.payload for delivery in deliveries]) if ids else None
+        duration_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        if error is None:
+            async with self.session_factory() as db:
+                await WebhookCRUD.succeed(db, subscription.id, self.worker_id, ids)
+            log_event(
+                logger,
+                logging.INFO if probing else logging.DEBUG,
+                "Webhook circuit closed" if probing else "Webhook batch delivered",
+                "webhook_delivered",
+                lambda: {"subscription_id": subscription.id, "events": len(ids), "duration_ms": duration_ms},
+            )
+            return
+
+        failures = subscription.failures + 1
+        opened = failures >= self.failure_threshold
+        retry_in = (
+            timedelta(seconds=self.cooldown)
+            if opened
+            else retry_delay(failures, base=self.retry_base, cap=self.retry_max)
+        )
+        async with self.session_factory() as db:
+            dead = await WebhookCRUD.fail(
+                db,
+                subscription.id,
+                self.worker_id,
+                ids,
+                error,
+                retry_in=retry_in,
+                max_attempts=self.max_attempts,
+            )
+        log_event(
+            logger,
+            logging.ERROR if opened else logging.WARNING,
+            "Webhook circuit open" if opened else "Webhook batch failed",
+            "webhook_failed",
+            lambda: {
+                "subscription_id": subscription.id,
+                "events": len(ids),
+                "failures": failures,
+                "retry_in": retry_in.total_seconds(),
+                "dead_lettered": dead,
+                "duration_ms": duration_ms,
+                "error": error,
+            },
+        )
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        self._stop.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._client.aclose()
+
+    async def _run(self) -> None:
+        while not self._stop.is_set():
+            sent = False
+            try:
+                sent = await self.run_once()
+            except Exception as exc:
+                log_event(
+                    logger,
+                    logging.ERROR,
+                    "Webhook dispatch failed",
+                    "webhook_dispatch_failed",
+                    lambda: {"error": repr(exc)},
+                )
+            if sent:
+                continue
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
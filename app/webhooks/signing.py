@@ -0,0 +1,29 @@
+"""HMAC signatures of webhook requests.
+
+Each request carries ``X-Webhook-Timestamp`` (Unix seconds) and
+``X-Webhook-Signature: sha256=<hex>``, the HMAC-SHA256 of
+``<timestamp>.<body>`` keyed with the subscription's secret. Partners
+recompute it over the raw body and reject old timestamps to stop replays.
+"""
+import hashlib
+import hmac
+import time
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+TIMESTAMP_HEADER = "X-Webhook-Timestamp"
+
+
+def sign(secret: str, timestamp: int, body: bytes) -> str:
+    digest = hmac.new(secret.encode(), b"%d." % timestamp + body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def verify(secret: str, timestamp: str, body: bytes, signature: str, *, tolerance: float = 300.0) -> bool:
+    """Check a received signature, as a partner would; stale timestamps fail."""
+    try:
+        sent_at = int(timestamp)
+    except ValueError:
+        return False
+    if abs(time.time() - sent_at) > tolerance:
+        return False
+    return hmac.compare_digest(sign(secret, sent_at, body), signature)
@@ -0,0 +1,33 @@
+from typing import Any
+
+import orjson
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.crud.webhook import WebhookCRUD
+from app.db.models.webhook import WEBHOOK_EVENTS
+from app.outbox.sinks import Event, OutboxSink
+
+
+def _payload(event: Event) -> dict[str, Any]:
+    # plain JSON types (created_at as an ISO string) for the jsonb column
+    return orjson.loads(
+        orjson.dumps({key: event[key] for key in ("id", "user_id", "type", "created_at", "data")})
+    )
+
+
+class WebhookSink(OutboxSink):
+    """Queues outbox events for the matching webhook subscriptions.
+
+    Only a database insert: the HTTP requests are made later by the
+    ``WebhookDispatcher``, so a slow partner holds up neither writes nor the relay.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, *, name: str = "webhooks") -> None:
+        self.session_factory = session_factory
+        self.name = name
+
+    async def deliver(self, events: list[Event]) -> None:
+        wanted = [_payload(event) for event in events if event["type"] in WEBHOOK_EVENTS]
+        if wanted:
+            async with self.session_factory() as db:
+                await WebhookCRUD.enqueue(db, wanted)
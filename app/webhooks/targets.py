@@ -0,0 +1,49 @@
+"""Which addresses webhook requests may reach.
+
+Subscriptions name arbitrary URLs, so without checks the dispatcher would
+POST wherever a user points it: the metadata service, the database, other
+internal services. ``check_url`` rejects what is visible in the URL itself
+when subscribing; ``resolve`` runs again right before every request, because
+a public name can later resolve to a private address. The dispatcher then
+connects to the address that was checked, not to a second lookup.
+"""
+import asyncio
+import ipaddress
+import socket
+from urllib.parse import urlsplit
+
+
+class TargetNotAllowedError(ValueError):
+    pass
+
+
+def _is_public(address: str) -> bool:
+    return ipaddress.ip_address(address.split("%", 1)[0]).is_global
+
+
+def check_url(url: str, *, require_https: bool, allow_private: bool) -> None:
+    parts = urlsplit(url)
+    if require_https and parts.scheme != "https":
+        raise TargetNotAllowedError("La URL debe usar https")
+    host = (parts.hostname or "").rstrip(".").lower()
+    if allow_private:
+        return
+    if host == "localhost" or host.endswith(".localhost"):
+        raise TargetNotAllowedError("La URL no puede apuntar a una dirección interna")
+    try:
+        public = _is_public(host)
+    except ValueError:
+        return  # a name: resolved and checked at send time
+    if not public:
+        raise TargetNotAllowedError("La URL no puede apuntar a una dirección interna")
+
+
+async def resolve(host: str, port: int, *, allow_private: bool) -> str:
+    """Resolve ``host`` and return the address to connect to; every answer must be public."""
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    addresses = [info[4][0] for info in infos]
+    if not addresses:
+        raise OSError(f"no addresses for {host}")
+    if not allow_private and not all(_is_public(address) for address in addresses):
+        raise TargetNotAllowedError(host)
+    return addresses[0]
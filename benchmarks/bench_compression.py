@@ -0,0 +1,115 @@
+"""Bandwidth and latency of ``CompressionMiddleware`` per encoding.
+
+Serves a 10k-row JSON transaction list and a streamed CSV of the same rows
+through the middleware and reports, per ``Accept-Encoding``: bytes on the wire,
+in-process server time, and the estimated end-to-end time on a 10 Mbit/s link
+(server time + transfer time). While the large JSON is compressed, a
+concurrent ``/ping`` probe measures event-loop latency, which stays flat
+because large bodies are compressed in a worker thread.
+
+Usage (with the usual .env in place)::
+
+    python -m benchmarks.bench_compression
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import httpx
+import orjson
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+
+from app.core.compression import CODECS, CompressionMiddleware
+
+ROWS = 10_000
+ROUNDS = 10
+LINK_MBPS = 10
+
+
+def _rows() -> list[dict]:
+    now = datetime.now(timezone.utc).isoformat()
+    return [
+        {
+            "id": i,
+            "user_id": 1,
+            "card_id": 1 + i % 5,
+            "description": f"Compra {i}",
+            "category_id": None,
+            "income": "0.00",
+            "expenses": "123.45",
+            "executed": True,
+            "transfer_id": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(ROWS)
+    ]
+
+
+def build_app() -> FastAPI:
+    rows = _rows()
+    body = orjson.dumps(rows)
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/json")
+    async def as_json():
+        return Response(body, media_type="application/json")
+
+    @app.get("/csv")
+    async def as_csv():
+        async def lines():
+            for start in range(0, ROWS, 500):
+                yield "".join(
+                    f"{r['id']},{r['card_id']},{r['description']},{r['expenses']},{r['created_at']}\n"
+                    for r in rows[start:start + 500]
+                )
+
+        return StreamingResponse(lines(), media_type="text/csv")
+
+    @app.get("/ping")
+    async def ping():
+        return Response(b"ok", media_type="text/plain")
+
+    return app
+
+
+async def _probe(client: httpx.AsyncClient, stop: asyncio.Event, samples: list[float]) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/ping", headers={"Accept-Encoding": "identity"})
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.001)
+
+
+async def main() -> None:
+    transport = httpx.ASGITransport(app=build_app())
+    encodings = ["identity", "gzip", *(e for e in ("br", "zstd") if e in CODECS)]
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ("/json", "/csv"):
+            for encoding in encodings:
+                headers = {"Accept-Encoding": encoding}
+                size = 0
+                stop = asyncio.Event()
+                samples: list[float] = []
+                probe = asyncio.create_task(_probe(client, stop, samples))
+                start = time.perf_counter()
+                for _ in range(ROUNDS):
+                    async with client.stream("GET", path, headers=headers) as res:
+                        size = sum([len(chunk) async for chunk in res.aiter_raw()])
+                server_ms = (time.perf_counter() - start) / ROUNDS * 1000
+                stop.set()
+                await probe
+                wire_ms = size * 8 / (LINK_MBPS * 1_000_000) * 1000
+                worst = max(samples) if samples else 0.0
+                print(
+                    f"{path:5s} {encoding:8s} {size / 1024:8.0f} KiB  server {server_ms:7.1f} ms  "
+                    f"@{LINK_MBPS}Mbit/s {server_ms + wire_ms:7.0f} ms  ping max {worst:5.1f} ms"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""App-side cost of serving attachments directly vs. offloading to the web server.
+
+Serves a 20 MiB blob from ``LocalStorage`` through ``attachment_response`` and,
+for ``CONCURRENCY`` simultaneous downloads, reports wall time, process CPU time
+and how long each request kept the app busy (time to the last body byte). In
+``x-accel`` mode the app only returns headers; nginx would stream the file with
+``sendfile(2)`` and handle ranges, so the app's share is constant regardless of
+file size or client speed. A 1 MiB range request is measured as well.
+
+Usage::
+
+    python -m benchmarks.bench_downloads
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI, Request
+
+from app.services.downloads import attachment_response
+from app.storage import LocalStorage, blob_key
+
+FILE_MB = 20
+CONCURRENCY = 32
+
+
+def build_app(root: Path, key: str, digest: str, offload: str) -> FastAPI:
+    storage = LocalStorage(root)
+    app = FastAPI()
+
+    @app.get("/download")
+    async def download(request: Request):
+        stored = await storage.stat(key)
+        return await attachment_response(
+            request,
+            storage,
+            stored,
+            filename="estado.pdf",
+            media_type="application/pdf",
+            content_tag=digest,
+            inline=False,
+            offload=offload,
+        )
+
+    return app
+
+
+async def run(app: FastAPI, headers: dict[str, str] | None = None) -> tuple[float, float, float, int]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one() -> tuple[float, int]:
+            start = time.perf_counter()
+            res = await client.get("/download", headers=headers)
+            return time.perf_counter() - start, len(res.content)
+
+        cpu0, wall0 = time.process_time(), time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(CONCURRENCY)))
+        cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+    busy = statistics.median(r[0] for r in results)
+    return wall, cpu, busy, sum(r[1] for r in results)
+
+
+async def main() -> None:
+    content = os.urandom(FILE_MB * 1024 * 1024)
+    digest = hashlib.sha256(content).hexdigest()
+    key = blob_key(digest)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / key).parent.mkdir(parents=True)
+        (root / key).write_bytes(content)
+
+        print(f"{CONCURRENCY} concurrent downloads of a {FILE_MB} MiB attachment")
+        print(f"{'mode':<22}{'wall s':>9}{'cpu s':>9}{'busy/req ms':>13}{'MiB from app':>14}")
+        cases = [
+            ("direct", "direct", None),
+            ("direct, 1 MiB range", "direct", {"Range": f"bytes=0-{1024 * 1024 - 1}"}),
+            ("x-accel", "x-accel", None),
+            ("x-sendfile", "x-sendfile", None),
+        ]
+        for label, offload, headers in cases:
+            wall, cpu, busy, sent = await run(build_app(root, key, digest, offload), headers)
+            print(f"{label:<22}{wall:>9.3f}{cpu:>9.3f}{busy * 1000:>13.1f}{sent / 1024 / 1024:>14.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
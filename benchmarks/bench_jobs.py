@@ -0,0 +1,109 @@
+"""Throughput of the jobs queue with several worker processes competing for it.
+
+``JOBS`` jobs that each wait ``WORK_MS`` (an I/O-bound job) are queued and
+drained by 1, 2 and 4 processes running a ``JobWorker`` with ``CONCURRENCY``
+slots. Timing starts once every process is ready. Afterwards it checks that
+every job succeeded on its first attempt, so no job was claimed twice, and
+reports jobs/s plus how the work was spread across processes.
+
+The benchmark jobs are inserted into the configured database and removed
+afterwards.
+
+Usage (with the usual .env in place and migrations applied)::
+
+    python -m benchmarks.bench_jobs
+"""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import time
+from collections import Counter
+
+from sqlalchemy import delete, func, insert, select
+
+from app.db.models import Job
+from app.db.models.job import QUEUED, RUNNING, SUCCEEDED
+from app.db.session import AsyncSessionLocal, engine
+from app.jobs import JobWorker, job_handler
+
+JOBS = 2000
+PROCESSES = (1, 2, 4)
+CONCURRENCY = 16
+WORK_MS = 5
+BENCH_TYPE = "bench.sleep"
+
+
+@job_handler(BENCH_TYPE, concurrency=CONCURRENCY)
+async def _sleep(ctx, payload):
+    await asyncio.sleep(WORK_MS / 1000)
+    return {"worker": ctx.worker_id.rsplit(":", 2)[1]}
+
+
+async def _pending() -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(
+            select(func.count()).select_from(Job).where(Job.type == BENCH_TYPE, Job.status.in_((QUEUED, RUNNING)))
+        )
+
+
+async def _drain(barrier) -> None:
+    worker = JobWorker(concurrency=CONCURRENCY, types=[BENCH_TYPE], poll_interval=0.05)
+    await _pending()  # warm up the connection pool before the clock starts
+    await asyncio.to_thread(barrier.wait)
+    worker.start()
+    while await _pending():
+        await asyncio.sleep(0.05)
+    await worker.stop()
+    await engine.dispose()
+
+
+def _worker_process(barrier) -> None:
+    asyncio.run(_drain(barrier))
+
+
+async def _seed() -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Job), [{"type": BENCH_TYPE, "payload": {"n": i}} for i in range(JOBS)])
+        await db.commit()
+
+
+async def _collect() -> tuple[int, int, Counter]:
+    async with AsyncSessionLocal() as db:
+        res = await db.execute(select(Job.status, Job.attempts, Job.result).where(Job.type == BENCH_TYPE))
+        rows = res.all()
+        await db.execute(delete(Job).where(Job.type == BENCH_TYPE))
+        await db.commit()
+    succeeded = sum(1 for status, _, _ in rows if status == SUCCEEDED)
+    max_attempts = max((attempts for _, attempts, _ in rows), default=0)
+    per_process = Counter(result["worker"] for status, _, result in rows if status == SUCCEEDED)
+    return succeeded, max_attempts, per_process
+
+
+async def main() -> None:
+    context = multiprocessing.get_context("spawn")
+    print(f"{JOBS} jobs x {WORK_MS} ms, {CONCURRENCY} slots per process")
+    try:
+        for processes in PROCESSES:
+            await _seed()
+            barrier = context.Barrier(processes + 1)
+            workers = [context.Process(target=_worker_process, args=(barrier,)) for _ in range(processes)]
+            for process in workers:
+                process.start()
+            await asyncio.to_thread(barrier.wait)
+            start = time.perf_counter()
+            for process in workers:
+                await asyncio.to_thread(process.join)
+            elapsed = time.perf_counter() - start
+            succeeded, max_attempts, per_process = await _collect()
+            print(
+                f"{processes} process(es): {succeeded / elapsed:8.0f} jobs/s  "
+                f"succeeded={succeeded}/{JOBS} max_attempts={max_attempts} "
+                f"spread={sorted(per_process.values(), reverse=True)}"
+            )
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
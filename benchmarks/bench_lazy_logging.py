@@ -0,0 +1,116 @@
+"""Cost of disabled DEBUG logging in ``TransactionCRUD``-style calls: eager ``extra=`` dicts vs ``log_event``.
+
+With DEBUG disabled (as in production) the eager form still builds the nested
+``details`` dicts, list comprehensions and ``isoformat()`` strings before
+``logger.debug`` discards them. ``log_event`` only calls the payload lambda when
+the level is enabled. Reports time and traced bytes allocated per call.
+
+Usage::
+
+    python -m benchmarks.bench_lazy_logging
+"""
+from __future__ import annotations
+
+import logging
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from app.core.logging_config import log_event
+
+CALLS = 200_000
+
+logger = logging.getLogger("bench.crud")
+
+
+def eager_update(transaction_id: int, kwargs: dict) -> None:
+    logger.debug(
+        "Transaction updated",
+        extra={
+            "details": {
+                "event": "transaction_update",
+                "extra": {
+                    "transaction_id": transaction_id,
+                    "updated_fields": [field for field, value in kwargs.items() if value is not None],
+                },
+            }
+        },
+    )
+
+
+def lazy_update(transaction_id: int, kwargs: dict) -> None:
+    log_event(
+        logger,
+        logging.DEBUG,
+        "Transaction updated",
+        "transaction_update",
+        lambda: {
+            "transaction_id": transaction_id,
+            "updated_fields": [field for field, value in kwargs.items() if value is not None],
+        },
+    )
+
+
+def eager_summary(user_id: int, start: datetime, end: datetime, rows: list) -> None:
+    logger.debug(
+        "Transaction summary generated",
+        extra={
+            "details": {
+                "event": "transaction_summary",
+                "extra": {"user_id": user_id, "start": start.isoformat(), "end": end.isoformat(), "count": len(rows)},
+            }
+        },
+    )
+
+
+def lazy_summary(user_id: int, start: datetime, end: datetime, rows: list) -> None:
+    log_event(
+        logger,
+        logging.DEBUG,
+        "Transaction summary generated",
+        "transaction_summary",
+        lambda: {"user_id": user_id, "start": start.isoformat(), "end": end.isoformat(), "count": len(rows)},
+    )
+
+
+def _bytes_per_call(fn, *args) -> float:
+    """Peak bytes allocated during one call, averaged. Dicts reused from CPython's
+    freelist are invisible to tracemalloc, so this under-reports the eager form."""
+    n = 1_000
+    total = 0
+    tracemalloc.start()
+    fn(*args)
+    for _ in range(n):
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn(*args)
+        total += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return total / n
+
+
+def _time_per_call(fn, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        fn(*args)
+    return (time.perf_counter() - start) / CALLS * 1e9
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    update_args = (42, {"description": "x", "income": None, "expenses": 10, "executed": True})
+    now = datetime.now(timezone.utc)
+    summary_args = (7, now, now, [1, 2, 3])
+    for name, eager, lazy, args in (
+        ("update", eager_update, lazy_update, update_args),
+        ("summary", eager_summary, lazy_summary, summary_args),
+    ):
+        for label, fn in (("eager", eager), ("lazy", lazy)):
+            print(
+                f"{name:8s} {label:6s} {_time_per_call(fn, *args):8.0f} ns/call   "
+                f"{_bytes_per_call(fn, *args):6.0f} bytes/call"
+            )
+
+
+if __name__ == "__main__":
+    main()
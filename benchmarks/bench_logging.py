@@ -0,0 +1,92 @@
+"""Request-path logging overhead: synchronous StreamHandler vs QueueHandler/QueueListener.
+
+Measures the time spent in the calling thread (the event loop in production) per
+``logger.info`` call with the usual ``details`` payload, and end-to-end /health
+throughput through the ASGI app with each handler setup. Output goes to /dev/null.
+
+Usage (with the usual .env in place)::
+
+    python -m benchmarks.bench_logging
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import queue
+import time
+from logging.handlers import QueueListener
+
+import httpx
+
+from app.core import logging_config
+from app.core.logging_config import DroppingQueueHandler, UTCFormatter
+from app.main import app
+
+CALLS = 20_000
+REQUESTS = 2_000
+
+
+class SlowSink:
+    def __init__(self, delay: float = 0.0002) -> None:
+        self.delay = delay
+
+    def write(self, data: str) -> int:
+        time.sleep(self.delay)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+
+def _sync_handlers(stream) -> tuple[list[logging.Handler], QueueListener | None]:
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(UTCFormatter("%(timestamp)s %(level)s %(message)s"))
+    return [handler], None
+
+
+def _queued_handlers(stream) -> tuple[list[logging.Handler], QueueListener | None]:
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(UTCFormatter("%(timestamp)s %(level)s %(message)s"))
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=100_000))
+    listener = QueueListener(queue_handler.queue, handler)
+    listener.start()
+    return [queue_handler], listener
+
+
+def _bench_calls(logger: logging.Logger) -> float:
+    start = time.perf_counter()
+    for i in range(CALLS):
+        logger.info(
+            "HTTP request completed",
+            extra={"details": {"event": "request_completed", "status_code": 200, "duration_ms": 1, "extra": {"method": "GET", "path": f"/x/{i}"}}},
+        )
+    return (time.perf_counter() - start) / CALLS * 1e6
+
+
+async def _bench_requests() -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            await client.get("/health")
+        return REQUESTS / (time.perf_counter() - start)
+
+
+def main() -> None:
+    root = logging.getLogger()
+    logging_config.shutdown_logging()
+    with open(os.devnull, "w") as devnull:
+        for sink_name, sink in (("devnull", devnull), ("slow sink", SlowSink())):
+            for name, setup in (("sync StreamHandler", _sync_handlers), ("QueueHandler", _queued_handlers)):
+                handlers, listener = setup(sink)
+                root.handlers[:] = handlers
+                per_call_us = _bench_calls(logging.getLogger("bench"))
+                rps = asyncio.run(_bench_requests())
+                if listener is not None:
+                    listener.stop()
+                print(f"{sink_name:10s} {name:20s} {per_call_us:8.2f} us/log call in caller   {rps:8.0f} req/s on /health")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Request throughput: ``@app.middleware("http")`` (BaseHTTPMiddleware) vs the pure ASGI
+``RequestLoggingMiddleware``.
+
+Both variants time the request and log start/completion like the application
+does; log output is disabled so only the middleware plumbing is compared. A JSON
+endpoint and a chunked ``StreamingResponse`` endpoint are exercised in-process
+through httpx's ASGI transport with concurrent clients.
+
+Usage (with the usual .env in place)::
+
+    python -m benchmarks.bench_middleware
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.middleware import RequestLoggingMiddleware
+
+REQUESTS = 3_000
+CONCURRENCY = 50
+
+logger = logging.getLogger("bench")
+
+
+def _routes(app: FastAPI) -> FastAPI:
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(16):
+                yield b"x" * 1024
+
+        return StreamingResponse(chunks(), media_type="application/octet-stream")
+
+    return app
+
+
+def base_http_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        start = time.perf_counter()
+        logger.info("HTTP request started", extra={"details": {"event": "request_start", "extra": {"path": request.url.path}}})
+        response = await call_next(request)
+        logger.info(
+            "HTTP request completed",
+            extra={
+                "details": {
+                    "event": "request_completed",
+                    "status_code": response.status_code,
+                    "duration_ms": int((time.perf_counter() - start) * 1000),
+                }
+            },
+        )
+        return response
+
+    return _routes(app)
+
+
+def asgi_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestLoggingMiddleware)
+    return _routes(app)
+
+
+async def _run(app: FastAPI, path: str) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        sem = asyncio.Semaphore(CONCURRENCY)
+
+        async def one() -> None:
+            async with sem:
+                res = await client.get(path)
+                res.raise_for_status()
+
+        await one()  # warm up
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(REQUESTS)))
+        return REQUESTS / (time.perf_counter() - start)
+
+
+def main() -> None:
+    logging.disable(logging.CRITICAL)
+    for path in ("/ping", "/stream"):
+        base = asyncio.run(_run(base_http_app(), path))
+        pure = asyncio.run(_run(asgi_app(), path))
+        print(f"{path:8s} BaseHTTPMiddleware {base:8.0f} req/s   ASGI middleware {pure:8.0f} req/s   ({pure / base - 1:+.0%})")
+
+
+if __name__ == "__main__":
+    main()
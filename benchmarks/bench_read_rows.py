@@ -0,0 +1,108 @@
+"""100k-row listing: ORM entities through ``response_model`` vs Core rows + ``ORJSONResponse``.
+
+The ORM path materializes ``Transaction`` instances (identity map, instance
+state) and, as FastAPI's ``response_model`` does, validates each one into
+``TransactionResponse`` and dumps it back before encoding. The Core path selects only the
+``TransactionResponse`` columns and zips each row into a dict. Both encode the
+same JSON. Throughput (rows/s) and peak traced memory are reported per path.
+
+A throw-away user with 100k transactions is inserted into the configured
+database and removed afterwards (cards and transactions cascade).
+
+Usage (with the usual .env in place and migrations applied)::
+
+    python -m benchmarks.bench_read_rows
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+import tracemalloc
+import uuid
+from decimal import Decimal
+
+from sqlalchemy import delete, insert
+
+from app.core.responses import ORJSONResponse
+from app.crud.card import CardCRUD
+from app.crud.transaction import TransactionCRUD
+from app.crud.user import UserCRUD
+from app.db.models import Transaction, User
+from app.db.session import AsyncSessionLocal, engine
+from app.schemas.transaction import TransactionResponse
+
+ROWS = 100_000
+ROUNDS = 3
+FIELDS = tuple(TransactionResponse.model_fields)
+
+
+async def _seed() -> int:
+    async with AsyncSessionLocal() as db:
+        suffix = uuid.uuid4().hex[:8]
+        user = await UserCRUD.create(
+            db, name="bench", phone=f"9{int(suffix, 16) % 10**12:012d}", telegram_id=None,
+            email=f"bench-{suffix}@example.com", password="bench",
+        )
+        card = await CardCRUD.create(db, user_id=user.id, bank_name="Bench", type="debit", card_name="B", alias=None)
+        values = [
+            {
+                "user_id": user.id,
+                "card_id": card.id,
+                "description": f"Compra {i}",
+                "income": Decimal("0.00"),
+                "expenses": Decimal("123.45"),
+                "executed": True,
+            }
+            for i in range(ROWS)
+        ]
+        for start in range(0, ROWS, 10_000):
+            await db.execute(insert(Transaction), values[start:start + 10_000])
+        await db.commit()
+        return user.id
+
+
+async def _orm(user_id: int) -> bytes:
+    async with AsyncSessionLocal() as db:
+        items = await TransactionCRUD.list_by_user(db, user_id)
+        return ORJSONResponse(
+            [TransactionResponse.model_validate(item).model_dump(mode="json") for item in items]
+        ).body
+
+
+async def _core(user_id: int) -> bytes:
+    async with AsyncSessionLocal() as db:
+        rows = await TransactionCRUD.list_rows_by_user(db, user_id, FIELDS)
+        return ORJSONResponse(rows).body
+
+
+async def _measure(name: str, fn, user_id: int) -> None:
+    await fn(user_id)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        body = await fn(user_id)
+    elapsed = (time.perf_counter() - start) / ROUNDS
+
+    tracemalloc.start()
+    await fn(user_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:5s} {elapsed * 1000:8.0f} ms   {ROWS / elapsed:10,.0f} rows/s   "
+        f"peak {peak / 2**20:7.1f} MiB   body {len(body) / 2**20:6.1f} MiB"
+    )
+
+
+async def main() -> None:
+    user_id = await _seed()
+    try:
+        await _measure("orm", _orm, user_id)
+        await _measure("core", _core, user_id)
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -23,6 +23,8 @@ load_dotenv()
 # Normalize env for tests before importing the app (pydantic Settings requires dev/prod)
 if os.getenv("DATABASE_USE") in (None, "test"):
     os.environ["DATABASE_USE"] = "dev"
+# The in-process job worker would poll the app database; tests drive workers explicitly
+os.environ.setdefault("DISABLE_STARTUP_WORKERS", "1")
 
 from app.main import app
 from app.core.config import get_settings
@@ -0,0 +1,127 @@
+import itertools
+from decimal import Decimal
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.security import create_access_token
+from app.crud.card import CardCRUD
+from app.crud.storage_usage import StorageUsageCRUD
+from app.crud.transaction import TransactionCRUD
+from app.crud.user import UserCRUD
+from app.storage import blob_key, get_storage
+
+KB = 1024
+_phones = itertools.count(5550701)
+
+
+@pytest.fixture()
+def upload_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_dir", str(tmp_path))
+    monkeypatch.setattr(get_settings(), "upload_max_mb", 1)
+    monkeypatch.setattr(get_settings(), "upload_quota_mb", 1)
+    monkeypatch.setattr(get_settings(), "upload_max_files", 3)
+    monkeypatch.setattr(get_settings(), "thumbnails_enabled", False)
+    get_storage.cache_clear()
+    yield tmp_path
+    get_storage.cache_clear()
+
+
+@pytest.fixture()
+async def owner(client, async_session, upload_root):
+    phone = str(next(_phones))
+    user = await UserCRUD.create(
+        async_session, name="BU", phone=phone, telegram_id=None, email=f"{phone}@example.com", password="secret"
+    )
+    debit = await CardCRUD.create(async_session, user_id=user.id, bank_name="X", type="debit", card_name="A", alias=None)
+    credit = await CardCRUD.create(async_session, user_id=user.id, bank_name="Y", type="credit", card_name="B", alias=None)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    tx = await TransactionCRUD.create(
+        async_session, user_id=user.id, card_id=debit.id, description="super", category_id=None,
+        income=Decimal("0.00"), expenses=Decimal("10.00"), executed=True,
+    )
+    expense_tx, _ = await TransactionCRUD.transfer(
+        async_session, user_id=user.id, source_card_id=debit.id, destination_card_id=credit.id,
+        amount=Decimal("5.00"), description=None, category_id=None,
+    )
+    return user, headers, tx.id, expense_tx.transfer_id
+
+
+@pytest.mark.asyncio
+async def test_attach_many_to_transaction_reports_each_file(client, async_session, owner, upload_root):
+    user, headers, transaction_id, _ = owner
+
+    res = await client.post(
+        f"/uploads/transactions/{transaction_id}/attachments",
+        files=[
+            ("files", ("a.png", b"a" * 10 * KB, "image/png")),
+            ("files", ("malo.svg", b"<svg/>", "image/svg+xml")),
+            ("files", ("b.pdf", b"%PDF-1.4 b", "application/pdf")),
+        ],
+        headers=headers,
+    )
+
+    assert res.status_code == 200, res.text
+    body = res.json()
+    assert body["transaction_id"] == transaction_id
+    created, blocked, pdf = body["results"]
+    assert (created["filename"], created["status"], created["size"]) == ("a.png", "created", 10 * KB)
+    assert (blocked["status"], blocked["status_code"]) == ("error", 415)
+    assert pdf["status"] == "created" and pdf["attachment_id"] != created["attachment_id"]
+    assert (upload_root / blob_key(pdf["sha256"])).read_bytes() == b"%PDF-1.4 b"
+    assert not list((upload_root / ".incoming").iterdir())
+
+    listed = await client.get(f"/uploads/transactions/{transaction_id}/attachments", headers=headers)
+    assert {row["filename"] for row in listed.json()} == {"a.png", "b.pdf"}
+    assert await StorageUsageCRUD.get_used(async_session, user.id) == 10 * KB + len(b"%PDF-1.4 b")
+
+
+@pytest.mark.asyncio
+async def test_attach_many_stops_at_the_quota(client, async_session, owner):
+    user, headers, transaction_id, _ = owner
+    await StorageUsageCRUD.add(async_session, user.id, 824 * KB)  # 200 KB left
+    await async_session.commit()
+
+    res = await client.post(
+        f"/uploads/transactions/{transaction_id}/attachments",
+        files=[
+            # 250 KB in total: within the multipart margin, so the early body check lets it through
+            ("files", ("a.png", b"a" * 120 * KB, "image/png")),
+            ("files", ("b.png", b"b" * 90 * KB, "image/png")),
+            ("files", ("c.png", b"c" * 40 * KB, "image/png")),
+        ],
+        headers=headers,
+    )
+
+    assert res.status_code == 200, res.text
+    statuses = [(r["filename"], r["status"], r.get("status_code")) for r in res.json()["results"]]
+    assert statuses == [("a.png", "created", None), ("b.png", "error", 413), ("c.png", "created", None)]
+    assert await StorageUsageCRUD.get_used(async_session, user.id) == 824 * KB + 160 * KB
+
+
+@pytest.mark.asyncio
+async def test_attach_many_to_transfer_and_limits(client, owner):
+    _, headers, transaction_id, transfer_id = owner
+    res = await client.post(
+        f"/uploads/transfers/{transfer_id}/attachments",
+        files=[("files", ("t.pdf", b"%PDF-1.4 t", "application/pdf"))],
+        headers=headers,
+    )
+    assert res.status_code == 200, res.text
+    assert res.json()["transfer_id"] == transfer_id
+    assert res.json()["results"][0]["status"] == "created"
+
+    res = await client.post(
+        "/uploads/transfers/999999999/attachments",
+        files=[("files", ("t.pdf", b"%PDF-1.4 t", "application/pdf"))],
+        headers=headers,
+    )
+    assert res.status_code == 404
+
+    res = await client.post(
+        f"/uploads/transactions/{transaction_id}/attachments",
+        files=[("files", (f"{i}.pdf", b"%PDF", "application/pdf")) for i in range(4)],
+        headers=headers,
+    )
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Máximo 3 archivos por petición"
@@ -0,0 +1,90 @@
+import gzip
+import zlib
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from app.core.compression import CODECS, CompressionMiddleware, negotiate
+
+PAYLOAD = ("colli finance " * 200).encode()
+
+
+def _app(**kwargs) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, **kwargs)
+
+    @app.get("/big")
+    async def big():
+        return PlainTextResponse(PAYLOAD)
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(4):
+                yield PAYLOAD
+
+        return StreamingResponse(chunks(), media_type="text/csv")
+
+    @app.get("/download")
+    async def download():
+        return PlainTextResponse(PAYLOAD, headers={"Cache-Control": "no-transform"})
+
+    return app
+
+
+async def _raw(app: FastAPI, path: str, encoding: str = "gzip") -> tuple[httpx.Headers, bytes]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as res:
+            body = b"".join([chunk async for chunk in res.aiter_raw()])
+            return res.headers, body
+
+
+def test_negotiate_honours_preference_and_q_values():
+    assert negotiate("gzip, deflate", ("zstd", "br", "gzip")) == "gzip"
+    assert negotiate("gzip;q=0, br", ("gzip",)) is None
+    assert negotiate("", ("gzip",)) is None
+    assert negotiate("*", ("gzip",)) == "gzip"
+
+
+@pytest.mark.asyncio
+async def test_large_body_is_gzipped_and_small_body_is_not():
+    app = _app(minimum_size=500)
+    headers, body = await _raw(app, "/big")
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(body) < len(PAYLOAD)
+    assert gzip.decompress(body) == PAYLOAD
+
+    headers, body = await _raw(app, "/small")
+    assert "content-encoding" not in headers and body == b"ok"
+
+
+@pytest.mark.asyncio
+async def test_streaming_is_compressed_incrementally_off_loop():
+    headers, body = await _raw(_app(minimum_size=500, offload_size=100), "/stream")
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    assert zlib.decompress(body, 31) == PAYLOAD * 4
+
+
+@pytest.mark.asyncio
+async def test_no_transform_responses_are_skipped():
+    headers, body = await _raw(_app(minimum_size=500), "/download")
+    assert "content-encoding" not in headers and body == PAYLOAD
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif("zstd" not in CODECS, reason="zstandard not installed")
+async def test_zstd_preferred_when_accepted():
+    import zstandard
+
+    headers, body = await _raw(_app(minimum_size=500), "/stream", encoding="gzip, zstd")
+    assert headers["content-encoding"] == "zstd"
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(body) == PAYLOAD * 4
@@ -0,0 +1,149 @@
+import itertools
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.security import create_access_token
+from app.crud.card import CardCRUD
+from app.crud.storage_usage import StorageUsageCRUD
+from app.crud.transaction import TransactionCRUD
+from app.crud.user import UserCRUD
+from app.db.models import Attachment, Audit, Card, OutboxEvent, Transaction, User
+from app.jobs import JobWorker
+from app.storage import blob_key, get_storage
+
+_phones = itertools.count(5551101)
+
+
+@pytest.fixture()
+def upload_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_dir", str(tmp_path))
+    monkeypatch.setattr(get_settings(), "thumbnails_enabled", False)
+    monkeypatch.setattr(get_settings(), "delete_batch_size", 2)
+    monkeypatch.setattr(get_settings(), "delete_batch_pause_ms", 0)
+    get_storage.cache_clear()
+    yield tmp_path
+    get_storage.cache_clear()
+
+
+@pytest.fixture()
+def sessions(test_engine):
+    return async_sessionmaker(bind=test_engine, expire_on_commit=False)
+
+
+@pytest.fixture()
+async def owner(client, async_session, upload_root):
+    phone = str(next(_phones))
+    user = await UserCRUD.create(
+        async_session, name="DL", phone=phone, telegram_id=None, email=f"{phone}@example.com", password="secret"
+    )
+    debit = await CardCRUD.create(async_session, user_id=user.id, bank_name="X", type="debit", card_name="A", alias=None)
+    credit = await CardCRUD.create(async_session, user_id=user.id, bank_name="Y", type="credit", card_name="B", alias=None)
+    for i in range(5):
+        await TransactionCRUD.create(
+            async_session, user_id=user.id, card_id=debit.id, description=f"gasto {i}", category_id=None,
+            income=Decimal("0.00"), expenses=Decimal("1.00"), executed=True,
+        )
+    expense_tx, _ = await TransactionCRUD.transfer(
+        async_session, user_id=user.id, source_card_id=debit.id, destination_card_id=credit.id,
+        amount=Decimal("5.00"), description=None, category_id=None,
+    )
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    return user.id, headers, debit.id, credit.id, expense_tx.id, expense_tx.transfer_id
+
+
+async def _attach(client, headers, path, name, data):
+    res = await client.post(path, files=[("files", (name, data, "application/pdf"))], headers=headers)
+    assert res.status_code == 200, res.text
+    return res.json()["results"][0]["sha256"]
+
+
+async def _count(async_session, model, *conditions) -> int:
+    return await async_session.scalar(select(func.count()).select_from(model).where(*conditions))
+
+
+@pytest.mark.asyncio
+async def test_card_is_hidden_then_purged_in_batches(client, async_session, owner, upload_root, sessions):
+    user_id, headers, debit_id, credit_id, tx_id, transfer_id = owner
+    receipt = await _attach(client, headers, f"/uploads/transactions/{tx_id}/attachments", "r.pdf", b"%PDF-1.4 r")
+    voucher = await _attach(client, headers, f"/uploads/transfers/{transfer_id}/attachments", "v.pdf", b"%PDF-1.4 v")
+
+    res = await client.delete(f"/cards/{debit_id}", headers=headers)
+    assert res.status_code == 202, res.text
+    job_id = res.json()["job_id"]
+    assert res.headers["location"] == f"/jobs/{job_id}"
+
+    # hidden right away, rows still there until the job runs
+    assert (await client.get(f"/cards/{debit_id}", headers=headers)).status_code == 404
+    listed = (await client.get("/transactions", headers=headers)).json()
+    assert {row["card_id"] for row in listed} == {credit_id}
+    assert await _count(async_session, Transaction, Transaction.card_id == debit_id) == 6
+
+    worker = JobWorker(sessions, types=["cards.delete"])
+    assert await worker.run_once()
+
+    job = (await client.get(f"/jobs/{job_id}", headers=headers)).json()
+    assert job["status"] == "succeeded"
+    assert job["result"]["transactions"] == 6
+    assert job["progress"]["transactions"] == 6
+    assert await async_session.get(Card, debit_id) is None
+    assert await _count(async_session, Attachment, Attachment.user_id == user_id) == 1
+    assert not (upload_root / blob_key(receipt)).exists()
+    # the other side of the transfer still exists, so its voucher stays
+    assert (upload_root / blob_key(voucher)).exists()
+    assert await StorageUsageCRUD.get_used(async_session, user_id) == len(b"%PDF-1.4 v")
+
+
+@pytest.mark.asyncio
+async def test_transfers_hide_the_deleted_card_side(client, async_session, owner, sessions):
+    user_id, headers, debit_id, credit_id, tx_id, transfer_id = owner
+    assert (await client.delete(f"/cards/{debit_id}", headers=headers)).status_code == 202
+
+    def card_ids(pair):
+        return {pair["source_transaction"]["card_id"], pair["destination_transaction"]["card_id"]}
+
+    (listed,) = (await client.get("/transfers", headers=headers)).json()
+    assert card_ids(listed) == {credit_id}
+    res = await client.get(f"/transfers/{transfer_id}", headers=headers)
+    assert res.status_code == 200 and card_ids(res.json()) == {credit_id}
+
+    res = await client.patch(f"/transfers/{transfer_id}", params={"description": "renombrada"}, headers=headers)
+    assert res.status_code == 200 and card_ids(res.json()) == {credit_id}
+    assert (await client.delete(f"/transfers/{transfer_id}", headers=headers)).status_code == 204
+    assert (await client.get(f"/transfers/{transfer_id}", headers=headers)).status_code == 404
+
+    # the hidden side is left untouched for the purge job
+    async with sessions() as db:
+        hidden = await db.get(Transaction, tx_id)
+    assert hidden.card_id == debit_id and hidden.description != "renombrada"
+
+
+@pytest.mark.asyncio
+async def test_user_is_disabled_then_purged(client, async_session, owner, upload_root, sessions):
+    user_id, headers, debit_id, credit_id, tx_id, transfer_id = owner
+    receipt = await _attach(client, headers, f"/uploads/transactions/{tx_id}/attachments", "r.pdf", b"%PDF-1.4 u")
+    voucher = await _attach(client, headers, f"/uploads/transfers/{transfer_id}/attachments", "v.pdf", b"%PDF-1.4 w")
+
+    res = await client.delete("/users/me", headers=headers)
+    assert res.status_code == 202, res.text
+    assert (await client.get("/users/me", headers=headers)).status_code == 401
+
+    worker = JobWorker(sessions, types=["users.delete"])
+    assert await worker.run_once()
+
+    async_session.expire_all()
+    assert await async_session.get(User, user_id) is None
+    assert await _count(async_session, Transaction, Transaction.user_id == user_id) == 0
+    assert not (upload_root / blob_key(receipt)).exists()
+    assert not (upload_root / blob_key(voucher)).exists()
+    # consumers learn about every card through card.deleted, which covers its transactions and attachments
+    res = await async_session.execute(
+        select(OutboxEvent.payload).where(OutboxEvent.user_id == user_id, OutboxEvent.type == "card.deleted")
+    )
+    assert sorted(payload["id"] for payload in res.scalars()) == [debit_id, credit_id]
+    # the audit trail is kept, detached from the account
+    assert await _count(async_session, Audit, Audit.user_id == user_id) == 0
+    assert await _count(async_session, Audit, Audit.details["user_id"].as_integer() == user_id) >= 1
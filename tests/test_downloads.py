@@ -0,0 +1,114 @@
+import hashlib
+import itertools
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.security import create_access_token
+from app.crud.attachment import AttachmentCRUD
+from app.crud.user import UserCRUD
+from app.services.downloads import parse_range
+from app.storage import blob_key, get_storage
+
+CONTENT = bytes(range(256)) * 40  # 10 KiB
+_phones = itertools.count(5557001)
+
+
+@pytest.fixture()
+async def attachment(tmp_path, monkeypatch, async_session):
+    monkeypatch.setattr(get_settings(), "upload_dir", str(tmp_path))
+    get_storage.cache_clear()
+    digest = hashlib.sha256(CONTENT).hexdigest()
+    blob = tmp_path / blob_key(digest)
+    blob.parent.mkdir(parents=True)
+    blob.write_bytes(CONTENT)
+    phone = str(next(_phones))
+    user = await UserCRUD.create(
+        async_session, name="DL", phone=phone, telegram_id=None, email=f"{phone}@example.com", password="secret"
+    )
+    att = await AttachmentCRUD.create(
+        async_session, user_id=user.id, filename="recibo enero.pdf", path=blob_key(digest),
+        content_type="application/pdf", size=len(CONTENT), transaction_id=None, transfer_id=None, sha256=digest,
+    )
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    yield f"/uploads/attachments/{att.id}/download", headers, digest
+    get_storage.cache_clear()
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("bytes=0-9", (0, 9)),
+        ("bytes=100-", (100, 999)),
+        ("bytes=-10", (990, 999)),
+        ("bytes=990-5000", (990, 999)),
+        ("bytes=0-1,5-9", None),
+        ("items=0-9", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5-1", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 1000)
+
+
+@pytest.mark.asyncio
+async def test_download_validators_and_conditional_get(client, attachment):
+    url, headers, digest = attachment
+
+    res = await client.get(url, headers=headers)
+    assert res.status_code == 200
+    assert res.content == CONTENT
+    assert res.headers["etag"] == f'"{digest}"'
+    assert res.headers["accept-ranges"] == "bytes"
+    assert "immutable" in res.headers["cache-control"] and "no-transform" in res.headers["cache-control"]
+    assert res.headers["content-disposition"] == "attachment; filename*=UTF-8''recibo%20enero.pdf"
+
+    res = await client.get(url, headers={**headers, "If-None-Match": f'"{digest}"'})
+    assert res.status_code == 304
+    assert res.content == b""
+    res = await client.get(url, headers={**headers, "If-Modified-Since": res.headers["last-modified"]})
+    assert res.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_download_byte_ranges(client, attachment):
+    url, headers, digest = attachment
+
+    res = await client.get(url, headers={**headers, "Range": "bytes=256-511"})
+    assert res.status_code == 206
+    assert res.content == CONTENT[256:512]
+    assert res.headers["content-range"] == f"bytes 256-511/{len(CONTENT)}"
+    assert res.headers["content-length"] == "256"
+
+    res = await client.get(url, headers={**headers, "Range": "bytes=-16", "If-Range": f'"{digest}"'})
+    assert res.status_code == 206
+    assert res.content == CONTENT[-16:]
+
+    # Stale If-Range: the whole (new) representation is sent
+    res = await client.get(url, headers={**headers, "Range": "bytes=0-9", "If-Range": '"otro"'})
+    assert res.status_code == 200
+    assert res.content == CONTENT
+
+    res = await client.get(url, headers={**headers, "Range": f"bytes={len(CONTENT)}-"})
+    assert res.status_code == 416
+    assert res.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode, header", [("x-accel", "x-accel-redirect"), ("x-sendfile", "x-sendfile")])
+async def test_download_offload_returns_internal_location(client, attachment, monkeypatch, tmp_path, mode, header):
+    url, headers, digest = attachment
+    monkeypatch.setattr(get_settings(), "download_offload", mode)
+
+    res = await client.get(url, headers=headers)
+    assert res.status_code == 200
+    assert res.content == b""
+    assert res.headers["content-type"] == "application/pdf"
+    assert res.headers["etag"] == f'"{digest}"'
+    expected = "/protected-uploads/" + blob_key(digest) if mode == "x-accel" else str(tmp_path / blob_key(digest))
+    assert res.headers[header] == expected
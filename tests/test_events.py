@@ -0,0 +1,132 @@
+import itertools
+
+import orjson
+import pytest
+from sqlalchemy.engine import make_url
+
+from app.core.security import create_access_token
+from app.crud.card import CardCRUD
+from app.crud.transaction import TransactionCRUD
+from app.crud.user import UserCRUD
+from app.events import EventBroker, sse_stream
+
+_phones = itertools.count(5551201)
+
+
+@pytest.fixture()
+async def broker(test_database_url, migrated_db):
+    dsn = make_url(test_database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+    broker = EventBroker(dsn, queue_size=2)
+    await broker.start()
+    yield broker
+    await broker.stop()
+
+
+@pytest.fixture()
+async def owner(async_session):
+    phone = str(next(_phones))
+    user = await UserCRUD.create(
+        async_session, name="EV", phone=phone, telegram_id=None, email=f"{phone}@example.com", password="secret"
+    )
+    debit = await CardCRUD.create(async_session, user_id=user.id, bank_name="X", type="debit", card_name="A", alias=None)
+    credit = await CardCRUD.create(async_session, user_id=user.id, bank_name="Y", type="credit", card_name="B", alias=None)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    return user.id, headers, debit.id, credit.id
+
+
+@pytest.mark.asyncio
+async def test_writes_are_pushed_with_balances_and_can_be_resumed(client, broker, owner):
+    user_id, headers, debit_id, credit_id = owner
+    subscription = await broker.subscribe(user_id)
+
+    res = await client.post(
+        "/transactions",
+        json={"card_id": debit_id, "description": "nómina", "income": "100.00", "expenses": "0.00", "executed": True},
+        headers=headers,
+    )
+    assert res.status_code == 201, res.text
+    created = await subscription.next(5)
+    assert created.type == "transaction.created"
+    data = orjson.loads(created.data)
+    assert data["id"] == res.json()["id"]
+    assert data["balances"] == {str(debit_id): "100.00"}
+
+    res = await client.post(
+        "/transfers",
+        json={"source_card_id": debit_id, "destination_card_id": credit_id, "amount": "30.00"},
+        headers=headers,
+    )
+    assert res.status_code == 201, res.text
+    transfer = await subscription.next(5)
+    assert transfer.type == "transfer.created"
+    assert orjson.loads(transfer.data)["balances"] == {str(debit_id): "70.00", str(credit_id): "30.00"}
+    assert transfer.id > created.id
+    broker.unsubscribe(subscription)
+
+    # reconnecting with the id of the first event replays only what came after it
+    resumed = await broker.subscribe(user_id, last_event_id=created.id)
+    assert (await resumed.next(1)).id == transfer.id
+    assert await resumed.next(0.05) is None
+    broker.unsubscribe(resumed)
+
+    unknown = await broker.subscribe(user_id, last_event_id=transfer.id + 1000)
+    reset = await unknown.next(1)
+    assert (reset.type, reset.id) == ("reset", transfer.id)
+    broker.unsubscribe(unknown)
+
+
+@pytest.mark.asyncio
+async def test_other_users_events_are_not_delivered(client, async_session, broker, owner):
+    user_id, _, debit_id, _ = owner
+    subscription = await broker.subscribe(user_id)
+    phone = str(next(_phones))
+    stranger = await UserCRUD.create(
+        async_session, name="EX", phone=phone, telegram_id=None, email=f"{phone}@example.com", password="secret"
+    )
+    card = await CardCRUD.create(async_session, user_id=stranger.id, bank_name="Z", type="debit", card_name="C", alias=None)
+    await TransactionCRUD.create(
+        async_session, stranger.id, card_id=card.id, description="ajeno", income=0, expenses=5, executed=True
+    )
+    await TransactionCRUD.create(
+        async_session, user_id, card_id=debit_id, description="propio", income=0, expenses=1, executed=True
+    )
+    event = await subscription.next(5)
+    assert orjson.loads(event.data)["card_id"] == debit_id
+    broker.unsubscribe(subscription)
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_dropped(async_session, broker, owner):
+    user_id, _, debit_id, _ = owner
+    subscription = await broker.subscribe(user_id)
+    for amount in (1, 2, 3):
+        await TransactionCRUD.create(
+            async_session, user_id, card_id=debit_id, description="gasto", income=0, expenses=amount, executed=True
+        )
+    stream = sse_stream(broker, subscription, heartbeat=5, retry_ms=1000)
+    assert await stream.__anext__() == b"retry: 1000\n\n"
+    # the third event overflowed the buffer of 2: the stream ends instead of growing it
+    with pytest.raises(StopAsyncIteration):
+        while True:
+            await stream.__anext__()
+    assert subscription.dropped
+    assert user_id not in broker._subscribers
+
+
+@pytest.mark.asyncio
+async def test_idle_stream_sends_heartbeats(broker, owner):
+    user_id = owner[0]
+    subscription = await broker.subscribe(user_id)
+    stream = sse_stream(broker, subscription, heartbeat=0.01, retry_ms=3000)
+    assert await stream.__anext__() == b"retry: 3000\n\n"
+    assert await stream.__anext__() == b": ping\n\n"
+    await stream.aclose()
+    assert user_id not in broker._subscribers
+
+
+@pytest.mark.asyncio
+async def test_stream_endpoint_validates_request(client, owner):
+    _, headers, _, _ = owner
+    assert (await client.get("/events/stream")).status_code == 401
+    res = await client.get("/events/stream", headers={**headers, "Last-Event-ID": "abc"})
+    assert res.status_code == 400
@@ -0,0 +1,121 @@
+import csv
+import hashlib
+import io
+import itertools
+import zipfile
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.security import create_access_token
+from app.crud.card import CardCRUD
+from app.crud.user import UserCRUD
+from app.storage import blob_key, get_storage
+
+_phones = itertools.count(5559001)
+
+
+@pytest.fixture()
+def upload_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_dir", str(tmp_path))
+    monkeypatch.setattr(get_settings(), "thumbnails_enabled", False)
+    get_storage.cache_clear()
+    yield tmp_path
+    get_storage.cache_clear()
+
+
+@pytest.fixture()
+async def receipts(client, async_session, upload_root):
+    phone = str(next(_phones))
+    user = await UserCRUD.create(
+        async_session, name="EX", phone=phone, telegram_id=None, email=f"{phone}@example.com", password="secret"
+    )
+    debit = await CardCRUD.create(async_session, user_id=user.id, bank_name="X", type="debit", card_name="A", alias=None)
+    credit = await CardCRUD.create(async_session, user_id=user.id, bank_name="Y", type="credit", card_name="B", alias=None)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    ids = {}
+    for name, content, content_type in [
+        ("ticket.png", b"\x89PNG" + b"p" * 4096, "image/png"),
+        ("escaneo.bmp", b"BM" + b"\x00" * 8192, "image/bmp"),
+    ]:
+        res = await client.post(
+            "/uploads/transactions",
+            data={"description": name, "card_id": str(debit.id)},
+            files={"file": (name, content, content_type)},
+            headers=headers,
+        )
+        assert res.status_code == 200, res.text
+        ids[name] = res.json()
+    res = await client.post(
+        "/uploads/transfers",
+        data={"source_card_id": str(debit.id), "destination_card_id": str(credit.id), "amount": "100.00"},
+        files={"file": ("comprobante.pdf", b"%PDF-1.4 pago tarjeta", "application/pdf")},
+        headers=headers,
+    )
+    assert res.status_code == 200, res.text
+    ids["comprobante.pdf"] = res.json()
+    return headers, credit, ids
+
+
+def _manifest(archive: zipfile.ZipFile) -> list[dict]:
+    return list(csv.DictReader(io.StringIO(archive.read("manifest.csv").decode())))
+
+
+@pytest.mark.asyncio
+async def test_export_streams_zip_with_manifest(client, receipts):
+    headers, _, ids = receipts
+    today = datetime.now(timezone.utc).date().isoformat()
+
+    res = await client.get(f"/uploads/attachments/export?date_from={today}&date_to={today}", headers=headers)
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/zip"
+    assert "content-length" not in res.headers  # chunked: built while it is sent
+    assert res.headers["content-disposition"] == f'attachment; filename="adjuntos_{today}_{today}.zip"'
+
+    with zipfile.ZipFile(io.BytesIO(res.content)) as archive:
+        assert archive.testzip() is None
+        manifest = _manifest(archive)
+        assert [row["filename"] for row in manifest] == ["ticket.png", "escaneo.bmp", "comprobante.pdf"]
+        infos = {row["filename"]: archive.getinfo(row["file"]) for row in manifest}
+        assert infos["ticket.png"].compress_type == zipfile.ZIP_STORED
+        assert infos["comprobante.pdf"].compress_type == zipfile.ZIP_STORED
+        assert infos["escaneo.bmp"].compress_type == zipfile.ZIP_DEFLATED
+        pdf_row = manifest[2]
+        assert pdf_row["transfer_id"] == str(ids["comprobante.pdf"]["transfer_id"])
+        assert pdf_row["expenses"] == "100.00"
+        assert archive.read(pdf_row["file"]) == b"%PDF-1.4 pago tarjeta"
+
+
+@pytest.mark.asyncio
+async def test_export_filters(client, receipts):
+    headers, credit, ids = receipts
+
+    # a transfer's attachment belongs to both of its cards
+    res = await client.get(f"/uploads/attachments/export?card_id={credit.id}", headers=headers)
+    with zipfile.ZipFile(io.BytesIO(res.content)) as archive:
+        assert [row["filename"] for row in _manifest(archive)] == ["comprobante.pdf"]
+
+    res = await client.get(
+        f"/uploads/attachments/export?transaction_id={ids['ticket.png']['transaction_id']}", headers=headers
+    )
+    with zipfile.ZipFile(io.BytesIO(res.content)) as archive:
+        assert [row["filename"] for row in _manifest(archive)] == ["ticket.png"]
+
+    yesterday = (datetime.now(timezone.utc).date() - timedelta(days=1)).isoformat()
+    res = await client.get(f"/uploads/attachments/export?date_to={yesterday}", headers=headers)
+    assert res.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_export_lists_missing_blobs_in_manifest(client, receipts, upload_root):
+    headers, _, ids = receipts
+    (upload_root / blob_key(ids["ticket.png"]["sha256"])).unlink()
+
+    res = await client.get("/uploads/attachments/export", headers=headers)
+    with zipfile.ZipFile(io.BytesIO(res.content)) as archive:
+        manifest = _manifest(archive)
+        assert len(archive.namelist()) == 3  # two files + manifest
+    missing = next(row for row in manifest if row["filename"] == "ticket.png")
+    assert missing["file"] == ""
+    assert missing["sha256"] == hashlib.sha256(b"\x89PNG" + b"p" * 4096).hexdigest()
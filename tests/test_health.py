@@ -5,3 +5,17 @@ async def test_health(client):
     res = await client.get("/health")
     assert res.status_code == 200
     assert res.json() == {"status": "ok"}
+
+
+@pytest.mark.asyncio
+async def test_request_id_header(client):
+    res = await client.get("/health")
+    assert res.headers["x-request-id"]
+
+    res = await client.get("/health", headers={"X-Request-ID": "abc123"})
+    assert res.headers["x-request-id"] == "abc123"
+
+    for bad in ("a" * 65, "abc 123", "../etc", "x{y}"):
+        res = await client.get("/health", headers={"X-Request-ID": bad})
+        assert res.headers["x-request-id"] != bad
+        assert len(res.headers["x-request-id"]) == 32
@@ -0,0 +1,161 @@
+import asyncio
+import itertools
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import delete, func, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.security import create_access_token
+from app.crud.job import JobCRUD
+from app.crud.user import UserCRUD
+from app.db.models import Job
+from app.jobs import JobWorker, job_handler
+from app.jobs import worker as worker_module
+
+_phones = itertools.count(5550901)
+ran: list[int] = []
+active = {"now": 0, "max": 0}
+
+
+@job_handler("test.echo")
+async def echo(ctx, payload):
+    ran.append(ctx.job_id)
+    await ctx.progress(step="done")
+    return {"echo": payload["value"]}
+
+
+@job_handler("test.broken")
+async def broken(ctx, payload):
+    raise RuntimeError("sin conexión")
+
+
+@job_handler("test.serial", concurrency=1)
+async def serial(ctx, payload):
+    active["now"] += 1
+    active["max"] = max(active["max"], active["now"])
+    await asyncio.sleep(0.02)
+    active["now"] -= 1
+
+
+@job_handler("test.stolen")
+async def stolen(ctx, payload):
+    # another worker takes the job over while this run is still going
+    async with ctx.session_factory() as db:
+        await db.execute(update(Job).where(Job.id == ctx.job_id).values(locked_by="otro"))
+        await db.commit()
+    if payload.get("fail"):
+        raise RuntimeError("tarde")
+    return {"done": True}
+
+
+@pytest.fixture()
+def sessions(test_engine):
+    return async_sessionmaker(bind=test_engine, expire_on_commit=False)
+
+
+async def _user(async_session):
+    phone = str(next(_phones))
+    user = await UserCRUD.create(
+        async_session, name="JB", phone=phone, telegram_id=None, email=f"{phone}@example.com", password="secret"
+    )
+    return user.id, {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_by_priority_and_report_status(client, async_session, sessions):
+    user_id, headers = await _user(async_session)
+    _, other_headers = await _user(async_session)
+    low = await JobCRUD.enqueue(async_session, type="test.echo", payload={"value": "baja"}, user_id=user_id)
+    high = await JobCRUD.enqueue(
+        async_session, type="test.echo", payload={"value": "alta"}, user_id=user_id, priority=10
+    )
+    worker = JobWorker(sessions, types=["test.echo"])
+    ran.clear()
+
+    assert await worker.run_once() and await worker.run_once()
+    assert not await worker.run_once()
+    assert ran == [high.id, low.id]
+
+    res = await client.get(f"/jobs/{high.id}", headers=headers)
+    assert res.status_code == 200
+    body = res.json()
+    assert (body["status"], body["attempts"], body["result"]) == ("succeeded", 1, {"echo": "alta"})
+    assert body["progress"] == {"step": "done"}
+    assert (await client.get(f"/jobs/{high.id}", headers=other_headers)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_failed_job_is_retried_with_backoff_then_failed(async_session, sessions):
+    job = await JobCRUD.enqueue(async_session, type="test.broken", max_attempts=2)
+    worker = JobWorker(sessions, types=["test.broken"], retry_base=60)
+
+    assert await worker.run_once()
+    await async_session.refresh(job)
+    assert (job.status, job.attempts, job.locked_by) == ("queued", 1, None)
+    assert "sin conexión" in job.last_error
+    assert not await worker.run_once()  # backing off (30-60 s)
+
+    await async_session.execute(update(Job).where(Job.id == job.id).values(run_at=func.now()))
+    await async_session.commit()
+    assert await worker.run_once()
+    await async_session.refresh(job)
+    assert (job.status, job.attempts) == ("failed", 2)
+
+
+@pytest.mark.asyncio
+async def test_stale_running_job_is_recovered(async_session, sessions):
+    job = await JobCRUD.enqueue(async_session, type="test.echo", payload={"value": "x"})
+    async with sessions() as db:
+        claimed = await JobCRUD.claim(db, "muerto", ["test.echo"])
+    assert claimed.id == job.id
+    await async_session.execute(
+        update(Job).where(Job.id == job.id).values(heartbeat_at=func.now() - timedelta(minutes=5))
+    )
+    await async_session.commit()
+
+    async with sessions() as db:
+        assert await JobCRUD.recover_stale(db, timedelta(seconds=60)) >= 1
+    await async_session.refresh(job)
+    assert (job.status, job.locked_by) == ("queued", None)
+    # the previous owner can no longer record an outcome
+    async with sessions() as db:
+        assert not await JobCRUD.complete(db, job.id, "muerto", None)
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_respects_per_type_concurrency(async_session, sessions):
+    ids = [(await JobCRUD.enqueue(async_session, type="test.serial")).id for _ in range(4)]
+    worker = JobWorker(sessions, concurrency=4, types=["test.serial"], poll_interval=0.01)
+    active.update(now=0, max=0)
+
+    worker.start()
+    try:
+        for _ in range(200):
+            async with sessions() as db:
+                jobs = [await JobCRUD.get(db, job_id) for job_id in ids]
+            if all(job.status == "succeeded" for job in jobs):
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await worker.stop()
+
+    assert [job.status for job in jobs] == ["succeeded"] * 4
+    assert active["max"] == 1
+
+
+@pytest.mark.asyncio
+async def test_outcome_of_a_lost_lease_is_not_recorded(async_session, sessions, monkeypatch):
+    events = []
+    monkeypatch.setattr(worker_module, "log_event", lambda logger, level, msg, event, build: events.append(event))
+    ok = await JobCRUD.enqueue(async_session, type="test.stolen")
+    failing = await JobCRUD.enqueue(async_session, type="test.stolen", payload={"fail": True})
+    worker = JobWorker(sessions, types=["test.stolen"], retry_base=60)
+
+    assert await worker.run_once() and await worker.run_once()
+    assert events == ["job_lease_lost", "job_lease_lost"]
+    for job in (ok, failing):
+        await async_session.refresh(job)
+        assert (job.status, job.locked_by, job.result, job.last_error) == ("running", "otro", None, None)
+    await async_session.execute(delete(Job).where(Job.id.in_([ok.id, failing.id])))
+    await async_session.commit()
@@ -0,0 +1,38 @@
+import logging
+import queue
+
+from app.core.logging_config import DroppingQueueHandler, SuccessSampler
+
+
+def _record(level: int, details: dict) -> logging.LogRecord:
+    record = logging.LogRecord("test", level, __file__, 0, "msg %s", ("x",), None)
+    record.details = details
+    return record
+
+
+def test_queue_handler_drops_and_counts_when_full():
+    q: queue.Queue = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(q)
+    for _ in range(5):
+        handler.emit(_record(logging.INFO, {"event": "e"}))
+    assert q.qsize() == 2
+    assert handler.dropped == 3
+
+    # once there is room again the drop count is reported as a warning record
+    q.get_nowait()
+    q.get_nowait()
+    handler.emit(_record(logging.INFO, {"event": "e"}))
+    first = q.get_nowait()
+    report = q.get_nowait()
+    assert first.msg == "msg x" and first.args is None
+    assert report.details["event"] == "log_dropped"
+    assert report.details["extra"]["dropped"] == 3
+
+
+def test_success_sampler_keeps_errors_and_unsampled_events():
+    sampler = SuccessSampler({"request_completed", "health"}, rate=0.0)
+    assert not sampler.filter(_record(logging.INFO, {"event": "health"}))
+    assert not sampler.filter(_record(logging.INFO, {"event": "request_completed", "status_code": 200}))
+    assert sampler.filter(_record(logging.INFO, {"event": "request_completed", "status_code": 404}))
+    assert sampler.filter(_record(logging.ERROR, {"event": "request_completed", "status_code": 500}))
+    assert sampler.filter(_record(logging.INFO, {"event": "transaction_create"}))
@@ -0,0 +1,99 @@
+import gzip
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.loki import LokiHandler
+
+
+class _LokiStandIn(BaseHTTPRequestHandler):
+    def do_POST(self):  # noqa: N802
+        server = self.server
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if server.fail_next > 0:
+            server.fail_next -= 1
+            self.send_response(500)
+            self.end_headers()
+            return
+        assert self.headers["Content-Encoding"] == "gzip"
+        server.batches.append(json.loads(gzip.decompress(body)))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):  # silence default stderr access log
+        pass
+
+
+@pytest.fixture()
+def loki_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _LokiStandIn)
+    server.batches = []
+    server.fail_next = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _handler(server, **kwargs) -> LokiHandler:
+    host, port = server.server_address
+    handler = LokiHandler(
+        f"http://{host}:{port}/loki/api/v1/push",
+        labels={"app": "test-app", "service": "test-service"},
+        flush_interval=60,
+        backoff=0.01,
+        **kwargs,
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    return handler
+
+
+def _record(name: str, level: int, msg: str) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 0, msg, None, None)
+
+
+def test_batches_are_grouped_by_stream_labels(loki_server):
+    handler = _handler(loki_server)
+    handler.handle(_record("app.crud.card", logging.INFO, "a"))
+    handler.handle(_record("app.crud.card", logging.INFO, "b"))
+    handler.handle(_record("app.main", logging.ERROR, "c"))
+    handler.flush()
+    handler.close()
+
+    assert len(loki_server.batches) == 1
+    streams = {
+        (s["stream"]["level"], s["stream"]["module"]): [v[1] for v in s["values"]]
+        for s in loki_server.batches[0]["streams"]
+    }
+    assert streams == {("info", "app.crud.card"): ["a", "b"], ("error", "app.main"): ["c"]}
+    assert all(s["stream"]["app"] == "test-app" for s in loki_server.batches[0]["streams"])
+
+
+def test_flushes_on_batch_size_and_retries_failures(loki_server):
+    loki_server.fail_next = 2
+    handler = _handler(loki_server, batch_size=3)
+    for i in range(3):
+        handler.handle(_record("app.main", logging.INFO, str(i)))
+    # the background thread is woken by the full batch; wait for the retried push
+    for _ in range(200):
+        if loki_server.batches:
+            break
+        time.sleep(0.01)
+    handler.close()
+
+    assert len(loki_server.batches) == 1
+    assert handler.pushed_batches == 1 and handler.failed_batches == 0
+
+
+def test_records_over_memory_budget_are_dropped(loki_server):
+    handler = _handler(loki_server, max_buffer_bytes=10)
+    handler.handle(_record("app.main", logging.INFO, "12345678"))
+    handler.handle(_record("app.main", logging.INFO, "12345678"))
+    assert handler.dropped == 1
+    handler.close()
+    assert [v[1] for v in loki_server.batches[0]["streams"][0]["values"]] == ["12345678"]
@@ -0,0 +1,191 @@
+import asyncio
+import itertools
+from datetime import timedelta
+from decimal import Decimal
+
+import asyncpg
+import orjson
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.security import create_access_token
+from app.crud.card import CardCRUD
+from app.crud.outbox import OutboxCRUD
+from app.crud.transaction import TransactionCRUD
+from app.crud.user import UserCRUD
+from app.db.models import OutboxEvent, OutboxOffset
+from app.outbox import FileSink, NotifySink, OutboxRelay, OutboxSink
+
+_phones = itertools.count(5551401)
+_sink_names = itertools.count(1)
+
+
+class RecordingSink(OutboxSink):
+    def __init__(self, fail_times: int = 0) -> None:
+        self.name = f"test-{next(_sink_names)}"
+        self.fail_times = fail_times
+        self.batches: list[list[dict]] = []
+
+    async def deliver(self, events):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("sink down")
+        self.batches.append(events)
+
+    def events_of(self, user_id):
+        return [event for batch in self.batches for event in batch if event["user_id"] == user_id]
+
+
+@pytest.fixture()
+def sessions(test_engine):
+    return async_sessionmaker(bind=test_engine, expire_on_commit=False)
+
+
+@pytest.fixture()
+async def owner(async_session):
+    phone = str(next(_phones))
+    user = await UserCRUD.create(
+        async_session, name="OB", phone=phone, telegram_id=None, email=f"{phone}@example.com", password="secret"
+    )
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    return user.id, headers
+
+
+async def _relay_all(relay):
+    while await relay.run_once():
+        pass
+
+
+@pytest.mark.asyncio
+async def test_writes_reach_sinks_in_order_after_a_failed_delivery(client, async_session, sessions, owner):
+    user_id, headers = owner
+    res = await client.post("/cards", json={"bank_name": "X", "type": "debit", "card_name": "A"}, headers=headers)
+    debit_id = res.json()["id"]
+    credit = await CardCRUD.create(
+        async_session, user_id=user_id, bank_name="Y", type="credit", card_name="B", alias=None
+    )
+    tx = await TransactionCRUD.create(
+        async_session, user_id, card_id=debit_id, description="nómina", income=Decimal("100.00"),
+        expenses=Decimal("0.00"), executed=True,
+    )
+    res = await client.post(
+        "/transfers", json={"source_card_id": debit_id, "destination_card_id": credit.id, "amount": "30.00"},
+        headers=headers,
+    )
+    assert res.status_code == 201, res.text
+    assert (await client.delete(f"/transactions/{tx.id}", headers=headers)).status_code == 204
+
+    sink = RecordingSink(fail_times=1)
+    relay = OutboxRelay([sink], sessions, batch_size=3, retry_base=0.01, retry_max=0.01)
+    assert await relay.run_once() == 0  # first attempt fails: nothing is lost, the offset stays
+    await asyncio.sleep(0.02)
+    await _relay_all(relay)
+
+    events = sink.events_of(user_id)
+    assert [event["type"] for event in events] == [
+        "card.created", "card.created", "transaction.created", "transfer.created", "transaction.deleted"
+    ]
+    assert [event["id"] for event in events] == sorted(event["id"] for event in events)
+    assert events[2]["data"]["balances"] == {str(debit_id): "100.00"}
+    assert events[3]["data"]["balances"] == {str(debit_id): "70.00", str(credit.id): "30.00"}
+    assert all(len(batch) <= 3 for batch in sink.batches)
+
+    # nothing new: the offset kept its place
+    assert await relay.run_once() == 0
+    offset = await async_session.get(OutboxOffset, sink.name)
+    assert offset.delivered == sum(len(batch) for batch in sink.batches)
+
+
+@pytest.mark.asyncio
+async def test_a_sink_leased_by_another_relay_is_skipped(async_session, sessions, owner):
+    user_id, _ = owner
+    await CardCRUD.create(async_session, user_id=user_id, bank_name="X", type="debit", card_name="A", alias=None)
+    sink = RecordingSink()
+    relay = OutboxRelay([sink], sessions)
+    async with sessions() as db:
+        await OutboxCRUD.register_sinks(db, [sink.name])
+        position = await OutboxCRUD.claim(db, sink.name, "otro", timedelta(minutes=1))
+        assert position is not None
+        assert await relay.run_once() == 0
+        # without the lease the offset cannot be moved
+        assert not await OutboxCRUD.advance(db, sink.name, relay.worker_id, position, (1, 1), 1)
+        await OutboxCRUD.release(db, sink.name, "otro")
+    await _relay_all(relay)
+    assert [event["type"] for event in sink.events_of(user_id)] == ["card.created"]
+
+
+class BlockingSink(RecordingSink):
+    def __init__(self) -> None:
+        super().__init__()
+        self.entered = asyncio.Event()
+        self.proceed = asyncio.Event()
+
+    async def deliver(self, events):
+        self.entered.set()
+        await self.proceed.wait()
+        await super().deliver(events)
+
+
+@pytest.mark.asyncio
+async def test_a_slow_sink_does_not_hold_back_the_others(async_session, sessions, owner):
+    user_id, _ = owner
+    await CardCRUD.create(async_session, user_id=user_id, bank_name="X", type="debit", card_name="A", alias=None)
+    slow, fast = BlockingSink(), RecordingSink()
+    slow_relay, fast_relay = OutboxRelay([slow], sessions), OutboxRelay([fast], sessions)
+    await _relay_all(fast_relay)
+
+    delivering = asyncio.create_task(slow_relay.run_once())
+    await asyncio.wait_for(slow.entered.wait(), 5)
+    # written while the slow sink is mid-delivery: no open relay transaction holds it back
+    await CardCRUD.create(async_session, user_id=user_id, bank_name="X", type="debit", card_name="B", alias=None)
+    await _relay_all(fast_relay)
+    assert [event["data"]["card_name"] for event in fast.events_of(user_id)] == ["A", "B"]
+
+    slow.proceed.set()
+    assert await delivering > 0
+    await _relay_all(slow_relay)
+    assert [event["data"]["card_name"] for event in slow.events_of(user_id)] == ["A", "B"]
+    offset = await async_session.get(OutboxOffset, slow.name)
+    assert (offset.locked_by, offset.lease_until) == (None, None)
+
+
+@pytest.mark.asyncio
+async def test_delivered_events_are_purged_in_batches(async_session, sessions, owner):
+    user_id, _ = owner
+    for name in ("A", "B", "C"):
+        await CardCRUD.create(async_session, user_id=user_id, bank_name="X", type="debit", card_name=name, alias=None)
+    sink = RecordingSink()
+    relay = OutboxRelay([sink], sessions, batch_size=2)
+    await _relay_all(relay)
+    # only this test's sink counts: offsets left by other tests would hold the purge back
+    await async_session.execute(delete(OutboxOffset).where(OutboxOffset.sink != sink.name))
+    await async_session.commit()
+
+    assert await relay.purge() >= 3
+    remaining = await async_session.execute(select(OutboxEvent.id).where(OutboxEvent.user_id == user_id))
+    assert remaining.all() == []
+
+
+@pytest.mark.asyncio
+async def test_file_and_notify_sinks(tmp_path, test_database_url, sessions):
+    events = [
+        {"id": 1, "user_id": 7, "type": "card.created", "data": {"id": 3}, "created_at": "2026-01-01T00:00:00Z"},
+        {"id": 2, "user_id": 7, "type": "card.deleted", "data": {"id": 3}, "created_at": "2026-01-01T00:00:01Z"},
+    ]
+    file_sink = FileSink(tmp_path)
+    await file_sink.deliver(events[:1])
+    await file_sink.deliver(events[1:])
+    (path,) = tmp_path.glob("outbox-*.ndjson")
+    assert [orjson.loads(line) for line in path.read_bytes().splitlines()] == events
+
+    received: asyncio.Queue = asyncio.Queue()
+    dsn = make_url(test_database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+    listener = await asyncpg.connect(dsn)
+    try:
+        await listener.add_listener("outbox_test", lambda *args: received.put_nowait(args[3]))
+        await NotifySink(sessions, "outbox_test").deliver(events)
+        assert [orjson.loads(await asyncio.wait_for(received.get(), 5)) for _ in events] == events
+    finally:
+        await listener.close()
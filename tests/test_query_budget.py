@@ -0,0 +1,72 @@
+import pytest
+from decimal import Decimal
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from app.core.security import create_access_token
+from app.crud.card import CardCRUD
+from app.crud.transaction import TransactionCRUD
+from app.crud.user import UserCRUD
+from app.db.instrumentation import _explain, track_queries
+
+
+@pytest.mark.asyncio
+async def test_health_issues_no_statements(client):
+    with track_queries() as stats:
+        res = await client.get("/health")
+    assert res.status_code == 200
+    assert stats.count == 0
+
+
+@pytest.mark.asyncio
+async def test_transfer_endpoints_statement_budget(client, async_session):
+    user = await UserCRUD.create(
+        async_session,
+        name="QB",
+        phone="5552001",
+        telegram_id=None,
+        email="qb@example.com",
+        password="secret",
+    )
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    src = await CardCRUD.create(async_session, user_id=user.id, bank_name="X", type="debit", card_name="A", alias=None)
+    dst = await CardCRUD.create(async_session, user_id=user.id, bank_name="X", type="debit", card_name="B", alias=None)
+    await TransactionCRUD.create(
+        async_session,
+        user_id=user.id,
+        card_id=src.id,
+        description="seed",
+        income=Decimal("50.00"),
+        expenses=Decimal("0.00"),
+        executed=True,
+    )
+
+    payload = {"source_card_id": src.id, "destination_card_id": dst.id, "amount": "10.00"}
+    with track_queries() as stats:
+        res = await client.post("/transfers", json=payload, headers=headers)
+    assert res.status_code == 201, res.text
+    assert stats.count <= 10, stats.statements
+
+    transfer_id = res.json()["source_transaction"]["transfer_id"]
+    with track_queries() as stats:
+        res = await client.patch(f"/transfers/{transfer_id}", params={"description": "renamed"}, headers=headers)
+    assert res.status_code == 200, res.text
+    assert stats.count <= 6, stats.statements
+
+
+@pytest.mark.asyncio
+async def test_explain_keeps_the_transaction_usable(async_session):
+    conn = await async_session.connection()
+    await conn.execute(text("SELECT 1"))
+
+    plan = await conn.run_sync(lambda sync: _explain(sync, "SELECT 1", ()))
+    assert plan[0]["Plan"]
+    assert await conn.run_sync(lambda sync: _explain(sync, "SELECT 1/0", ())) is None
+    for statement in ("SELECT id FROM users FOR UPDATE NOWAIT", "SELECT pg_advisory_xact_lock(1)"):
+        assert await conn.run_sync(lambda sync: _explain(sync, statement, ())) is None
+    # the failed EXPLAIN was rolled back to its savepoint
+    assert (await conn.execute(text("SELECT 2"))).scalar_one() == 2
+
+    with pytest.raises(DBAPIError):
+        await conn.execute(text("SELECT 1/0"))
+    assert conn.info.get("query_start_time") == []
+    await async_session.rollback()
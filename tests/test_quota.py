@@ -0,0 +1,141 @@
+import itertools
+import sys
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core.config import get_settings
+from app.core.security import create_access_token
+from app.crud.attachment import AttachmentCRUD
+from app.crud.card import CardCRUD
+from app.crud.storage_usage import QuotaExceededError, StorageUsageCRUD
+from app.crud.transaction import TransactionCRUD
+from app.crud.user import UserCRUD
+from app.db.models import OutboxEvent, StorageUsage, Tombstone
+from app.storage import get_storage
+
+KB = 1024
+_phones = itertools.count(5550601)
+
+
+@pytest.fixture()
+def upload_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_dir", str(tmp_path))
+    monkeypatch.setattr(get_settings(), "upload_max_mb", 1)
+    monkeypatch.setattr(get_settings(), "upload_quota_mb", 1)
+    monkeypatch.setattr(get_settings(), "thumbnails_enabled", False)
+    get_storage.cache_clear()
+    yield tmp_path
+    get_storage.cache_clear()
+
+
+async def _user_with_card(async_session):
+    phone = str(next(_phones))
+    user = await UserCRUD.create(
+        async_session, name="QT", phone=phone, telegram_id=None, email=f"{phone}@example.com", password="secret"
+    )
+    card = await CardCRUD.create(async_session, user_id=user.id, bank_name="X", type="debit", card_name="A", alias=None)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    return user, card, headers
+
+
+async def _upload(client, card, headers, content: bytes):
+    return await client.post(
+        "/uploads/transactions",
+        data={"description": "ticket", "card_id": str(card.id)},
+        files={"file": ("ticket.png", content, "image/png")},
+        headers=headers,
+    )
+
+
+@pytest.mark.asyncio
+async def test_usage_counter_follows_uploads_and_deletes(client, async_session, upload_root):
+    user, card, headers = await _user_with_card(async_session)
+
+    first = await _upload(client, card, headers, b"a" * 100 * KB)
+    await _upload(client, card, headers, b"b" * 50 * KB)
+    res = await client.get("/uploads/usage", headers=headers)
+    assert res.json() == {"used_bytes": 150 * KB, "quota_bytes": 1024 * KB}
+
+    await client.delete(f"/uploads/attachments/{first.json()['attachment_id']}", headers=headers)
+    assert (await client.get("/uploads/usage", headers=headers)).json()["used_bytes"] == 50 * KB
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "size",
+    [
+        300 * KB,  # Content-Length over the remaining quota: refused before reading the body
+        200 * KB + 10 * KB,  # within the multipart margin: refused while spooling
+    ],
+)
+async def test_upload_over_quota_is_rejected_without_side_effects(client, async_session, upload_root, size):
+    user, card, headers = await _user_with_card(async_session)
+    await StorageUsageCRUD.add(async_session, user.id, 824 * KB)  # 200 KB left
+    await async_session.commit()
+
+    res = await _upload(client, card, headers, b"x" * size)
+
+    assert res.status_code == 413
+    assert res.json()["detail"] == "Cuota de almacenamiento excedida. Disponible: 0.2MB."
+    assert await TransactionCRUD.list_by_user(async_session, user.id) == []
+    assert [p for p in upload_root.rglob("*") if p.is_file()] == []
+    assert await StorageUsageCRUD.get_used(async_session, user.id) == 824 * KB
+
+
+@pytest.mark.asyncio
+async def test_conditional_increment_and_rebuild(async_session):
+    user, _, _ = await _user_with_card(async_session)
+    user_id = user.id  # the rollback below expires ``user``
+    await AttachmentCRUD.create(
+        async_session, user_id=user_id, filename="a.pdf", path="a.pdf", content_type="application/pdf",
+        size=600, transaction_id=None, transfer_id=None, quota=1000,
+    )
+    with pytest.raises(QuotaExceededError):
+        await AttachmentCRUD.create(
+            async_session, user_id=user_id, filename="b.pdf", path="b.pdf", content_type="application/pdf",
+            size=600, transaction_id=None, transfer_id=None, quota=1000,
+        )
+    await async_session.rollback()
+    assert await StorageUsageCRUD.get_used(async_session, user_id) == 600
+
+    await async_session.execute(update(StorageUsage).where(StorageUsage.user_id == user_id).values(bytes_used=7))
+    await async_session.commit()
+    assert await StorageUsageCRUD.rebuild(async_session, user_id) == 1
+    assert await StorageUsageCRUD.get_used(async_session, user_id) == 600
+
+
+@pytest.mark.asyncio
+async def test_quota_race_commits_no_transaction_or_event(client, async_session, upload_root, monkeypatch):
+    uploads = sys.modules["app.routers.uploads"]  # app.routers re-exports the router under this name
+
+    user, card, headers = await _user_with_card(async_session)
+    await StorageUsageCRUD.add(async_session, user.id, 1000 * KB)
+    await async_session.commit()
+
+    # as if a concurrent upload took the quota after the early checks passed
+    async def stale_budget(db, user_id):
+        return 1024 * KB, None
+
+    monkeypatch.setattr(uploads, "_upload_budget", stale_budget)
+    res = await _upload(client, card, headers, b"x" * 100 * KB)
+    assert res.status_code == 413
+
+    other = await CardCRUD.create(
+        async_session, user_id=user.id, bank_name="Y", type="debit", card_name="B", alias=None
+    )
+    res = await client.post(
+        "/uploads/transfers",
+        data={"source_card_id": str(card.id), "destination_card_id": str(other.id), "amount": "5.00"},
+        files={"file": ("ticket.png", b"x" * 100 * KB, "image/png")},
+        headers=headers,
+    )
+    assert res.status_code == 413
+
+    # nothing was ever committed: no rows, no events for SSE/sync/webhooks, no tombstones
+    assert await TransactionCRUD.list_by_user(async_session, user.id) == []
+    events = await async_session.execute(select(OutboxEvent.type).where(OutboxEvent.user_id == user.id))
+    assert set(events.scalars()) == {"card.created"}
+    tombstones = await async_session.execute(select(Tombstone.id).where(Tombstone.user_id == user.id))
+    assert tombstones.all() == []
+    assert [p for p in upload_root.rglob("*") if p.is_file()] == []
@@ -0,0 +1,51 @@
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.core.responses import ORJSONResponse
+from app.core.security import create_access_token
+from app.crud.card import CardCRUD
+from app.crud.transaction import TransactionCRUD
+from app.crud.user import UserCRUD
+from app.schemas.card import CardResponse
+from app.schemas.transaction import TransactionResponse
+
+
+def test_orjson_response_decimal_and_utc_datetime():
+    content = {"amount": Decimal("1.10"), "at": datetime(2025, 1, 1, tzinfo=timezone.utc)}
+    body = json.loads(ORJSONResponse(content).body)
+    assert body == {"amount": "1.10", "at": "2025-01-01T00:00:00Z"}
+
+
+@pytest.mark.asyncio
+async def test_list_transactions_fast_path(client, async_session):
+    user = await UserCRUD.create(
+        async_session, name="RS", phone="5553001", telegram_id=None, email="rs@example.com", password="secret"
+    )
+    card = await CardCRUD.create(async_session, user_id=user.id, bank_name="X", type="debit", card_name="A", alias=None)
+    tx = await TransactionCRUD.create(
+        async_session, user_id=user.id, card_id=card.id, description="d", income=Decimal("5.25"), expenses=Decimal("0")
+    )
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+    res = await client.get("/transactions", headers=headers)
+    assert res.status_code == 200
+    assert res.json() == [TransactionResponse.model_validate(tx).model_dump(mode="json")]
+
+
+@pytest.mark.asyncio
+async def test_list_cards_reads_plain_rows(client, async_session):
+    user = await UserCRUD.create(
+        async_session, name="RC", phone="5553002", telegram_id=None, email="rc@example.com", password="secret"
+    )
+    card = await CardCRUD.create(async_session, user_id=user.id, bank_name="X", type="debit", card_name="A", alias="a")
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+    rows = await CardCRUD.list_rows_by_user(async_session, user.id, ("id", "card_name"))
+    assert rows == [{"id": card.id, "card_name": "A"}]
+
+    res = await client.get("/cards", headers=headers)
+    assert res.status_code == 200
+    assert res.json() == [CardResponse.model_validate(card).model_dump(mode="json")]
@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import itertools
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select, text, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.security import create_access_token
+from app.crud.card import CardCRUD
+from app.crud.job import JobCRUD
+from app.crud.storage_usage import StorageUsageCRUD
+from app.crud.transaction import TransactionCRUD
+from app.crud.upload_session import UploadSessionBusyError, UploadSessionCRUD
+from app.crud.user import UserCRUD
+from app.db.models import UploadSession
+from app.jobs import JobWorker
+from app.services.resumable import session_path
+from app.storage import blob_key, get_storage
+
+KB = 1024
+_phones = itertools.count(5550801)
+PDF = b"%PDF-1.4 " + bytes(range(256)) * 200  # ~50 KB
+
+
+@pytest.fixture()
+def upload_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_dir", str(tmp_path))
+    monkeypatch.setattr(get_settings(), "upload_max_mb", 1)
+    monkeypatch.setattr(get_settings(), "thumbnails_enabled", False)
+    get_storage.cache_clear()
+    yield tmp_path
+    get_storage.cache_clear()
+
+
+@pytest.fixture()
+async def owner(async_session, upload_root):
+    phone = str(next(_phones))
+    user = await UserCRUD.create(
+        async_session, name="RU", phone=phone, telegram_id=None, email=f"{phone}@example.com", password="secret"
+    )
+    card = await CardCRUD.create(async_session, user_id=user.id, bank_name="X", type="debit", card_name="A", alias=None)
+    tx = await TransactionCRUD.create(
+        async_session, user_id=user.id, card_id=card.id, description="estado de cuenta", category_id=None,
+        income=Decimal("0.00"), expenses=Decimal("0.00"), executed=True,
+    )
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    return user, headers, tx.id
+
+
+async def _open(client, headers, transaction_id, *, filename="estado.pdf", length=len(PDF)):
+    return await client.post(
+        "/uploads/sessions",
+        json={
+            "filename": filename,
+            "content_type": "application/pdf",
+            "upload_length": length,
+            "transaction_id": transaction_id,
+        },
+        headers=headers,
+    )
+
+
+async def _patch(client, headers, session_id, offset, data):
+    return await client.patch(
+        f"/uploads/sessions/{session_id}",
+        content=data,
+        headers={**headers, "Upload-Offset": str(offset), "Content-Type": "application/offset+octet-stream"},
+    )
+
+
+@pytest.mark.asyncio
+async def test_resumable_upload_in_chunks(client, async_session, owner, upload_root):
+    user, headers, transaction_id = owner
+    res = await _open(client, headers, transaction_id)
+    assert res.status_code == 201, res.text
+    session_id = res.json()["id"]
+    assert res.headers["location"] == f"/uploads/sessions/{session_id}"
+
+    first, rest = PDF[: 20 * KB], PDF[20 * KB :]
+    res = await _patch(client, headers, session_id, 0, first)
+    assert res.status_code == 204
+    assert res.headers["upload-offset"] == str(len(first))
+
+    # a retried chunk at a stale offset is refused with the current one
+    res = await _patch(client, headers, session_id, 0, first)
+    assert res.status_code == 409
+    assert res.headers["upload-offset"] == str(len(first))
+
+    res = await client.post(f"/uploads/sessions/{session_id}/finalize", headers=headers)
+    assert res.status_code == 409
+
+    res = await client.head(f"/uploads/sessions/{session_id}", headers=headers)
+    assert (res.status_code, res.headers["upload-offset"]) == (200, str(len(first)))
+    assert (await _patch(client, headers, session_id, len(first), rest)).status_code == 204
+
+    res = await client.post(f"/uploads/sessions/{session_id}/finalize", headers=headers)
+    assert res.status_code == 200, res.text
+    body = res.json()
+    assert body["transaction_id"] == transaction_id
+    assert body["sha256"] == hashlib.sha256(PDF).hexdigest()
+    assert (upload_root / blob_key(body["sha256"])).read_bytes() == PDF
+    assert not session_path(upload_root, session_id).exists()
+    assert (await client.head(f"/uploads/sessions/{session_id}", headers=headers)).status_code == 404
+    assert await StorageUsageCRUD.get_used(async_session, user.id) == len(PDF)
+
+
+@pytest.mark.asyncio
+async def test_resumable_upload_limits(client, owner, upload_root):
+    _, headers, transaction_id = owner
+
+    assert (await _open(client, headers, transaction_id, filename="x.svg")).status_code == 415
+    assert (await _open(client, headers, transaction_id, length=2 * 1024 * KB)).status_code == 413
+    assert (await _open(client, headers, 999999999)).status_code == 404
+
+    session_id = (await _open(client, headers, transaction_id, length=10)).json()["id"]
+    res = await _patch(client, headers, session_id, 0, b"x" * 11)
+    assert res.status_code == 413
+    res = await client.head(f"/uploads/sessions/{session_id}", headers=headers)
+    assert res.headers["upload-offset"] == "0"
+
+    assert (await client.delete(f"/uploads/sessions/{session_id}", headers=headers)).status_code == 204
+    assert not session_path(upload_root, session_id).exists()
+
+
+@pytest.mark.asyncio
+async def test_expired_sessions_are_purged_by_the_job(client, async_session, owner, upload_root, test_engine):
+    _, headers, transaction_id = owner
+    session_id = (await _open(client, headers, transaction_id)).json()["id"]
+    await async_session.execute(
+        update(UploadSession)
+        .where(UploadSession.id == session_id)
+        .values(expires_at=datetime.now(timezone.utc) - timedelta(minutes=1))
+    )
+    await async_session.commit()
+    assert (await client.head(f"/uploads/sessions/{session_id}", headers=headers)).status_code == 404
+
+    # nothing else purges them while no new upload starts
+    job = await JobCRUD.enqueue(async_session, type="uploads.purge_sessions", payload={})
+    sessions = async_sessionmaker(bind=test_engine, expire_on_commit=False)
+    assert await JobWorker(sessions, types=["uploads.purge_sessions"]).run_once()
+    async with sessions() as db:
+        job = await JobCRUD.get(db, job.id)
+    assert job.status == "succeeded" and job.result["removed"] >= 1
+    assert not session_path(upload_root, session_id).exists()
+    assert await async_session.get(UploadSession, session_id) is None
+
+
+@pytest.mark.asyncio
+async def test_leased_session_is_reported_busy(client, async_session, owner, test_engine):
+    user, headers, transaction_id = owner
+    user_id = user.id
+    session_id = (await _open(client, headers, transaction_id)).json()["id"]
+
+    assert await UploadSessionCRUD.claim(async_session, user_id, session_id, "a", timedelta(minutes=1)) is not None
+    async with async_sessionmaker(bind=test_engine)() as other:
+        with pytest.raises(UploadSessionBusyError):
+            await UploadSessionCRUD.claim(other, user_id, session_id, "b", timedelta(minutes=1))
+    assert (await _patch(client, headers, session_id, 0, b"%PDF")).status_code == 423
+    assert (await client.delete(f"/uploads/sessions/{session_id}", headers=headers)).status_code == 423
+    await UploadSessionCRUD.release(async_session, session_id, "a")
+    assert (await _patch(client, headers, session_id, 0, b"%PDF")).status_code == 204
+
+
+@pytest.mark.asyncio
+async def test_slow_chunk_holds_a_renewed_lease_not_a_transaction(
+    client, async_session, owner, test_engine, monkeypatch
+):
+    _, headers, transaction_id = owner
+    monkeypatch.setattr(get_settings(), "upload_session_lease_seconds", 0.3)
+    await async_session.commit()  # only the request may show up in pg_stat_activity below
+    session_id = (await _open(client, headers, transaction_id)).json()["id"]
+    half = asyncio.Event()
+    resume = asyncio.Event()
+
+    async def slow_body():
+        yield PDF[: 10 * KB]
+        half.set()
+        await resume.wait()
+        yield PDF[10 * KB :]
+
+    sending = asyncio.create_task(
+        client.patch(
+            f"/uploads/sessions/{session_id}",
+            content=slow_body(),
+            headers={**headers, "Upload-Offset": "0", "Content-Type": "application/offset+octet-stream"},
+        )
+    )
+    await asyncio.wait_for(half.wait(), 5)
+    await asyncio.sleep(0.5)  # longer than the lease: it is being renewed
+
+    assert (await _patch(client, headers, session_id, 0, PDF)).status_code == 423
+    async with async_sessionmaker(bind=test_engine)() as other:
+        lease = await other.execute(select(UploadSession.locked_by).where(UploadSession.id == session_id))
+        assert lease.scalar_one() is not None
+        idle = await other.execute(
+            text(
+                "SELECT count(*), string_agg(query, ' | ') FROM pg_stat_activity "
+                "WHERE datname = current_database() AND state = 'idle in transaction'"
+            )
+        )
+        row = idle.one()
+        assert row[0] == 0, row[1]
+
+    resume.set()
+    res = await sending
+    assert res.status_code == 204, res.text
+    assert res.headers["upload-offset"] == str(len(PDF))
+    session = await async_session.get(UploadSession, session_id)
+    assert (session.locked_by, session.lease_until) == (None, None)
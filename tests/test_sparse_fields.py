@@ -0,0 +1,50 @@
+import pytest
+from decimal import Decimal
+from app.core.security import create_access_token
+from app.crud.card import CardCRUD
+from app.crud.transaction import TransactionCRUD
+from app.crud.user import UserCRUD
+from app.db.instrumentation import track_queries
+
+
+@pytest.mark.asyncio
+async def test_list_fields_are_pushed_into_select(client, async_session):
+    user = await UserCRUD.create(
+        async_session, name="SF", phone="5554001", telegram_id=None, email="sf@example.com", password="secret"
+    )
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    src = await CardCRUD.create(async_session, user_id=user.id, bank_name="X", type="debit", card_name="A", alias=None)
+    dst = await CardCRUD.create(async_session, user_id=user.id, bank_name="X", type="debit", card_name="B", alias=None)
+    await TransactionCRUD.create(
+        async_session, user_id=user.id, card_id=src.id, description="seed", income=Decimal("20.00"), expenses=Decimal("0")
+    )
+
+    with track_queries() as stats:
+        res = await client.get("/transactions", params={"fields": "expenses, description,created_at"}, headers=headers)
+    assert res.status_code == 200
+    # allow-list order, not request order
+    assert list(res.json()[0]) == ["description", "expenses", "created_at"]
+    listing = [sql for sql in stats.statements if "FROM transactions" in sql]
+    assert listing and "updated_at" not in listing[0] and "transfer_id" not in listing[0]
+
+    res = await client.get("/cards", params={"fields": "id,card_name"}, headers=headers)
+    assert sorted(res.json(), key=lambda c: c["id"]) == [{"id": src.id, "card_name": "A"}, {"id": dst.id, "card_name": "B"}]
+
+    payload = {"source_card_id": src.id, "destination_card_id": dst.id, "amount": "5.00"}
+    assert (await client.post("/transfers", json=payload, headers=headers)).status_code == 201
+    res = await client.get("/transfers", params={"fields": "card_id"}, headers=headers)
+    assert res.json() == [{"source_transaction": {"card_id": src.id}, "destination_transaction": {"card_id": dst.id}}]
+
+
+@pytest.mark.asyncio
+async def test_unknown_fields_are_rejected(client, async_session):
+    user = await UserCRUD.create(
+        async_session, name="SF2", phone="5554002", telegram_id=None, email="sf2@example.com", password="secret"
+    )
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+    res = await client.get("/transactions", params={"fields": "description,password"}, headers=headers)
+    assert res.status_code == 400
+    assert "password" in res.json()["detail"]
+    res = await client.get("/uploads/attachments", params={"fields": "user_id"}, headers=headers)
+    assert res.status_code == 400
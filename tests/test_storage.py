@@ -0,0 +1,178 @@
+import hashlib
+import socket
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import get_settings
+from app.crud.attachment import AttachmentCRUD
+from app.crud.user import UserCRUD
+from app.db.models import Attachment
+from app.storage import LocalStorage, blob_key
+from app.storage.migrate import migrate
+
+
+async def _read(storage, key, start=0, end=None) -> bytes:
+    return b"".join([chunk async for chunk in storage.open(key, start, end)])
+
+
+def _staged(tmp_path, content: bytes, name: str = "upload.part"):
+    src = tmp_path / name
+    src.write_bytes(content)
+    return src
+
+
+@pytest.mark.asyncio
+async def test_local_storage_roundtrip(tmp_path):
+    storage = LocalStorage(tmp_path / "blobs")
+    key = blob_key(hashlib.sha256(b"hola").hexdigest())
+
+    assert await storage.put_file(key, _staged(tmp_path, b"hola")) is True
+    assert await storage.put_file(key, _staged(tmp_path, b"hola")) is False  # duplicate: temp file dropped
+    assert not (tmp_path / "upload.part").exists()
+    assert (await storage.stat(key)).size == 4
+    assert await _read(storage, key, 1, 2) == b"ol"
+    assert [k async for k in storage.iter_keys()] == [key]
+
+    await storage.delete(key)
+    assert await storage.stat(key) is None
+    with pytest.raises(ValueError):
+        storage.local_path("../outside")
+
+
+@pytest.mark.asyncio
+async def test_local_storage_lists_large_directories_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.storage.local.SCAN_CHUNK", 3)
+    root = tmp_path / "blobs"
+    (root / "ab" / "cd").mkdir(parents=True)
+    (root / ".staging").mkdir()
+    (root / ".staging" / "upload.part").write_bytes(b"x")
+    legacy = [f"legacy-{i}" for i in range(7)]
+    for name in legacy:
+        (root / name).write_bytes(b"x")
+    (root / "ab" / "cd" / "blob").write_bytes(b"x")
+    storage = LocalStorage(root)
+
+    assert sorted([k async for k in storage.iter_keys()]) == sorted(legacy + ["ab/cd/blob"])
+
+    keys = storage.iter_keys()
+    assert (await keys.__anext__()).startswith("legacy-")  # the root is listed before its subdirectories
+    await keys.aclose()  # stopping early closes the open scandir
+
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    pytest.importorskip("aiobotocore")
+    server_mod = pytest.importorskip("moto.server")
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = server_mod.ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.stop()
+
+
+@pytest.fixture()
+async def s3_storage(s3_endpoint):
+    from app.storage.s3 import S3Storage
+
+    storage = S3Storage(
+        "attachments",
+        prefix="test",
+        endpoint_url=s3_endpoint,
+        region="us-east-1",
+        access_key_id="testing",
+        secret_access_key="testing",
+        multipart_threshold=5 * 1024 * 1024,
+        part_size=5 * 1024 * 1024,
+    )
+    client = await storage._get_client()
+    try:
+        await client.create_bucket(Bucket="attachments")
+    except client.exceptions.BucketAlreadyOwnedByYou:
+        pass
+    yield storage
+    async for key in storage.iter_keys():
+        await storage.delete(key)
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_s3_storage_roundtrip_and_multipart(tmp_path, s3_storage):
+    small = b"recibo"
+    assert await s3_storage.put_file("ab/cd/small", _staged(tmp_path, small)) is True
+    assert await s3_storage.put_file("ab/cd/small", _staged(tmp_path, small)) is False
+    assert await _read(s3_storage, "ab/cd/small", 2, 4) == b"cib"
+
+    big = bytes(range(256)) * (24 * 1024)  # 6 MiB -> two parts
+    assert await s3_storage.put_file("ef/gh/big", _staged(tmp_path, big, "big.part")) is True
+    assert (await s3_storage.stat("ef/gh/big")).size == len(big)
+    assert await _read(s3_storage, "ef/gh/big") == big
+    assert sorted([k async for k in s3_storage.iter_keys()]) == ["ab/cd/small", "ef/gh/big"]
+
+    await s3_storage.rename("ab/cd/small", ".quarantine/ab/cd/small")
+    assert await s3_storage.stat("ab/cd/small") is None
+    assert await _read(s3_storage, ".quarantine/ab/cd/small") == small
+    await s3_storage.delete(".quarantine/ab/cd/small")
+
+
+@pytest.mark.asyncio
+async def test_migrate_local_to_s3_with_rekey(tmp_path, monkeypatch, test_engine, async_session, s3_storage):
+    monkeypatch.setattr(get_settings(), "upload_dir", str(tmp_path))
+    local = LocalStorage(tmp_path)
+    content = b"estado de cuenta"
+    digest = hashlib.sha256(content).hexdigest()
+    (tmp_path / "legacy.pdf").write_bytes(content)
+    user = await UserCRUD.create(
+        async_session, name="MG", phone="5556001", telegram_id=None, email="mg@example.com", password="secret"
+    )
+    att = await AttachmentCRUD.create(
+        async_session, user_id=user.id, filename="e.pdf", path="legacy.pdf", content_type="application/pdf",
+        size=len(content), transaction_id=None, transfer_id=None, sha256=digest,
+    )
+
+    stats = await migrate(
+        local, s3_storage, rekey=True, delete_source=True,
+        session_factory=async_sessionmaker(bind=test_engine, expire_on_commit=False),
+    )
+
+    assert (stats.copied, stats.rekeyed, stats.deleted) == (1, 1, 1)
+    assert await _read(s3_storage, blob_key(digest)) == content
+    assert not (tmp_path / "legacy.pdf").exists()
+    path = (await async_session.execute(select(Attachment.path).where(Attachment.id == att.id))).scalar_one()
+    assert path == blob_key(digest)
+
+
+@pytest.mark.asyncio
+async def test_uploads_use_configured_backend(tmp_path, monkeypatch, client, async_session, s3_storage):
+    from app.core.security import create_access_token
+    from app.crud.card import CardCRUD
+    from app.main import app
+    from app.storage import get_storage
+
+    monkeypatch.setattr(get_settings(), "upload_dir", str(tmp_path))
+    app.dependency_overrides[get_storage] = lambda: s3_storage
+    user = await UserCRUD.create(
+        async_session, name="S3", phone="5556002", telegram_id=None, email="s3@example.com", password="secret"
+    )
+    card = await CardCRUD.create(async_session, user_id=user.id, bank_name="X", type="debit", card_name="A", alias=None)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    content = b"%PDF-1.4 remoto"
+
+    res = await client.post(
+        "/uploads/transactions",
+        data={"description": "remoto", "card_id": str(card.id)},
+        files={"file": ("r.pdf", content, "application/pdf")},
+        headers=headers,
+    )
+    assert res.status_code == 200, res.text
+    key = blob_key(hashlib.sha256(content).hexdigest())
+    assert res.json()["stored_as"] == key
+    assert [p for p in tmp_path.rglob("*") if p.is_file()] == []
+
+    res = await client.get(f"/uploads/attachments/{res.json()['attachment_id']}/download", headers=headers)
+    assert res.status_code == 200
+    assert res.content == content
+    assert res.headers["content-length"] == str(len(content))
@@ -0,0 +1,101 @@
+import itertools
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.security import create_access_token
+from app.crud.card import CardCRUD
+from app.crud.transaction import TransactionCRUD
+from app.crud.user import UserCRUD
+from app.services.sync import SyncCursor, encode_cursor
+
+_phones = itertools.count(5551301)
+
+
+@pytest.fixture(autouse=True)
+def no_settle(monkeypatch):
+    monkeypatch.setattr(get_settings(), "sync_settle_seconds", 0)
+
+
+@pytest.fixture()
+async def owner(async_session):
+    phone = str(next(_phones))
+    user = await UserCRUD.create(
+        async_session, name="SY", phone=phone, telegram_id=None, email=f"{phone}@example.com", password="secret"
+    )
+    debit = await CardCRUD.create(async_session, user_id=user.id, bank_name="X", type="debit", card_name="A", alias=None)
+    credit = await CardCRUD.create(async_session, user_id=user.id, bank_name="Y", type="credit", card_name="B", alias=None)
+    ids = []
+    for i in range(3):
+        tx = await TransactionCRUD.create(
+            async_session, user.id, card_id=debit.id, description=f"gasto {i}", category_id=None,
+            income=Decimal("10.00"), expenses=Decimal("0.00"), executed=True,
+        )
+        ids.append(tx.id)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    return headers, debit.id, credit.id, ids
+
+
+async def _sync_all(client, headers, cursor=None, limit=500):
+    cards, transactions, tombstones, pages = [], [], [], 0
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        res = await client.get("/sync", params=params, headers=headers)
+        assert res.status_code == 200, res.text
+        body = res.json()
+        cards += body["cards"]
+        transactions += body["transactions"]
+        tombstones += body["tombstones"]
+        cursor = body["cursor"]
+        pages += 1
+        if not body["has_more"]:
+            return cards, transactions, tombstones, cursor, pages
+
+
+@pytest.mark.asyncio
+async def test_first_sync_is_a_paginated_snapshot_then_only_deltas(client, owner):
+    headers, debit_id, credit_id, (first, second, third) = owner
+
+    cards, transactions, tombstones, cursor, pages = await _sync_all(client, headers, limit=2)
+    assert pages == 2
+    assert sorted(card["id"] for card in cards) == [debit_id, credit_id]
+    assert sorted(tx["id"] for tx in transactions) == [first, second, third]
+    assert tombstones == []
+
+    # nothing changed: an empty page, and the cursor still moves up to the horizon
+    assert (await _sync_all(client, headers, cursor))[:3] == ([], [], [])
+
+    assert (await client.patch(f"/transactions/{first}", json={"description": "editado"}, headers=headers)).status_code == 200
+    assert (await client.delete(f"/transactions/{second}", headers=headers)).status_code == 204
+    res = await client.post(
+        "/transfers", json={"source_card_id": debit_id, "destination_card_id": credit_id, "amount": "5.00"}, headers=headers
+    )
+    transfer_id = res.json()["source_transaction"]["transfer_id"]
+
+    cards, transactions, tombstones, cursor, _ = await _sync_all(client, headers, cursor)
+    assert cards == []
+    assert [tx["id"] for tx in transactions][0] == first
+    assert transactions[0]["description"] == "editado"
+    assert {tx["transfer_id"] for tx in transactions[1:]} == {transfer_id}
+    assert [(t["entity"], t["id"]) for t in tombstones] == [("transaction", second)]
+
+    assert (await client.delete(f"/transfers/{transfer_id}", headers=headers)).status_code == 204
+    assert (await client.delete(f"/cards/{credit_id}", headers=headers)).status_code == 202
+    cards, transactions, tombstones, _, _ = await _sync_all(client, headers, cursor)
+    assert (cards, transactions) == ([], [])
+    assert sorted(t["entity"] for t in tombstones) == ["card", "transaction", "transaction"]
+    assert ("card", credit_id) in {(t["entity"], t["id"]) for t in tombstones}
+
+
+@pytest.mark.asyncio
+async def test_bad_and_expired_cursors(client, owner):
+    headers = owner[0]
+    res = await client.get("/sync", params={"cursor": "no-es-un-cursor"}, headers=headers)
+    assert res.status_code == 400
+
+    old = datetime.now(timezone.utc) - timedelta(days=get_settings().sync_tombstone_retention_days + 1)
+    expired = encode_cursor(SyncCursor(cards=(old, 0), transactions=(old, 0), tombstones=(old, 0)))
+    res = await client.get("/sync", params={"cursor": expired}, headers=headers)
+    assert res.status_code == 410
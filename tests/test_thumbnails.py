@@ -0,0 +1,95 @@
+import hashlib
+import io
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.security import create_access_token
+from app.crud.card import CardCRUD
+from app.crud.user import UserCRUD
+from app.storage import blob_key, get_storage, thumbnail_key
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture()
+def upload_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_dir", str(tmp_path))
+    monkeypatch.setattr(get_settings(), "thumbnail_max_px", 64)
+    get_storage.cache_clear()
+    yield tmp_path
+    get_storage.cache_clear()
+
+
+async def _upload(client, async_session, phone: str, name: str, content: bytes, content_type: str):
+    user = await UserCRUD.create(
+        async_session, name="TH", phone=phone, telegram_id=None, email=f"{phone}@example.com", password="secret"
+    )
+    card = await CardCRUD.create(async_session, user_id=user.id, bank_name="X", type="debit", card_name="A", alias=None)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    res = await client.post(
+        "/uploads/transactions",
+        data={"description": "ticket", "card_id": str(card.id)},
+        files={"file": (name, content, content_type)},
+        headers=headers,
+    )
+    assert res.status_code == 200, res.text
+    return res.json()["attachment_id"], headers
+
+
+def _png(width: int, height: int) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_image_thumbnail_generated_after_upload_and_lazily(client, async_session, upload_root):
+    content = _png(400, 200)
+    attachment_id, headers = await _upload(client, async_session, "5558001", "ticket.png", content, "image/png")
+    thumb = upload_root / thumbnail_key(blob_key(hashlib.sha256(content).hexdigest()), 64)
+    assert thumb.exists()  # rendered by the background task once the response was sent
+
+    res = await client.get(f"/uploads/attachments/{attachment_id}/thumbnail", headers=headers)
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "image/webp"
+    assert "immutable" in res.headers["cache-control"]
+    with Image.open(io.BytesIO(res.content)) as img:
+        assert (img.format, img.size) == ("WEBP", (64, 32))
+
+    thumb.unlink()
+    res = await client.get(f"/uploads/attachments/{attachment_id}/thumbnail", headers=headers)
+    assert res.status_code == 200
+    assert thumb.exists()
+
+    assert (await client.delete(f"/uploads/attachments/{attachment_id}", headers=headers)).status_code == 200
+    assert not thumb.exists()
+
+
+@pytest.mark.asyncio
+async def test_pdf_thumbnail_renders_first_page(client, async_session, upload_root):
+    pdfium = pytest.importorskip("pypdfium2")
+    pdf = pdfium.PdfDocument.new()
+    pdf.new_page(200, 400)
+    buf = io.BytesIO()
+    pdf.save(buf)
+    pdf.close()
+    attachment_id, headers = await _upload(
+        client, async_session, "5558002", "estado.pdf", buf.getvalue(), "application/pdf"
+    )
+
+    res = await client.get(f"/uploads/attachments/{attachment_id}/thumbnail", headers=headers)
+    assert res.status_code == 200
+    with Image.open(io.BytesIO(res.content)) as img:
+        assert img.size == (32, 64)
+
+
+@pytest.mark.asyncio
+async def test_unreadable_image_still_uploads_without_thumbnail(client, async_session, upload_root):
+    attachment_id, headers = await _upload(
+        client, async_session, "5558003", "roto.png", b"\x89PNG no es una imagen", "image/png"
+    )
+
+    res = await client.get(f"/uploads/attachments/{attachment_id}/thumbnail", headers=headers)
+    assert res.status_code == 404
+    assert res.json()["detail"] == "Vista previa no disponible"
@@ -53,3 +53,8 @@ async def test_transfer_happy_path(client, async_session):
     assert stx["transfer_id"] == dtx["transfer_id"]
     assert Decimal(str(stx["expenses"])) == Decimal("100.00")
     assert Decimal(str(dtx["income"])) == Decimal("100.00")
+
+    # The list endpoint reads plain rows; it must return the same pair
+    res = await client.get("/transfers", headers=headers)
+    assert res.status_code == 200
+    assert res.json() == [body]
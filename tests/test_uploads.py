@@ -0,0 +1,121 @@
+import hashlib
+from pathlib import Path
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.security import create_access_token
+from app.crud.attachment import AttachmentCRUD
+from app.crud.card import CardCRUD
+from app.crud.transaction import TransactionCRUD
+from app.crud.user import UserCRUD
+from app.services.storage import INCOMING_DIR
+from app.storage import get_storage
+from app.storage.hashes import backfill_hashes
+
+
+@pytest.fixture()
+def upload_root(tmp_path, monkeypatch) -> Path:
+    monkeypatch.setattr(get_settings(), "upload_dir", str(tmp_path))
+    monkeypatch.setattr(get_settings(), "upload_max_mb", 1)
+    get_storage.cache_clear()
+    yield tmp_path
+    get_storage.cache_clear()
+
+
+async def _user_with_card(async_session, phone: str):
+    user = await UserCRUD.create(
+        async_session, name="UP", phone=phone, telegram_id=None, email=f"{phone}@example.com", password="secret"
+    )
+    card = await CardCRUD.create(async_session, user_id=user.id, bank_name="X", type="debit", card_name="A", alias=None)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    return user, card, headers
+
+
+@pytest.mark.asyncio
+async def test_upload_is_streamed_hashed_and_moved_into_place(client, async_session, upload_root):
+    user, card, headers = await _user_with_card(async_session, "5555001")
+    content = b"\x89PNG" + b"x" * (300 * 1024)
+
+    res = await client.post(
+        "/uploads/transactions",
+        data={"description": "ticket", "card_id": str(card.id)},
+        files={"file": ("ticket.png", content, "image/png")},
+        headers=headers,
+    )
+    assert res.status_code == 200, res.text
+    body = res.json()
+    assert body["sha256"] == hashlib.sha256(content).hexdigest()
+    assert Path(body["stored_as"]).read_bytes() == content
+    assert list((upload_root / INCOMING_DIR).iterdir()) == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "size, phone",
+    [
+        (2 * 1024 * 1024, "5555002"),  # rejected while the body is received
+        (1024 * 1024 + 10 * 1024, "5555003"),  # within the multipart margin: rejected while spooling
+    ],
+)
+async def test_oversized_upload_is_rejected_without_side_effects(client, async_session, upload_root, size, phone):
+    user, card, headers = await _user_with_card(async_session, phone)
+
+    res = await client.post(
+        "/uploads/transactions",
+        data={"description": "big", "card_id": str(card.id)},
+        files={"file": ("big.png", b"x" * size, "image/png")},
+        headers=headers,
+    )
+    assert res.status_code == 413
+    assert await TransactionCRUD.list_by_user(async_session, user.id) == []
+    assert [p for p in upload_root.rglob("*") if p.is_file()] == []
+
+
+@pytest.mark.asyncio
+async def test_identical_uploads_share_one_blob_until_last_delete(client, async_session, upload_root):
+    user, card, headers = await _user_with_card(async_session, "5555004")
+    content = b"%PDF-1.4 estado de cuenta"
+    ids = []
+    for _ in range(2):
+        res = await client.post(
+            "/uploads/transactions",
+            data={"description": "estado", "card_id": str(card.id)},
+            files={"file": ("estado.pdf", content, "application/pdf")},
+            headers=headers,
+        )
+        assert res.status_code == 200, res.text
+        ids.append(res.json()["attachment_id"])
+
+    digest = hashlib.sha256(content).hexdigest()
+    blob = upload_root / digest[:2] / digest[2:4] / digest
+    assert [p for p in upload_root.rglob("*") if p.is_file()] == [blob]
+
+    assert (await client.delete(f"/uploads/attachments/{ids[0]}", headers=headers)).status_code == 200
+    assert blob.exists()
+    assert (await client.delete(f"/uploads/attachments/{ids[1]}", headers=headers)).status_code == 200
+    assert not blob.exists()
+
+
+@pytest.mark.asyncio
+async def test_legacy_attachments_get_their_hash_backfilled(async_session, test_engine, upload_root):
+    user, card, _ = await _user_with_card(async_session, "5555005")
+    legacy = [b"ticket antiguo %d" % i for i in range(3)]
+    ids = []
+    for i, content in enumerate(legacy):
+        (upload_root / f"legacy-{user.id}-{i}.pdf").write_bytes(content)
+        att = await AttachmentCRUD.create(
+            async_session, user_id=user.id, filename="t.pdf", path=f"legacy-{user.id}-{i}.pdf",
+            content_type="application/pdf", size=len(content), transaction_id=None, transfer_id=None,
+        )
+        ids.append(att.id)
+    (upload_root / f"legacy-{user.id}-2.pdf").unlink()  # a missing blob stays NULL
+
+    sessions = async_sessionmaker(bind=test_engine, expire_on_commit=False)
+    stats = await backfill_hashes(get_storage(), batch_size=2, session_factory=sessions)
+    assert stats.hashed >= 2
+
+    async with sessions() as db:
+        hashes = [(await AttachmentCRUD.get_by_id(db, user.id, id)).sha256 for id in ids]
+    assert hashes == [hashlib.sha256(legacy[0]).hexdigest(), hashlib.sha256(legacy[1]).hexdigest(), None]
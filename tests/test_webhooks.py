@@ -0,0 +1,303 @@
+import asyncio
+import itertools
+from decimal import Decimal
+
+import orjson
+import pytest
+import uvicorn
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+
+from app.core.config import get_settings
+from app.core.security import create_access_token
+from app.crud.card import CardCRUD
+from app.crud.transaction import TransactionCRUD
+from app.crud.user import UserCRUD
+from app.db.models import WebhookDelivery, WebhookSubscription
+from app.outbox import OutboxRelay
+from app.webhooks import SIGNATURE_HEADER, TIMESTAMP_HEADER, WebhookDispatcher, WebhookSink, verify
+
+_phones = itertools.count(5551501)
+
+
+class Partner:
+    """Local stand-in for a partner endpoint: records requests, can fail or stall."""
+
+    def __init__(self) -> None:
+        self.requests: list[tuple[dict, bytes]] = []
+        self.status = 200
+        self.delay = 0.0
+        self.url = ""
+
+        async def receive(request):
+            body = await request.body()
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            self.requests.append((dict(request.headers), body))
+            return Response(status_code=self.status)
+
+        self.app = Starlette(routes=[Route("/hook", receive, methods=["POST"])])
+
+    def batches(self) -> list[list[dict]]:
+        return [orjson.loads(body)["events"] for _, body in self.requests]
+
+
+@pytest.fixture()
+async def partner():
+    stand_in = Partner()
+    server = uvicorn.Server(uvicorn.Config(stand_in.app, host="127.0.0.1", port=0, log_level="warning", lifespan="off"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    stand_in.url = f"http://127.0.0.1:{port}/hook"
+    yield stand_in
+    server.should_exit = True
+    await task
+
+
+@pytest.fixture()
+def sessions(test_engine):
+    return async_sessionmaker(bind=test_engine, expire_on_commit=False)
+
+
+async def _new_user(async_session):
+    phone = str(next(_phones))
+    user = await UserCRUD.create(
+        async_session, name="WH", phone=phone, telegram_id=None, email=f"{phone}@example.com", password="secret"
+    )
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    return user.id, headers
+
+
+@pytest.fixture()
+async def owner(async_session, monkeypatch):
+    # the partner stand-in listens on 127.0.0.1
+    monkeypatch.setattr(get_settings(), "webhooks_allow_private_targets", True)
+    # dispatchers lease any endpoint with pending events: start every test without leftovers
+    await async_session.execute(delete(WebhookSubscription))
+    await async_session.commit()
+    return await _new_user(async_session)
+
+
+async def _subscribe(client, headers, url, **extra):
+    res = await client.post("/webhooks", json={"url": url, **extra}, headers=headers)
+    assert res.status_code == 201, res.text
+    return res.json()
+
+
+async def _write_events(client, async_session, user_id, headers):
+    """A ``transaction.created`` and a ``transfer.created`` event (plus card events nobody subscribes to)."""
+    debit = await CardCRUD.create(
+        async_session, user_id=user_id, bank_name="X", type="debit", card_name="A", alias=None
+    )
+    credit = await CardCRUD.create(
+        async_session, user_id=user_id, bank_name="Y", type="credit", card_name="B", alias=None
+    )
+    await TransactionCRUD.create(
+        async_session, user_id, card_id=debit.id, description="nómina", income=Decimal("100.00"),
+        expenses=Decimal("0.00"), executed=True,
+    )
+    res = await client.post(
+        "/transfers", json={"source_card_id": debit.id, "destination_card_id": credit.id, "amount": "30.00"},
+        headers=headers,
+    )
+    assert res.status_code == 201, res.text
+
+
+async def _queue(sessions):
+    relay = OutboxRelay([WebhookSink(sessions)], sessions)
+    while await relay.run_once():
+        pass
+
+
+async def _pending(sessions, subscription_id):
+    async with sessions() as db:
+        res = await db.execute(select(WebhookDelivery).where(WebhookDelivery.subscription_id == subscription_id))
+        return list(res.scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_events_are_delivered_in_one_signed_batch(client, async_session, sessions, owner, partner):
+    user_id, headers = owner
+    created = await _subscribe(client, headers, partner.url)
+    await _write_events(client, async_session, user_id, headers)
+    await _queue(sessions)
+
+    dispatcher = WebhookDispatcher(sessions, concurrency=1, allow_private=True)
+    try:
+        assert await dispatcher.run_once() is True
+        assert await dispatcher.run_once() is False
+    finally:
+        await dispatcher.stop()
+
+    assert len(partner.requests) == 1
+    request_headers, body = partner.requests[0]
+    timestamp, signature = request_headers[TIMESTAMP_HEADER.lower()], request_headers[SIGNATURE_HEADER.lower()]
+    assert verify(created["secret"], timestamp, body, signature)
+    assert not verify("otro", timestamp, body, signature)
+    events = partner.batches()[0]
+    assert [event["type"] for event in events] == ["transaction.created", "transfer.created"]
+    assert events[0]["id"] < events[1]["id"]
+    assert all(event["user_id"] == user_id for event in events)
+    assert await _pending(sessions, created["id"]) == []
+
+
+@pytest.mark.asyncio
+async def test_failing_endpoint_backs_off_opens_its_circuit_and_probes(client, async_session, sessions, owner, partner):
+    user_id, headers = owner
+    created = await _subscribe(client, headers, partner.url)
+    await _write_events(client, async_session, user_id, headers)
+    await _queue(sessions)
+    partner.status = 500
+
+    dispatcher = WebhookDispatcher(
+        sessions, concurrency=1, max_attempts=10, retry_base=0.2, retry_max=0.2, failure_threshold=2, cooldown=0.5,
+        allow_private=True,
+    )
+    try:
+        assert await dispatcher.run_once() is True
+        assert await dispatcher.run_once() is False  # backing off
+        await asyncio.sleep(0.25)
+        assert await dispatcher.run_once() is True  # second failure opens the circuit
+        await asyncio.sleep(0.25)
+        assert await dispatcher.run_once() is False  # open: cooling down
+
+        res = await client.get("/webhooks", headers=headers)
+        (listed,) = res.json()
+        assert listed["failures"] == 2 and listed["retry_at"] is not None
+        assert "secret" not in listed
+
+        partner.status = 200
+        await asyncio.sleep(0.3)
+        assert await dispatcher.run_once() is True  # half-open: one event probes the endpoint
+        assert await dispatcher.run_once() is True  # closed again: the rest in one batch
+    finally:
+        await dispatcher.stop()
+
+    assert [len(batch) for batch in partner.batches()] == [2, 2, 1, 1]
+    assert [event["type"] for batch in partner.batches()[2:] for event in batch] == [
+        "transaction.created", "transfer.created"
+    ]
+    assert await _pending(sessions, created["id"]) == []
+
+
+@pytest.mark.asyncio
+async def test_exhausted_events_are_dead_lettered_and_redelivered(client, async_session, sessions, owner, partner):
+    user_id, headers = owner
+    created = await _subscribe(client, headers, partner.url, events=["transfer.created"])
+    await _write_events(client, async_session, user_id, headers)
+    await _queue(sessions)
+    partner.status = 503
+
+    dispatcher = WebhookDispatcher(
+        sessions, concurrency=1, max_attempts=2, retry_base=0.01, retry_max=0.01, allow_private=True
+    )
+    try:
+        assert await dispatcher.run_once() is True
+        await asyncio.sleep(0.02)
+        assert await dispatcher.run_once() is True
+        await asyncio.sleep(0.02)
+        assert await dispatcher.run_once() is False  # nothing left to send
+        assert await _pending(sessions, created["id"]) == []
+
+        res = await client.get(f"/webhooks/{created['id']}/dead-letters", headers=headers)
+        (dead,) = res.json()
+        assert dead["type"] == "transfer.created"
+        assert dead["attempts"] == 2 and dead["last_error"] == "HTTP 503"
+
+        partner.status = 200
+        res = await client.post(f"/webhooks/{created['id']}/dead-letters/redeliver", headers=headers)
+        assert res.json() == {"requeued": 1}
+        assert await dispatcher.run_once() is True
+    finally:
+        await dispatcher.stop()
+
+    assert [len(batch) for batch in partner.batches()] == [1, 1, 1]
+    assert partner.batches()[-1][0]["id"] == dead["event_id"]
+    res = await client.get(f"/webhooks/{created['id']}/dead-letters", headers=headers)
+    assert res.json() == []
+
+
+@pytest.mark.asyncio
+async def test_a_stalled_endpoint_times_out_as_a_failure(client, async_session, sessions, owner, partner):
+    user_id, headers = owner
+    created = await _subscribe(client, headers, partner.url)
+    await _write_events(client, async_session, user_id, headers)
+    await _queue(sessions)
+    partner.delay = 1.0
+
+    dispatcher = WebhookDispatcher(
+        sessions, concurrency=1, timeout=0.2, retry_base=60, retry_max=60, allow_private=True
+    )
+    try:
+        assert await dispatcher.run_once() is True
+    finally:
+        await dispatcher.stop()
+
+    deliveries = await _pending(sessions, created["id"])
+    assert [delivery.attempts for delivery in deliveries] == [1, 1]
+    assert deliveries[0].last_error == "timeout"
+    async with sessions() as db:
+        subscription = await db.get(WebhookSubscription, created["id"])
+    assert subscription.failures == 1 and subscription.locked_by is None
+
+
+@pytest.mark.asyncio
+async def test_internal_addresses_are_refused(client, async_session, sessions, owner, partner, monkeypatch):
+    user_id, headers = owner
+    created = await _subscribe(client, headers, partner.url.replace("127.0.0.1", "localhost"))
+    await _write_events(client, async_session, user_id, headers)
+    await _queue(sessions)
+
+    monkeypatch.setattr(get_settings(), "webhooks_allow_private_targets", False)
+    for url in (
+        "http://127.0.0.1:8000/h", "http://10.0.0.5/h", "http://169.254.169.254/latest", "http://[::1]/h",
+        "http://localhost:3100/h",
+    ):
+        res = await client.post("/webhooks", json={"url": url}, headers=headers)
+        assert res.status_code == 422, url
+    monkeypatch.setattr(get_settings(), "database_use", "prod")
+    res = await client.post("/webhooks", json={"url": "http://example.com/h"}, headers=headers)
+    assert res.status_code == 422
+
+    # names are checked again at send time: one that resolves to a private address is never contacted
+    dispatcher = WebhookDispatcher(sessions, concurrency=1, retry_base=60, retry_max=60)
+    try:
+        assert await dispatcher.run_once() is True
+    finally:
+        await dispatcher.stop()
+
+    assert partner.requests == []
+    deliveries = await _pending(sessions, created["id"])
+    assert [delivery.last_error for delivery in deliveries] == ["address_not_allowed"] * 2
+
+
+@pytest.mark.asyncio
+async def test_subscription_api(client, async_session, owner, monkeypatch):
+    _, headers = owner
+    res = await client.post("/webhooks", json={"url": "no-es-una-url"}, headers=headers)
+    assert res.status_code == 422
+    res = await client.post(
+        "/webhooks", json={"url": "https://example.com/h", "events": ["card.created"]}, headers=headers
+    )
+    assert res.status_code == 422
+    res = await client.post("/webhooks", json={"url": "https://example.com/h", "events": []}, headers=headers)
+    assert res.status_code == 422
+
+    created = await _subscribe(client, headers, "https://example.com/h")
+    assert created["events"] == ["transaction.created", "transfer.created"]
+    assert len(created["secret"]) == 64
+
+    monkeypatch.setattr(get_settings(), "webhooks_max_per_user", 1)
+    res = await client.post("/webhooks", json={"url": "https://example.com/otro"}, headers=headers)
+    assert res.status_code == 409
+
+    _, other_headers = await _new_user(async_session)
+    assert (await client.delete(f"/webhooks/{created['id']}", headers=other_headers)).status_code == 404
+    assert (await client.get(f"/webhooks/{created['id']}/dead-letters", headers=other_headers)).status_code == 404
+    assert (await client.delete(f"/webhooks/{created['id']}", headers=headers)).status_code == 204
+    assert (await client.get("/webhooks", headers=headers)).json() == []